@@ -0,0 +1,116 @@
+"""
+Show how the drive-size mapping scales with the number of partitions.
+
+Builds a fake WMI inventory with ``--disks`` physical drives and a growing
+number of partitions, then times the old nested ``associators()`` loop against
+``wmi_probes.probe_disks``, which joins two association queries in memory.
+Every WMI call costs ``--call-ms`` plus ``--row-us`` per returned row. The
+legacy walk makes O(partitions x drives) calls; the batched probe makes four
+calls whose cost grows only with the rows returned.
+
+Usage:
+  python scripts/bench_disk_mapping.py [--disks 2] [--partitions 4,8,16,32,64]
+                                       [--call-ms 2] [--row-us 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from utils.wmi_probes import FakeWmiProvider, probe_disks  # noqa: E402
+
+
+ASSOCIATION_CLASSES = ("Win32_DiskDriveToDiskPartition", "Win32_LogicalDiskToPartition")
+QUERY_CLASSES = ("Win32_DiskDrive", "Win32_DiskPartition")
+
+
+def build_provider(disks: int, partitions: int, call_ms: float, row_us: float) -> FakeWmiProvider:
+    drives = [
+        {
+            "DeviceID": f"\\\\.\\PHYSICALDRIVE{index}",
+            "Size": str((index + 1) * 256 * 1000**3),
+            "Caption": "NVMe SSD",
+            "MediaType": "Fixed hard disk media",
+            "InterfaceType": "SCSI",
+        }
+        for index in range(disks)
+    ]
+    partition_rows = []
+    drive_links = []
+    logical_links = []
+    for index in range(partitions):
+        disk = index % disks
+        partition_id = f"Disk #{disk}, Partition #{index // disks}"
+        partition_rows.append({"DeviceID": partition_id})
+        drive_links.append((("Win32_DiskDrive", drives[disk]["DeviceID"]), ("Win32_DiskPartition", partition_id)))
+        logical_links.append((("Win32_DiskPartition", partition_id), ("Win32_LogicalDisk", f"L{index}:")))
+    delays = {name: call_ms / 1000.0 for name in QUERY_CLASSES + ASSOCIATION_CLASSES}
+    return FakeWmiProvider(
+        {
+            "Win32_DiskDrive": drives,
+            "Win32_DiskPartition": partition_rows,
+            "Win32_LogicalDisk": [{"DeviceID": f"L{index}:"} for index in range(partitions)],
+        },
+        delays=delays,
+        row_latency=row_us / 1_000_000.0,
+        associations={
+            "Win32_DiskDriveToDiskPartition": drive_links,
+            "Win32_LogicalDiskToPartition": logical_links,
+        },
+    )
+
+
+def legacy_drive_sizes(session):
+    """The previous nested associators() walk, kept for comparison."""
+
+    physical_drives = {disk.DeviceID: int(int(disk.Size) / (1000**3)) for disk in session.query("Win32_DiskDrive")}
+    drive_sizes = []
+    for partition in session.query("Win32_DiskPartition"):
+        for _logical in partition.associators("Win32_LogicalDiskToPartition"):
+            for disk in session.query("Win32_DiskDrive"):
+                for part in disk.associators("Win32_DiskDriveToDiskPartition"):
+                    if part.DeviceID == partition.DeviceID and disk.DeviceID in physical_drives:
+                        if physical_drives[disk.DeviceID] not in drive_sizes:
+                            drive_sizes.append(physical_drives[disk.DeviceID])
+    return "+".join(f"{size}GB" for size in drive_sizes)
+
+
+def timed(func, provider):
+    provider.calls.clear()
+    started = time.perf_counter()
+    with provider.session() as session:
+        result = func(session)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    calls = sum(count for key, count in provider.calls.items() if key != "session")
+    return result, elapsed_ms, calls
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--disks", type=int, default=2)
+    parser.add_argument("--partitions", default="4,8,16,32,64")
+    parser.add_argument("--call-ms", type=float, default=2.0, help="Fixed cost of every WMI call.")
+    parser.add_argument("--row-us", type=float, default=20.0, help="Extra cost per returned row.")
+    args = parser.parse_args()
+
+    print(f"{'partitions':>10} {'legacy calls':>13} {'legacy ms':>10} {'batched calls':>14} {'batched ms':>11}")
+    for partitions in (int(value) for value in args.partitions.split(",")):
+        provider = build_provider(args.disks, partitions, args.call_ms, args.row_us)
+        legacy_ssd, legacy_ms, legacy_calls = timed(legacy_drive_sizes, provider)
+        fields, batched_ms, batched_calls = timed(lambda session: probe_disks(session, lambda message: None), provider)
+        if fields.get("SSD") != legacy_ssd:
+            print(f"mismatch at {partitions} partitions: {legacy_ssd!r} != {fields.get('SSD')!r}", file=sys.stderr)
+            return 1
+        print(f"{partitions:>10} {legacy_calls:>13} {legacy_ms:>10.1f} {batched_calls:>14} {batched_ms:>11.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
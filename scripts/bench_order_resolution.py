@@ -0,0 +1,140 @@
+"""
+Compare round trips for the legacy sequential order lookup against the combined
+single-query snapshot used by the search flow.
+
+The default stub mode replays scripted rows through a counting cursor that
+sleeps for ``--latency-ms`` on every ``execute()``, which approximates a
+remote MySQL server. ``--live`` runs both paths against the configured
+database instead and counts the statements issued.
+
+Usage:
+  python scripts/bench_order_resolution.py [--reference 123456] [--iterations 50]
+                                           [--latency-ms 20] [--live]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import main_logic  # noqa: E402
+
+
+CUSTOM_ITEM = [7, 1, 1, "T480-I5-16-256", "ThinkPad T480", "ThinkPad T480", "i5-8350U", "Windows 11 Pro", "16GB", "256GB", "Good"]
+
+
+class CountingCursor:
+    """Wrap a DB-API cursor (or scripted rows) and count ``execute()`` calls."""
+
+    def __init__(self, inner=None, latency: float = 0.0):
+        self._inner = inner
+        self._latency = latency
+        self._row = None
+        self.executions = 0
+
+    def execute(self, sql, params=None):
+        self.executions += 1
+        if self._inner is not None:
+            return self._inner.execute(sql, params)
+        if self._latency:
+            time.sleep(self._latency)
+        self._row = self._scripted_row(sql, params or ())
+        return 1 if self._row else 0
+
+    def fetchone(self):
+        if self._inner is not None:
+            return self._inner.fetchone()
+        return self._row[0] if self._row else None
+
+    def fetchall(self):
+        if self._inner is not None:
+            return self._inner.fetchall()
+        return list(self._row or [])
+
+    @staticmethod
+    def _scripted_row(sql, params):
+        # The stub order is only reachable through its marketplace external_id,
+        # which is the slowest path for the sequential lookups.
+        if "JSON_ARRAYAGG" in sql:
+            return [(42, "ORD-42", main_logic.ORDER_MATCH_EXTERNAL_ID, "T480-I5-16-256", json.dumps([CUSTOM_ITEM]), "Check hinge")]
+        if "FROM custom_order_item" in sql:
+            return [tuple(CUSTOM_ITEM)]
+        if "FROM order_note" in sql:
+            return [("Check hinge",)]
+        if "WHERE external_id" in sql:
+            return [(42, "ORD-42")]
+        return None
+
+
+def legacy_lookup(cursor, reference):
+    identity = main_logic.resolve_order_by_order_number(cursor, reference)
+    if not identity:
+        identity = main_logic.resolve_order_by_external_id(cursor, reference)
+    if not identity:
+        return None
+    order_db_id, _order_number = identity
+    main_logic.load_order_candidates_for_order_id(cursor, order_db_id)
+    main_logic.load_order_note_for_order_id(cursor, order_db_id)
+    return identity
+
+
+def combined_lookup(cursor, reference):
+    return main_logic.load_order_search_snapshot(cursor, reference)
+
+
+def run(label, lookup, make_cursor, reference, iterations):
+    timings = []
+    executions = 0
+    for _ in range(iterations):
+        cursor = make_cursor()
+        started = time.perf_counter()
+        lookup(cursor, reference)
+        timings.append((time.perf_counter() - started) * 1000)
+        executions = cursor.executions
+    print(
+        f"{label:<10} round trips={executions:<3} "
+        f"median={statistics.median(timings):8.2f} ms  max={max(timings):8.2f} ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reference", default="123456", help="Order reference to resolve.")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated per-query latency in stub mode.")
+    parser.add_argument("--live", action="store_true", help="Use the configured database instead of the stub.")
+    args = parser.parse_args()
+
+    conn = None
+    if args.live:
+        from db.database import get_db_connection
+
+        conn = get_db_connection(show_errors=False)
+        if not conn:
+            print("Database unavailable.", file=sys.stderr)
+            return 1
+
+    def make_cursor():
+        if conn is not None:
+            return CountingCursor(conn.cursor())
+        return CountingCursor(latency=args.latency_ms / 1000.0)
+
+    try:
+        run("legacy", legacy_lookup, make_cursor, args.reference, args.iterations)
+        run("combined", combined_lookup, make_cursor, args.reference, args.iterations)
+    finally:
+        if conn is not None:
+            conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+"""
+Compare one process per command with requests to a persistent worker.
+
+By default the stub worker from ``utils.powershell_host`` stands in for
+PowerShell, so this runs anywhere and measures process start-up plus protocol
+overhead. On Windows, ``--powershell`` uses real ``powershell.exe`` for both
+sides. That shows the 1-3 s interpreter start-up that the host avoids.
+
+Usage:
+  python scripts/bench_powershell_host.py [--requests 10] [--powershell]
+"""
+
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from utils.powershell_host import PowerShellHost, stub_worker_command  # noqa: E402
+
+
+SCRIPT = "(Get-CimInstance -ClassName Win32_BIOS).SerialNumber"
+
+
+def one_shot_command(use_powershell: bool) -> list[str]:
+    if use_powershell:
+        return ["powershell.exe", "-NoProfile", "-NonInteractive", "-Command", SCRIPT]
+    return [sys.executable, "-c", "print('PF1ABCDE')"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--powershell", action="store_true", help="Use real powershell.exe (Windows only).")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        subprocess.run(one_shot_command(args.powershell), capture_output=True, text=True, check=True)
+    one_shot_ms = (time.perf_counter() - started) * 1000.0
+
+    command = None if args.powershell else stub_worker_command({"*": {"output": "PF1ABCDE"}})
+    host = PowerShellHost(command, max_workers=1)
+    try:
+        started = time.perf_counter()
+        first = host.run(SCRIPT, timeout=60)
+        first_ms = (time.perf_counter() - started) * 1000.0
+        started = time.perf_counter()
+        for _ in range(args.requests - 1):
+            host.run(SCRIPT, timeout=60)
+        warm_ms = (time.perf_counter() - started) * 1000.0
+    finally:
+        host.shutdown()
+
+    warm_avg = warm_ms / max(1, args.requests - 1)
+    print(f"one process per call  {one_shot_ms / args.requests:8.1f} ms/call")
+    print(f"host, first request   {first_ms:8.1f} ms (includes worker start, output={first.last_line!r})")
+    print(f"host, warm requests   {warm_avg:8.1f} ms/call")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
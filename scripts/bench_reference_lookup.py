@@ -0,0 +1,170 @@
+"""
+Show the query plans of the trade job and order resolvers before and after
+sql/003_reference_lookup_indexes.sql.
+
+Seeds ``--rows`` jobs and orders into minimal ``job`` and ``order`` tables in a
+scratch MySQL database. The plans and median timings are printed twice:
+first without the generated column and indexes (full scans), then after
+applying the migration script (index lookups). Host, user and password come
+from config.ini and the DB_* variables. The database must be named explicitly
+and should be a scratch schema: both tables are dropped and recreated there.
+
+Usage:
+  python scripts/bench_reference_lookup.py --database scratch [--rows 200000] [--repeat 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import MySQLdb  # noqa: E402
+
+import main_logic  # noqa: E402
+from db.database import load_database_settings  # noqa: E402
+
+
+MIGRATION = ROOT / "sql" / "003_reference_lookup_indexes.sql"
+
+TABLES = (
+    """
+    CREATE TABLE job (
+        id INT NOT NULL AUTO_INCREMENT,
+        reference_number VARCHAR(64) NOT NULL,
+        customer VARCHAR(255) NULL,
+        summary VARCHAR(255) NULL,
+        notes TEXT NULL,
+        is_archived TINYINT(1) NULL,
+        date_created DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """,
+    """
+    CREATE TABLE `order` (
+        id INT NOT NULL AUTO_INCREMENT,
+        platform VARCHAR(32) NOT NULL,
+        external_id VARCHAR(128) NOT NULL,
+        order_number VARCHAR(64) NOT NULL,
+        sku VARCHAR(128) NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE KEY uq_order_source_item (platform, external_id, sku)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """,
+)
+
+QUERIES = {
+    "trade job (legacy UPPER(TRIM()))": (
+        "SELECT id, reference_number FROM job WHERE UPPER(TRIM(reference_number)) = UPPER(TRIM(%s)) "
+        "AND COALESCE(is_archived, 0) = 0 ORDER BY id DESC LIMIT 1",
+        lambda rows: (f" tj-{rows // 2:07d} ",),
+    ),
+    "order by order_number": (
+        "SELECT id, order_number FROM `order` WHERE order_number = %s ORDER BY id DESC LIMIT 1",
+        lambda rows: (f"{rows // 2:06d}",),
+    ),
+    "order by external_id": (
+        "SELECT id, order_number FROM `order` WHERE external_id = %s ORDER BY id DESC LIMIT 1",
+        lambda rows: (f"EXT-{rows // 2:08d}",),
+    ),
+}
+NORMALISED_JOB_QUERY = (
+    "trade job (reference_number_norm)",
+    "SELECT id, reference_number FROM job WHERE reference_number_norm = UPPER(TRIM(%s)) "
+    "AND COALESCE(is_archived, 0) = 0 ORDER BY id DESC LIMIT 1",
+    lambda rows: (f" tj-{rows // 2:07d} ",),
+)
+
+
+def seed(conn, rows: int) -> None:
+    cursor = conn.cursor()
+    for table in ("job", "`order`"):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    for ddl in TABLES:
+        cursor.execute(ddl)
+    for start in range(0, rows, 5000):
+        numbers = range(start, min(rows, start + 5000))
+        cursor.executemany(
+            "INSERT INTO job (reference_number, customer, is_archived) VALUES (%s, %s, %s)",
+            [(f"TJ-{number:07d}", "Bench Customer", number % 50 == 0) for number in numbers],
+        )
+        cursor.executemany(
+            "INSERT INTO `order` (platform, external_id, order_number, sku) VALUES (%s, %s, %s, %s)",
+            [("ebay", f"EXT-{number:08d}", f"{number:06d}", "T480-I5-16-256") for number in numbers],
+        )
+    conn.commit()
+
+
+def apply_migration(conn) -> None:
+    cursor = conn.cursor()
+    script = "\n".join(line for line in MIGRATION.read_text(encoding="utf-8").splitlines() if not line.startswith("--"))
+    for statement in script.split(";"):
+        if statement.strip():
+            cursor.execute(statement)
+    conn.commit()
+
+
+def report(cursor, label: str, sql: str, params, repeat: int) -> None:
+    cursor.execute("EXPLAIN " + sql, params)
+    columns = [column[0] for column in cursor.description]
+    plan = dict(zip(columns, cursor.fetchone()))
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    print(
+        f"  {label:<36} type={plan.get('type')!s:<6} key={plan.get('key')!s:<24} "
+        f"rows={plan.get('rows')!s:<8} {statistics.median(samples):8.2f} ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="Scratch database to seed (required).")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    settings = load_database_settings()
+    conn = MySQLdb.connect(
+        host=settings["host"],
+        user=settings["user"],
+        passwd=settings["password"],
+        db=args.database,
+        charset="utf8mb4",
+    )
+    cursor = conn.cursor()
+
+    started = time.perf_counter()
+    seed(conn, args.rows)
+    print(f"seeded {args.rows} jobs and orders in {time.perf_counter() - started:.1f}s")
+
+    print("before migration:")
+    for label, (sql, params) in QUERIES.items():
+        report(cursor, label, sql, params(args.rows), args.repeat)
+
+    apply_migration(conn)
+    cursor.execute("ANALYZE TABLE job, `order`")
+    cursor.fetchall()
+    print("after sql/003_reference_lookup_indexes.sql:")
+    label, sql, params = NORMALISED_JOB_QUERY
+    report(cursor, label, sql, params(args.rows), args.repeat)
+    for label, (sql, params) in list(QUERIES.items())[1:]:
+        report(cursor, label, sql, params(args.rows), args.repeat)
+
+    identity = main_logic.resolve_trade_job_by_reference(cursor, f" tj-{args.rows // 2:07d} ")
+    print(f"resolve_trade_job_by_reference -> {identity}")
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+"""
+Measure peak memory and bytes on the wire for a check report with a large hash CSV.
+
+A local HTTP server reads each request body in chunks and throws it away. It
+counts the bytes. The same trade report is then sent in each upload mode:
+JSON with the CSV embedded (the default), multipart with the CSV streamed
+from disk, and multipart with gzip. Peak memory comes from ``tracemalloc``.
+
+Usage:
+  python scripts/bench_report_upload.py [--size-mb 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.server
+import sys
+import tempfile
+import threading
+import tracemalloc
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from utils import helpers  # noqa: E402
+from utils.webtools_client import (  # noqa: E402
+    REPORT_UPLOAD_JSON,
+    REPORT_UPLOAD_MULTIPART,
+    WebToolsClient,
+    WebToolsConfig,
+)
+
+
+MODES = (
+    ("json", REPORT_UPLOAD_JSON, False),
+    ("multipart", REPORT_UPLOAD_MULTIPART, False),
+    ("multipart+gzip", REPORT_UPLOAD_MULTIPART, True),
+)
+
+
+class DiscardingServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        self.bytes_received = 0
+        super().__init__(("127.0.0.1", 0), DiscardingHandler)
+
+
+class DiscardingHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        remaining = int(self.headers.get("Content-Length") or 0)
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 64 * 1024))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            self.server.bytes_received += len(chunk)
+        body = b'{"success": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_hash_csv(path: Path, size_mb: int) -> None:
+    # Hardware hashes are base64 text, which is what makes gzip worthwhile.
+    row = b"PF1ABCDE,," + b"T0FBQUFBQUFBQUFBQUFB" * 200 + b",\r\n"
+    with path.open("wb") as handle:
+        handle.write(b"Device Serial Number,Windows Product ID,Hardware Hash,Group Tag\r\n")
+        for _ in range(max(1, size_mb * 1024 * 1024 // len(row))):
+            handle.write(row)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=20)
+    args = parser.parse_args()
+
+    server = DiscardingServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        csv_path = Path(temp_dir) / "PF1ABCDE.csv"
+        write_hash_csv(csv_path, args.size_mb)
+        file_mb = csv_path.stat().st_size / (1024 * 1024)
+        print(f"hash CSV: {file_mb:.1f} MB")
+        try:
+            for label, report_upload, compress in MODES:
+                config = WebToolsConfig(base_url, "bench-key", report_upload=report_upload, compress=compress)
+                helpers.set_webtools_client(WebToolsClient(config, backoff_factor=0))
+                server.bytes_received = 0
+                tracemalloc.start()
+                ok, _body = helpers.upload_trade_job_check_report(
+                    job_reference="TJ-BENCH",
+                    serial_number="PF1ABCDE",
+                    product_label="X280",
+                    specs={},
+                    test_results={},
+                    hash_csv_path=str(csv_path),
+                )
+                _current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(
+                    f"{label:<16} ok={ok!s:<5} peak {peak / (1024 * 1024):8.1f} MB  "
+                    f"sent {server.bytes_received / (1024 * 1024):8.2f} MB"
+                )
+        finally:
+            helpers.set_webtools_client(None)
+            server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,167 @@
+"""
+Compare the serial viewer's old full-order fetch with keyset pagination.
+
+Seeds ``--rows`` serials for one order into ``order_serials`` in a scratch
+MySQL database, then times:
+
+- the old path: every row for the order is fetched and page 1 is sliced in Python
+- the keyset path: a COUNT plus one LIMITed page
+- walking ``--pages`` pages in order with the keyset path
+
+Seeded rows share ``assigned_at`` values in runs, which exercises the ``id``
+tie-break. Host, user and password default to config.ini and the DB_* variables.
+The database must be named explicitly and should be a scratch schema: the table
+is created there if missing and the bench order's rows are replaced.
+
+Usage:
+  python scripts/bench_serial_pagination.py --database scratch [--rows 100000]
+                                            [--pages 50] [--drop-index] [--cleanup]
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import MySQLdb  # noqa: E402
+
+from db.database import load_database_settings  # noqa: E402
+from logic.view_serials_logic import SERIALS_PER_PAGE, SerialPager, count_order_serials, fetch_serial_page  # noqa: E402
+
+
+ORDER_NUMBER = "BENCH-PAGINATION"
+PAGE_INDEX = "idx_order_serials_order_page"
+
+TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS order_serials (
+        id BIGINT NOT NULL AUTO_INCREMENT,
+        order_id INT NOT NULL,
+        order_number VARCHAR(64) NOT NULL,
+        serial_number VARCHAR(64) NOT NULL,
+        sku VARCHAR(128) NULL,
+        assigned_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id),
+        UNIQUE KEY uniq_serial_number (serial_number),
+        KEY idx_order_serials_order_number (order_number)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+"""
+
+
+def has_page_index(cursor) -> bool:
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = 'order_serials' AND index_name = %s",
+        (PAGE_INDEX,),
+    )
+    return bool(cursor.fetchone()[0])
+
+
+def seed(conn, rows: int) -> None:
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM order_serials WHERE order_number = %s", (ORDER_NUMBER,))
+    base = datetime.datetime(2025, 1, 1, 8, 0, 0)
+    batch = []
+    for number in range(rows):
+        # Ten serials per second, so pages regularly split rows with equal timestamps.
+        assigned_at = base + datetime.timedelta(seconds=number // 10)
+        batch.append((1, ORDER_NUMBER, f"BENCH{number:09d}", "T480-I5-16-256", assigned_at))
+        if len(batch) == 5000:
+            cursor.executemany(
+                "INSERT INTO order_serials (order_id, order_number, serial_number, sku, assigned_at) VALUES (%s, %s, %s, %s, %s)",
+                batch,
+            )
+            batch = []
+    if batch:
+        cursor.executemany(
+            "INSERT INTO order_serials (order_id, order_number, serial_number, sku, assigned_at) VALUES (%s, %s, %s, %s, %s)",
+            batch,
+        )
+    conn.commit()
+
+
+def timed(func, repeat: int = 5) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="Scratch database to seed (required).")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--drop-index", action="store_true", help="Measure without the keyset index.")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the seeded rows afterwards.")
+    args = parser.parse_args()
+
+    settings = load_database_settings()
+    conn = MySQLdb.connect(
+        host=settings["host"],
+        user=settings["user"],
+        passwd=settings["password"],
+        db=args.database,
+        charset="utf8mb4",
+    )
+    cursor = conn.cursor()
+    cursor.execute(TABLE_DDL)
+    indexed = has_page_index(cursor)
+    if args.drop_index and indexed:
+        cursor.execute(f"ALTER TABLE order_serials DROP INDEX {PAGE_INDEX}")
+    elif not args.drop_index and not indexed:
+        cursor.execute(f"ALTER TABLE order_serials ADD INDEX {PAGE_INDEX} (order_number, assigned_at, id)")
+
+    started = time.perf_counter()
+    seed(conn, args.rows)
+    print(f"seeded {args.rows} serials in {time.perf_counter() - started:.1f}s (page index: {not args.drop_index})")
+
+    def legacy_first_page():
+        cursor.execute("SELECT serial_number, sku, assigned_at FROM order_serials WHERE order_number = %s", (ORDER_NUMBER,))
+        return cursor.fetchall()[:SERIALS_PER_PAGE]
+
+    def keyset_first_page():
+        count_order_serials(cursor, ORDER_NUMBER)
+        return fetch_serial_page(cursor, ORDER_NUMBER, None, SERIALS_PER_PAGE)
+
+    def keyset_walk():
+        pager = SerialPager(lambda after, limit: fetch_serial_page(cursor, ORDER_NUMBER, after, limit))
+        for index in range(args.pages):
+            if not pager.get_page(index):
+                break
+
+    legacy_ms = timed(legacy_first_page)
+    keyset_ms = timed(keyset_first_page)
+    walk_ms = timed(keyset_walk, repeat=3)
+    print(f"full fetch + slice     {legacy_ms:9.1f} ms  ({args.rows} rows transferred)")
+    print(f"COUNT + keyset page 1  {keyset_ms:9.1f} ms  ({SERIALS_PER_PAGE} rows transferred)")
+    print(f"keyset next page       {walk_ms / args.pages:9.2f} ms/page over {args.pages} pages")
+
+    cursor.execute(
+        "EXPLAIN SELECT id, serial_number, sku, assigned_at FROM order_serials WHERE order_number = %s "
+        "AND (assigned_at > %s OR (assigned_at = %s AND id > %s)) ORDER BY assigned_at, id LIMIT %s",
+        (ORDER_NUMBER, datetime.datetime(2025, 1, 1, 9), datetime.datetime(2025, 1, 1, 9), 0, SERIALS_PER_PAGE),
+    )
+    columns = [column[0] for column in cursor.description]
+    for row in cursor.fetchall():
+        plan = dict(zip(columns, row))
+        print(f"plan: key={plan.get('key')} type={plan.get('type')} rows={plan.get('rows')} extra={plan.get('Extra')}")
+
+    if args.cleanup:
+        cursor.execute("DELETE FROM order_serials WHERE order_number = %s", (ORDER_NUMBER,))
+        conn.commit()
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,171 @@
+"""
+Microbenchmark for the compiled SKU tag matcher.
+
+Generates synthetic ``attribute_term_metadata`` entries and SKUs, checks that
+the Aho–Corasick matcher returns exactly what the previous sort-and-scan loop
+returned, and reports the per-SKU cost of both. The same SKUs are then run
+through the compiled ``[search]`` keyword matcher from ``--config`` and the
+per-keyword ``re.search`` loop it replaced.
+
+Usage:
+  python scripts/bench_sku_matcher.py [--tags 3000] [--skus 2000] [--seed 7]
+                                      [--config dist/config.ini]
+"""
+
+from __future__ import annotations
+
+import argparse
+import configparser
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from utils.sku_matcher import SKU_KEYWORD_CATEGORIES, SkuKeywordMatcher, SkuTagMatcher  # noqa: E402
+
+
+CATEGORY_TO_FIELD = {
+    "cpu": "CPU",
+    "memory": "RAM",
+    "storage": "SSD",
+    "os": "Windows",
+    "battery": "Battery",
+    "model": "Model",
+    "resolution": "Resolution",
+}
+NORMALIZE_PATTERN = re.compile(r"[^A-Z0-9]+")
+
+
+def category_to_field(category):
+    return CATEGORY_TO_FIELD.get(category.lower()) if category else None
+
+
+def build_metadata(count: int, rng: random.Random):
+    alphabet = string.ascii_uppercase + string.digits
+    categories = list(CATEGORY_TO_FIELD) + ["colour"]
+    metadata = []
+    for index in range(count):
+        tag = "".join(rng.choice(alphabet) for _ in range(rng.randint(2, 8)))
+        metadata.append(
+            {
+                "sku_tag": tag,
+                "normalized_tag": NORMALIZE_PATTERN.sub("", tag.upper()),
+                "astro_name": f"Option {index}",
+                "dropdown_category": rng.choice(categories),
+                "dropdown_option_name": f"Option {index}",
+            }
+        )
+    return metadata
+
+
+def build_skus(metadata, count: int, rng: random.Random):
+    skus = []
+    for _ in range(count):
+        parts = [rng.choice(metadata)["sku_tag"] for _ in range(rng.randint(3, 6))]
+        skus.append("-".join(parts))
+    return skus
+
+
+def legacy_match(metadata, sku):
+    """The pre-compilation algorithm, kept here as the reference result."""
+
+    normalized_sku = NORMALIZE_PATTERN.sub("", sku.upper())
+    matched = {}
+    matched_tags = set()
+    for entry in sorted(metadata, key=lambda item: len(item["normalized_tag"]), reverse=True):
+        tag = entry["normalized_tag"]
+        if not tag or tag in matched_tags or tag not in normalized_sku:
+            continue
+        field = category_to_field(entry["dropdown_category"])
+        if not field:
+            continue
+        value = entry["dropdown_option_name"] or entry["astro_name"] or entry["sku_tag"]
+        if not value:
+            continue
+        if field not in matched:
+            matched[field] = value
+        matched_tags.add(tag)
+    return matched
+
+
+def legacy_keyword_match(keywords, target):
+    for keyword in keywords:
+        if re.search(rf"(?<!\w){re.escape(keyword)}(?!\w)", target, re.IGNORECASE):
+            return keyword
+    for keyword in keywords:
+        if keyword.lower() in target.lower():
+            return keyword
+    return None
+
+
+def bench_keywords(config_path: Path, skus) -> int:
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    keyword_lists = {
+        category: config.get("search", f"{category}_keywords").split(",")
+        for category in SKU_KEYWORD_CATEGORIES
+        if category != "grade"
+    }
+
+    started = time.perf_counter()
+    legacy_results = [
+        [legacy_keyword_match(keywords, sku) for keywords in keyword_lists.values()] for sku in skus
+    ]
+    legacy_s = time.perf_counter() - started
+
+    matcher = SkuKeywordMatcher(keyword_lists)
+    started = time.perf_counter()
+    compiled_results = [[matcher.first_match(category, sku) for category in keyword_lists] for sku in skus]
+    compiled_s = time.perf_counter() - started
+
+    mismatches = sum(1 for old, new in zip(legacy_results, compiled_results) if old != new)
+    print(f"keywords from {config_path}")
+    print(f"legacy   {len(skus) / legacy_s:10.0f} skus/s")
+    print(f"compiled {len(skus) / compiled_s:10.0f} skus/s")
+    print(f"mismatches={mismatches}")
+    return mismatches
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tags", type=int, default=3000)
+    parser.add_argument("--skus", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--config", type=Path, default=ROOT / "dist" / "config.ini")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    metadata = build_metadata(args.tags, rng)
+    skus = build_skus(metadata, args.skus, rng)
+
+    started = time.perf_counter()
+    matcher = SkuTagMatcher.from_metadata(metadata, category_to_field)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    legacy_results = [legacy_match(metadata, sku) for sku in skus]
+    legacy_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled_results = [matcher.match(NORMALIZE_PATTERN.sub("", sku.upper())) for sku in skus]
+    compiled_s = time.perf_counter() - started
+
+    mismatches = sum(1 for old, new in zip(legacy_results, compiled_results) if old != new)
+    print(f"tags={args.tags} skus={args.skus} automaton build={build_ms:.1f} ms")
+    print(f"legacy   {legacy_s / len(skus) * 1e6:10.1f} us/sku")
+    print(f"compiled {compiled_s / len(skus) * 1e6:10.1f} us/sku  ({legacy_s / compiled_s:.0f}x faster)")
+    print(f"mismatches={mismatches}")
+
+    keyword_skus = [f"{sku}-T480S-i7-16RAM-512SSD-WIN11" if index % 2 else sku for index, sku in enumerate(skus)]
+    mismatches += bench_keywords(args.config, keyword_skus)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,176 @@
+"""
+Compare the trade job search's LIKE scan with the n-gram FULLTEXT query.
+
+Seeds ``--jobs`` jobs (about 1.5 products each) into minimal ``job`` and
+``product`` tables in a scratch MySQL database, applies
+sql/004_trade_job_fulltext.sql and times both queries for a mix of
+reference prefixes, customer and summary fragments and product infixes,
+including terms with the letters the default InnoDB stopword list would drop.
+LIKE and FULLTEXT hit counts are printed side by side; a difference means the
+indexes are missing rows.
+The FULLTEXT timings go through ``main_logic.search_trade_jobs``, so they
+include the relevance ordering the picker uses. Host, user and password come
+from config.ini and the DB_* variables. The database must be named explicitly
+and should be a scratch schema: both tables are dropped and recreated there.
+
+Usage:
+  python scripts/bench_trade_job_search.py --database scratch [--jobs 1000000]
+                                           [--repeat 10] [--skip-seed]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import MySQLdb  # noqa: E402
+
+import main_logic  # noqa: E402
+from db.database import load_database_settings  # noqa: E402
+
+
+MIGRATION = ROOT / "sql" / "004_trade_job_fulltext.sql"
+TARGET_MS = 50.0
+
+TABLES = (
+    """
+    CREATE TABLE job (
+        id INT NOT NULL AUTO_INCREMENT,
+        reference_number VARCHAR(64) NOT NULL,
+        customer VARCHAR(255) NULL,
+        summary VARCHAR(255) NULL,
+        is_archived TINYINT(1) NULL,
+        date_created DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """,
+    """
+    CREATE TABLE product (
+        id INT NOT NULL AUTO_INCREMENT,
+        job_id INT NOT NULL,
+        product_name VARCHAR(255) NOT NULL,
+        PRIMARY KEY (id),
+        KEY idx_product_job (job_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """,
+)
+
+CUSTOMERS = ("Northgate", "Bramley", "Kestrel", "Harbour", "Oakfield", "Wexford", "Pemberton", "Calder")
+SUFFIXES = ("Academy", "Trust", "Council", "Ltd", "Holdings", "Partners", "College", "Surgery")
+SUMMARIES = ("Laptop refresh", "Desktop collection", "Server decommission", "Mixed IT disposal", "Monitor trade-in")
+PRODUCTS = ("ThinkPad T480", "Latitude 5490", "EliteBook 840 G5", "OptiPlex 7060", "ProDesk 600 G4", "Surface Pro 6")
+
+
+def search_terms(jobs: int):
+    return (
+        ("reference prefix", f"TJ-{jobs // 2:07d}"[:8]),
+        ("full reference", f"TJ-{jobs // 3:07d}"),
+        ("customer fragment", f"{CUSTOMERS[3][1:6]}"),
+        ("summary fragment", "decommis"),
+        ("product infix", "Book 840"),
+        ("stopword letters", "Academ"),
+        ("stopword product", "Latitude"),
+        ("no match", "Zyxwv"),
+    )
+
+
+def seed(conn, jobs: int) -> None:
+    rng = random.Random(4)
+    cursor = conn.cursor()
+    for table in ("product", "job"):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    for ddl in TABLES:
+        cursor.execute(ddl)
+    for start in range(0, jobs, 5000):
+        numbers = range(start, min(jobs, start + 5000))
+        cursor.executemany(
+            "INSERT INTO job (id, reference_number, customer, summary, is_archived) VALUES (%s, %s, %s, %s, %s)",
+            [
+                (
+                    number + 1,
+                    f"TJ-{number:07d}",
+                    f"{rng.choice(CUSTOMERS)} {rng.choice(SUFFIXES)} {number % 997}",
+                    rng.choice(SUMMARIES),
+                    number % 50 == 0,
+                )
+                for number in numbers
+            ],
+        )
+        products = []
+        for number in numbers:
+            for _ in range(rng.choice((1, 1, 2, 2))):
+                products.append((number + 1, f"{rng.choice(PRODUCTS)} #{rng.randint(1000, 9999)}"))
+        cursor.executemany("INSERT INTO product (job_id, product_name) VALUES (%s, %s)", products)
+        conn.commit()
+
+
+def apply_migration(conn) -> None:
+    cursor = conn.cursor()
+    script = "\n".join(line for line in MIGRATION.read_text(encoding="utf-8").splitlines() if not line.startswith("--"))
+    for statement in script.split(";"):
+        if statement.strip():
+            cursor.execute(statement)
+    conn.commit()
+
+
+def timed(func, repeat: int):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return statistics.median(samples), max(samples), result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="Scratch database to seed (required).")
+    parser.add_argument("--jobs", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the tables from a previous run.")
+    args = parser.parse_args()
+
+    settings = load_database_settings()
+    conn = MySQLdb.connect(
+        host=settings["host"],
+        user=settings["user"],
+        passwd=settings["password"],
+        db=args.database,
+        charset="utf8mb4",
+    )
+    cursor = conn.cursor()
+
+    if not args.skip_seed:
+        started = time.perf_counter()
+        seed(conn, args.jobs)
+        print(f"seeded {args.jobs} jobs in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        apply_migration(conn)
+        print(f"built FULLTEXT indexes in {time.perf_counter() - started:.1f}s")
+
+    print(f"{'search':<20} {'text':<12} {'LIKE median':>12} {'FULLTEXT median':>16} {'FULLTEXT max':>13}  hits (LIKE/FT)")
+    slowest = 0.0
+    for label, text in search_terms(args.jobs):
+        main_logic._TRADE_JOB_FULLTEXT_ENABLED = False
+        like_ms, _, like_matches = timed(lambda: main_logic.search_trade_jobs(cursor, text), max(1, args.repeat // 5))
+        main_logic._TRADE_JOB_FULLTEXT_ENABLED = True
+        fulltext_ms, fulltext_max, matches = timed(lambda: main_logic.search_trade_jobs(cursor, text), args.repeat)
+        slowest = max(slowest, fulltext_ms)
+        print(f"{label:<20} {text:<12} {like_ms:9.1f} ms {fulltext_ms:13.1f} ms {fulltext_max:10.1f} ms  {len(like_matches)}/{len(matches)}")
+
+    print(f"slowest FULLTEXT median {slowest:.1f} ms (target {TARGET_MS:.0f} ms): {'ok' if slowest <= TARGET_MS else 'over'}")
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+"""
+Benchmark the concurrent spec probes against a fake WMI backend.
+
+Each WMI class query sleeps for ``--latency-ms`` to mimic a slow WMI service.
+The probes are run one after another in a single session (the old collection
+order) and then through ``collect_probes``. ``--hang`` makes one class block
+for longer than ``--timeout`` to show that partial results come back on time.
+
+Usage:
+  python scripts/bench_wmi_probes.py [--latency-ms 150] [--timeout 2] [--hang Win32_VideoController]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from utils.wmi_probes import WMI_PROBES, FakeWmiProvider, Probe, collect_probes  # noqa: E402
+
+
+TABLES = {
+    "Win32_Processor": [{"Name": "Intel(R) Core(TM) i7-8650U CPU @ 1.90GHz"}],
+    "Win32_BIOS": [{"SerialNumber": "PF1ABCDE"}],
+    "Win32_VideoController": [{"CurrentHorizontalResolution": 1920, "CurrentVerticalResolution": 1080}],
+    "Win32_OperatingSystem": [{"Caption": "Microsoft Windows 11 Pro", "BuildNumber": "22631"}],
+    "Win32_ComputerSystem": [{"Manufacturer": "LENOVO", "SystemFamily": "ThinkPad X280", "Model": "20KF"}],
+    "Win32_DiskDrive": [
+        {
+            "DeviceID": r"\\.\PHYSICALDRIVE0",
+            "Size": "512110190592",
+            "Caption": "NVMe SSD",
+            "MediaType": "Fixed hard disk media",
+            "InterfaceType": "SCSI",
+        }
+    ],
+    "Win32_DiskPartition": [{"DeviceID": "Disk #0, Partition #2"}],
+    "Win32_LogicalDisk": [{"DeviceID": "C:"}],
+}
+ASSOCIATIONS = {
+    "Win32_LogicalDiskToPartition": [
+        (("Win32_DiskPartition", "Disk #0, Partition #2"), ("Win32_LogicalDisk", "C:")),
+    ],
+    "Win32_DiskDriveToDiskPartition": [
+        (("Win32_DiskDrive", r"\\.\PHYSICALDRIVE0"), ("Win32_DiskPartition", "Disk #0, Partition #2")),
+    ],
+}
+
+
+def run_sequential(provider) -> dict:
+    fields = {}
+    with provider.session() as session:
+        for probe in WMI_PROBES:
+            fields.update(probe.func(session, lambda message: None))
+    return fields
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Simulated latency per WMI query.")
+    parser.add_argument("--timeout", type=float, default=2.0, help="Per-probe timeout for the concurrent run.")
+    parser.add_argument("--hang", help="WMI class that blocks for 10x the timeout.")
+    args = parser.parse_args()
+
+    delays = {name: args.latency_ms / 1000.0 for name in TABLES}
+    provider = FakeWmiProvider(TABLES, delays=delays, associations=ASSOCIATIONS)
+
+    started = time.perf_counter()
+    sequential_fields = run_sequential(provider)
+    sequential_s = time.perf_counter() - started
+    print(f"sequential  {sequential_s * 1000:8.1f} ms  fields={len(sequential_fields)}")
+
+    if args.hang:
+        delays[args.hang] = args.timeout * 10
+    probes = [Probe(probe.name, probe.func, timeout=args.timeout, uses_wmi=probe.uses_wmi) for probe in WMI_PROBES]
+    started = time.perf_counter()
+    run = collect_probes(provider, probes)
+    concurrent_s = time.perf_counter() - started
+    print(f"concurrent  {concurrent_s * 1000:8.1f} ms  fields={len(run.fields)}  status={run.status}")
+    slowest = max(run.durations_ms.items(), key=lambda item: item[1], default=("-", 0.0))
+    print(f"slowest finished probe: {slowest[0]} ({slowest[1]:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
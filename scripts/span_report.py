@@ -0,0 +1,101 @@
+"""
+Summarise the timing spans recorded in events.jsonl.
+
+Prints the call count, p50, p95, p99 and max duration (milliseconds) for every
+span name, slowest p95 first. Error counts are shown alongside so failing
+stations stand out.
+
+Usage:
+  python scripts/span_report.py [events.jsonl ...] [--span NAME] [--since 2024-01-31]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def load_spans(paths: list[Path], since: str | None, only: str | None):
+    durations: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    skipped = 0
+    for path in paths:
+        with path.open(encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    event = json.loads(line)
+                    name = event["span"]
+                    duration = float(event["duration_ms"])
+                except (ValueError, KeyError, TypeError):
+                    skipped += 1
+                    continue
+                if only and name != only:
+                    continue
+                if since and str(event.get("ts", "")) < since:
+                    continue
+                durations[name].append(duration)
+                if event.get("status") == "error":
+                    errors[name] += 1
+    return durations, errors, skipped
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", type=Path, default=[ROOT / "events.jsonl"])
+    parser.add_argument("--span", help="Only report this span name.")
+    parser.add_argument("--since", help="Ignore events before this ISO timestamp prefix.")
+    args = parser.parse_args()
+
+    missing = [path for path in args.paths if not path.exists()]
+    if missing:
+        print(f"Event log not found: {', '.join(str(path) for path in missing)}", file=sys.stderr)
+        return 1
+
+    durations, errors, skipped = load_spans(args.paths, args.since, args.span)
+    if not durations:
+        print("No spans recorded.")
+        return 0
+
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        rows.append(
+            (
+                name,
+                len(values),
+                percentile(values, 50),
+                percentile(values, 95),
+                percentile(values, 99),
+                values[-1],
+                errors.get(name, 0),
+            )
+        )
+    rows.sort(key=lambda row: row[3], reverse=True)
+
+    width = max(len("span"), *(len(row[0]) for row in rows))
+    print(f"{'span':<{width}} {'count':>7} {'p50':>10} {'p95':>10} {'p99':>10} {'max':>10} {'errors':>7}")
+    for name, count, p50, p95, p99, peak, error_count in rows:
+        print(f"{name:<{width}} {count:>7} {p50:>10.1f} {p95:>10.1f} {p99:>10.1f} {peak:>10.1f} {error_count:>7}")
+    if skipped:
+        print(f"\nSkipped {skipped} malformed line(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,23 @@
+-- Keyset pagination index for the serial viewer.
+-- The viewer pages through one order's serials ordered by (assigned_at, id)
+-- and seeks past the last row of the previous page, so each page is a short
+-- range scan on this index instead of a full read of the order's rows.
+-- Safe to run more than once: the index is only created when it is missing.
+
+SET @index_exists := (
+    SELECT COUNT(*)
+    FROM information_schema.statistics
+    WHERE table_schema = DATABASE()
+      AND table_name = 'order_serials'
+      AND index_name = 'idx_order_serials_order_page'
+);
+
+SET @ddl := IF(
+    @index_exists = 0,
+    'ALTER TABLE `order_serials` ADD INDEX idx_order_serials_order_page (order_number, assigned_at, id)',
+    'DO 0'
+);
+
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
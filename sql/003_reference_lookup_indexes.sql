@@ -0,0 +1,77 @@
+-- Indexed lookup paths for trade job and order references.
+--
+-- resolve_trade_job_by_reference used to filter on
+-- UPPER(TRIM(reference_number)), which no index can serve, so every trade
+-- lookup scanned `job`. A stored generated column keeps the normalised form,
+-- and an index on it turns the lookup into a ref access. The order resolvers
+-- compare `order`.order_number and `order`.external_id as-is, so those only
+-- need indexes. The secondary indexes end in the primary key, which serves the
+-- resolvers' ORDER BY id DESC LIMIT 1.
+--
+-- Each step checks information_schema first, so the script is safe to re-run
+-- and skips columns a given deployment does not have.
+
+-- job.reference_number_norm + idx_job_reference_norm
+SET @has_column := (
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'job' AND column_name = 'reference_number'
+);
+SET @has_norm := (
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'job' AND column_name = 'reference_number_norm'
+);
+SET @ddl := IF(
+    @has_column = 1 AND @has_norm = 0,
+    'ALTER TABLE `job` ADD COLUMN reference_number_norm VARCHAR(255)
+        GENERATED ALWAYS AS (UPPER(TRIM(reference_number))) STORED',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @has_index := (
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'job' AND index_name = 'idx_job_reference_norm'
+);
+SET @ddl := IF(
+    @has_column = 1 AND @has_index = 0,
+    'ALTER TABLE `job` ADD INDEX idx_job_reference_norm (reference_number_norm)',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- order.order_number -> idx_order_order_number
+SET @has_column := (
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'order' AND column_name = 'order_number'
+);
+SET @has_index := (
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'order' AND index_name = 'idx_order_order_number'
+);
+SET @ddl := IF(
+    @has_column = 1 AND @has_index = 0,
+    'ALTER TABLE `order` ADD INDEX idx_order_order_number (order_number)',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- order.external_id -> idx_order_external_id
+-- (uq_order_source_item starts with platform, so it cannot serve external_id alone.)
+SET @has_index := (
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'order' AND index_name = 'idx_order_external_id'
+);
+SET @ddl := IF(
+    @has_index = 0,
+    'ALTER TABLE `order` ADD INDEX idx_order_external_id (external_id)',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -0,0 +1,48 @@
+-- Full-text search for the trade job picker.
+--
+-- search_trade_jobs used four leading-wildcard LIKEs (reference, customer,
+-- summary and a correlated EXISTS over product names), which read every job.
+-- These FULLTEXT indexes use the n-gram parser, so a phrase query matches any
+-- run of characters inside a value (infix as well as prefix) and MATCH()
+-- returns a relevance score to rank by. The default ngram_token_size of 2
+-- means one-character searches are not indexable; the app uses LIKE for those.
+--
+-- Stopwords are turned off for the build. The ngram parser drops every token
+-- that contains a stopword, and the default InnoDB list has "a", "i", "at",
+-- "in", "is", "it", "on", "to" and others, so most customer names and product
+-- models would never match. The setting is read when an index is created; an
+-- index built with stopwords on must be dropped and this script run again.
+--
+-- Building a FULLTEXT index copies the table. Run this outside working hours
+-- on large databases. Each step checks information_schema first, so the script
+-- is safe to re-run.
+
+SET SESSION innodb_ft_enable_stopword = OFF;
+
+SET @has_index := (
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'job' AND index_name = 'ft_job_search'
+);
+SET @ddl := IF(
+    @has_index = 0,
+    'ALTER TABLE `job` ADD FULLTEXT INDEX ft_job_search (reference_number, customer, summary) WITH PARSER ngram',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @has_index := (
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'product' AND index_name = 'ft_product_name'
+);
+SET @ddl := IF(
+    @has_index = 0,
+    'ALTER TABLE `product` ADD FULLTEXT INDEX ft_product_name (product_name) WITH PARSER ngram',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET SESSION innodb_ft_enable_stopword = ON;
@@ -0,0 +1,133 @@
+-- Change tracking for the SKU reference tables.
+--
+-- The app keeps a local SQLite copy of dropdown_option, attribute_term_metadata
+-- and attribute_dropdown_map (utils/reference_replica.py). With an updated_at
+-- column maintained by MySQL, each background sync only reads the rows changed
+-- since its last high-water mark. Without it the copy still works, but every
+-- sync re-reads the three tables in full. Existing rows get the time the
+-- column is added. Deletes are detected from the key set, so no tombstones
+-- are needed.
+--
+-- The copy keys attribute_term_metadata on (attribute_id, term_id) and
+-- attribute_dropdown_map on attribute_id. The first steps make MySQL enforce
+-- that with a unique key, unless a unique index on exactly those columns
+-- already exists. If one fails with a duplicate entry error (1062), list the
+-- offending rows with
+--   SELECT attribute_id, term_id, COUNT(*) FROM attribute_term_metadata
+--   GROUP BY attribute_id, term_id HAVING COUNT(*) > 1;
+-- (or GROUP BY attribute_id on attribute_dropdown_map), remove the extra rows
+-- and run the script again.
+--
+-- Each step checks information_schema first, so the script is safe to re-run.
+
+SET @has_unique := (
+    SELECT COUNT(*) FROM (
+        SELECT index_name FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'attribute_term_metadata' AND non_unique = 0
+        GROUP BY index_name
+        HAVING GROUP_CONCAT(column_name ORDER BY seq_in_index) = 'attribute_id,term_id'
+    ) AS unique_keys
+);
+SET @ddl := IF(
+    @has_unique = 0,
+    'ALTER TABLE `attribute_term_metadata` ADD UNIQUE KEY uniq_attribute_term_metadata_term (attribute_id, term_id)',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @has_unique := (
+    SELECT COUNT(*) FROM (
+        SELECT index_name FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'attribute_dropdown_map' AND non_unique = 0
+        GROUP BY index_name
+        HAVING GROUP_CONCAT(column_name ORDER BY seq_in_index) = 'attribute_id'
+    ) AS unique_keys
+);
+SET @ddl := IF(
+    @has_unique = 0,
+    'ALTER TABLE `attribute_dropdown_map` ADD UNIQUE KEY uniq_attribute_dropdown_map_attribute (attribute_id)',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @has_column := (
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'dropdown_option' AND column_name = 'updated_at'
+);
+SET @ddl := IF(
+    @has_column = 0,
+    'ALTER TABLE `dropdown_option` ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @has_index := (
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'dropdown_option' AND index_name = 'idx_dropdown_option_updated_at'
+);
+SET @ddl := IF(
+    @has_index = 0,
+    'ALTER TABLE `dropdown_option` ADD INDEX idx_dropdown_option_updated_at (updated_at)',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @has_column := (
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'attribute_term_metadata' AND column_name = 'updated_at'
+);
+SET @ddl := IF(
+    @has_column = 0,
+    'ALTER TABLE `attribute_term_metadata` ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @has_index := (
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'attribute_term_metadata' AND index_name = 'idx_attribute_term_metadata_updated_at'
+);
+SET @ddl := IF(
+    @has_index = 0,
+    'ALTER TABLE `attribute_term_metadata` ADD INDEX idx_attribute_term_metadata_updated_at (updated_at)',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @has_column := (
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'attribute_dropdown_map' AND column_name = 'updated_at'
+);
+SET @ddl := IF(
+    @has_column = 0,
+    'ALTER TABLE `attribute_dropdown_map` ADD COLUMN updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @has_index := (
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = 'attribute_dropdown_map' AND index_name = 'idx_attribute_dropdown_map_updated_at'
+);
+SET @ddl := IF(
+    @has_index = 0,
+    'ALTER TABLE `attribute_dropdown_map` ADD INDEX idx_attribute_dropdown_map_updated_at (updated_at)',
+    'DO 0'
+);
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
@@ -13,8 +13,12 @@ from tkinter import messagebox
 from ttkbootstrap import ttk
 
 from auth.login import AuthenticatedUser, LoginPanel
+from db.database import get_db_connection
+from logic.reconcile_logic import replay_assignment_journal
 from main_logic import (
     build_results_footer,
+    get_assignment_journal,
+    get_order_prefetcher,
     load_laptop_specs,
     render_results,
     save_order_note_for_order_id,
@@ -23,27 +27,46 @@ from main_logic import (
     search_trade_job_logic,
 )
 from utils.specs import reset_specs_cache
+from ui.diagnostics import DiagnosticsWindow
 from ui.tests import TestsWindow
 from update_service import UpdateManifest, UpdateService
 from utils.helpers import (
     check_mdm_lock_status,
+    get_battery_sampler,
+    get_hash_prefetcher,
+    get_upload_outbox,
     get_live_battery_percent,
+    get_reference_replica,
     is_battery_charging,
     load_app_mode,
     log_event,
+    refresh_mdm_lock_status,
     save_app_mode,
+    warm_powershell_host,
 )
 from utils.ui_scaling import get_work_area
 
+ORDER_REFERENCE_PATTERN = re.compile(r"^[A-Za-z0-9\-]{3,32}$")
+# Quiet period after the last keystroke before the order reference is prefetched.
+ORDER_PREFETCH_DEBOUNCE_MS = 350
+# How often pending offline assignments are retried against MySQL.
+JOURNAL_REPLAY_INTERVAL_MS = 60_000
+
 
 class AppController:
     def __init__(self, root: tk.Tk):
         reset_specs_cache()
+        # Start sampling now so the first footer/battery bar read finds a snapshot.
+        get_battery_sampler()
+        warm_powershell_host()
+        # SKU parsing reads the local reference copy; the sync keeps it current.
+        get_reference_replica().start()
         self.root = root
         self.current_user: Optional[AuthenticatedUser] = None
         self.test_results = {}
         self.test_labels = {}
         self.tests_window = None
+        self.diagnostics_window: Optional[DiagnosticsWindow] = None
         self.update_service = UpdateService()
         self.mdm_status = None
         self._mdm_refresh_started = False
@@ -52,6 +75,7 @@ class AppController:
         self.current_order_note_order_number: Optional[str] = None
         self.current_note_mode = "order"
         self.current_mode = load_app_mode()
+        self._order_prefetch_after_id = None
 
         width, height, x, y = self._compute_geometry()
         self.root.geometry(f"{width}x{height}+{x}+{y}")
@@ -68,6 +92,10 @@ class AppController:
 
         self.current_user = user
         self._build_ui()
+        self._start_hash_prefetch()
+        # Opening the outbox starts its sender, which replays uploads left from earlier sessions.
+        get_upload_outbox()
+        self._replay_offline_journal()
 
     def _build_ui(self) -> None:
         version_label = self.update_service.current_version
@@ -95,6 +123,7 @@ class AppController:
         menubar.add_cascade(label="Tools", menu=tools_menu)
         tools_menu.add_command(label="Check for App Updates", command=self.check_for_updates)
         tools_menu.add_command(label="Run Windows Updates", command=self.run_windows_update_script)
+        tools_menu.add_command(label="Diagnostics", command=self.open_diagnostics)
 
         header_frame = ttk.Frame(self.root, padding=(10, 10, 10, 10), style="Header.TFrame")
         header_frame.pack(fill="x")
@@ -110,6 +139,7 @@ class AppController:
         self.order_entry = ttk.Entry(header_frame, width=32, font=("Segoe UI", 11))
         self.order_entry.grid(row=0, column=1, padx=(0, 5), pady=0, ipady=4, sticky="ew")
         self.order_entry.bind("<Return>", lambda event: self.run_search())
+        self.order_entry.bind("<KeyRelease>", self._schedule_order_prefetch)
 
         self.mode_var = tk.StringVar(value="Trade" if self.current_mode == "trade" else "Order")
         self.mode_selector = ttk.Combobox(
@@ -384,6 +414,87 @@ class AppController:
     def _update_hash_capture_status(self, text: str, color: str) -> None:
         self.autopilot_hash_footer.config(text=text or "", fg=color or "#475467")
 
+    def _start_hash_prefetch(self) -> None:
+        """Capture the Autopilot hash in the background so assignment never waits on it."""
+
+        if sys.platform != "win32":
+            return
+        status_by_state = {
+            "pending": ("Autopilot Hash Pending", "#b54708"),
+            "ready": ("Autopilot Hash Collected", "#1f7a4d"),
+            "failed": ("Autopilot Hash Failed", "#b42318"),
+        }
+
+        def on_state(state: str, _path: Optional[str]) -> None:
+            text, color = status_by_state.get(state, ("", "#475467"))
+            self.root.after(0, lambda: self._update_hash_capture_status(text, color))
+
+        prefetcher = get_hash_prefetcher()
+        prefetcher.add_listener(on_state)
+        # start() reads the BIOS serial from the specs, which may still be probing.
+        threading.Thread(target=prefetcher.start, daemon=True).start()
+
+    def _replay_offline_journal(self) -> None:
+        """Write assignments journalled while offline once MySQL answers again, then check again later."""
+
+        def worker():
+            try:
+                journal = get_assignment_journal()
+                if journal.stats()["pending"]:
+                    conn = get_db_connection(retries=1, show_errors=False)
+                    if conn:
+                        try:
+                            result = replay_assignment_journal(conn, journal)
+                        finally:
+                            conn.close()
+                        if result.conflicts or result.db_only:
+                            self.root.after(0, lambda: self._show_journal_conflicts(result.conflicts, result.db_only))
+            except Exception as exc:
+                log_event(f"Offline journal replay failed: {exc}")
+            finally:
+                self.root.after(JOURNAL_REPLAY_INTERVAL_MS, self._replay_offline_journal)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _show_journal_conflicts(self, conflicts, db_only=()) -> None:
+        sections = []
+        if conflicts:
+            lines = [f"- {entry.serial_number} -> {entry.order_number}: {entry.detail}" for entry in conflicts]
+            sections.append(
+                "These serials were assigned while the database was unavailable but could not be written:\n"
+                + "\n".join(lines)
+                + "\n\nCheck them in the serial viewer and assign them again if needed."
+            )
+        if db_only:
+            lines = [f"- {entry.serial_number} -> {entry.order_number}: {entry.detail}" for entry in db_only]
+            sections.append(
+                "These serials were written to the database only; Web-Tools did not get their check report:\n"
+                + "\n".join(lines)
+                + "\n\nAssign them again online to send the report."
+            )
+        messagebox.showwarning("Offline Assignments Not Written", "\n\n".join(sections))
+
+    def _schedule_order_prefetch(self, event=None) -> None:
+        """Restart the debounce timer; the order is prefetched once typing pauses."""
+
+        if event is not None and getattr(event, "keysym", "") in ("Return", "KP_Enter"):
+            return
+        if self._order_prefetch_after_id:
+            try:
+                self.root.after_cancel(self._order_prefetch_after_id)
+            except Exception:
+                pass
+            self._order_prefetch_after_id = None
+        if self.current_mode != "order":
+            return
+        self._order_prefetch_after_id = self.root.after(ORDER_PREFETCH_DEBOUNCE_MS, self._prefetch_order_reference)
+
+    def _prefetch_order_reference(self) -> None:
+        self._order_prefetch_after_id = None
+        reference = self.order_entry.get().strip()
+        if self.current_mode == "order" and ORDER_REFERENCE_PATTERN.match(reference):
+            get_order_prefetcher().request(reference)
+
     def _update_order_notes_footer(
         self,
         text: str,
@@ -592,7 +703,7 @@ class AppController:
         active_mode = "trade" if self.current_mode == "trade" else "order"
         reference_label = "trade job reference" if active_mode == "trade" else "order number"
         log_event(f"User initiated {active_mode} search for reference: {order_id}")
-        if not order_id or not re.match(r"^[A-Za-z0-9\-]{3,32}$", order_id):
+        if not order_id or not ORDER_REFERENCE_PATTERN.match(order_id):
             log_event(f"Invalid order ID entered: {order_id}")
             messagebox.showerror("Invalid Reference", f"Please enter a valid {reference_label} (alphanumeric, 3-32 characters).")
             log_event(f"User entered invalid order ID: '{order_id}'")
@@ -836,33 +947,12 @@ class AppController:
         self._mdm_refresh_started = True
 
         def worker():
+            # Runs in-process: the policy commands go through the shared
+            # PowerShell host instead of a separate --refresh-mdm interpreter.
             try:
-                result = subprocess.run(
-                    self._build_helper_command("--refresh-mdm"),
-                    capture_output=True,
-                    text=True,
-                    timeout=120,
-                )
+                status = refresh_mdm_lock_status()
             except Exception as err:
-                log_event(f"MDM refresh process failed: {err}")
-                return
-
-            if result.returncode != 0:
-                log_event(
-                    f"MDM refresh helper exited {result.returncode}: "
-                    f"{(result.stderr or result.stdout).strip()}"
-                )
-                return
-
-            stdout = result.stdout.strip()
-            if not stdout:
-                log_event("MDM refresh helper finished with no status.")
-                return
-
-            try:
-                status = json.loads(stdout)
-            except json.JSONDecodeError as exc:
-                log_event(f"Failed to parse MDM refresh output: {exc}")
+                log_event(f"MDM refresh failed: {err}")
                 return
 
             self.mdm_status = status
@@ -891,6 +981,14 @@ class AppController:
                 except tk.TclError:
                     self.test_labels[f"{result_key}_label"] = None
 
+    def open_diagnostics(self):
+        log_event("Opening diagnostics view.")
+        if self.diagnostics_window and self.diagnostics_window.window.winfo_exists():
+            self.diagnostics_window.window.lift()
+            self.diagnostics_window.refresh()
+            return
+        self.diagnostics_window = DiagnosticsWindow(self.root)
+
     def open_test_panel(self):
         log_event("Opening test panel.")
         if self.tests_window and tk.Toplevel.winfo_exists(self.tests_window):
@@ -1,8 +1,15 @@
+import atexit
+import hashlib
+import json
 import os
+import tempfile
+import threading
 
 import MySQLdb
 from tkinter import messagebox
 
+from db.pool import ConnectionPool
+
 REQUIRED_ORDER_SERIALS_COLUMNS = [
     "sku",
     "test_microphone",
@@ -30,6 +37,18 @@ COLUMN_DEFINITIONS = {
 DEFAULT_DB_RETRIES = 2
 DEFAULT_DB_DELAY = 1
 DEFAULT_DB_TIMEOUT = 5
+DEFAULT_DB_POOL_SIZE = 4
+
+_POOL = None
+_POOL_KEY = None
+_POOL_LOCK = threading.Lock()
+
+REQUIRED_TABLES = ("order", "order_serials", "user")
+SCHEMA_FINGERPRINT_FILENAME = "schema_fingerprint.json"
+
+_VERIFIED_SCHEMAS = set()
+_SCHEMA_LOCK = threading.Lock()
+_SCHEMA_VERIFICATION_STATS = {"verified": 0, "skipped": 0}
 
 
 def build_retry_sleep_seconds(base_delay: int, attempt: int) -> int:
@@ -59,12 +78,164 @@ def load_database_settings():
         raise
 
 
+def _open_mysql_connection(settings, log_event):
+    conn = MySQLdb.connect(
+        host=settings["host"],
+        user=settings["user"],
+        passwd=settings["password"],
+        db=settings["database"],
+        charset="utf8mb4",
+        connect_timeout=DEFAULT_DB_TIMEOUT,
+        read_timeout=DEFAULT_DB_TIMEOUT,
+        write_timeout=DEFAULT_DB_TIMEOUT,
+    )
+    try:
+        ensure_schema_once(conn, settings, log_event)
+    except Exception:
+        conn.close()
+        raise
+    log_event("Opened new pooled database connection.")
+    return conn
+
+
+def get_connection_pool(settings, log_event) -> ConnectionPool:
+    """Return the process-wide pool for ``settings``, replacing it if the settings changed."""
+
+    global _POOL, _POOL_KEY
+
+    key = (settings["host"], settings["user"], settings["password"], settings["database"])
+    with _POOL_LOCK:
+        if _POOL is not None and _POOL_KEY == key:
+            return _POOL
+        previous = _POOL
+        _POOL = ConnectionPool(
+            lambda: _open_mysql_connection(settings, log_event),
+            max_size=DEFAULT_DB_POOL_SIZE,
+            log=log_event,
+        )
+        _POOL_KEY = key
+    if previous is not None:
+        log_event("Database settings changed; closing previous connection pool.")
+        previous.close_all()
+    return _POOL
+
+
+def build_schema_fingerprint() -> str:
+    """Hash the schema expectations baked into this build."""
+
+    payload = json.dumps(
+        {
+            "tables": sorted(REQUIRED_TABLES),
+            "order_serials_columns": sorted(REQUIRED_ORDER_SERIALS_COLUMNS),
+            "column_definitions": COLUMN_DEFINITIONS,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _schema_fingerprint_path() -> str:
+    from utils.helpers import get_config_path
+
+    return os.path.join(os.path.dirname(get_config_path()), SCHEMA_FINGERPRINT_FILENAME)
+
+
+def _load_schema_fingerprints(log_event) -> dict:
+    path = _schema_fingerprint_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            data = json.load(handle)
+        return data if isinstance(data, dict) else {}
+    except Exception as exc:
+        log_event(f"Failed to read schema fingerprint file: {exc}")
+        return {}
+
+
+def _store_schema_fingerprint(key: str, entry: dict, log_event) -> None:
+    path = _schema_fingerprint_path()
+    data = _load_schema_fingerprints(log_event)
+    data[key] = entry
+    try:
+        directory = os.path.dirname(path) or "."
+        fd, temp_path = tempfile.mkstemp(prefix=".schema_fingerprint.", dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, indent=2, sort_keys=True)
+        os.replace(temp_path, path)
+    except Exception as exc:
+        log_event(f"Failed to persist schema fingerprint: {exc}")
+
+
+def ensure_schema_once(conn, settings, log_event) -> None:
+    """
+    Verify the schema once per host/database for this app version.
+
+    A successful verification is remembered in memory and in
+    ``schema_fingerprint.json`` next to ``config.ini``; it only runs again when
+    the app version or the schema fingerprint of this build changes.
+    """
+
+    from version import __version__ as app_version
+
+    key = f"{settings['host']}/{settings['database']}"
+    fingerprint = build_schema_fingerprint()
+    with _SCHEMA_LOCK:
+        if key in _VERIFIED_SCHEMAS:
+            _SCHEMA_VERIFICATION_STATS["skipped"] += 1
+            return
+
+    stored = _load_schema_fingerprints(log_event).get(key) or {}
+    if stored.get("app_version") == app_version and stored.get("fingerprint") == fingerprint:
+        with _SCHEMA_LOCK:
+            _VERIFIED_SCHEMAS.add(key)
+            _SCHEMA_VERIFICATION_STATS["skipped"] += 1
+        log_event(f"Schema fingerprint for {key} unchanged; skipping verification.")
+        return
+
+    if not ensure_schema(conn, settings["database"], log_event):
+        return
+
+    with _SCHEMA_LOCK:
+        _VERIFIED_SCHEMAS.add(key)
+        _SCHEMA_VERIFICATION_STATS["verified"] += 1
+    _store_schema_fingerprint(
+        key,
+        {"app_version": app_version, "fingerprint": fingerprint},
+        log_event,
+    )
+
+
+def get_schema_verification_stats():
+    with _SCHEMA_LOCK:
+        return dict(_SCHEMA_VERIFICATION_STATS)
+
+
+def get_pool_stats():
+    pool = _POOL
+    return pool.stats() if pool is not None else {}
+
+
+def close_connection_pool() -> None:
+    global _POOL, _POOL_KEY
+
+    with _POOL_LOCK:
+        pool = _POOL
+        _POOL = None
+        _POOL_KEY = None
+    if pool is not None:
+        pool.close_all()
+
+
+atexit.register(close_connection_pool)
+
+
 def get_db_connection(retries=DEFAULT_DB_RETRIES, delay=DEFAULT_DB_DELAY, show_errors=True):
     from utils.helpers import log_event
     import traceback
     import time
 
-    log_event("Attempting to establish database connection...")
+    log_event("Checking out database connection...")
 
     try:
         settings = load_database_settings()
@@ -74,29 +245,11 @@ def get_db_connection(retries=DEFAULT_DB_RETRIES, delay=DEFAULT_DB_DELAY, show_e
             messagebox.showerror("Config Error", f"Error loading database configuration:\n{config_err}")
         return None
 
+    pool = get_connection_pool(settings, log_event)
     for attempt in range(1, retries + 1):
-        conn = None
         try:
-            log_event(f"Database connection attempt {attempt}/{retries}.")
-            conn = MySQLdb.connect(
-                host=settings["host"],
-                user=settings["user"],
-                passwd=settings["password"],
-                db=settings["database"],
-                charset="utf8mb4",
-                connect_timeout=DEFAULT_DB_TIMEOUT,
-                read_timeout=DEFAULT_DB_TIMEOUT,
-                write_timeout=DEFAULT_DB_TIMEOUT,
-            )
-            ensure_schema(conn, settings["database"], log_event)
-            log_event("Database connection established successfully.")
-            return conn
+            return pool.acquire()
         except MySQLdb.MySQLError as err:
-            if conn:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
             log_event(f"MySQL error on attempt {attempt}: {err}\n{traceback.format_exc()}")
             if attempt == retries:
                 log_event("Max retries reached. Database connection failed.")
@@ -105,11 +258,6 @@ def get_db_connection(retries=DEFAULT_DB_RETRIES, delay=DEFAULT_DB_DELAY, show_e
                 return None
             time.sleep(build_retry_sleep_seconds(delay, attempt))
         except Exception as err:
-            if conn:
-                try:
-                    conn.close()
-                except Exception:
-                    pass
             log_event(f"Unexpected error on attempt {attempt}: {err}\n{traceback.format_exc()}")
             if attempt == retries:
                 if show_errors:
@@ -118,8 +266,10 @@ def get_db_connection(retries=DEFAULT_DB_RETRIES, delay=DEFAULT_DB_DELAY, show_e
             time.sleep(build_retry_sleep_seconds(delay, attempt))
 
 
-def ensure_schema(conn, database_name, log_event):
-    required_tables = {"order", "order_serials", "user"}
+def ensure_schema(conn, database_name, log_event) -> bool:
+    """Check required tables/columns, adding known missing columns. Returns True when complete."""
+
+    required_tables = set(REQUIRED_TABLES)
     required_columns = REQUIRED_ORDER_SERIALS_COLUMNS
 
     try:
@@ -180,5 +330,9 @@ def ensure_schema(conn, database_name, log_event):
                         else:
                             raise
                 conn.commit()
+            if unknown_columns:
+                return False
+        return not missing_tables
     except Exception as err:
         log_event(f"Schema verification failed: {err}")
+        return False
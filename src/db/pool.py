@@ -0,0 +1,250 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_IDLE_TIMEOUT = 300.0
+DEFAULT_CHECKOUT_TIMEOUT = 10.0
+DEFAULT_HEALTH_CHECK_AFTER = 2.0
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+
+def default_health_check(conn) -> None:
+    """Ping MySQLdb connections; run a trivial query on other DB-API objects."""
+
+    ping = getattr(conn, "ping", None)
+    if callable(ping):
+        ping()
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+
+class PooledConnection:
+    """DB-API connection proxy whose ``close()`` hands the connection back to the pool."""
+
+    def __init__(self, pool: "ConnectionPool", raw_conn):
+        self._pool = pool
+        self._raw_conn = raw_conn
+        self._released = False
+
+    @property
+    def raw_connection(self):
+        return self._raw_conn
+
+    def close(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw_conn)
+
+    def discard(self) -> None:
+        """Close the underlying connection instead of returning it to the pool."""
+
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw_conn, discard=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __getattr__(self, name):
+        if self._released:
+            raise RuntimeError("Pooled connection used after close().")
+        return getattr(self._raw_conn, name)
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of DB-API connections.
+
+    ``connect`` is any zero-argument callable returning a new connection, so the
+    pool works with MySQLdb as well as stand-ins such as ``sqlite3``. Idle
+    connections are health-checked before reuse once they have been idle for
+    ``health_check_after`` seconds and are closed after ``idle_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        *,
+        max_size: int = DEFAULT_POOL_SIZE,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        checkout_timeout: float = DEFAULT_CHECKOUT_TIMEOUT,
+        health_check: Optional[Callable[[Any], None]] = default_health_check,
+        health_check_after: float = DEFAULT_HEALTH_CHECK_AFTER,
+        log: Optional[Callable[[str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._health_check = health_check
+        self.health_check_after = health_check_after
+        self._log = log or (lambda message: None)
+        self._clock = clock
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._in_use = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "evicted_idle": 0,
+            "failed_health_checks": 0,
+            "timeouts": 0,
+        }
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a connection, creating one if the pool has spare capacity."""
+
+        wait_limit = self.checkout_timeout if timeout is None else timeout
+        deadline = self._clock() + wait_limit
+        while True:
+            candidate = None
+            create_new = False
+            expired = []
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                expired = self._pop_expired_locked()
+                if self._idle:
+                    candidate = self._idle.pop()
+                    self._in_use += 1
+                elif self._in_use < self.max_size:
+                    self._in_use += 1
+                    create_new = True
+                else:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No database connection available after {wait_limit:.1f}s "
+                            f"(pool size {self.max_size})."
+                        )
+                    self._condition.wait(remaining)
+                    continue
+
+            for conn in expired:
+                self._close_quietly(conn)
+
+            if create_new:
+                try:
+                    conn = self._connect()
+                except BaseException:
+                    self._return_slot()
+                    raise
+                with self._condition:
+                    self._stats["created"] += 1
+                return PooledConnection(self, conn)
+
+            conn, idle_since = candidate
+            if self._is_healthy(conn, idle_since):
+                with self._condition:
+                    self._stats["reused"] += 1
+                return PooledConnection(self, conn)
+
+            self._close_quietly(conn)
+            self._return_slot()
+
+    def release(self, conn, discard: bool = False) -> None:
+        """Return a connection to the pool, rolling back any open transaction."""
+
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception as exc:
+                self._log(f"Discarding pooled connection after rollback failure: {exc}")
+                discard = True
+
+        with self._condition:
+            self._in_use = max(0, self._in_use - 1)
+            if discard or self._closed:
+                self._condition.notify()
+            else:
+                self._idle.append((conn, self._clock()))
+                self._condition.notify()
+                conn = None
+
+        if conn is not None:
+            self._close_quietly(conn)
+
+    def close_all(self) -> None:
+        """Close idle connections and refuse further checkouts."""
+
+        with self._condition:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._condition.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            snapshot = dict(self._stats)
+            snapshot["idle"] = len(self._idle)
+            snapshot["in_use"] = self._in_use
+            snapshot["max_size"] = self.max_size
+        return snapshot
+
+    def _pop_expired_locked(self):
+        if self.idle_timeout is None:
+            return []
+        now = self._clock()
+        expired = []
+        kept: Deque[Tuple[Any, float]] = deque()
+        for conn, idle_since in self._idle:
+            if now - idle_since >= self.idle_timeout:
+                expired.append(conn)
+            else:
+                kept.append((conn, idle_since))
+        if expired:
+            self._idle = kept
+            self._stats["evicted_idle"] += len(expired)
+        return expired
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        if self._health_check is None:
+            return True
+        if self._clock() - idle_since < self.health_check_after:
+            return True
+        try:
+            self._health_check(conn)
+            return True
+        except Exception as exc:
+            with self._condition:
+                self._stats["failed_health_checks"] += 1
+            self._log(f"Pooled connection failed health check: {exc}")
+            return False
+
+    def _return_slot(self) -> None:
+        with self._condition:
+            self._in_use = max(0, self._in_use - 1)
+            self._condition.notify()
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
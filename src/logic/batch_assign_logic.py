@@ -0,0 +1,265 @@
+# batch_assign_logic.py
+import csv
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from main_logic import (
+    ORDER_SERIALS_INSERT_SQL,
+    invalidate_order_cache,
+    normalise_test_result,
+    order_serial_row,
+    resolve_order_identity,
+)
+from utils.helpers import log_event
+from utils.telemetry import span
+
+STATUS_ASSIGNED = "assigned"
+STATUS_REASSIGNED = "reassigned"
+STATUS_ALREADY_ASSIGNED = "already_assigned"
+STATUS_CONFLICT = "conflict"
+STATUS_INVALID = "invalid"
+STATUS_DUPLICATE = "duplicate"
+STATUS_FAILED = "failed"
+
+# Keep the conflict query's IN (...) list well under max_allowed_packet.
+CONFLICT_QUERY_CHUNK = 500
+
+TEST_KEYS = ("keyboard", "speaker", "microphone", "display", "webcam", "usb", "wifi", "activation")
+# CSV column -> key in the specs dict used by the single-unit assign path.
+SPEC_COLUMNS = {
+    "cpu": "CPU",
+    "ram": "RAM",
+    "ssd": "SSD",
+    "model": "Model",
+    "resolution": "Resolution",
+    "windows": "Windows",
+    "battery": "Battery",
+    "battery2": "Battery 2",
+}
+
+
+@dataclass
+class BatchRow:
+    line_number: int
+    serial_number: str
+    sku: str = ""
+    specs: Dict[str, str] = field(default_factory=dict)
+    test_results: Dict[str, str] = field(default_factory=dict)
+    mdm_state: Optional[str] = None
+    mdm_details: Optional[str] = None
+
+
+@dataclass
+class BatchRowResult:
+    line_number: int
+    serial_number: str
+    status: str
+    detail: str = ""
+
+
+@dataclass
+class BatchAssignResult:
+    order_reference: str
+    order_id: Optional[int] = None
+    order_number: Optional[str] = None
+    committed: bool = False
+    error: Optional[str] = None
+    rows: List[BatchRowResult] = field(default_factory=list)
+
+    def counts(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for row in self.rows:
+            totals[row.status] = totals.get(row.status, 0) + 1
+        return totals
+
+    @property
+    def ok(self) -> bool:
+        return self.committed and self.error is None
+
+
+def _cell(record: Dict[str, Any], name: str) -> str:
+    return str(record.get(name) or "").strip()
+
+
+def read_batch_csv(path: str) -> List[BatchRow]:
+    """
+    Read a batch file with a ``serial_number`` column and optional spec/test columns.
+
+    Recognised columns: ``sku``, ``cpu``, ``ram``, ``ssd``, ``model``,
+    ``resolution``, ``windows``, ``battery``, ``battery2``, one per test
+    (``keyboard`` ... ``activation``), ``mdm_state`` and ``mdm_details``.
+    Header names are case-insensitive; unknown columns are ignored.
+    """
+
+    rows: List[BatchRow] = []
+    with open(path, "r", encoding="utf-8-sig", newline="") as handle:
+        reader = csv.DictReader(handle)
+        if not reader.fieldnames or "serial_number" not in [name.strip().lower() for name in reader.fieldnames]:
+            raise ValueError(f"{path}: missing a 'serial_number' column")
+        for raw in reader:
+            record = {(key or "").strip().lower(): value for key, value in raw.items()}
+            rows.append(
+                BatchRow(
+                    line_number=reader.line_num,
+                    serial_number=_cell(record, "serial_number"),
+                    sku=_cell(record, "sku"),
+                    specs={spec: _cell(record, column) for column, spec in SPEC_COLUMNS.items()},
+                    test_results={key: _cell(record, key) for key in TEST_KEYS},
+                    mdm_state=_cell(record, "mdm_state") or None,
+                    mdm_details=_cell(record, "mdm_details") or None,
+                )
+            )
+    return rows
+
+
+def _order_sku_options(cursor, order_db_id: int) -> List[str]:
+    cursor.execute("SELECT sku FROM `order` WHERE id = %s", (order_db_id,))
+    options: List[str] = []
+    for (raw_value,) in cursor.fetchall():
+        if raw_value is None:
+            continue
+        decoded = raw_value.decode("utf-8", errors="ignore") if isinstance(raw_value, (bytes, bytearray)) else str(raw_value)
+        for part in decoded.split(","):
+            candidate = part.strip()
+            if candidate and candidate not in options:
+                options.append(candidate)
+    return options
+
+
+def _serial_key(serial: str) -> str:
+    # order_serials.serial_number uses utf8mb4_unicode_ci, which ignores case and trailing spaces.
+    return (serial or "").strip().upper()
+
+
+def _existing_assignments(cursor, serials: Sequence[str]) -> Dict[str, List[str]]:
+    """Orders holding each serial, keyed by ``_serial_key``."""
+
+    existing: Dict[str, List[str]] = {}
+    for start in range(0, len(serials), CONFLICT_QUERY_CHUNK):
+        chunk = serials[start:start + CONFLICT_QUERY_CHUNK]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        cursor.execute(
+            f"SELECT serial_number, order_number FROM order_serials WHERE serial_number IN ({placeholders})",
+            tuple(chunk),
+        )
+        for serial, assigned_order in cursor.fetchall():
+            existing.setdefault(_serial_key(serial), []).append(assigned_order)
+    return existing
+
+
+def assign_serials_batch(
+    conn,
+    order_reference: str,
+    rows: Sequence[BatchRow],
+    *,
+    assigned_by: Optional[str] = None,
+    reassign: bool = False,
+) -> BatchAssignResult:
+    """
+    Assign many serials to one order in a single transaction.
+
+    The order is resolved once, existing assignments for every serial are read
+    with one ``IN (...)`` query, and the rows are written with ``executemany``
+    before a single commit. Serials already on another order are reported as
+    conflicts unless ``reassign`` is set, in which case their old rows are
+    deleted in the same transaction. Rows are written straight to
+    ``order_serials``: the Web-Tools stock report and hash upload of the
+    single-unit path describe the machine the tool runs on, so they do not
+    apply to a pallet of other units.
+    """
+
+    result = BatchAssignResult(order_reference=order_reference)
+    with span("batch_assign", rows=len(rows)) as attrs:
+        cursor = conn.cursor()
+        identity = resolve_order_identity(cursor, order_reference)
+        if not identity:
+            result.error = f"Order '{order_reference}' could not be found in the consolidated order table."
+            result.rows = [BatchRowResult(row.line_number, row.serial_number, STATUS_FAILED, "order not found") for row in rows]
+            attrs["outcome"] = "order_not_found"
+            return result
+        result.order_id, result.order_number = identity
+
+        default_sku = ""
+        if any(not row.sku for row in rows):
+            sku_options = _order_sku_options(cursor, result.order_id)
+            default_sku = sku_options[0] if len(sku_options) == 1 else ""
+
+        outcomes: Dict[int, BatchRowResult] = {}
+        pending: List[Tuple[int, BatchRow]] = []
+        seen = set()
+        for index, row in enumerate(rows):
+            serial = row.serial_number
+            if not serial or serial == "Unknown":
+                outcomes[index] = BatchRowResult(row.line_number, serial, STATUS_INVALID, "serial number missing")
+            elif _serial_key(serial) in seen:
+                outcomes[index] = BatchRowResult(row.line_number, serial, STATUS_DUPLICATE, "serial repeated in batch")
+            elif not (row.sku or default_sku):
+                outcomes[index] = BatchRowResult(
+                    row.line_number, serial, STATUS_INVALID, "no SKU given and the order has no single SKU"
+                )
+            else:
+                pending.append((index, row))
+            seen.add(_serial_key(serial))
+
+        existing = _existing_assignments(cursor, [row.serial_number for _, row in pending])
+        to_insert: List[Tuple[int, BatchRow]] = []
+        to_delete: List[str] = []
+        for index, row in pending:
+            assigned_orders = existing.get(_serial_key(row.serial_number), [])
+            elsewhere = [order for order in assigned_orders if order != result.order_number]
+            if assigned_orders and not elsewhere:
+                outcomes[index] = BatchRowResult(
+                    row.line_number, row.serial_number, STATUS_ALREADY_ASSIGNED, f"already on {result.order_number}"
+                )
+            elif elsewhere and not reassign:
+                outcomes[index] = BatchRowResult(
+                    row.line_number, row.serial_number, STATUS_CONFLICT, f"assigned to {', '.join(elsewhere)}"
+                )
+            else:
+                if assigned_orders:
+                    to_delete.append(row.serial_number)
+                to_insert.append((index, row))
+
+        insert_params = [
+            order_serial_row(
+                result.order_id,
+                result.order_number,
+                row.serial_number,
+                row.sku or default_sku,
+                row.specs,
+                {key: normalise_test_result(row.test_results.get(key)) for key in TEST_KEYS},
+                row.mdm_state,
+                row.mdm_details,
+                assigned_by,
+            )
+            for _, row in to_insert
+        ]
+        try:
+            if to_delete:
+                cursor.executemany("DELETE FROM order_serials WHERE serial_number = %s", [(serial,) for serial in to_delete])
+            if insert_params:
+                cursor.executemany(ORDER_SERIALS_INSERT_SQL, insert_params)
+            conn.commit()
+            result.committed = True
+            invalidate_order_cache(result.order_id)
+        except Exception as exc:
+            conn.rollback()
+            result.error = f"Batch write failed and was rolled back: {exc}"
+            log_event(f"Batch assignment to {result.order_number} failed: {exc}")
+
+        replaced = {_serial_key(serial) for serial in to_delete}
+        for index, row in to_insert:
+            if not result.committed:
+                outcomes[index] = BatchRowResult(row.line_number, row.serial_number, STATUS_FAILED, "rolled back")
+            elif _serial_key(row.serial_number) in replaced:
+                moved_from = ", ".join(existing[_serial_key(row.serial_number)])
+                outcomes[index] = BatchRowResult(row.line_number, row.serial_number, STATUS_REASSIGNED, f"moved from {moved_from}")
+            else:
+                outcomes[index] = BatchRowResult(row.line_number, row.serial_number, STATUS_ASSIGNED)
+        result.rows = [outcomes[index] for index in range(len(rows))]
+        attrs["written"] = len(to_insert) if result.committed else 0
+        attrs["outcome"] = "committed" if result.committed else "rolled_back"
+
+    user_text = f" by '{assigned_by}'" if assigned_by else ""
+    log_event(f"Batch assignment to {result.order_number}{user_text}: {result.counts()}")
+    return result
@@ -0,0 +1,173 @@
+# reconcile_logic.py
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from main_logic import ORDER_SERIALS_COLUMNS, ORDER_SERIALS_INSERT_SQL, _mysql_error_code, invalidate_order_cache
+from utils.helpers import log_event, queue_hash_csv_upload, queue_stock_unit_check_report
+from utils.offline_store import (
+    JOURNAL_APPLIED,
+    JOURNAL_CONFLICT,
+    JOURNAL_REJECTED,
+    AssignmentJournal,
+    JournalEntry,
+)
+from utils.telemetry import span
+
+MYSQL_ERROR_DUP_ENTRY = 1062
+MYSQL_ERROR_NO_REFERENCED_ROW = 1452
+
+QueueHashUpload = Callable[..., bool]
+QueueStockReport = Callable[..., bool]
+
+
+@dataclass
+class ReplayEntryResult:
+    entry_id: int
+    serial_number: str
+    order_number: str
+    status: str
+    detail: str = ""
+    serial_row_id: Optional[int] = None
+    # False for applied rows whose Web-Tools stock report could not be queued ("DB only").
+    report_queued: bool = False
+
+
+@dataclass
+class ReplayResult:
+    entries: List[ReplayEntryResult] = field(default_factory=list)
+    # Set when replay stopped early (e.g. the connection dropped); the rest stay pending.
+    stopped: Optional[str] = None
+
+    def counts(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for entry in self.entries:
+            totals[entry.status] = totals.get(entry.status, 0) + 1
+        return totals
+
+    @property
+    def conflicts(self) -> List[ReplayEntryResult]:
+        return [entry for entry in self.entries if entry.status in (JOURNAL_CONFLICT, JOURNAL_REJECTED)]
+
+    @property
+    def db_only(self) -> List[ReplayEntryResult]:
+        """Applied entries written to ``order_serials`` without a queued stock report."""
+
+        return [entry for entry in self.entries if entry.status == JOURNAL_APPLIED and not entry.report_queued]
+
+
+def _current_owners(cursor, serial_number: str) -> List[str]:
+    try:
+        cursor.execute("SELECT order_number FROM order_serials WHERE serial_number = %s", (serial_number,))
+        return [str(row[0]) for row in cursor.fetchall()]
+    except Exception:
+        return []
+
+
+def _replay_entry(
+    conn,
+    cursor,
+    entry: JournalEntry,
+    queue_hash_upload: QueueHashUpload,
+    queue_stock_report: QueueStockReport,
+) -> ReplayEntryResult:
+    params = tuple(entry.row.get(column) for column in ORDER_SERIALS_COLUMNS)
+    try:
+        cursor.execute(ORDER_SERIALS_INSERT_SQL, params)
+        serial_row_id = cursor.lastrowid
+        conn.commit()
+    except Exception as exc:
+        conn.rollback()
+        code = _mysql_error_code(exc)
+        if code == MYSQL_ERROR_DUP_ENTRY:
+            owners = _current_owners(cursor, entry.serial_number)
+            if owners == [entry.order_number]:
+                # Written by an earlier replay that stopped before the journal was updated.
+                return _queue_reports(entry, None, "already in order_serials", queue_hash_upload, queue_stock_report)
+            return ReplayEntryResult(
+                entry.id, entry.serial_number, entry.order_number, JOURNAL_CONFLICT,
+                f"already assigned to {', '.join(owners)}" if owners else "uniq_serial_number conflict",
+            )
+        if code == MYSQL_ERROR_NO_REFERENCED_ROW:
+            return ReplayEntryResult(
+                entry.id, entry.serial_number, entry.order_number, JOURNAL_REJECTED, "order no longer exists"
+            )
+        raise
+
+    invalidate_order_cache(entry.order_id)
+    return _queue_reports(entry, serial_row_id, "", queue_hash_upload, queue_stock_report)
+
+
+def _queue_reports(
+    entry: JournalEntry,
+    serial_row_id: Optional[int],
+    detail: str,
+    queue_hash_upload: QueueHashUpload,
+    queue_stock_report: QueueStockReport,
+) -> ReplayEntryResult:
+    hash_csv_path = entry.hash_csv_path if entry.hash_csv_path and os.path.exists(entry.hash_csv_path) else None
+    # The stock report carries the hash CSV, as it does for an online assignment. The key is
+    # fixed per entry so a replay that stopped after queueing does not send it twice.
+    if entry.report and queue_stock_report(
+        hash_csv_path=hash_csv_path, idempotency_key=f"journal-{entry.serial_number}-{entry.checked_at}", **entry.report
+    ):
+        return ReplayEntryResult(
+            entry.id, entry.serial_number, entry.order_number, JOURNAL_APPLIED, detail,
+            serial_row_id=serial_row_id, report_queued=True,
+        )
+    if hash_csv_path and serial_row_id is not None:
+        queue_hash_upload(hash_csv_path, serial_id=serial_row_id, sku=entry.row.get("sku"), uploaded_at=entry.checked_at)
+    reason = "stock report could not be queued" if entry.report else "no stock report journalled"
+    return ReplayEntryResult(
+        entry.id, entry.serial_number, entry.order_number, JOURNAL_APPLIED,
+        f"DB only: {reason}" + (f" ({detail})" if detail else ""), serial_row_id=serial_row_id,
+    )
+
+
+def replay_assignment_journal(
+    conn,
+    journal: AssignmentJournal,
+    *,
+    queue_hash_upload: QueueHashUpload = queue_hash_csv_upload,
+    queue_stock_report: QueueStockReport = queue_stock_unit_check_report,
+) -> ReplayResult:
+    """
+    Write pending offline assignments to ``order_serials`` in the order they were made.
+
+    Each entry is inserted and committed on its own. A duplicate on
+    ``uniq_serial_number`` (MySQL error 1062) means the serial was assigned
+    elsewhere while this station was offline: the entry is marked as a
+    conflict with the order that holds it and nothing is overwritten. A
+    missing order (1452) is rejected. Any other error stops the replay and
+    leaves that entry and the ones after it pending for the next attempt.
+    Applied entries queue their Web-Tools stock report (with the hash CSV)
+    through the upload outbox. Entries journalled without a report, or whose
+    report could not be queued, only get the hash upload and are listed in
+    ``db_only``.
+    """
+
+    result = ReplayResult()
+    entries = journal.pending()
+    if not entries:
+        return result
+    with span("journal_replay", entries=len(entries)) as attrs:
+        cursor = conn.cursor()
+        for entry in entries:
+            try:
+                outcome = _replay_entry(conn, cursor, entry, queue_hash_upload, queue_stock_report)
+            except Exception as exc:
+                journal.record_attempt(entry.id, str(exc))
+                result.stopped = str(exc)
+                log_event(f"Offline journal replay stopped at entry {entry.id} ({entry.serial_number}): {exc}")
+                break
+            journal.mark(entry.id, outcome.status, outcome.detail, serial_row_id=outcome.serial_row_id)
+            result.entries.append(outcome)
+            if outcome.status != JOURNAL_APPLIED or not outcome.report_queued:
+                log_event(f"Offline assignment {outcome.status}: serial={entry.serial_number} order={entry.order_number} {outcome.detail}")
+        attrs["outcome"] = "stopped" if result.stopped else "complete"
+
+    log_event(
+        f"Offline journal replay: {result.counts()} db_only={len(result.db_only)}"
+        + (f" stopped: {result.stopped}" if result.stopped else "")
+    )
+    return result
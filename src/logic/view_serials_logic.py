@@ -5,9 +5,144 @@ from db.database import get_db_connection
 from utils.helpers import log_event
 import traceback
 import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 SERIALS_PER_PAGE = 20
 
+PageKey = Tuple[Any, int]
+SerialRow = Tuple[int, Any, Any, Any]
+
+
+def count_order_serials(cursor, order_number: str) -> int:
+    cursor.execute("SELECT COUNT(*) FROM order_serials WHERE order_number = %s", (order_number,))
+    row = cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+def fetch_serial_page(cursor, order_number: str, after: Optional[PageKey], limit: int) -> List[SerialRow]:
+    """
+    Return up to ``limit`` ``(id, serial_number, sku, assigned_at)`` rows after ``after``.
+
+    Rows are ordered by ``(assigned_at, id)`` and ``after`` is the key of the
+    last row of the previous page, so each page is one index range scan on
+    ``idx_order_serials_order_page`` no matter how deep it is.
+    """
+
+    if after is None:
+        cursor.execute(
+            """
+                SELECT id, serial_number, sku, assigned_at
+                FROM order_serials
+                WHERE order_number = %s
+                ORDER BY assigned_at, id
+                LIMIT %s
+            """,
+            (order_number, limit),
+        )
+    else:
+        assigned_at, row_id = after
+        cursor.execute(
+            """
+                SELECT id, serial_number, sku, assigned_at
+                FROM order_serials
+                WHERE order_number = %s
+                  AND (assigned_at > %s OR (assigned_at = %s AND id > %s))
+                ORDER BY assigned_at, id
+                LIMIT %s
+            """,
+            (order_number, assigned_at, assigned_at, row_id, limit),
+        )
+    return list(cursor.fetchall())
+
+
+def _run_query(query, *args):
+    conn = get_db_connection(show_errors=False)
+    if not conn:
+        raise RuntimeError("Database unavailable.")
+    try:
+        return query(conn.cursor(), *args)
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class SerialPager:
+    """
+    Keyset pager over one order's serials with a one-page read-ahead.
+
+    ``fetch_page(after, limit)`` loads the rows following the key ``after``
+    (None for the first page). The start key of page N+1 is the last row of
+    page N, so pages are reached in order; ``prefetch()`` loads the next one
+    on a background thread while the current page is on screen.
+    """
+
+    def __init__(self, fetch_page: Callable[[Optional[PageKey], int], List[SerialRow]], page_size: int = SERIALS_PER_PAGE):
+        self._fetch_page = fetch_page
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._starts: Dict[int, Optional[PageKey]] = {0: None}
+        self._pages: Dict[int, List[SerialRow]] = {}
+        self._loading: Dict[int, threading.Event] = {}
+        self.fetches = 0
+        self.prefetch_hits = 0
+
+    def get_page(self, index: int) -> List[SerialRow]:
+        with self._lock:
+            if index in self._pages:
+                self.prefetch_hits += 1
+                return self._pages[index]
+            loading = self._loading.get(index)
+        if loading is not None:
+            loading.wait()
+            with self._lock:
+                if index in self._pages:
+                    self.prefetch_hits += 1
+                    return self._pages[index]
+        return self._load(index)
+
+    def prefetch(self, index: int) -> None:
+        with self._lock:
+            if index in self._pages or index in self._loading or index not in self._starts:
+                return
+            self._loading[index] = threading.Event()
+        threading.Thread(target=self._prefetch, args=(index,), daemon=True).start()
+
+    def reset_from(self, index: int) -> None:
+        """Forget page ``index`` and everything after it (rows were removed or added)."""
+
+        with self._lock:
+            self._pages = {key: rows for key, rows in self._pages.items() if key < index}
+            self._starts = {key: start for key, start in self._starts.items() if key <= index}
+
+    def _prefetch(self, index: int) -> None:
+        try:
+            self._load(index)
+        except Exception as exc:
+            log_event(f"Serial page prefetch failed for page {index + 1}: {exc}")
+        finally:
+            with self._lock:
+                event = self._loading.pop(index, None)
+            if event is not None:
+                event.set()
+
+    def _load(self, index: int) -> List[SerialRow]:
+        with self._lock:
+            if index not in self._starts:
+                raise LookupError(f"page {index + 1} is not reachable before page {index}")
+            after = self._starts[index]
+        rows = self._fetch_page(after, self.page_size)
+        with self._lock:
+            self.fetches += 1
+            # A reset while this page was loading makes its start key stale.
+            if self._starts.get(index, ...) == after:
+                self._pages[index] = rows
+                if len(rows) == self.page_size:
+                    last = rows[-1]
+                    self._starts[index + 1] = (last[3], last[0])
+        return rows
+
 def open_serial_viewer(order_number):
     # Open a window to view and manage serial numbers assigned to an order
     try:
@@ -24,21 +159,20 @@ def open_serial_viewer(order_number):
         treeview.column("Assigned At", anchor="center", width=120, stretch=True)
         treeview.pack(pady=10, expand=True, fill=tk.BOTH)
 
-        # Pagination state
+        # Pagination state: the pager seeks page by page on (assigned_at, id)
         page = [0]
-        all_rows = []
+        total = [0]
+        pager = SerialPager(lambda after, limit: _run_query(fetch_serial_page, order_number, after, limit))
 
         def next_page():
             # Navigate to the next page of serial numbers
-            if (page[0]+1)*SERIALS_PER_PAGE < len(all_rows):
-                page[0] += 1
-                show_page()
+            if (page[0]+1)*SERIALS_PER_PAGE < total[0]:
+                load_page(page[0] + 1)
 
         def prev_page():
             # Navigate to the previous page of serial numbers
             if page[0] > 0:
-                page[0] -= 1
-                show_page()
+                load_page(page[0] - 1)
 
         # Pagination controls (define after prev_page/next_page)
         nav_frame = tk.Frame(view_window)
@@ -48,44 +182,31 @@ def open_serial_viewer(order_number):
         page_label.pack(side="left", padx=2)
         tk.Button(nav_frame, text="Next", command=next_page, width=8).pack(side="left", padx=2)
 
-        def load_rows():
+        def load_page(index, recount=False):
             def fetch_data():
-                conn = None
                 try:
-                    conn = get_db_connection(show_errors=False)
-                    if not conn:
-                        raise RuntimeError("Database unavailable.")
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "SELECT serial_number, sku, assigned_at FROM order_serials WHERE order_number = %s",
-                        (order_number,),
-                    )
-                    rows = cursor.fetchall()
-                    view_window.after(0, lambda: update_rows(list(rows)))
+                    if recount:
+                        total[0] = _run_query(count_order_serials, order_number)
+                    rows = pager.get_page(index)
+                    if not rows and index > 0:
+                        # The last page emptied (rows removed elsewhere); step back.
+                        view_window.after(0, lambda: load_page(index - 1, recount=True))
+                        return
+                    view_window.after(0, lambda: show_page(index, rows))
+                    if (index + 1) * SERIALS_PER_PAGE < total[0]:
+                        pager.prefetch(index + 1)
                 except Exception as err:
                     log_event(f"Error loading serials: {err}\n{traceback.format_exc()}")
                     msg = f"Failed to load serials:\n{err}"
                     view_window.after(0, lambda: messagebox.showerror("Error", msg))
-                finally:
-                    if conn:
-                        try:
-                            conn.close()
-                        except Exception:
-                            pass
 
             threading.Thread(target=fetch_data, daemon=True).start()
 
-        def update_rows(rows):
-            nonlocal all_rows
-            all_rows = rows
-            show_page()
-
-        def show_page():
-            # Display the current page of serial numbers in the treeview
+        def show_page(index, rows):
+            # Display one page of serial numbers in the treeview
+            page[0] = index
             treeview.delete(*treeview.get_children())
-            start = page[0] * SERIALS_PER_PAGE
-            end = start + SERIALS_PER_PAGE
-            for serial, sku_value, assigned_at in all_rows[start:end]:
+            for _row_id, serial, sku_value, assigned_at in rows:
                 try:
                     if hasattr(assigned_at, "strftime"):
                         display_time = assigned_at.strftime("%d/%m/%Y %H:%M")
@@ -104,9 +225,9 @@ def open_serial_viewer(order_number):
                     sku_display = sku_value or ""
 
                 treeview.insert("", "end", values=(serial_display, sku_display, display_time))
-            page_label.config(text=f"Page {page[0]+1} of {max(1, (len(all_rows)-1)//SERIALS_PER_PAGE+1)}")
+            page_label.config(text=f"Page {page[0]+1} of {max(1, (total[0]-1)//SERIALS_PER_PAGE+1)}")
 
-        load_rows()
+        load_page(0, recount=True)
 
         def remove_selected():
             # Remove the selected serial number from the database and refresh the view
@@ -133,9 +254,9 @@ def open_serial_viewer(order_number):
                     cursor = conn.cursor()
                     cursor.execute("DELETE FROM order_serials WHERE order_number = %s AND serial_number = %s", (order_number, serial))
                     conn.commit()
-                    # Remove from all_rows and refresh page
-                    all_rows[:] = [row for row in all_rows if row[0] != serial]
-                    show_page()
+                    # Pages from this one on have shifted; refetch them from the current page's start key
+                    pager.reset_from(page[0])
+                    load_page(page[0], recount=True)
                     log_event(f"Removed serial '{serial}' from order '{order_number}'")
                 except Exception as err:
                     log_event(f"Error removing serial: {err}\n{traceback.format_exc()}")
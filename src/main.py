@@ -3,6 +3,7 @@ import argparse
 import json
 import os
 import sys
+from typing import Optional
 
 if getattr(sys, "frozen", False):
     sys.path.insert(0, getattr(sys, "_MEIPASS", os.path.dirname(sys.executable)))
@@ -46,6 +47,81 @@ def run_headless_mdm_refresh() -> None:
     print(json.dumps(status))
 
 
+def run_headless_batch_assign(csv_path: str, order_reference: str, assigned_by: Optional[str], reassign: bool) -> int:
+    """Assign every serial in ``csv_path`` to one order and print per-row results as JSON."""
+
+    log_event(f"Running headless batch assignment of {csv_path} to order {order_reference}.")
+    from dataclasses import asdict
+
+    from db.database import get_db_connection
+    from logic.batch_assign_logic import assign_serials_batch, read_batch_csv
+
+    try:
+        rows = read_batch_csv(csv_path)
+    except (OSError, ValueError) as exc:
+        print(json.dumps({"ok": False, "error": str(exc)}))
+        return 2
+
+    conn = get_db_connection(show_errors=False)
+    if not conn:
+        print(json.dumps({"ok": False, "error": "Could not connect to the database."}))
+        return 2
+    try:
+        result = assign_serials_batch(conn, order_reference, rows, assigned_by=assigned_by, reassign=reassign)
+    finally:
+        conn.close()
+
+    print(
+        json.dumps(
+            {
+                "ok": result.ok,
+                "error": result.error,
+                "order_id": result.order_id,
+                "order_number": result.order_number,
+                "counts": result.counts(),
+                "rows": [asdict(row) for row in result.rows],
+            },
+            indent=2,
+        )
+    )
+    return 0 if result.ok else 1
+
+
+def run_headless_journal_replay() -> int:
+    """Replay offline assignments against MySQL and print the outcome of each entry as JSON."""
+
+    log_event("Running headless offline journal replay.")
+    from dataclasses import asdict
+
+    from db.database import get_db_connection
+    from logic.reconcile_logic import replay_assignment_journal
+    from main_logic import get_assignment_journal
+
+    journal = get_assignment_journal()
+    conn = get_db_connection(show_errors=False)
+    if not conn:
+        print(json.dumps({"ok": False, "error": "Could not connect to the database.", "journal": journal.stats()}))
+        return 2
+    try:
+        result = replay_assignment_journal(conn, journal)
+    finally:
+        conn.close()
+
+    print(
+        json.dumps(
+            {
+                "ok": result.stopped is None and not result.conflicts,
+                "stopped": result.stopped,
+                "counts": result.counts(),
+                "entries": [asdict(entry) for entry in result.entries],
+                "journal": journal.stats(),
+            },
+            indent=2,
+        )
+    )
+    return 0 if result.stopped is None and not result.conflicts else 1
+
+
 def main() -> None:
     enable_windows_dpi_awareness()
 
@@ -56,8 +132,27 @@ def main() -> None:
         action="store_true",
         help="refresh MDM policy and return lock status without launching the UI",
     )
+    parser.add_argument("--assign-batch", metavar="CSV", help="assign every serial in CSV to --order and exit")
+    parser.add_argument("--order", metavar="REF", help="order reference for --assign-batch")
+    parser.add_argument("--assigned-by", metavar="NAME", help="user recorded on batch-assigned rows")
+    parser.add_argument(
+        "--reassign",
+        action="store_true",
+        help="with --assign-batch, move serials already assigned to other orders",
+    )
+    parser.add_argument(
+        "--replay-journal",
+        action="store_true",
+        help="write assignments saved while the database was offline and exit",
+    )
     args = parser.parse_args()
 
+    if args.replay_journal:
+        sys.exit(run_headless_journal_replay())
+    if args.assign_batch:
+        if not args.order:
+            parser.error("--assign-batch requires --order")
+        sys.exit(run_headless_batch_assign(args.assign_batch, args.order, args.assigned_by, args.reassign))
     if args.check_updates:
         run_headless_update_check()
         return
@@ -1,9 +1,10 @@
 ﻿# main_logic.py
 import threading
+import time
 import tkinter as tk
-import wmi
 import re
 import datetime
+import json
 import os
 import subprocess
 from tkinter import messagebox
@@ -13,15 +14,15 @@ from db.database import get_db_connection
 from utils.helpers import (
     log_event,
     extract_details_from_sku,
-    get_live_battery_percent,
+    get_app_dir,
+    get_battery_snapshot,
     parse_percent,
     check_mdm_lock_status,
     check_activation_status,
-    is_battery_charging,
     cpu_specs_are_compatible,
     storage_specs_are_compatible,
-    capture_autopilot_hash_csv,
-    upload_hash_csv,
+    get_hash_prefetcher,
+    queue_hash_csv_upload,
     upload_stock_unit_check_report,
     upload_trade_job_check_report,
 )
@@ -31,6 +32,11 @@ from utils.specs import (
     get_latest_batteryinfoview_report,
 )
 from logic.view_serials_logic import open_serial_viewer
+from utils.battery_sampler import BatterySnapshot
+from utils.cache import TTLCache
+from utils.offline_store import AssignmentJournal, OfflineOrderStore
+from utils.order_prefetch import OrderSnapshotPrefetcher, reference_key
+from utils.telemetry import span, traced
 import traceback
 import ttkbootstrap as tb
 from ttkbootstrap import ttk
@@ -241,13 +247,355 @@ def resolve_order_by_external_id(cursor, order_reference: str) -> Optional[Tuple
     return _row_to_identity(cursor.fetchone())
 
 
+ORDER_MATCH_ORDER_NUMBER = 1
+ORDER_MATCH_PC_NUMBER = 2
+ORDER_MATCH_EXTERNAL_ID = 3
+
+_ORDER_SNAPSHOT_QUERY_ENABLED = True
+_JOB_REFERENCE_NORM_ENABLED = True
+_TRADE_JOB_FULLTEXT_ENABLED = True
+MYSQL_ERROR_BAD_FIELD = 1054
+MYSQL_ERROR_PARSE = 1064
+MYSQL_ERROR_NO_SUCH_TABLE = 1146
+MYSQL_ERROR_FT_MATCHING_KEY_NOT_FOUND = 1191
+MYSQL_ERROR_FUNCTION_DOES_NOT_EXIST = 1305
+# Errors meaning the server or schema cannot run the combined order lookup at all.
+# A missing custom_order_item or order_note table (1146) is tolerated by the sequential lookups.
+_ORDER_SNAPSHOT_SCHEMA_ERRORS = frozenset(
+    {MYSQL_ERROR_BAD_FIELD, MYSQL_ERROR_PARSE, MYSQL_ERROR_NO_SUCH_TABLE, MYSQL_ERROR_FUNCTION_DOES_NOT_EXIST}
+)
+# innodb ngram_token_size default: shorter searches cannot use the FULLTEXT indexes.
+TRADE_JOB_FULLTEXT_MIN_LENGTH = 2
+TRADE_JOB_SEARCH_LIMIT = 20
+_ORDER_PREFETCHER: Optional[OrderSnapshotPrefetcher] = None
+_ORDER_PREFETCHER_LOCK = threading.Lock()
+
+# Re-searching an order while working through a batch should not hit the
+# database again: identities are cached by reference, candidates and notes by
+# order id. Note saves and assignments invalidate the order id.
+ORDER_CACHE_TTL_SECONDS = 300.0
+_ORDER_IDENTITY_CACHE = TTLCache(maxsize=128, ttl=ORDER_CACHE_TTL_SECONDS)
+_ORDER_CANDIDATES_CACHE = TTLCache(maxsize=64, ttl=ORDER_CACHE_TTL_SECONDS)
+_ORDER_NOTE_CACHE = TTLCache(maxsize=64, ttl=ORDER_CACHE_TTL_SECONDS)
+
+
+def invalidate_order_cache(order_db_id: Optional[int] = None) -> None:
+    """Forget cached candidates and notes for ``order_db_id``; None clears every order cache."""
+
+    if order_db_id is None:
+        _ORDER_IDENTITY_CACHE.clear()
+        _ORDER_CANDIDATES_CACHE.clear()
+        _ORDER_NOTE_CACHE.clear()
+    else:
+        _ORDER_CANDIDATES_CACHE.invalidate(order_db_id)
+        _ORDER_NOTE_CACHE.invalidate(order_db_id)
+    get_order_prefetcher().clear()
+
+
+def get_order_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        "identity": _ORDER_IDENTITY_CACHE.stats(),
+        "candidates": _ORDER_CANDIDATES_CACHE.stats(),
+        "notes": _ORDER_NOTE_CACHE.stats(),
+    }
+
+
+def _cached_order_snapshot(trimmed_reference: str) -> Optional[Dict[str, Any]]:
+    identity = _ORDER_IDENTITY_CACHE.get(reference_key(trimmed_reference))
+    if identity is None:
+        return None
+    order_db_id, order_number, match_rank = identity
+    candidates = _ORDER_CANDIDATES_CACHE.get(order_db_id)
+    note = _ORDER_NOTE_CACHE.get(order_db_id) if candidates is not None else None
+    if note is None:
+        return None
+    return {
+        "order_id": order_db_id,
+        "order_number": order_number,
+        "match_rank": match_rank,
+        "candidates": list(candidates),
+        "note": note,
+    }
+
+
+def _remember_order_snapshot(trimmed_reference: str, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    order_db_id = snapshot["order_id"]
+    _ORDER_IDENTITY_CACHE.put(
+        reference_key(trimmed_reference), (order_db_id, snapshot["order_number"], snapshot["match_rank"])
+    )
+    _ORDER_CANDIDATES_CACHE.put(order_db_id, list(snapshot["candidates"]))
+    _ORDER_NOTE_CACHE.put(order_db_id, snapshot["note"])
+    return snapshot
+
+
+def _mysql_error_code(exc: BaseException) -> Optional[int]:
+    args = getattr(exc, "args", ())
+    return args[0] if args and isinstance(args[0], int) else None
+
+
+def _build_order_match_union(trimmed_reference: str) -> Tuple[str, List[str]]:
+    """
+    Build one UNION ALL over the lookup paths, ranked by the legacy precedence:
+    ASTRO order number, then the numeric ``PC-####`` fallback, then external_id.
+    """
+
+    branches = [
+        f"""
+            (SELECT id, order_number, sku, {ORDER_MATCH_ORDER_NUMBER} AS match_rank
+             FROM `order` WHERE order_number = %s ORDER BY id DESC LIMIT 1)
+        """
+    ]
+    params = [trimmed_reference]
+    if trimmed_reference.isdigit():
+        branches.append(
+            f"""
+            (SELECT id, order_number, sku, {ORDER_MATCH_PC_NUMBER} AS match_rank
+             FROM `order` WHERE order_number = %s ORDER BY id DESC LIMIT 1)
+            """
+        )
+        params.append(f"PC-{trimmed_reference}")
+    branches.append(
+        f"""
+            (SELECT id, order_number, sku, {ORDER_MATCH_EXTERNAL_ID} AS match_rank
+             FROM `order` WHERE external_id = %s ORDER BY id DESC LIMIT 1)
+        """
+    )
+    params.append(trimmed_reference)
+    return " UNION ALL ".join(branches), params
+
+
+@traced()
 def resolve_order_identity(cursor, order_reference: str) -> Optional[Tuple[int, str]]:
-    """Resolve by custom order number, then marketplace order number."""
+    """Resolve by custom order number, then marketplace order number, in one query."""
+
+    trimmed_reference = (order_reference or "").strip()
+    if not trimmed_reference:
+        return None
+
+    matches_sql, params = _build_order_match_union(trimmed_reference)
+    cursor.execute(
+        f"""
+            SELECT m.id, m.order_number
+            FROM ({matches_sql}) AS m
+            ORDER BY m.match_rank
+            LIMIT 1
+        """,
+        params,
+    )
+    return _row_to_identity(cursor.fetchone())
+
+
+@traced()
+def load_order_search_snapshot(cursor, order_reference: str) -> Optional[Dict[str, Any]]:
+    """
+    Resolve an order reference together with its candidates and latest note.
+
+    Returns ``{"order_id", "order_number", "match_rank", "candidates", "note"}``
+    or None. Everything is fetched in a single round trip. If the server or
+    schema cannot run the combined query (MySQL errors 1054, 1064, 1146, 1305) the
+    sequential lookups are used from then on; other errors are raised.
+    """
 
-    identity = resolve_order_by_order_number(cursor, order_reference)
-    if identity:
-        return identity
-    return resolve_order_by_external_id(cursor, order_reference)
+    global _ORDER_SNAPSHOT_QUERY_ENABLED
+
+    trimmed_reference = (order_reference or "").strip()
+    if not trimmed_reference:
+        return None
+
+    cached = _cached_order_snapshot(trimmed_reference)
+    if cached is not None:
+        return cached
+
+    if _ORDER_SNAPSHOT_QUERY_ENABLED:
+        matches_sql, params = _build_order_match_union(trimmed_reference)
+        try:
+            cursor.execute(
+                f"""
+                    SELECT
+                        m.id,
+                        m.order_number,
+                        m.match_rank,
+                        m.sku,
+                        (
+                            SELECT JSON_ARRAYAGG(JSON_ARRAY(
+                                c.id, c.spec_set, c.line_number, c.sku, c.title,
+                                c.model_label, c.cpu, c.os, c.ram, c.ssd, c.battery
+                            ))
+                            FROM custom_order_item c
+                            WHERE c.order_id = m.id
+                        ) AS custom_items,
+                        (
+                            SELECT n.notes
+                            FROM order_note n
+                            WHERE n.order_id = m.id
+                            ORDER BY n.updated_at DESC, n.created_at DESC
+                            LIMIT 1
+                        ) AS notes
+                    FROM ({matches_sql}) AS m
+                    ORDER BY m.match_rank
+                    LIMIT 1
+                """,
+                params,
+            )
+            row = cursor.fetchone()
+        except Exception as exc:
+            if _mysql_error_code(exc) not in _ORDER_SNAPSHOT_SCHEMA_ERRORS:
+                raise
+            _ORDER_SNAPSHOT_QUERY_ENABLED = False
+            log_event(f"Combined order lookup unavailable, using sequential lookups: {exc}")
+        else:
+            if not row:
+                return None
+            order_db_id, order_number, match_rank, raw_sku, custom_items, notes = row
+            custom_rows = _parse_custom_item_rows(custom_items)
+            if custom_rows:
+                candidates = _build_custom_order_candidates(custom_rows)
+            else:
+                candidates = [
+                    {"label": sku, "sku": sku, "details": None}
+                    for sku in _split_sku_options([raw_sku])
+                ]
+            order_db_id, order_number = _row_to_identity((order_db_id, order_number))
+            return _remember_order_snapshot(
+                trimmed_reference,
+                {
+                    "order_id": order_db_id,
+                    "order_number": order_number,
+                    "match_rank": int(match_rank),
+                    "candidates": candidates,
+                    "note": _decode_db_value(notes),
+                },
+            )
+
+    match_rank = ORDER_MATCH_ORDER_NUMBER
+    identity = resolve_order_by_order_number(cursor, trimmed_reference)
+    if not identity:
+        match_rank = ORDER_MATCH_EXTERNAL_ID
+        identity = resolve_order_by_external_id(cursor, trimmed_reference)
+    if not identity:
+        return None
+    order_db_id, order_number = identity
+    return _remember_order_snapshot(
+        trimmed_reference,
+        {
+            "order_id": order_db_id,
+            "order_number": order_number,
+            "match_rank": match_rank,
+            "candidates": load_order_candidates_for_order_id(cursor, order_db_id),
+            "note": load_order_note_for_order_id(cursor, order_db_id),
+        },
+    )
+
+
+def _load_order_snapshot_for_prefetch(order_reference: str) -> Optional[Dict[str, Any]]:
+    conn = get_db_connection(retries=1, show_errors=False)
+    if not conn:
+        return None
+    try:
+        return load_order_search_snapshot(conn.cursor(), order_reference)
+    finally:
+        conn.close()
+
+
+def get_order_prefetcher() -> OrderSnapshotPrefetcher:
+    """Return the shared as-you-type order snapshot prefetcher."""
+
+    global _ORDER_PREFETCHER
+    with _ORDER_PREFETCHER_LOCK:
+        if _ORDER_PREFETCHER is None:
+            _ORDER_PREFETCHER = OrderSnapshotPrefetcher(
+                _load_order_snapshot_for_prefetch, ttl=ORDER_CACHE_TTL_SECONDS, log=log_event
+            )
+        return _ORDER_PREFETCHER
+
+
+def set_order_prefetcher(prefetcher: Optional[OrderSnapshotPrefetcher]) -> None:
+    global _ORDER_PREFETCHER
+    with _ORDER_PREFETCHER_LOCK:
+        _ORDER_PREFETCHER = prefetcher
+
+
+# Searched orders and offline assignments share one SQLite file next to the executable.
+OFFLINE_STORE_FILENAME = "offline.sqlite3"
+_OFFLINE_ORDER_STORE: Optional[OfflineOrderStore] = None
+_ASSIGNMENT_JOURNAL: Optional[AssignmentJournal] = None
+_OFFLINE_LOCK = threading.Lock()
+
+
+def get_offline_order_store() -> OfflineOrderStore:
+    """Return the on-disk copy of searched orders used when MySQL is unreachable."""
+
+    global _OFFLINE_ORDER_STORE
+    with _OFFLINE_LOCK:
+        if _OFFLINE_ORDER_STORE is None:
+            _OFFLINE_ORDER_STORE = OfflineOrderStore(os.path.join(get_app_dir(), OFFLINE_STORE_FILENAME))
+        return _OFFLINE_ORDER_STORE
+
+
+def set_offline_order_store(store: Optional[OfflineOrderStore]) -> None:
+    global _OFFLINE_ORDER_STORE
+    with _OFFLINE_LOCK:
+        _OFFLINE_ORDER_STORE = store
+
+
+def get_assignment_journal() -> AssignmentJournal:
+    """Return the journal of assignments waiting to be replayed against MySQL."""
+
+    global _ASSIGNMENT_JOURNAL
+    with _OFFLINE_LOCK:
+        if _ASSIGNMENT_JOURNAL is None:
+            _ASSIGNMENT_JOURNAL = AssignmentJournal(os.path.join(get_app_dir(), OFFLINE_STORE_FILENAME))
+        return _ASSIGNMENT_JOURNAL
+
+
+def set_assignment_journal(journal: Optional[AssignmentJournal]) -> None:
+    global _ASSIGNMENT_JOURNAL
+    with _OFFLINE_LOCK:
+        _ASSIGNMENT_JOURNAL = journal
+
+
+def get_offline_stats() -> Dict[str, Any]:
+    """Journal and snapshot counts, without opening the offline store if nothing has used it yet."""
+
+    with _OFFLINE_LOCK:
+        journal, store = _ASSIGNMENT_JOURNAL, _OFFLINE_ORDER_STORE
+    if journal is None and store is None:
+        return {"state": "not started"}
+    stats: Dict[str, Any] = {}
+    try:
+        if journal is not None:
+            stats.update(journal.stats())
+        if store is not None:
+            stats.update(store.stats())
+    except Exception as exc:
+        stats["error"] = str(exc)
+    return stats
+
+
+def _save_offline_snapshot(order_reference: str, snapshot: Dict[str, Any]) -> None:
+    try:
+        get_offline_order_store().save(order_reference, snapshot)
+    except Exception as exc:  # noqa: BLE001 - the offline copy is best effort
+        log_event(f"Offline order copy not saved for {order_reference}: {exc}")
+
+
+def offline_snapshot_notice(saved_at: float, now: Optional[float] = None) -> str:
+    """Footer line telling the user the order came from the offline copy, and how old it is."""
+
+    age = max(0.0, (time.time() if now is None else now) - float(saved_at))
+    if age < 60:
+        age_text = "less than a minute ago"
+    elif age < 3600:
+        age_text = f"{int(age // 60)} min ago"
+    elif age < 86400:
+        age_text = f"{int(age // 3600)} h ago"
+    else:
+        days = int(age // 86400)
+        age_text = f"{days} day{'s' if days != 1 else ''} ago"
+    return (
+        f"OFFLINE: order details from a copy saved {age_text}. "
+        "Assignments are journalled until the database is back."
+    )
 
 
 def prompt_for_marketplace_search(root: tk.Tk) -> bool:
@@ -282,6 +630,63 @@ def normalise_test_result(value: Optional[str]) -> str:
     return "n/a"
 
 
+ORDER_SERIALS_COLUMNS = (
+    "order_id", "order_number", "serial_number", "sku", "cpu", "ram", "ssd", "model", "resolution", "windows",
+    "battery", "battery2", "laptop_status", "test_keyboard", "test_speaker", "test_microphone", "test_display",
+    "test_webcam", "test_usb", "test_wifi", "activation", "mdm_state", "mdm_details", "assigned_by",
+)
+ORDER_SERIALS_INSERT_SQL = f"""
+    INSERT INTO order_serials ({", ".join(ORDER_SERIALS_COLUMNS)})
+    VALUES ({", ".join(["%s"] * len(ORDER_SERIALS_COLUMNS))})
+"""
+TEST_RESULT_KEYS = ("keyboard", "speaker", "microphone", "display", "webcam", "usb", "wifi", "activation")
+
+
+def normalised_test_results(test_results: Dict[str, Any]) -> Dict[str, str]:
+    return {key: normalise_test_result(test_results.get(key)) for key in TEST_RESULT_KEYS}
+
+
+def order_serial_row(
+    order_db_id: int,
+    order_number: str,
+    serial_number: str,
+    sku: str,
+    specs: Dict[str, Any],
+    normalized_tests: Dict[str, str],
+    mdm_state: Optional[str],
+    mdm_details: Optional[str],
+    assigned_by: Optional[str],
+) -> Tuple[Any, ...]:
+    """Parameters for :data:`ORDER_SERIALS_INSERT_SQL`."""
+
+    return (
+        order_db_id,
+        order_number,
+        serial_number,
+        sku,
+        specs.get("CPU", ""),
+        specs.get("RAM", ""),
+        specs.get("SSD", ""),
+        specs.get("Model", ""),
+        specs.get("Resolution", ""),
+        specs.get("Windows", ""),
+        specs.get("Battery", ""),
+        specs.get("Battery 2", ""),
+        "Reserved",
+        normalized_tests["keyboard"],
+        normalized_tests["speaker"],
+        normalized_tests["microphone"],
+        normalized_tests["display"],
+        normalized_tests["webcam"],
+        normalized_tests["usb"],
+        normalized_tests["wifi"],
+        normalized_tests["activation"],
+        mdm_state,
+        mdm_details,
+        assigned_by,
+    )
+
+
 def prompt_for_sku_selection(
     root: tk.Tk,
     sku_options: List[str],
@@ -361,23 +766,10 @@ def prompt_for_sku_selection(
     selection_event.wait()
     return selection["value"]
 
-# Detect number of batteries and set labels
-try:
-    c = wmi.WMI()
-    batteries = c.Win32_Battery()
-    battery_labels = ["Battery"] if len(batteries) == 1 else ["Battery 1", "Battery 2"]
-except Exception as e:
-    log_event(f"Error detecting batteries: {e}")
-    battery_labels = ["Battery"]  # fallback to just one label
+def battery_labels_for(snapshot: BatterySnapshot) -> List[str]:
+    """Footer labels for the batteries in the sampler snapshot."""
 
-def battery_charging_status(index: int = 0) -> bool:
-    """Return True when the specified battery reports an active charging state."""
-
-    try:
-        return is_battery_charging(index)
-    except Exception as exc:  # noqa: BLE001 - defensive logging path
-        log_event(f"Error checking battery charging status: {exc}")
-        return False
+    return ["Battery"] if len(snapshot.readings) <= 1 else ["Battery 1", "Battery 2"]
 
 
 def has_secondary_battery(value) -> bool:
@@ -405,10 +797,13 @@ def load_sku_options_for_order_id(cursor, order_db_id: int) -> List[str]:
     """Return unique SKU options for the given order row id."""
 
     cursor.execute("SELECT sku FROM `order` WHERE id = %s", (order_db_id,))
+    return _split_sku_options(raw_value for (raw_value,) in cursor.fetchall())
 
+
+def _split_sku_options(raw_values) -> List[str]:
     sku_options: List[str] = []
     seen = set()
-    for (raw_value,) in cursor.fetchall():
+    for raw_value in raw_values:
         if raw_value is None:
             continue
         if isinstance(raw_value, (bytes, bytearray)):
@@ -452,7 +847,12 @@ def load_order_candidates_for_order_id(cursor, order_db_id: int) -> List[Dict[st
 
     For custom orders, prefer rows from custom_order_item so saved spec fields
     (model/cpu/ram/ssd/os/battery) are used for comparison in SecondChecking.
+    Results are served from the order cache while they are fresh.
     """
+    cached = _ORDER_CANDIDATES_CACHE.get(order_db_id)
+    if cached is not None:
+        return list(cached)
+
     try:
         cursor.execute(
             """
@@ -469,50 +869,89 @@ def load_order_candidates_for_order_id(cursor, order_db_id: int) -> List[Dict[st
         log_event(f"Custom order item lookup skipped for order id {order_db_id}: {exc}")
 
     if custom_rows:
-        candidates: List[Dict[str, Any]] = []
-        seen_labels = set()
-        for row in custom_rows:
-            (
-                row_id,
-                spec_set,
-                line_number,
-                sku,
-                title,
-                model_label,
-                cpu,
-                os_value,
-                ram,
-                ssd,
-                battery,
-            ) = row
-            item_payload = {
-                "model_label": model_label,
-                "cpu": cpu,
-                "os": os_value,
-                "ram": ram,
-                "ssd": ssd,
-                "battery": battery,
-            }
-            sku_value = _decode_db_value(sku)
-            title_value = _decode_db_value(title)
-            model_value = _decode_db_value(model_label)
-            sku_for_assignment = sku_value or model_value or title_value or f"CUSTOM-LINE-{row_id}"
-            label_base = sku_for_assignment
-            line_hint = spec_set or line_number or row_id
-            label = label_base
-            if label in seen_labels:
-                label = f"{label_base} (line {line_hint})"
-            seen_labels.add(label)
-            candidates.append(
-                {
-                    "label": label,
-                    "sku": sku_for_assignment,
-                    "details": _build_custom_item_details(item_payload),
-                }
-            )
-        return candidates
+        candidates = _build_custom_order_candidates(custom_rows)
+    else:
+        candidates = [
+            {"label": sku, "sku": sku, "details": None} for sku in load_sku_options_for_order_id(cursor, order_db_id)
+        ]
+    _ORDER_CANDIDATES_CACHE.put(order_db_id, list(candidates))
+    return candidates
+
+
+def _custom_item_sort_key(row) -> Tuple:
+    row_id, spec_set, line_number = row[0], row[1], row[2]
+
+    def component(value):
+        if value is None:
+            return (1, 0, "")
+        if isinstance(value, (int, float)):
+            return (0, value, "")
+        text = _decode_db_value(value)
+        return (0, int(text), "") if text.isdigit() else (0, 0, text)
+
+    group = next((value for value in (spec_set, line_number, row_id) if value is not None), None)
+    return component(group), component(line_number), component(row_id)
 
-    return [{"label": sku, "sku": sku, "details": None} for sku in load_sku_options_for_order_id(cursor, order_db_id)]
+
+def _parse_custom_item_rows(raw_items) -> List[Tuple]:
+    """Decode the JSON_ARRAYAGG payload from the combined order lookup."""
+
+    if raw_items is None:
+        return []
+    if isinstance(raw_items, (bytes, bytearray)):
+        raw_items = raw_items.decode("utf-8", errors="ignore")
+    try:
+        items = json.loads(raw_items) if isinstance(raw_items, str) else raw_items
+    except ValueError as exc:
+        log_event(f"Unable to parse custom order items from combined lookup: {exc}")
+        return []
+    rows = [tuple(item) for item in items or [] if isinstance(item, (list, tuple)) and len(item) == 11]
+    return sorted(rows, key=_custom_item_sort_key)
+
+
+def _build_custom_order_candidates(custom_rows) -> List[Dict[str, Any]]:
+    candidates: List[Dict[str, Any]] = []
+    seen_labels = set()
+    for row in custom_rows:
+        (
+            row_id,
+            spec_set,
+            line_number,
+            sku,
+            title,
+            model_label,
+            cpu,
+            os_value,
+            ram,
+            ssd,
+            battery,
+        ) = row
+        item_payload = {
+            "model_label": model_label,
+            "cpu": cpu,
+            "os": os_value,
+            "ram": ram,
+            "ssd": ssd,
+            "battery": battery,
+        }
+        sku_value = _decode_db_value(sku)
+        title_value = _decode_db_value(title)
+        model_value = _decode_db_value(model_label)
+        sku_for_assignment = sku_value or model_value or title_value or f"CUSTOM-LINE-{row_id}"
+        label_base = sku_for_assignment
+        line_hint = spec_set or line_number or row_id
+        label = label_base
+        if label in seen_labels:
+            label = f"{label_base} (line {line_hint})"
+        seen_labels.add(label)
+        candidates.append(
+            {
+                "label": label,
+                "sku": sku_for_assignment,
+                "details": _build_custom_item_details(item_payload),
+            }
+        )
+    return candidates
 
 
 def merge_spec_details(primary: Dict[str, str], fallback: Dict[str, str]) -> Dict[str, str]:
@@ -638,6 +1077,10 @@ def load_trade_test_results(cursor, job_reference, serial_number):
 def load_order_note_for_order_id(cursor, order_db_id: int) -> str:
     """Return the latest notes text for the order row id."""
 
+    cached = _ORDER_NOTE_CACHE.get(order_db_id)
+    if cached is not None:
+        return cached
+
     try:
         cursor.execute(
             """
@@ -654,15 +1097,15 @@ def load_order_note_for_order_id(cursor, order_db_id: int) -> str:
         log_event(f"Order note lookup failed for order id {order_db_id}: {exc}")
         return ""
 
-    if not row:
-        return ""
-
-    value = row[0]
+    value = row[0] if row else None
     if value is None:
-        return ""
-    if isinstance(value, (bytes, bytearray)):
-        return value.decode("utf-8", errors="ignore").strip()
-    return str(value).strip()
+        note = ""
+    elif isinstance(value, (bytes, bytearray)):
+        note = value.decode("utf-8", errors="ignore").strip()
+    else:
+        note = str(value).strip()
+    _ORDER_NOTE_CACHE.put(order_db_id, note)
+    return note
 
 
 def save_order_note_for_order_id(order_db_id: int, notes: str) -> None:
@@ -682,6 +1125,7 @@ def save_order_note_for_order_id(order_db_id: int, notes: str) -> None:
             (order_db_id, notes or ""),
         )
         conn.commit()
+        invalidate_order_cache(order_db_id)
         log_event(f"Saved order notes for order id {order_db_id}.")
     finally:
         try:
@@ -698,9 +1142,38 @@ def _job_row_to_identity(row) -> Optional[Tuple[int, str]]:
 
 
 def resolve_trade_job_by_reference(cursor, job_reference: str) -> Optional[Tuple[int, str]]:
+    """
+    Resolve a trade job by reference, ignoring case and surrounding spaces.
+
+    Uses the indexed ``reference_number_norm`` column from
+    ``sql/003_reference_lookup_indexes.sql``; databases without it (MySQL
+    error 1054) fall back to normalising ``reference_number`` per row.
+    """
+
+    global _JOB_REFERENCE_NORM_ENABLED
+
     trimmed_reference = (job_reference or "").strip()
     if not trimmed_reference:
         return None
+    if _JOB_REFERENCE_NORM_ENABLED:
+        try:
+            cursor.execute(
+                """
+                    SELECT id, reference_number
+                    FROM job
+                    WHERE reference_number_norm = UPPER(TRIM(%s))
+                      AND COALESCE(is_archived, 0) = 0
+                    ORDER BY id DESC
+                    LIMIT 1
+                """,
+                (trimmed_reference,),
+            )
+            return _job_row_to_identity(cursor.fetchone())
+        except Exception as exc:
+            if _mysql_error_code(exc) != MYSQL_ERROR_BAD_FIELD:
+                raise
+            _JOB_REFERENCE_NORM_ENABLED = False
+            log_event("job.reference_number_norm missing; apply sql/003_reference_lookup_indexes.sql. Using UPPER(TRIM()) scan.")
     cursor.execute(
         """
             SELECT id, reference_number
@@ -715,10 +1188,74 @@ def resolve_trade_job_by_reference(cursor, job_reference: str) -> Optional[Tuple
     return _job_row_to_identity(cursor.fetchone())
 
 
+def _trade_job_fulltext_phrase(text: str) -> str:
+    """Quote ``text`` as one boolean-mode phrase; with the ngram parser that matches it anywhere in a value."""
+
+    return '"' + " ".join(text.replace('"', " ").split()) + '"'
+
+
+def _like_prefix(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _trade_job_match_rows(rows) -> List[Dict[str, Any]]:
+    matches = []
+    for job_id, reference, customer, summary in rows:
+        ref = _decode_db_value(reference)
+        details = " - ".join(
+            part
+            for part in (_decode_db_value(customer), _decode_db_value(summary))
+            if part
+        )
+        matches.append({"id": int(job_id), "reference": ref, "label": f"{ref} - {details}" if details else ref})
+    return matches
+
+
 def search_trade_jobs(cursor, search_text: str) -> List[Dict[str, Any]]:
+    """
+    Find open trade jobs whose reference, customer, summary or product names contain ``search_text``.
+
+    Uses the n-gram FULLTEXT indexes from ``sql/004_trade_job_fulltext.sql``:
+    references starting with the text come first, then jobs by relevance, then
+    newest. Searches shorter than the n-gram size, and databases without the
+    indexes (MySQL error 1191), use the leading-wildcard LIKE scan instead.
+    """
+
+    global _TRADE_JOB_FULLTEXT_ENABLED
+
     text = (search_text or "").strip()
     if not text:
         return []
+    phrase = _trade_job_fulltext_phrase(text)
+    if _TRADE_JOB_FULLTEXT_ENABLED and len(phrase) - 2 >= TRADE_JOB_FULLTEXT_MIN_LENGTH:
+        try:
+            cursor.execute(
+                """
+                    SELECT j.id, j.reference_number, j.customer, j.summary
+                    FROM (
+                        SELECT id AS job_id,
+                               MATCH(reference_number, customer, summary) AGAINST (%s IN BOOLEAN MODE) AS score
+                        FROM job
+                        WHERE MATCH(reference_number, customer, summary) AGAINST (%s IN BOOLEAN MODE)
+                        UNION ALL
+                        SELECT job_id, MATCH(product_name) AGAINST (%s IN BOOLEAN MODE) AS score
+                        FROM product
+                        WHERE MATCH(product_name) AGAINST (%s IN BOOLEAN MODE)
+                    ) hits
+                    JOIN job j ON j.id = hits.job_id
+                    WHERE COALESCE(j.is_archived, 0) = 0
+                    GROUP BY j.id, j.reference_number, j.customer, j.summary, j.date_created
+                    ORDER BY (j.reference_number LIKE %s) DESC, SUM(hits.score) DESC, j.date_created DESC, j.id DESC
+                    LIMIT %s
+                """,
+                (phrase, phrase, phrase, phrase, _like_prefix(text), TRADE_JOB_SEARCH_LIMIT),
+            )
+            return _trade_job_match_rows(cursor.fetchall())
+        except Exception as exc:
+            if _mysql_error_code(exc) != MYSQL_ERROR_FT_MATCHING_KEY_NOT_FOUND:
+                raise
+            _TRADE_JOB_FULLTEXT_ENABLED = False
+            log_event("Trade job FULLTEXT indexes missing; apply sql/004_trade_job_fulltext.sql. Using LIKE scan.")
     like = f"%{text}%"
     cursor.execute(
         """
@@ -737,20 +1274,11 @@ def search_trade_jobs(cursor, search_text: str) -> List[Dict[str, Any]]:
                 )
               )
             ORDER BY j.date_created DESC, j.id DESC
-            LIMIT 20
+            LIMIT %s
         """,
-        (like, like, like, like),
+        (like, like, like, like, TRADE_JOB_SEARCH_LIMIT),
     )
-    rows = []
-    for job_id, reference, customer, summary in cursor.fetchall():
-        ref = _decode_db_value(reference)
-        details = " - ".join(
-            part
-            for part in (_decode_db_value(customer), _decode_db_value(summary))
-            if part
-        )
-        rows.append({"id": int(job_id), "reference": ref, "label": f"{ref} - {details}" if details else ref})
-    return rows
+    return _trade_job_match_rows(cursor.fetchall())
 
 
 def prompt_for_trade_job_selection(root: tk.Tk, matches: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
@@ -839,7 +1367,7 @@ def save_trade_job_note_for_job_id(job_id: int, notes: str) -> None:
             pass
 
 
-def build_results_footer(laptop_specs, details, mdm_status):
+def build_results_footer(laptop_specs, details, mdm_status, offline_notice=None):
     success_color = "#1f7a4d"
     warning_color = "#b54708"
     danger_color = "#b42318"
@@ -880,6 +1408,9 @@ def build_results_footer(laptop_specs, details, mdm_status):
 
     mismatch_text = "\n".join(mismatches) if mismatches else "All listed specs match."
     mismatch_color = danger_color if mismatches else success_color
+    if offline_notice:
+        mismatch_text = f"{offline_notice}\n{mismatch_text}"
+        mismatch_color = danger_color if mismatches else warning_color
 
     status = mdm_status or {}
     mdm_state = status.get("state", "error")
@@ -902,10 +1433,12 @@ def build_results_footer(laptop_specs, details, mdm_status):
         mdm_text = mdm_details or "Unable to retrieve Microsoft MDM lock status."
         mdm_color = warning_color
 
+    # Read the sampler snapshot once; no COM calls happen on the render path.
+    battery_snapshot = get_battery_snapshot()
     battery_lines = []
-    for index, label in enumerate(battery_labels):
-        percent = get_live_battery_percent(index=index)
-        charging = battery_charging_status(index=index)
+    for index, label in enumerate(battery_labels_for(battery_snapshot)):
+        percent = battery_snapshot.percent(index)
+        charging = battery_snapshot.charging(index)
         if percent is None:
             line = f"{label}: NONE"
         else:
@@ -1161,28 +1694,43 @@ def search_order_logic(
 
     def run_search():
         conn = None
+        offline_notice = None
         try:
-            conn = get_db_connection(show_errors=False)
-            if not conn:
-                log_event("Database connection failed.")
-                root.after(
-                    0,
-                    lambda: messagebox.showerror(
-                        "Database Error",
-                        "The app started, but the database is unavailable. Please try again when the connection is back.",
-                    ),
-                )
-                return
-
-            cursor = conn.cursor()
-            identity = resolve_order_by_order_number(cursor, order_id)
-            if not identity:
+            with span("order_search.resolve") as resolve_attrs:
+                conn = get_db_connection(show_errors=False)
+                cursor = conn.cursor() if conn else None
+                if cursor is None:
+                    # Offline: fall back to the copy saved the last time this order was searched.
+                    resolve_attrs["source"] = "offline"
+                    snapshot = get_offline_order_store().load(order_id)
+                    if snapshot is None:
+                        log_event(f"Database connection failed and no offline copy of order {order_id} exists.")
+                        root.after(
+                            0,
+                            lambda: messagebox.showerror(
+                                "Database Error",
+                                "The database is unavailable and this order has not been searched on this station before. "
+                                "Please try again when the connection is back.",
+                            ),
+                        )
+                        return
+                    offline_notice = offline_snapshot_notice(snapshot["saved_at"])
+                    log_event(f"Database unavailable; using offline copy of order {snapshot['order_number']}.")
+                else:
+                    # One round trip resolves the order and loads its candidates and note, unless
+                    # the as-you-type prefetch already has it; the marketplace prompt is still
+                    # shown before an external_id match is used.
+                    snapshot = get_order_prefetcher().get(order_id)
+                    if snapshot is None:
+                        snapshot = load_order_search_snapshot(cursor, order_id)
+                    if snapshot:
+                        _save_offline_snapshot(order_id, snapshot)
+            if not snapshot or snapshot["match_rank"] == ORDER_MATCH_EXTERNAL_ID:
                 log_event(f"ASTRO order number {order_id} not found.")
                 if not prompt_for_marketplace_search(root):
                     log_event(f"User declined marketplace fallback search for {order_id}.")
                     return
-                identity = resolve_order_by_external_id(cursor, order_id)
-                if not identity:
+                if not snapshot:
                     log_event(f"Marketplace order number {order_id} not found in consolidated database.")
                     root.after(
                         0,
@@ -1193,10 +1741,11 @@ def search_order_logic(
                     )
                     return
 
-            db_order_id, order_number = identity
-            order_candidates = load_order_candidates_for_order_id(cursor, db_order_id)
+            db_order_id = snapshot["order_id"]
+            order_number = snapshot["order_number"]
+            order_candidates = snapshot["candidates"]
             sku_options = [candidate["label"] for candidate in order_candidates]
-            order_note_text = load_order_note_for_order_id(cursor, db_order_id)
+            order_note_text = snapshot["note"]
             order_notes_callback = getattr(root, "_update_order_notes_footer", None)
             log_event(
                 f"Fetched {len(sku_options)} SKU candidates for order {order_number} (id={db_order_id})."
@@ -1236,28 +1785,34 @@ def search_order_logic(
                 else selected_sku
             ) or selected_sku
 
-            laptop_specs = load_laptop_specs()
-            serial_number = laptop_specs.get("Serial Number", "Unknown")
-
-            test_results.update(load_test_results(cursor, order_number, serial_number))
-            test_results["activation"] = "pass" if check_activation_status() else "fail"
-            log_event(
-                f"[DEBUG] test_results['activation'] set to: {test_results['activation']} for order {order_number}"
-            )
+            with span("order_search.compare"):
+                laptop_specs = load_laptop_specs()
+                serial_number = laptop_specs.get("Serial Number", "Unknown")
 
-            log_event(f"Processing SKU: {selected_sku_value}")
-            details = extract_details_from_sku(cursor, selected_sku_value)
-            if isinstance(selected_candidate, dict) and selected_candidate.get("details"):
-                details = merge_spec_details(selected_candidate["details"], details)
-            mdm_status = check_mdm_lock_status()
+                if cursor is not None:
+                    test_results.update(load_test_results(cursor, order_number, serial_number))
+                else:
+                    test_results.update({key: "Not Run" for key in TEST_RESULT_KEYS if key != "activation"})
+                test_results["activation"] = "pass" if check_activation_status() else "fail"
+                log_event(
+                    f"[DEBUG] test_results['activation'] set to: {test_results['activation']} for order {order_number}"
+                )
 
-            footer_payload = None
-            footer_callback = getattr(root, "_update_results_footer", None)
-            if callable(footer_callback):
-                try:
-                    footer_payload = build_results_footer(laptop_specs, details, mdm_status)
-                except Exception as exc:
-                    log_event(f"Search footer preparation failed: {exc}")
+                log_event(f"Processing SKU: {selected_sku_value}")
+                details = extract_details_from_sku(cursor, selected_sku_value)
+                if isinstance(selected_candidate, dict) and selected_candidate.get("details"):
+                    details = merge_spec_details(selected_candidate["details"], details)
+                mdm_status = check_mdm_lock_status()
+
+                footer_payload = None
+                footer_callback = getattr(root, "_update_results_footer", None)
+                if callable(footer_callback):
+                    try:
+                        footer_payload = build_results_footer(
+                            laptop_specs, details, mdm_status, offline_notice=offline_notice
+                        )
+                    except Exception as exc:
+                        log_event(f"Search footer preparation failed: {exc}")
 
             root.after(
                 0,
@@ -1308,6 +1863,11 @@ def start_hash_capture_status_update(root: tk.Tk, serial_number: str, context_la
     if not callable(hash_status_callback):
         return
 
+    if get_hash_prefetcher().cached_path(serial_number):
+        # Usually captured by the prefetch started at login; nothing to wait for.
+        root.after(0, lambda: hash_status_callback("Autopilot Hash Collected", "#1f7a4d"))
+        return
+
     root.after(
         0,
         lambda: hash_status_callback("Autopilot Hash Pending", "#b54708"),
@@ -1317,7 +1877,7 @@ def start_hash_capture_status_update(root: tk.Tk, serial_number: str, context_la
         hash_status_text = "Autopilot Hash Failed"
         hash_status_color = "#b42318"
         try:
-            hash_csv_path = capture_autopilot_hash_csv(preferred_serial=serial_number)
+            hash_csv_path = get_hash_prefetcher().get(serial_number)
             if hash_csv_path:
                 hash_status_text = "Autopilot Hash Collected"
                 hash_status_color = "#1f7a4d"
@@ -1516,21 +2076,29 @@ def assign_serial_logic(
             detail_text = f" {mdm_details}" if mdm_details else ""
             warning_lines.append(f"Microsoft MDM lock detected.{detail_text}")
 
-        conn = get_db_connection()
-        if not conn:
-            messagebox.showerror("Database Error", "Could not connect to the database.")
+        # Spans cover DB and compute work only; time spent in dialogs is not recorded.
+        with span("assign_serial.prepare") as prepare_attrs:
+            conn = get_db_connection(show_errors=False)
+            cursor = conn.cursor() if conn else None
+            offline_snapshot = None
+            if cursor is None:
+                prepare_attrs["source"] = "offline"
+                offline_snapshot = get_offline_order_store().load(order_number)
+            if cursor is not None or offline_snapshot is not None:
+                try:
+                    details = extract_details_from_sku(cursor, (sku or "").strip())
+                    mismatch_text, _, _, _, _ = build_results_footer(specs, details, mdm_status)
+                    if mismatch_text != "All listed specs match.":
+                        warning_lines.append("Spec mismatches were detected (items marked REVIEW in the results table).")
+                except Exception as exc:  # noqa: BLE001 - warning enrichment should not block assignment
+                    log_event(f"Unable to prepare spec mismatch warning during assignment: {exc}")
+        if cursor is None and offline_snapshot is None:
+            messagebox.showerror(
+                "Database Error",
+                "Could not connect to the database, and this order has no offline copy on this station.",
+            )
             return
 
-        cursor = conn.cursor()
-
-        try:
-            details = extract_details_from_sku(cursor, (sku or "").strip())
-            mismatch_text, _, _, _, _ = build_results_footer(specs, details, mdm_status)
-            if mismatch_text != "All listed specs match.":
-                warning_lines.append("Spec mismatches were detected (items marked REVIEW in the results table).")
-        except Exception as exc:  # noqa: BLE001 - warning enrichment should not block assignment
-            log_event(f"Unable to prepare spec mismatch warning during assignment: {exc}")
-
         if warning_lines:
             warn_message = (
                 "There are outstanding issues before assigning this serial:\n"
@@ -1540,7 +2108,18 @@ def assign_serial_logic(
             if not messagebox.askokcancel("Confirm Assignment", warn_message):
                 return
 
-        identity = resolve_order_identity(cursor, order_number)
+        if offline_snapshot is not None:
+            _journal_offline_assignment(
+                offline_snapshot, serial_number, specs, test_results, sku, mdm_status, assigned_by, root
+            )
+            return
+
+        with span("assign_serial.lookup"):
+            identity = resolve_order_identity(cursor, order_number)
+            existing = []
+            if identity:
+                cursor.execute("SELECT order_number FROM order_serials WHERE serial_number = %s", (serial_number,))
+                existing = cursor.fetchall()
         if not identity:
             messagebox.showerror(
                 "Order Not Found",
@@ -1551,9 +2130,6 @@ def assign_serial_logic(
         order_db_id, canonical_order_number = identity
         order_number = canonical_order_number
 
-        cursor.execute("SELECT order_number FROM order_serials WHERE serial_number = %s", (serial_number,))
-        existing = cursor.fetchall()
-
         if existing:
             old_orders = ", ".join(order[0] for order in existing)
             confirm = messagebox.askyesno(
@@ -1596,37 +2172,29 @@ def assign_serial_logic(
         mdm_state = mdm_status.get("state") if mdm_status else None
         mdm_details = mdm_status.get("details") if mdm_status else None
         checked_at = datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
-        normalized_tests = {
-            "keyboard": normalise_test_result(test_results.get("keyboard")),
-            "speaker": normalise_test_result(test_results.get("speaker")),
-            "microphone": normalise_test_result(test_results.get("microphone")),
-            "display": normalise_test_result(test_results.get("display")),
-            "webcam": normalise_test_result(test_results.get("webcam")),
-            "usb": normalise_test_result(test_results.get("usb")),
-            "wifi": normalise_test_result(test_results.get("wifi")),
-            "activation": normalise_test_result(test_results.get("activation")),
-        }
+        normalized_tests = normalised_test_results(test_results)
 
-        hash_csv_path = capture_autopilot_hash_csv(preferred_serial=serial_number)
-        battery_report = get_latest_batteryinfoview_report()
-        if not battery_report:
-            try:
-                battery_report = capture_batteryinfoview_report()
-            except Exception as exc:
-                log_event(f"BatteryInfoView report capture failed during assignment: {exc}")
-        stock_report_ok, stock_report_response = upload_stock_unit_check_report(
-            order_id=order_db_id,
-            order_number=order_number,
-            serial_number=serial_number,
-            sku=sku_value,
-            specs=specs,
-            test_results=normalized_tests,
-            mdm_status=mdm_status,
-            assigned_by=assigned_by,
-            hash_csv_path=hash_csv_path,
-            battery_report=battery_report,
-            checked_at=checked_at,
-        )
+        with span("assign_serial.stock_report"):
+            hash_csv_path = get_hash_prefetcher().get(serial_number)
+            battery_report = get_latest_batteryinfoview_report()
+            if not battery_report:
+                try:
+                    battery_report = capture_batteryinfoview_report()
+                except Exception as exc:
+                    log_event(f"BatteryInfoView report capture failed during assignment: {exc}")
+            stock_report_ok, stock_report_response = upload_stock_unit_check_report(
+                order_id=order_db_id,
+                order_number=order_number,
+                serial_number=serial_number,
+                sku=sku_value,
+                specs=specs,
+                test_results=normalized_tests,
+                mdm_status=mdm_status,
+                assigned_by=assigned_by,
+                hash_csv_path=hash_csv_path,
+                battery_report=battery_report,
+                checked_at=checked_at,
+            )
         if (
             not stock_report_ok
             and isinstance(stock_report_response, dict)
@@ -1641,20 +2209,21 @@ def assign_serial_logic(
                 ),
             )
             if create_stock:
-                stock_report_ok, stock_report_response = upload_stock_unit_check_report(
-                    order_id=order_db_id,
-                    order_number=order_number,
-                    serial_number=serial_number,
-                    sku=sku_value,
-                    specs=specs,
-                    test_results=normalized_tests,
-                    mdm_status=mdm_status,
-                    assigned_by=assigned_by,
-                    hash_csv_path=hash_csv_path,
-                    battery_report=battery_report,
-                    checked_at=checked_at,
-                    create_stock_unit=True,
-                )
+                with span("assign_serial.stock_report", create_stock_unit=True):
+                    stock_report_ok, stock_report_response = upload_stock_unit_check_report(
+                        order_id=order_db_id,
+                        order_number=order_number,
+                        serial_number=serial_number,
+                        sku=sku_value,
+                        specs=specs,
+                        test_results=normalized_tests,
+                        mdm_status=mdm_status,
+                        assigned_by=assigned_by,
+                        hash_csv_path=hash_csv_path,
+                        battery_report=battery_report,
+                        checked_at=checked_at,
+                        create_stock_unit=True,
+                    )
             else:
                 messagebox.showinfo(
                     "Assignment Cancelled",
@@ -1662,6 +2231,7 @@ def assign_serial_logic(
                 )
                 return
         if stock_report_ok:
+            invalidate_order_cache(order_db_id)
             user_text = f" by '{assigned_by}'" if assigned_by else ""
             hash_status_text = "OK" if hash_csv_path else "Not collected"
             show_assign_success_dialog(
@@ -1676,65 +2246,44 @@ def assign_serial_logic(
             f"Falling back to legacy order_serials insert for serial={serial_number}; "
             f"stock report response={stock_report_response}"
         )
-        if existing:
-            cursor.execute("DELETE FROM order_serials WHERE serial_number = %s", (serial_number,))
+        with span("assign_serial.write"):
+            if existing:
+                cursor.execute("DELETE FROM order_serials WHERE serial_number = %s", (serial_number,))
+
+            cursor.execute(
+                ORDER_SERIALS_INSERT_SQL,
+                order_serial_row(
+                    order_db_id,
+                    order_number,
+                    serial_number,
+                    sku_value,
+                    specs,
+                    normalized_tests,
+                    mdm_state,
+                    mdm_details,
+                    assigned_by,
+                ),
+            )
+            serial_row_id = cursor.lastrowid
+            conn.commit()
+            invalidate_order_cache(order_db_id)
 
-        cursor.execute(
-            """
-                INSERT INTO order_serials (
-                    order_id, order_number, serial_number, sku, cpu, ram, ssd, model, resolution, windows, battery, battery2,
-                    laptop_status, test_keyboard, test_speaker, test_microphone, test_display, test_webcam, test_usb, test_wifi, activation,
-                    mdm_state, mdm_details, assigned_by
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+            # The upload is delivered by the outbox sender; the dialog only waits for the queue write.
+            hash_upload_queued = False
+            if hash_csv_path:
+                hash_upload_queued = queue_hash_csv_upload(
+                    hash_csv_path,
+                    serial_id=serial_row_id,
+                    sku=sku_value,
+                    uploaded_at=checked_at,
+                )
+            else:
+                log_event(
+                    f"Hash upload skipped for serial assignment: serial_id={serial_row_id}, serial_number={serial_number} (csv capture failed)."
                 )
-            """,
-            (
-                order_db_id,
-                order_number,
-                serial_number,
-                sku_value,
-                specs.get("CPU", ""),
-                specs.get("RAM", ""),
-                specs.get("SSD", ""),
-                specs.get("Model", ""),
-                specs.get("Resolution", ""),
-                specs.get("Windows", ""),
-                specs.get("Battery", ""),
-                specs.get("Battery 2", ""),
-                "Reserved",
-                normalized_tests["keyboard"],
-                normalized_tests["speaker"],
-                normalized_tests["microphone"],
-                normalized_tests["display"],
-                normalized_tests["webcam"],
-                normalized_tests["usb"],
-                normalized_tests["wifi"],
-                normalized_tests["activation"],
-                mdm_state,
-                mdm_details,
-                assigned_by,
-            ),
-        )
-        serial_row_id = cursor.lastrowid
-        conn.commit()
-
-        hash_upload_ok = False
-        if hash_csv_path:
-            hash_upload_ok = upload_hash_csv(
-                hash_csv_path,
-                serial_id=serial_row_id,
-                sku=sku_value,
-                uploaded_at=checked_at,
-            )
-        else:
-            log_event(
-                f"Hash upload skipped for serial assignment: serial_id={serial_row_id}, serial_number={serial_number} (csv capture failed)."
-            )
 
         user_text = f" by '{assigned_by}'" if assigned_by else ""
-        hash_status_text = "OK" if hash_upload_ok else "Failed"
+        hash_status_text = "Queued" if hash_upload_queued else "Failed"
         show_assign_success_dialog(
             root,
             f"Serial '{serial_number}' (SKU '{sku_value or 'Unknown'}') assigned to order '{order_number}'{user_text}."
@@ -1749,6 +2298,93 @@ def assign_serial_logic(
             conn.close()
 
 
+def _journal_offline_assignment(
+    snapshot: Dict[str, Any],
+    serial_number: str,
+    specs: dict,
+    test_results: dict,
+    sku: str,
+    mdm_status: Optional[Dict[str, str]],
+    assigned_by: Optional[str],
+    root: tk.Tk,
+) -> None:
+    """
+    Record an assignment in the offline journal while MySQL is unreachable.
+
+    The journalled row is the same ``order_serials`` insert the online
+    fallback writes, together with the Web-Tools stock report (battery
+    report included). The reconciler replays the row, reports serials that
+    were assigned elsewhere in the meantime, and queues the stock report with
+    the hash CSV through the upload outbox.
+    """
+
+    order_db_id = int(snapshot["order_id"])
+    order_number = snapshot["order_number"]
+    sku_value = (sku or "").strip()
+    if not sku_value:
+        sku_options = list(dict.fromkeys(candidate["sku"] for candidate in snapshot["candidates"] if candidate.get("sku")))
+        if len(sku_options) == 1:
+            sku_value = sku_options[0]
+        elif sku_options:
+            selected = prompt_for_sku_selection(root, sku_options)
+            if not selected:
+                messagebox.showinfo("Selection Cancelled", "No SKU was selected. Assignment cancelled.")
+                return
+            sku_value = selected
+
+    checked_at = datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+    normalized_tests = normalised_test_results(test_results)
+    row = order_serial_row(
+        order_db_id,
+        order_number,
+        serial_number,
+        sku_value,
+        specs,
+        normalized_tests,
+        mdm_status.get("state") if mdm_status else None,
+        mdm_status.get("details") if mdm_status else None,
+        assigned_by,
+    )
+    hash_csv_path = get_hash_prefetcher().get(serial_number)
+    battery_report = get_latest_batteryinfoview_report()
+    if not battery_report:
+        try:
+            battery_report = capture_batteryinfoview_report()
+        except Exception as exc:
+            log_event(f"BatteryInfoView report capture failed during offline assignment: {exc}")
+    journal = get_assignment_journal()
+    entry_id = journal.append(
+        order_db_id,
+        order_number,
+        serial_number,
+        dict(zip(ORDER_SERIALS_COLUMNS, row)),
+        hash_csv_path=hash_csv_path,
+        checked_at=checked_at,
+        report={
+            "order_id": order_db_id,
+            "order_number": order_number,
+            "serial_number": serial_number,
+            "sku": sku_value,
+            "specs": specs,
+            "test_results": normalized_tests,
+            "mdm_status": mdm_status,
+            "assigned_by": assigned_by,
+            "battery_report": battery_report,
+            "checked_at": checked_at,
+        },
+    )
+    pending = journal.stats()["pending"]
+    log_event(f"Offline assignment journalled: entry={entry_id} serial={serial_number} order={order_number}")
+    user_text = f" by '{assigned_by}'" if assigned_by else ""
+    show_assign_success_dialog(
+        root,
+        f"Serial '{serial_number}' (SKU '{sku_value or 'Unknown'}') saved offline for order '{order_number}'{user_text}."
+        f"\nThe database is unavailable; {pending} offline assignment(s) will be written when it is back."
+        f"\nStock Report Upload: Queued after sync"
+        f"\nHash Upload: {'Queued after sync' if hash_csv_path else 'Not collected'}",
+    )
+
+
 def assign_trade_serial_logic(
     job_id: Optional[int],
     job_reference: str,
@@ -1852,7 +2488,7 @@ def assign_trade_serial_logic(
         mdm_details = mdm_status.get("details") if mdm_status else None
         checked_at = datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
 
-        hash_csv_path = capture_autopilot_hash_csv(preferred_serial=serial_number)
+        hash_csv_path = get_hash_prefetcher().get(serial_number)
         battery_report = get_latest_batteryinfoview_report()
         if not battery_report:
             try:
@@ -1871,6 +2507,7 @@ def assign_trade_serial_logic(
             hash_csv_path=hash_csv_path,
             battery_report=battery_report,
             checked_at=checked_at,
+            queue_on_failure=True,
         )
         if (
             not report_ok
@@ -1898,6 +2535,7 @@ def assign_trade_serial_logic(
                     battery_report=battery_report,
                     checked_at=checked_at,
                     create_stock_unit=True,
+                    queue_on_failure=True,
                 )
             else:
                 messagebox.showinfo(
@@ -1975,7 +2613,12 @@ def assign_trade_serial_logic(
         assigned_count = int(cursor.fetchone()[0] or 0)
 
         user_text = f" by '{assigned_by}'" if assigned_by else ""
-        report_status_text = "OK" if report_ok else f"Failed ({report_response.get('error') if isinstance(report_response, dict) else 'unknown'})"
+        if report_ok:
+            report_status_text = "OK"
+        elif isinstance(report_response, dict) and report_response.get("queued"):
+            report_status_text = "Queued (Web-Tools unreachable; will retry)"
+        else:
+            report_status_text = f"Failed ({report_response.get('error') if isinstance(report_response, dict) else 'unknown'})"
         hash_status_text = "OK" if hash_csv_path else "Not collected"
         show_assign_success_dialog(
             root,
@@ -0,0 +1,98 @@
+# ui/diagnostics.py
+import threading
+import tkinter as tk
+from typing import Any, Dict
+
+from ttkbootstrap import ttk
+
+from db.database import get_pool_stats, get_schema_verification_stats
+from main_logic import get_offline_stats, get_order_cache_stats, get_order_prefetcher
+from utils.helpers import get_background_service_stats, log_event
+from utils.ui_scaling import center_window
+
+SERVICE_TITLES = {
+    "powershell_host": "PowerShell host",
+    "hash_prefetch": "Autopilot hash prefetch",
+    "upload_outbox": "Upload outbox",
+    "reference_replica": "SKU reference replica",
+}
+
+
+def collect_diagnostics() -> Dict[str, Dict[str, Any]]:
+    """Gather the in-process counters shown in Tools > Diagnostics, one section per component."""
+
+    sections: Dict[str, Dict[str, Any]] = {
+        "Database pool": get_pool_stats() or {"state": "not started"},
+        "Schema verification": get_schema_verification_stats(),
+    }
+    cache_stats = get_order_cache_stats()
+    sections["Order identity cache"] = cache_stats["identity"]
+    sections["Order candidates cache"] = cache_stats["candidates"]
+    sections["Order notes cache"] = cache_stats["notes"]
+    sections["Order prefetch"] = get_order_prefetcher().stats()
+    sections["Offline journal"] = get_offline_stats()
+    for name, stats in get_background_service_stats().items():
+        sections[SERVICE_TITLES.get(name, name)] = stats
+    return sections
+
+
+def format_diagnostics(sections: Dict[str, Dict[str, Any]]) -> str:
+    lines = []
+    for title, stats in sections.items():
+        lines.append(title)
+        if not stats:
+            lines.append("  (no data)")
+        width = max((len(str(key)) for key in stats), default=0)
+        for key, value in stats.items():
+            lines.append(f"  {str(key).ljust(width)}  {'-' if value is None else value}")
+        lines.append("")
+    return "\n".join(lines).rstrip() + "\n"
+
+
+class DiagnosticsWindow:
+    def __init__(self, root: tk.Misc):
+        self.root = root
+        self.window = tk.Toplevel(root)
+        self.window.title("Diagnostics")
+        center_window(self.window, 480, 560, min_width=380, min_height=360)
+
+        frame = ttk.Frame(self.window, padding=10)
+        frame.pack(fill="both", expand=True)
+        self.text = tk.Text(frame, wrap="none", font=("Consolas", 10), relief="flat", bg="#f8f9fb")
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.text.yview)
+        self.text.configure(yscrollcommand=scrollbar.set, state="disabled")
+        self.text.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        buttons = ttk.Frame(self.window, padding=(10, 0, 10, 10))
+        buttons.pack(fill="x")
+        ttk.Button(buttons, text="Refresh", command=self.refresh, style="info.TButton").pack(side="left")
+        ttk.Button(buttons, text="Copy", command=self.copy, style="secondary.TButton").pack(side="left", padx=(6, 0))
+        ttk.Button(buttons, text="Close", command=self.window.destroy, style="secondary.TButton").pack(side="right")
+        self.refresh()
+
+    def refresh(self) -> None:
+        self._show("Collecting...\n")
+
+        def worker():
+            # Outbox stats read SQLite, so collect off the Tk thread.
+            try:
+                text = format_diagnostics(collect_diagnostics())
+            except Exception as exc:
+                log_event(f"Diagnostics collection failed: {exc}")
+                text = f"Failed to collect diagnostics:\n{exc}\n"
+            self.root.after(0, lambda: self._show(text))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def copy(self) -> None:
+        self.window.clipboard_clear()
+        self.window.clipboard_append(self.text.get("1.0", "end-1c"))
+
+    def _show(self, text: str) -> None:
+        if not self.window.winfo_exists():
+            return
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", text)
+        self.text.configure(state="disabled")
@@ -12,9 +12,12 @@ from hardwaretests.usb import run_usb_test
 from hardwaretests.webcam import run_webcam_test
 from hardwaretests.wifi import run_wifi_test
 from ui.keyboard_test import run_keyboard_test
-from utils.helpers import check_activation_status, log_event
+from utils.helpers import check_activation_status, get_powershell_host, log_event
+from utils.powershell_host import PowerShellHostError, PowerShellTimeout
 from utils.ui_scaling import center_window, center_window_to_content, get_work_area
 
+PRODUCT_KEY_QUERY = "(Get-WmiObject -query 'select * from SoftwareLicensingService').OA3xOriginalProductKey"
+
 
 class TestsWindow:
     def __init__(self, root, test_results, test_labels):
@@ -325,17 +328,20 @@ class TestsWindow:
 
         def run():
             try:
-                result = subprocess.run(
-                    [
-                        "powershell",
-                        "-Command",
-                        "(Get-WmiObject -query 'select * from SoftwareLicensingService').OA3xOriginalProductKey",
-                    ],
-                    capture_output=True,
-                    text=True,
-                    timeout=10,
-                )
-                key = result.stdout.strip()
+                try:
+                    key = get_powershell_host().run(PRODUCT_KEY_QUERY, timeout=10, name="Product key").last_line
+                except PowerShellTimeout:
+                    # Re-running a query that already hung would only double the wait.
+                    raise
+                except PowerShellHostError as exc:
+                    log_event(f"Product key query falling back to a one-off process: {exc}")
+                    result = subprocess.run(
+                        ["powershell", "-Command", PRODUCT_KEY_QUERY],
+                        capture_output=True,
+                        text=True,
+                        timeout=10,
+                    )
+                    key = result.stdout.strip()
                 if not key:
                     raise Exception("No product key found.")
                 self.root.after(
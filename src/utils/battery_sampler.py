@@ -0,0 +1,180 @@
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+DEFAULT_SAMPLE_INTERVAL = 2.0
+DEFAULT_FIRST_SAMPLE_WAIT = 2.0
+CHARGING_STATUSES = frozenset({2, 6})
+
+RawBatteryRow = Tuple[Optional[int], Optional[int]]
+
+
+@dataclass(frozen=True)
+class BatteryReading:
+    percent: Optional[int]
+    charging: bool
+
+
+@dataclass(frozen=True)
+class BatterySnapshot:
+    readings: Tuple[BatteryReading, ...] = ()
+    sampled_at: Optional[float] = None
+    error: Optional[str] = None
+
+    def percent(self, index: int = 0) -> Optional[int]:
+        return self.readings[index].percent if 0 <= index < len(self.readings) else None
+
+    def charging(self, index: int = 0) -> bool:
+        return self.readings[index].charging if 0 <= index < len(self.readings) else False
+
+
+class WmiBatterySource:
+    """Reads ``Win32_Battery`` through one WMI client owned by the sampler thread."""
+
+    def __init__(self):
+        self._client = None
+        self._com_initialized = False
+
+    def read(self) -> List[RawBatteryRow]:
+        if sys.platform != "win32":
+            return []
+        if self._client is None:
+            import pythoncom  # type: ignore[import]
+            import wmi
+
+            if not self._com_initialized:
+                pythoncom.CoInitialize()
+                self._com_initialized = True
+            self._client = wmi.WMI()
+        try:
+            return [(battery.EstimatedChargeRemaining, battery.BatteryStatus) for battery in self._client.Win32_Battery()]
+        except Exception:
+            # Drop the client so the next sample reconnects.
+            self._client = None
+            raise
+
+    def close(self) -> None:
+        self._client = None
+        if self._com_initialized:
+            import pythoncom  # type: ignore[import]
+
+            pythoncom.CoUninitialize()
+            self._com_initialized = False
+
+
+class FakeBatterySource:
+    """Replays canned ``(percent, BatteryStatus)`` rows; an Exception entry is raised."""
+
+    def __init__(self, samples: Sequence):
+        self._samples = list(samples)
+        self._index = 0
+        self.reads = 0
+
+    def read(self) -> List[RawBatteryRow]:
+        self.reads += 1
+        sample = self._samples[min(self._index, len(self._samples) - 1)] if self._samples else []
+        self._index += 1
+        if isinstance(sample, Exception):
+            raise sample
+        return list(sample)
+
+    def close(self) -> None:
+        pass
+
+
+class BatterySampler:
+    """
+    Background thread that polls all batteries at a fixed interval.
+
+    Each sample is published as a new immutable :class:`BatterySnapshot` by a
+    single reference assignment, so readers never lock or touch COM. A failed
+    read keeps the previous readings and records the error.
+    """
+
+    def __init__(
+        self,
+        source=None,
+        *,
+        interval: float = DEFAULT_SAMPLE_INTERVAL,
+        first_sample_wait: float = DEFAULT_FIRST_SAMPLE_WAIT,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        self._source = source if source is not None else WmiBatterySource()
+        self.interval = interval
+        self.first_sample_wait = first_sample_wait
+        self._log = log or (lambda message: None)
+        self._snapshot = BatterySnapshot()
+        self._first_sample = threading.Event()
+        self._waited_for_first_sample = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._last_error: Optional[str] = None
+
+    def start(self) -> "BatterySampler":
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="battery-sampler", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def snapshot(self) -> BatterySnapshot:
+        """
+        Latest snapshot; the first call off the UI thread waits briefly for the initial sample.
+
+        The wait happens at most once per sampler, and never on the main (Tk)
+        thread, so a machine without a battery or with a hung WMI source gets
+        the empty snapshot straight away instead of stalling every render.
+        """
+
+        if not self._first_sample.is_set():
+            self.start()
+            if not self._waited_for_first_sample and threading.current_thread() is not threading.main_thread():
+                self._waited_for_first_sample = True
+                self._first_sample.wait(self.first_sample_wait)
+        return self._snapshot
+
+    def sample_now(self) -> BatterySnapshot:
+        """Take one sample on the calling thread (used by the thread loop and tests)."""
+
+        previous = self._snapshot
+        try:
+            rows = self._source.read()
+            readings = tuple(
+                BatteryReading(
+                    percent=int(percent) if percent is not None else None,
+                    charging=status in CHARGING_STATUSES,
+                )
+                for percent, status in rows
+            )
+            snapshot = BatterySnapshot(readings=readings, sampled_at=time.time())
+            self._last_error = None
+        except Exception as exc:
+            message = str(exc)
+            if message != self._last_error:
+                self._log(f"Battery sampler read error: {exc}")
+                self._last_error = message
+            snapshot = BatterySnapshot(readings=previous.readings, sampled_at=previous.sampled_at, error=message)
+        self._snapshot = snapshot
+        self._first_sample.set()
+        return snapshot
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                self.sample_now()
+                self._stop.wait(self.interval)
+        finally:
+            try:
+                self._source.close()
+            except Exception as exc:
+                self._log(f"Battery sampler shutdown error: {exc}")
@@ -0,0 +1,165 @@
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+from utils.telemetry import span
+
+STATE_IDLE = "idle"
+STATE_PENDING = "pending"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+DEFAULT_WAIT_SECONDS = 90.0
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|]')
+
+CaptureFn = Callable[..., Optional[str]]
+Listener = Callable[[str, Optional[str]], None]
+
+
+def hash_csv_filename(serial: str) -> str:
+    """File name the capture script uses for ``serial``."""
+
+    return f"{_UNSAFE_FILENAME_CHARS.sub('_', serial.strip())}.csv"
+
+
+class HashPrefetcher:
+    """
+    Capture the Autopilot hash CSV once in the background and hand it out by serial.
+
+    The hardware hash never changes for a machine, so the CSV written by
+    ``capture`` (``<cache_dir>/<serial>.csv``) is reused for every later
+    assignment, including across restarts. ``get()`` returns a cached file
+    immediately, waits for a capture already in flight, or captures on the
+    calling thread as a last resort. Hits and misses are counted and recorded
+    as ``autopilot_hash.lookup`` spans.
+    """
+
+    def __init__(
+        self,
+        capture: CaptureFn,
+        cache_dir: str,
+        *,
+        serial_source: Optional[Callable[[], Optional[str]]] = None,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        self._capture = capture
+        self.cache_dir = cache_dir
+        self._serial_source = serial_source or (lambda: None)
+        self._log = log or (lambda message: None)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, str] = {}
+        self._listeners: List[Listener] = []
+        self._done = threading.Event()
+        self._done.set()
+        self.state = STATE_IDLE
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.captures = 0
+        self.failures = 0
+
+    def add_listener(self, listener: Listener) -> None:
+        """Call ``listener(state, csv_path)`` whenever the capture state changes."""
+
+        with self._lock:
+            self._listeners.append(listener)
+
+    def cached_path(self, serial: Optional[str] = None) -> Optional[str]:
+        serial = (serial or self._serial_source() or "").strip()
+        if not serial or serial == "Unknown":
+            return None
+        with self._lock:
+            path = self._entries.get(serial)
+        if path and os.path.exists(path):
+            return path
+        # A CSV left by an earlier session is just as valid: the hash is per machine.
+        path = os.path.join(self.cache_dir, hash_csv_filename(serial))
+        if os.path.exists(path):
+            with self._lock:
+                self._entries[serial] = path
+            return path
+        return None
+
+    def start(self, preferred_serial: Optional[str] = None) -> bool:
+        """Begin a background capture unless one is cached or running; True if started."""
+
+        serial = preferred_serial or self._serial_source()
+        cached = self.cached_path(serial)
+        if cached:
+            self._set_state(STATE_READY, cached)
+            return False
+        with self._lock:
+            if not self._done.is_set():
+                return False
+            self._done.clear()
+        self._set_state(STATE_PENDING, None)
+        threading.Thread(target=self._run_capture, args=(serial,), name="hash-prefetch", daemon=True).start()
+        return True
+
+    def get(self, serial: Optional[str] = None, wait: float = DEFAULT_WAIT_SECONDS) -> Optional[str]:
+        """Return the hash CSV for ``serial``, waiting for (or starting) a capture if needed."""
+
+        with span("autopilot_hash.lookup") as attrs:
+            path = self.cached_path(serial)
+            if path:
+                outcome = "hit"
+            else:
+                if not self._done.is_set():
+                    outcome = "wait"
+                else:
+                    outcome = "miss"
+                    self.start(serial)
+                self._done.wait(wait)
+                path = self.cached_path(serial)
+            with self._lock:
+                if outcome == "hit":
+                    self.hits += 1
+                elif outcome == "wait":
+                    self.waits += 1
+                else:
+                    self.misses += 1
+            attrs["outcome"] = outcome
+            attrs["found"] = bool(path)
+        self._log(f"Autopilot hash lookup {outcome} for serial {serial or 'unknown'}: {path or 'no file'}")
+        return path
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "hits": self.hits,
+                "waits": self.waits,
+                "misses": self.misses,
+                "captures": self.captures,
+                "failures": self.failures,
+            }
+
+    def _run_capture(self, serial: Optional[str]) -> None:
+        path = None
+        try:
+            path = self._capture(preferred_serial=serial, output_directory=self.cache_dir)
+        except Exception as exc:
+            self._log(f"Autopilot hash prefetch raised: {exc}")
+        key = (serial or "").strip() or (os.path.splitext(os.path.basename(path))[0] if path else "")
+        with self._lock:
+            self.captures += 1
+            if path and key:
+                self._entries[key] = path
+            else:
+                self.failures += 1
+        self._set_state(STATE_READY if path else STATE_FAILED, path)
+        self._done.set()
+
+    def _set_state(self, state: str, path: Optional[str]) -> None:
+        with self._lock:
+            changed = state != self.state
+            self.state = state
+            listeners = list(self._listeners)
+        if not changed:
+            return
+        for listener in listeners:
+            try:
+                listener(state, path)
+            except Exception as exc:
+                self._log(f"Hash prefetch listener failed: {exc}")
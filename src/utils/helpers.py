@@ -1,19 +1,40 @@
+import base64
 import configparser
 import datetime
 import hashlib
+import json
 import os
 import re
+import sqlite3
 import subprocess
 import sys
 import tempfile
-import time
+import threading
 import urllib.request
-import wmi
+import uuid
 import zipfile
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Set, Tuple
 import requests
 
+from utils.battery_sampler import BatterySampler, BatterySnapshot
+from utils.hash_prefetch import HashPrefetcher
+from utils.log_writer import BackgroundLogWriter
+from utils.powershell_host import PowerShellHost, PowerShellHostError, PowerShellResult, PowerShellTimeout
+from utils.reference_replica import ReferenceReplica
+from utils.sku_matcher import SkuKeywordMatcher, SkuTagMatcher
+from utils.telemetry import traced
+from utils.upload_outbox import DELIVERED, REJECTED, RETRY, OutboxItem, UploadOutbox
+from utils.webtools_client import (
+    DEFAULT_BASE_URL,
+    HTTP_UNSUPPORTED_MEDIA_TYPE,
+    REPORT_UPLOAD_JSON,
+    REPORT_UPLOAD_MULTIPART,
+    MultipartStream,
+    WebToolsClient,
+    WebToolsConfig,
+)
+
 SYSROOT = Path(os.environ.get("WINDIR", r"C:\Windows"))
 DSREGCMD_PATH = SYSROOT / "System32" / "dsregcmd.exe"
 GPUPDATE_PATH = SYSROOT / "System32" / "gpupdate.exe"
@@ -21,7 +42,9 @@ HARDCODED_SECOND_CHECK_KEY = "n_wHG3XvhznRp-bXm6tpN4OO_E4mnwu11XxkbVEStMv7W5fpjl
 
 _SKU_TAG_METADATA: Optional[List[Dict[str, Any]]] = None
 _DROPDOWN_OPTION_CACHE: Optional[Dict[int, Dict[str, str]]] = None
-_CPU_KEYWORD_TOKENS: Optional[Set[str]] = None
+_SKU_TAG_MATCHER: Optional[Tuple[List[Dict[str, Any]], SkuTagMatcher]] = None
+_SKU_KEYWORD_MATCHER: Optional[Tuple[configparser.ConfigParser, SkuKeywordMatcher]] = None
+_CPU_KEYWORD_TOKENS: Optional[Tuple[configparser.ConfigParser, Set[str]]] = None
 _NORMALIZE_PATTERN = re.compile(r"[^A-Z0-9]+")
 _STORAGE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)\s*(TB|GB)\b", re.IGNORECASE)
 _CATEGORY_TO_SPEC_FIELD = {
@@ -41,6 +64,79 @@ def _windows_no_window_creationflags() -> int:
     return 0
 
 
+_POWERSHELL_HOST: Optional[PowerShellHost] = None
+_POWERSHELL_HOST_LOCK = threading.Lock()
+
+# Runs a native tool inside the PowerShell host; stderr is folded into output.
+_NATIVE_COMMAND_SCRIPT = r"""
+param([string]$Path, [string[]]$Arguments = @())
+& $Path @Arguments
+"""
+
+# Same check as `slmgr.vbs /xpr` without starting cscript: a licensed Windows
+# product with no grace period left is permanently activated.
+_ACTIVATION_SCRIPT = r"""
+$product = Get-CimInstance -ClassName SoftwareLicensingProduct -Filter "ApplicationID='55c92734-d682-4d71-983e-d6ec3f16059f' AND PartialProductKey IS NOT NULL" |
+    Where-Object { $_.LicenseStatus -eq 1 } | Select-Object -First 1
+if ($null -eq $product) { "not-activated" }
+elseif ([int]$product.GracePeriodRemaining -eq 0) { "permanently-activated" }
+else { "activated-with-expiry:$($product.GracePeriodRemaining)" }
+"""
+
+
+def get_powershell_host() -> PowerShellHost:
+    """Return the shared PowerShell worker pool, creating it on first use."""
+
+    global _POWERSHELL_HOST
+    with _POWERSHELL_HOST_LOCK:
+        if _POWERSHELL_HOST is None:
+            _POWERSHELL_HOST = PowerShellHost(log=log_event).install_exit_hook()
+        return _POWERSHELL_HOST
+
+
+def set_powershell_host(host: Optional[PowerShellHost]) -> None:
+    """Replace the shared host (e.g. one running a stub worker); the old one is shut down."""
+
+    global _POWERSHELL_HOST
+    with _POWERSHELL_HOST_LOCK:
+        previous, _POWERSHELL_HOST = _POWERSHELL_HOST, host
+    if previous is not None and previous is not host:
+        previous.shutdown()
+
+
+def warm_powershell_host() -> None:
+    """Start a PowerShell worker in the background on Windows."""
+
+    if sys.platform == "win32":
+        get_powershell_host().warm()
+
+
+def _run_in_powershell_host(script: str, args: Dict[str, Any], label: str, timeout: float) -> Optional[PowerShellResult]:
+    """
+    Run ``script`` in the shared host; None means the host itself failed.
+
+    A timeout is returned as a failed result rather than None: the script may
+    already have had side effects, and running it again in a one-off process
+    would repeat them and double the wait.
+    """
+
+    try:
+        return get_powershell_host().run(script, args, timeout=timeout, name=label)
+    except PowerShellTimeout as exc:
+        log_event(f"{label}: timed out in the PowerShell host after {timeout:g}s ({exc}).")
+        return PowerShellResult(
+            ok=False,
+            output="",
+            error=f"timed out after {timeout:g}s",
+            exit_code=-1,
+            duration_ms=timeout * 1000.0,
+            timed_out=True,
+        )
+    except PowerShellHostError as exc:
+        log_event(f"{label}: PowerShell host unavailable ({exc}); using a one-off process.")
+        return None
+
+
 def _run_windows_command(path: Path, args: list[str], label: str) -> bool:
     """Run `path` with `args`, logging the result."""
 
@@ -48,6 +144,16 @@ def _run_windows_command(path: Path, args: list[str], label: str) -> bool:
         log_event(f"{label} ({path}) not found; skipping.")
         return False
 
+    hosted = _run_in_powershell_host(
+        _NATIVE_COMMAND_SCRIPT, {"Path": str(path), "Arguments": list(args)}, label, timeout=60
+    )
+    if hosted is not None:
+        if hosted.succeeded:
+            log_event(f"{label} succeeded with args {args}.")
+            return True
+        log_event(f"{label} exited {hosted.exit_code}: {(hosted.error or hosted.output).strip()}")
+        return False
+
     try:
         result = subprocess.run(
             [str(path), *args],
@@ -84,6 +190,7 @@ def run_mdm_policy_commands() -> bool:
     return success
 
 
+@traced()
 def capture_autopilot_hash_csv(
     preferred_serial: Optional[str] = None,
     output_directory: Optional[str] = None,
@@ -275,6 +382,19 @@ $row | Export-Csv -Path $outFile -NoTypeInformation -Encoding UTF8
 Write-Output $outFile
 """
 
+    hosted = _run_in_powershell_host(
+        script,
+        {"OutputDirectory": out_dir, "PreferredSerial": preferred_serial or ""},
+        "Autopilot hash capture",
+        timeout=60,
+    )
+    if hosted is not None:
+        if not hosted.succeeded:
+            failure_text = (hosted.error or hosted.output).strip() or f"exit code {hosted.exit_code}"
+            log_event("Autopilot hash capture failed: " + failure_text)
+            return None
+        return _hash_csv_path_from_output(hosted.output)
+
     temp_script_path = ""
     try:
         with tempfile.NamedTemporaryFile(
@@ -330,7 +450,13 @@ Write-Output $outFile
         )
         return None
 
-    output = (result.stdout or "").strip().splitlines()
+    return _hash_csv_path_from_output(result.stdout)
+
+
+def _hash_csv_path_from_output(stdout: Optional[str]) -> Optional[str]:
+    """The capture script prints the CSV path as its last line."""
+
+    output = (stdout or "").strip().splitlines()
     csv_path = output[-1].strip() if output else ""
     if not csv_path or not os.path.exists(csv_path):
         log_event(f"Autopilot hash capture completed but CSV path was not found: '{csv_path}'")
@@ -340,20 +466,50 @@ Write-Output $outFile
     return csv_path
 
 
-def upload_hash_csv(
+_HASH_PREFETCHER: Optional[HashPrefetcher] = None
+_HASH_PREFETCHER_LOCK = threading.Lock()
+
+
+def _bios_serial() -> Optional[str]:
+    try:
+        from utils.specs import get_laptop_specs
+
+        return get_laptop_specs().get("Serial Number")
+    except Exception as exc:  # noqa: BLE001 - a missing serial only disables the cache key
+        log_event(f"Unable to read BIOS serial for hash prefetch: {exc}")
+        return None
+
+
+def get_hash_prefetcher() -> HashPrefetcher:
+    """Return the shared Autopilot hash prefetcher (CSV cached by BIOS serial)."""
+
+    global _HASH_PREFETCHER
+    with _HASH_PREFETCHER_LOCK:
+        if _HASH_PREFETCHER is None:
+            _HASH_PREFETCHER = HashPrefetcher(
+                capture_autopilot_hash_csv,
+                os.path.join(get_app_dir(), "AutopilotHashes"),
+                serial_source=_bios_serial,
+                log=log_event,
+            )
+        return _HASH_PREFETCHER
+
+
+def set_hash_prefetcher(prefetcher: Optional[HashPrefetcher]) -> None:
+    global _HASH_PREFETCHER
+    with _HASH_PREFETCHER_LOCK:
+        _HASH_PREFETCHER = prefetcher
+
+
+def _build_hash_upload(
     file_path,
     serial_id=None,
     order_id=None,
     serial_number=None,
     sku=None,
     uploaded_at=None,
-):
-    """
-    Upload a hash CSV file to Web-Tools using multipart/form-data.
-
-    Local test example:
-    upload_hash_csv(r"C:\\temp\\PF24NEM2.csv", serial_id=123, uploaded_at="2026-03-18T10:00:00Z")
-    """
+) -> Optional[Dict[str, Any]]:
+    """Validate a hash upload and capture everything needed to (re)send it later."""
 
     identifier_text = ""
     if serial_id is not None:
@@ -362,42 +518,20 @@ def upload_hash_csv(
         identifier_text = f"order_id={order_id},serial_number={serial_number}"
     else:
         log_event("Hash upload skipped: missing serial identifier (serial_id or order_id+serial_number).")
-        return False
+        return None
     sku_text = str(sku or "").strip()
     if sku_text:
         identifier_text = f"{identifier_text},sku={sku_text}"
 
     if not file_path or not os.path.exists(file_path):
         log_event(f"Hash upload skipped: file not found ({file_path}).")
-        return False
-
-    config_base_url = ""
-    config_api_key = ""
-    try:
-        config = load_config()
-        if config.has_section("webtools"):
-            config_base_url = config.get("webtools", "base_url", fallback="").strip()
-            config_api_key = config.get("webtools", "second_check_key", fallback="").strip()
-    except Exception as exc:
-        log_event(f"Hash upload config read warning: {exc}")
+        return None
 
-    base_url = (
-        os.getenv("SECOND_CHECK_BASE_URL", "").strip()
-        or config_base_url
-        or "http://192.168.1.188:5001"
-    )
-    api_key = (
-        os.getenv("SECOND_CHECK_KEY", "").strip()
-        or HARDCODED_SECOND_CHECK_KEY
-        or config_api_key
-    )
-    if not api_key or api_key == "<SECRET>":
+    if not get_webtools_client().config.configured:
         log_event("Hash upload skipped: X-Second-Check-Key is not configured.")
-        return False
-    url = f"{base_url.rstrip('/')}/orders/serials/hash"
-    file_name = os.path.basename(file_path)
-    utc_stamp = uploaded_at or datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+        return None
 
+    utc_stamp = uploaded_at or datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
     form_data = {"hash_uploaded_at": utc_stamp}
     if serial_id is not None:
         form_data["serial_id"] = str(serial_id)
@@ -407,67 +541,120 @@ def upload_hash_csv(
     if sku_text:
         form_data["sku"] = sku_text
 
-    headers = {"X-Second-Check-Key": api_key}
-    max_attempts = 4
-    backoff_seconds = 1
+    try:
+        with open(file_path, "rb") as csv_handle:
+            file_data = csv_handle.read()
+    except OSError as exc:
+        log_event(f"Hash upload skipped: unable to read {file_path}: {exc}")
+        return None
+
+    return {
+        "identifier": identifier_text,
+        "form": form_data,
+        "file_name": os.path.basename(file_path),
+        # Stored with the queued upload so a replay never depends on the CSV still existing.
+        "file_b64": base64.b64encode(file_data).decode("ascii"),
+    }
 
-    for attempt in range(1, max_attempts + 1):
-        try:
-            with open(file_path, "rb") as csv_handle:
-                response = requests.post(
-                    url,
-                    headers=headers,
-                    data=form_data,
-                    files={"hash_file": (file_name, csv_handle, "text/csv")},
-                    timeout=20,
-                )
-        except requests.RequestException as exc:
-            if attempt < max_attempts:
-                log_event(
-                    f"Hash upload retry ({attempt}/{max_attempts}) {identifier_text} file={file_name} network_error={exc}"
-                )
-                time.sleep(backoff_seconds)
-                backoff_seconds *= 2
-                continue
-            log_event(f"Hash upload failed {identifier_text} file={file_name} network_error={exc}")
-            return False
 
-        status = response.status_code
-        body = (response.text or "").strip().replace("\n", " ")
-        if len(body) > 200:
-            body = f"{body[:200]}..."
-        log_event(f"Hash upload response {identifier_text} file={file_name} status={status}")
+def _send_hash_upload(upload: Dict[str, Any], idempotency_key: Optional[str] = None) -> Tuple[str, str]:
+    """Send one hash upload; returns (DELIVERED | RETRY | REJECTED, detail).
 
-        if status == 200:
-            log_event(f"Hash upload success {identifier_text} file={file_name}")
-            return True
+    Connection errors and 5xx responses have already been retried by the
+    client's adapter by the time RETRY is returned.
+    """
 
-        if status in {500, 502, 503, 504} and attempt < max_attempts:
-            log_event(
-                f"Hash upload retry ({attempt}/{max_attempts}) {identifier_text} file={file_name} status={status}"
-            )
-            time.sleep(backoff_seconds)
-            backoff_seconds *= 2
-            continue
+    client = get_webtools_client()
+    if not client.config.configured:
+        return REJECTED, "X-Second-Check-Key is not configured"
+    identifier_text = upload["identifier"]
+    file_name = upload["file_name"]
+    headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
 
-        if status == 400:
-            log_event(f"Hash upload failed {identifier_text} file={file_name} status=400 payload/format issue {body}")
-            return False
-        if status == 401:
-            log_event(f"Hash upload failed {identifier_text} file={file_name} status=401 auth issue")
-            return False
-        if status == 404:
-            log_event(f"Hash upload failed {identifier_text} file={file_name} status=404 serial not found")
-            return False
-        if status >= 500:
-            log_event(f"Hash upload failed {identifier_text} file={file_name} status={status} server error {body}")
-            return False
-
-        log_event(f"Hash upload failed {identifier_text} file={file_name} status={status} {body}")
+    try:
+        response = client.post(
+            "/orders/serials/hash",
+            headers=headers,
+            data=upload["form"],
+            files={"hash_file": (file_name, base64.b64decode(upload["file_b64"]), "text/csv")},
+            timeout=20,
+        )
+    except requests.RequestException as exc:
+        return RETRY, f"network_error={exc}"
+
+    status = response.status_code
+    body = (response.text or "").strip().replace("\n", " ")
+    if len(body) > 200:
+        body = f"{body[:200]}..."
+    log_event(f"Hash upload response {identifier_text} file={file_name} status={status}")
+
+    if status == 200:
+        log_event(f"Hash upload success {identifier_text} file={file_name}")
+        return DELIVERED, ""
+    if status in {500, 502, 503, 504}:
+        return RETRY, f"status={status}"
+
+    if status == 400:
+        detail = f"status=400 payload/format issue {body}"
+    elif status == 401:
+        detail = "status=401 auth issue"
+    elif status == 404:
+        detail = "status=404 serial not found"
+    elif status >= 500:
+        detail = f"status={status} server error {body}"
+    else:
+        detail = f"status={status} {body}"
+    log_event(f"Hash upload failed {identifier_text} file={file_name} {detail}")
+    return REJECTED, detail
+
+
+@traced()
+def upload_hash_csv(
+    file_path,
+    serial_id=None,
+    order_id=None,
+    serial_number=None,
+    sku=None,
+    uploaded_at=None,
+):
+    """
+    Upload a hash CSV file to Web-Tools using multipart/form-data, waiting for the result.
+
+    Assignments use queue_hash_csv_upload() instead so they never wait on Web-Tools.
+
+    Local test example:
+    upload_hash_csv(r"C:\\temp\\PF24NEM2.csv", serial_id=123, uploaded_at="2026-03-18T10:00:00Z")
+    """
+
+    upload = _build_hash_upload(file_path, serial_id, order_id, serial_number, sku, uploaded_at)
+    if upload is None:
         return False
 
-    log_event(f"Hash upload failed {identifier_text} file={file_name} retries exhausted")
-    return False
+    outcome, detail = _send_hash_upload(upload, uuid.uuid4().hex)
+    if outcome == RETRY:
+        log_event(f"Hash upload failed {upload['identifier']} file={upload['file_name']} {detail} retries exhausted")
+    return outcome == DELIVERED
+
+
+def queue_hash_csv_upload(
+    file_path,
+    serial_id=None,
+    order_id=None,
+    serial_number=None,
+    sku=None,
+    uploaded_at=None,
+) -> bool:
+    """Queue a hash CSV upload in the durable outbox; True once it is safely on disk."""
+
+    upload = _build_hash_upload(file_path, serial_id, order_id, serial_number, sku, uploaded_at)
+    if upload is None:
+        return False
+    try:
+        get_upload_outbox().enqueue(OUTBOX_HASH_UPLOAD, upload)
+        return True
+    except Exception as exc:  # noqa: BLE001 - fall back to the direct upload
+        log_event(f"Hash upload could not be queued ({exc}); uploading directly.")
+        return upload_hash_csv(file_path, serial_id, order_id, serial_number, sku, uploaded_at)
 
 
 def _load_webtools_api_config():
@@ -484,7 +671,7 @@ def _load_webtools_api_config():
     base_url = (
         os.getenv("SECOND_CHECK_BASE_URL", "").strip()
         or config_base_url
-        or "http://192.168.1.188:5001"
+        or DEFAULT_BASE_URL
     )
     api_key = (
         os.getenv("SECOND_CHECK_KEY", "").strip()
@@ -494,6 +681,196 @@ def _load_webtools_api_config():
     return base_url.rstrip("/"), api_key
 
 
+def _load_webtools_upload_options() -> Dict[str, Any]:
+    """[webtools] report_upload = json|multipart and compress = true|false."""
+
+    options: Dict[str, Any] = {}
+    try:
+        config = load_config()
+        if config.has_section("webtools"):
+            mode = config.get("webtools", "report_upload", fallback=REPORT_UPLOAD_JSON).strip().lower()
+            options["report_upload"] = REPORT_UPLOAD_MULTIPART if mode == REPORT_UPLOAD_MULTIPART else REPORT_UPLOAD_JSON
+            options["compress"] = config.getboolean("webtools", "compress", fallback=False)
+    except Exception as exc:
+        log_event(f"Web-Tools upload options read warning: {exc}")
+    return options
+
+
+_WEBTOOLS_CLIENT: Optional[WebToolsClient] = None
+_WEBTOOLS_CLIENT_LOCK = threading.Lock()
+
+
+def get_webtools_client() -> WebToolsClient:
+    """Return the shared Web-Tools client; its config is read once per process."""
+
+    global _WEBTOOLS_CLIENT
+    with _WEBTOOLS_CLIENT_LOCK:
+        if _WEBTOOLS_CLIENT is None:
+            _WEBTOOLS_CLIENT = WebToolsClient(
+                WebToolsConfig(*_load_webtools_api_config(), **_load_webtools_upload_options())
+            )
+        return _WEBTOOLS_CLIENT
+
+
+def set_webtools_client(client: Optional[WebToolsClient]) -> None:
+    """Replace the shared client (None re-reads the config on next use); the old one is closed."""
+
+    global _WEBTOOLS_CLIENT
+    with _WEBTOOLS_CLIENT_LOCK:
+        previous, _WEBTOOLS_CLIENT = _WEBTOOLS_CLIENT, client
+    if previous is not None and previous is not client:
+        previous.close()
+
+
+TRADE_REPORT_PATH = "/jobs/api/second-check/trade-report"
+STOCK_REPORT_PATH = "/api/stock_units/check-report"
+OUTBOX_HASH_UPLOAD = "hash_csv"
+OUTBOX_TRADE_REPORT = "trade_report"
+OUTBOX_STOCK_REPORT = "stock_report"
+_UPLOAD_OUTBOX: Optional[UploadOutbox] = None
+_UPLOAD_OUTBOX_LOCK = threading.Lock()
+
+
+def _deliver_queued_hash_upload(item: OutboxItem) -> Tuple[str, str]:
+    return _send_hash_upload(item.payload, item.idempotency_key)
+
+
+def _deliver_queued_report(path: str, label: str, item: OutboxItem) -> Tuple[str, str]:
+    serial_text = item.payload.get("serial_number")
+    status, body = _post_check_report(path, item.payload, item.idempotency_key)
+    if status is None:
+        return RETRY, f"network_error={body.get('error')}"
+    if status == 200 and body.get("success"):
+        log_event(f"Queued {label} delivered serial={serial_text}")
+        return DELIVERED, ""
+    if status in {500, 502, 503, 504}:
+        return RETRY, f"status={status}"
+    log_event(f"Queued {label} rejected serial={serial_text} status={status} payload={body}")
+    return REJECTED, f"status={status} {body.get('error', '')}".strip()
+
+
+def _deliver_queued_trade_report(item: OutboxItem) -> Tuple[str, str]:
+    return _deliver_queued_report(TRADE_REPORT_PATH, "trade report", item)
+
+
+def _deliver_queued_stock_report(item: OutboxItem) -> Tuple[str, str]:
+    return _deliver_queued_report(STOCK_REPORT_PATH, "stock report", item)
+
+
+def get_upload_outbox() -> UploadOutbox:
+    """Return the shared upload outbox, starting its sender threads on first use."""
+
+    global _UPLOAD_OUTBOX
+    with _UPLOAD_OUTBOX_LOCK:
+        if _UPLOAD_OUTBOX is None:
+            _UPLOAD_OUTBOX = UploadOutbox(
+                os.path.join(get_app_dir(), "upload_outbox.sqlite3"),
+                {
+                    OUTBOX_HASH_UPLOAD: _deliver_queued_hash_upload,
+                    OUTBOX_TRADE_REPORT: _deliver_queued_trade_report,
+                    OUTBOX_STOCK_REPORT: _deliver_queued_stock_report,
+                },
+                log=log_event,
+            ).start()
+        return _UPLOAD_OUTBOX
+
+
+def set_upload_outbox(outbox: Optional[UploadOutbox]) -> None:
+    """Replace the shared outbox (tests point it at a temporary file); the old one is stopped."""
+
+    global _UPLOAD_OUTBOX
+    with _UPLOAD_OUTBOX_LOCK:
+        previous, _UPLOAD_OUTBOX = _UPLOAD_OUTBOX, outbox
+    if previous is not None and previous is not outbox:
+        previous.stop(timeout=0)
+
+
+_REFERENCE_REPLICA: Optional[ReferenceReplica] = None
+_REFERENCE_REPLICA_LOCK = threading.Lock()
+
+
+def _connect_reference_source():
+    from db.database import get_db_connection
+
+    return get_db_connection(retries=1, show_errors=False)
+
+
+def get_reference_replica() -> ReferenceReplica:
+    """Return the shared SQLite copy of the SKU reference tables (sync not started here)."""
+
+    global _REFERENCE_REPLICA
+    with _REFERENCE_REPLICA_LOCK:
+        if _REFERENCE_REPLICA is None:
+            _REFERENCE_REPLICA = ReferenceReplica(
+                os.path.join(get_app_dir(), "reference_replica.sqlite3"),
+                _connect_reference_source,
+                on_change=reset_sku_reference_cache,
+                log=log_event,
+            )
+        return _REFERENCE_REPLICA
+
+
+def set_reference_replica(replica: Optional[ReferenceReplica]) -> None:
+    """Replace the shared replica (tests point it at a temporary file); the old one is stopped."""
+
+    global _REFERENCE_REPLICA
+    with _REFERENCE_REPLICA_LOCK:
+        previous, _REFERENCE_REPLICA = _REFERENCE_REPLICA, replica
+    if previous is not None and previous is not replica:
+        previous.stop(timeout=0)
+
+
+def reset_sku_reference_cache() -> None:
+    """Forget the loaded dropdown options and SKU tag metadata; the next SKU lookup reloads them."""
+
+    global _SKU_TAG_METADATA, _DROPDOWN_OPTION_CACHE
+    _DROPDOWN_OPTION_CACHE = None
+    _SKU_TAG_METADATA = None
+
+
+def _reference_replica_ready() -> bool:
+    replica = _REFERENCE_REPLICA
+    try:
+        return replica is not None and replica.ready()
+    except sqlite3.Error as exc:
+        log_event(f"Reference replica unavailable: {exc}")
+        return False
+
+
+def _reference_rows(cursor, sql: str) -> List[Tuple[Any, ...]]:
+    """Run a reference-table query against the local replica when it is synced, else MySQL."""
+
+    replica = _REFERENCE_REPLICA
+    if replica is not None and _reference_replica_ready():
+        try:
+            return replica.query(sql)
+        except sqlite3.Error as exc:
+            log_event(f"Reference replica read failed, using MySQL: {exc}")
+    cursor.execute(sql)
+    return cursor.fetchall()
+
+
+def get_background_service_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters of the shared background services that have been started (none are created here)."""
+
+    services = {
+        "powershell_host": _POWERSHELL_HOST,
+        "hash_prefetch": _HASH_PREFETCHER,
+        "upload_outbox": _UPLOAD_OUTBOX,
+        "reference_replica": _REFERENCE_REPLICA,
+    }
+    stats: Dict[str, Dict[str, Any]] = {}
+    for name, service in services.items():
+        if service is None:
+            stats[name] = {"state": "not started"}
+            continue
+        try:
+            stats[name] = dict(service.stats())
+        except Exception as exc:
+            stats[name] = {"error": str(exc)}
+    return stats
+
+
 def load_app_mode() -> str:
     try:
         config = load_config()
@@ -515,6 +892,7 @@ def save_app_mode(mode: str) -> None:
         config.set("app", "mode", selected)
         with open(path, "w", encoding="utf-8") as handle:
             config.write(handle)
+        reload_config()
         log_event(f"Saved app mode: {selected}")
     except Exception as exc:
         log_event(f"App mode save warning: {exc}")
@@ -537,6 +915,65 @@ def _read_optional_text_file(path: Optional[str]) -> Tuple[str, str]:
         return "", ""
 
 
+def _embed_hash_file(payload: Dict[str, Any], hash_csv_path: Optional[str]) -> Dict[str, Any]:
+    """Copy of ``payload`` with the hash CSV inlined as ``hash_file_data`` (the JSON upload format)."""
+
+    hash_filename, hash_text = _read_optional_text_file(hash_csv_path)
+    return {**payload, "hash_filename": hash_filename, "hash_file_data": hash_text}
+
+
+def _post_check_report(
+    path: str,
+    payload: Dict[str, Any],
+    idempotency_key: str,
+    hash_csv_path: Optional[str] = None,
+    *,
+    retry: bool = True,
+) -> Tuple[Optional[int], Dict[str, Any]]:
+    """
+    POST one check report; the status is None on a network error.
+
+    In multipart mode the report JSON and the hash CSV are sent as separate
+    parts and the CSV is streamed from disk. Otherwise the CSV is embedded in
+    the JSON body. A 415 reply to multipart switches the client back to JSON
+    for the rest of the process. ``retry=False`` makes a single attempt.
+    """
+
+    client = get_webtools_client()
+    headers = {"Accept": "application/json", "Idempotency-Key": idempotency_key}
+    try:
+        response = None
+        if client.report_upload == REPORT_UPLOAD_MULTIPART and hash_csv_path and os.path.exists(hash_csv_path):
+            hash_filename = os.path.basename(hash_csv_path)
+            stream = MultipartStream(
+                [("report", json.dumps({**payload, "hash_filename": hash_filename}).encode("utf-8"), "application/json")],
+                [("hash_file", hash_filename, hash_csv_path, "text/csv")],
+            )
+            try:
+                response = client.send(path, stream, stream.content_type, headers=headers, timeout=30, retry=retry)
+            finally:
+                stream.close()
+            if response.status_code == HTTP_UNSUPPORTED_MEDIA_TYPE:
+                log_event(f"Web-Tools does not accept multipart reports on {path}; using JSON from now on.")
+                client.report_upload = REPORT_UPLOAD_JSON
+                response = None
+        if response is None:
+            report = _embed_hash_file(payload, hash_csv_path) if hash_csv_path else payload
+            response = client.send(
+                path, json.dumps(report).encode("utf-8"), "application/json", headers=headers, timeout=30, retry=retry
+            )
+    except (requests.RequestException, OSError) as exc:
+        return None, {"error": str(exc)}
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = {"error": (response.text or "").strip()}
+    if not isinstance(body, dict):
+        body = {"error": str(body)}
+    return response.status_code, body
+
+
 def upload_trade_job_check_report(
     *,
     job_reference,
@@ -550,19 +987,24 @@ def upload_trade_job_check_report(
     battery_report=None,
     checked_at=None,
     create_stock_unit=False,
+    queue_on_failure=False,
 ):
+    """
+    Upload a trade-job check report. With ``queue_on_failure`` the report is
+    posted once, and a network error or 5xx leaves it in the upload outbox
+    (``queued`` in the response) instead of being retried in the foreground.
+    """
+
     serial_text = str(serial_number or "").strip()
     if not serial_text or serial_text == "Unknown":
         log_event("Trade report upload skipped: missing serial number.")
         return False, {"error": "missing serial number"}
 
-    base_url, api_key = _load_webtools_api_config()
-    if not api_key or api_key == "<SECRET>":
+    if not get_webtools_client().config.configured:
         log_event("Trade report upload skipped: X-Second-Check-Key is not configured.")
         return False, {"error": "missing API key"}
 
     utc_stamp = checked_at or datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
-    hash_filename, hash_text = _read_optional_text_file(hash_csv_path)
     payload = {
         "job_reference": job_reference,
         "serial_number": serial_text,
@@ -574,84 +1016,52 @@ def upload_trade_job_check_report(
         "assigned_by": assigned_by,
         "checked_at": utc_stamp,
         "hash_uploaded_at": utc_stamp,
-        "hash_filename": hash_filename,
-        "hash_file_data": hash_text,
+        "hash_filename": "",
+        "hash_file_data": "",
         "battery_report": battery_report or {},
         "create_stock_unit": bool(create_stock_unit),
     }
 
-    url = f"{base_url}/jobs/api/second-check/trade-report"
-    headers = {
-        "X-Second-Check-Key": api_key,
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-    }
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-    except requests.RequestException as exc:
-        log_event(f"Trade report upload failed serial={serial_text} network_error={exc}")
-        return False, {"error": str(exc)}
-
-    try:
-        body = response.json()
-    except ValueError:
-        body = {"error": (response.text or "").strip()}
-
-    if response.status_code == 200 and body.get("success"):
+    idempotency_key = uuid.uuid4().hex
+    status, body = _post_check_report(
+        TRADE_REPORT_PATH, payload, idempotency_key, hash_csv_path, retry=not queue_on_failure
+    )
+    if status is None:
+        log_event(f"Trade report upload failed serial={serial_text} network_error={body.get('error')}")
+    elif status == 200 and body.get("success"):
         log_event(f"Trade report upload success serial={serial_text}")
         return True, body
+    else:
+        log_event(
+            f"Trade report upload failed serial={serial_text} status={status} payload={body}"
+        )
 
-    log_event(
-        f"Trade report upload failed serial={serial_text} status={response.status_code} payload={body}"
-    )
+    if queue_on_failure and (status is None or status in {500, 502, 503, 504}):
+        try:
+            # The queued copy carries the CSV inline so a replay does not depend on the file.
+            get_upload_outbox().enqueue(OUTBOX_TRADE_REPORT, _embed_hash_file(payload, hash_csv_path), idempotency_key)
+            body = {**body, "queued": True}
+        except Exception as exc:  # noqa: BLE001 - report stays failed
+            log_event(f"Trade report could not be queued serial={serial_text}: {exc}")
     return False, body
 
 
-def upload_stock_unit_check_report(
+def _stock_report_payload(
     *,
     order_id,
     order_number,
-    serial_number,
+    serial_text,
     sku,
     specs,
     test_results,
     mdm_status=None,
     assigned_by=None,
-    hash_csv_path=None,
     battery_report=None,
     checked_at=None,
     create_stock_unit=False,
-):
-    """Upload the full SecondChecking result to the Web-Tools stock-unit API."""
-
-    serial_text = str(serial_number or "").strip()
-    if not serial_text or serial_text == "Unknown":
-        log_event("Stock report upload skipped: missing serial number.")
-        return False, {"error": "missing serial number"}
-
-    base_url, api_key = _load_webtools_api_config()
-    if not api_key or api_key == "<SECRET>":
-        log_event("Stock report upload skipped: X-Second-Check-Key is not configured.")
-        return False, {"error": "missing API key"}
-
+) -> Dict[str, Any]:
     utc_stamp = checked_at or datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
-    hash_filename = ""
-    hash_text = ""
-    if hash_csv_path:
-        if os.path.exists(hash_csv_path):
-            hash_filename = os.path.basename(hash_csv_path)
-            try:
-                with open(hash_csv_path, "r", encoding="utf-8-sig") as handle:
-                    hash_text = handle.read()
-            except UnicodeDecodeError:
-                with open(hash_csv_path, "r", encoding="utf-8", errors="ignore") as handle:
-                    hash_text = handle.read()
-            except OSError as exc:
-                log_event(f"Stock report hash read failed: {exc}")
-        else:
-            log_event(f"Stock report hash file not found: {hash_csv_path}")
-
-    payload = {
+    return {
         "order_id": order_id,
         "order_number": order_number,
         "serial_number": serial_text,
@@ -663,73 +1073,128 @@ def upload_stock_unit_check_report(
         "assigned_by": assigned_by,
         "checked_at": utc_stamp,
         "hash_uploaded_at": utc_stamp,
-        "hash_filename": hash_filename,
-        "hash_file_data": hash_text,
+        "hash_filename": "",
+        "hash_file_data": "",
         "battery_report": battery_report or {},
         "create_stock_unit": bool(create_stock_unit),
     }
 
-    url = f"{base_url}/api/stock_units/check-report"
-    headers = {
-        "X-Second-Check-Key": api_key,
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-    }
-    max_attempts = 4
-    backoff_seconds = 1
-    for attempt in range(1, max_attempts + 1):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-        except requests.RequestException as exc:
-            if attempt < max_attempts:
-                log_event(
-                    f"Stock report upload retry ({attempt}/{max_attempts}) serial={serial_text} network_error={exc}"
-                )
-                time.sleep(backoff_seconds)
-                backoff_seconds *= 2
-                continue
-            log_event(f"Stock report upload failed serial={serial_text} network_error={exc}")
-            return False, {"error": str(exc)}
 
-        try:
-            body = response.json()
-        except ValueError:
-            body = {"error": (response.text or "").strip()}
+def upload_stock_unit_check_report(
+    *,
+    order_id,
+    order_number,
+    serial_number,
+    sku,
+    specs,
+    test_results,
+    mdm_status=None,
+    assigned_by=None,
+    hash_csv_path=None,
+    battery_report=None,
+    checked_at=None,
+    create_stock_unit=False,
+):
+    """Upload the full SecondChecking result to the Web-Tools stock-unit API."""
 
-        if response.status_code == 200 and body.get("success"):
-            log_event(f"Stock report upload success serial={serial_text}")
-            return True, body
+    serial_text = str(serial_number or "").strip()
+    if not serial_text or serial_text == "Unknown":
+        log_event("Stock report upload skipped: missing serial number.")
+        return False, {"error": "missing serial number"}
 
-        if response.status_code in {500, 502, 503, 504} and attempt < max_attempts:
-            log_event(
-                f"Stock report upload retry ({attempt}/{max_attempts}) serial={serial_text} status={response.status_code}"
-            )
-            time.sleep(backoff_seconds)
-            backoff_seconds *= 2
-            continue
+    if not get_webtools_client().config.configured:
+        log_event("Stock report upload skipped: X-Second-Check-Key is not configured.")
+        return False, {"error": "missing API key"}
 
-        log_event(
-            f"Stock report upload failed serial={serial_text} status={response.status_code} payload={body}"
-        )
+    payload = _stock_report_payload(
+        order_id=order_id,
+        order_number=order_number,
+        serial_text=serial_text,
+        sku=sku,
+        specs=specs,
+        test_results=test_results,
+        mdm_status=mdm_status,
+        assigned_by=assigned_by,
+        battery_report=battery_report,
+        checked_at=checked_at,
+        create_stock_unit=create_stock_unit,
+    )
+
+    status, body = _post_check_report(STOCK_REPORT_PATH, payload, uuid.uuid4().hex, hash_csv_path)
+    if status is None:
+        log_event(f"Stock report upload failed serial={serial_text} network_error={body.get('error')}")
         return False, body
 
-    return False, {"error": "retries exhausted"}
+    if status == 200 and body.get("success"):
+        log_event(f"Stock report upload success serial={serial_text}")
+        return True, body
+
+    log_event(
+        f"Stock report upload failed serial={serial_text} status={status} payload={body}"
+    )
+    return False, body
+
+
+def queue_stock_unit_check_report(
+    *,
+    order_id,
+    order_number,
+    serial_number,
+    sku,
+    specs,
+    test_results,
+    mdm_status=None,
+    assigned_by=None,
+    hash_csv_path=None,
+    battery_report=None,
+    checked_at=None,
+    idempotency_key=None,
+) -> bool:
+    """
+    Queue a stock-unit check report in the upload outbox; True once it is on disk.
+
+    Used for assignments replayed from the offline journal. The queued copy
+    carries the hash CSV inline, so the Web-Tools side gets the same report
+    an online assignment would have sent.
+    """
+
+    serial_text = str(serial_number or "").strip()
+    if not serial_text or serial_text == "Unknown":
+        log_event("Stock report queue skipped: missing serial number.")
+        return False
+
+    payload = _stock_report_payload(
+        order_id=order_id,
+        order_number=order_number,
+        serial_text=serial_text,
+        sku=sku,
+        specs=specs,
+        test_results=test_results,
+        mdm_status=mdm_status,
+        assigned_by=assigned_by,
+        battery_report=battery_report,
+        checked_at=checked_at,
+    )
+    try:
+        get_upload_outbox().enqueue(OUTBOX_STOCK_REPORT, _embed_hash_file(payload, hash_csv_path), idempotency_key)
+        return True
+    except Exception as exc:  # noqa: BLE001 - caller reports the row as written without its report
+        log_event(f"Stock report could not be queued serial={serial_text}: {exc}")
+        return False
 
 def log_event(message):
-    log_path = get_log_path()
+    # Timestamp on the caller; the background writer handles file I/O and rotation.
     try:
-        # Log rotation: if log file > 5MB, rotate
-        if os.path.exists(log_path) and os.path.getsize(log_path) > 5 * 1024 * 1024:
-            if os.path.exists(log_path + ".1"):
-                os.remove(log_path + ".1")
-            os.rename(log_path, log_path + ".1")
-        # Append the log message with a timestamp
-        with open(log_path, "a", encoding="utf-8") as log_file:
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            log_file.write(f"[{timestamp}] {message}\n")
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        _LOG_WRITER.write(f"[{timestamp}] {message}\n")
     except Exception as e:
         print(f"Failed to log event: {e}")
 
+
+def flush_log(timeout: float = 5.0) -> bool:
+    """Wait for queued log lines to reach logs.txt."""
+    return _LOG_WRITER.flush(timeout)
+
 def get_config_path():
     # Determine the path to the configuration file
     return os.path.join(get_app_dir(), "config.ini")
@@ -739,21 +1204,125 @@ def get_log_path():
     return os.path.join(get_app_dir(), "logs.txt")
 
 
+_LOG_WRITER = BackgroundLogWriter(lambda: get_log_path())
+_LOG_WRITER.install_exit_hooks()
+
+
 def get_app_dir():
     if getattr(sys, "frozen", False):
         return os.path.abspath(os.path.dirname(sys.executable))
     return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 
-def load_config():
-    log_event("Loading configuration file...")
-    config = configparser.ConfigParser()
+class ReadOnlyConfigParser(configparser.ConfigParser):
+    """ConfigParser snapshot shared between callers; mutating it raises TypeError."""
+
+    _frozen = False
+
+    def freeze(self) -> "ReadOnlyConfigParser":
+        self._frozen = True
+        return self
+
+    def _check_writable(self) -> None:
+        if self._frozen:
+            raise TypeError("The cached configuration is read-only; edit config.ini and call reload_config().")
+
+    def read(self, *args, **kwargs):
+        self._check_writable()
+        return super().read(*args, **kwargs)
+
+    def read_file(self, *args, **kwargs):
+        self._check_writable()
+        return super().read_file(*args, **kwargs)
+
+    def read_string(self, *args, **kwargs):
+        self._check_writable()
+        return super().read_string(*args, **kwargs)
+
+    def read_dict(self, *args, **kwargs):
+        self._check_writable()
+        return super().read_dict(*args, **kwargs)
+
+    def add_section(self, section):
+        self._check_writable()
+        return super().add_section(section)
+
+    def set(self, section, option, value=None):
+        self._check_writable()
+        return super().set(section, option, value)
+
+    def remove_section(self, section):
+        self._check_writable()
+        return super().remove_section(section)
+
+    def remove_option(self, section, option):
+        self._check_writable()
+        return super().remove_option(section, option)
+
+    def __setitem__(self, key, value):
+        self._check_writable()
+        return super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._check_writable()
+        return super().__delitem__(key)
+
+
+def _config_file_signature(path: str) -> Tuple[Any, ...]:
     try:
-        config.read(get_config_path())
-        log_event("Configuration file loaded successfully.")
-    except Exception as e:
-        log_event(f"Error loading configuration file: {e}")
-        raise
-    return config
+        stat = os.stat(path)
+    except OSError:
+        return (path, None, None)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+class _ConfigCache:
+    """Holds the parsed config.ini, re-reading it only when its mtime or size changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[Any, ...]] = None
+        self._config: Optional[ReadOnlyConfigParser] = None
+        self.loads = 0
+
+    def get(self) -> ReadOnlyConfigParser:
+        path = get_config_path()
+        signature = _config_file_signature(path)
+        with self._lock:
+            if self._config is not None and self._signature == signature:
+                return self._config
+            return self._load_locked(path, signature)
+
+    def reload(self) -> ReadOnlyConfigParser:
+        path = get_config_path()
+        with self._lock:
+            return self._load_locked(path, _config_file_signature(path))
+
+    def _load_locked(self, path: str, signature: Tuple[Any, ...]) -> ReadOnlyConfigParser:
+        log_event("Loading configuration file...")
+        config = ReadOnlyConfigParser()
+        try:
+            config.read(path)
+            log_event("Configuration file loaded successfully.")
+        except Exception as e:
+            log_event(f"Error loading configuration file: {e}")
+            raise
+        self._config = config.freeze()
+        self._signature = signature
+        self.loads += 1
+        return self._config
+
+
+_CONFIG_CACHE = _ConfigCache()
+
+
+def load_config():
+    """Return the shared read-only config snapshot, reloaded when config.ini changes."""
+    return _CONFIG_CACHE.get()
+
+
+def reload_config():
+    """Force config.ini to be re-read, e.g. after this process writes to it."""
+    return _CONFIG_CACHE.reload()
 
 def parse_percent(text):
     if text is None:
@@ -769,9 +1338,18 @@ def parse_percent(text):
 
 def check_activation_status():
     """
-    Check if Windows is permanently activated using slmgr.vbs /xpr.
+    Check if Windows is permanently activated (the `slmgr.vbs /xpr` check).
     Returns True if activated, False otherwise.
     """
+    if sys.platform == "win32":
+        hosted = _run_in_powershell_host(_ACTIVATION_SCRIPT, {}, "Activation check", timeout=20)
+        if hosted is not None:
+            state = hosted.last_line
+            if hosted.succeeded and state == "permanently-activated":
+                return True
+            log_event(f"[DEBUG] activation check output: {state or hosted.error.strip()}")
+            if hosted.succeeded or hosted.timed_out:
+                return False
     try:
         creationflags = 0
         if sys.platform == "win32":
@@ -909,19 +1487,18 @@ def _normalize_token(token: Optional[str]) -> str:
 
 
 def _get_cpu_keyword_tokens() -> Set[str]:
-    """Cache the normalized CPU keywords defined in config."""
+    """Cache the normalized CPU keywords defined in config, per config snapshot."""
     global _CPU_KEYWORD_TOKENS
-    if _CPU_KEYWORD_TOKENS is not None:
-        return _CPU_KEYWORD_TOKENS
     try:
         config = load_config()
     except Exception:
-        _CPU_KEYWORD_TOKENS = set()
-        return _CPU_KEYWORD_TOKENS
+        return _CPU_KEYWORD_TOKENS[1] if _CPU_KEYWORD_TOKENS is not None else set()
+    if _CPU_KEYWORD_TOKENS is not None and _CPU_KEYWORD_TOKENS[0] is config:
+        return _CPU_KEYWORD_TOKENS[1]
     raw_keywords = config.get("search", "cpu_keywords", fallback="")
     tokens = {_normalize_token(keyword) for keyword in raw_keywords.split(",") if keyword.strip()}
-    _CPU_KEYWORD_TOKENS = {token for token in tokens if token}
-    return _CPU_KEYWORD_TOKENS
+    _CPU_KEYWORD_TOKENS = (config, {token for token in tokens if token})
+    return _CPU_KEYWORD_TOKENS[1]
 
 
 def is_generic_cpu_spec(value: Optional[str]) -> bool:
@@ -977,8 +1554,7 @@ def _build_dropdown_option_cache(cursor) -> Dict[int, Dict[str, str]]:
         return _DROPDOWN_OPTION_CACHE
     cache: Dict[int, Dict[str, str]] = {}
     try:
-        cursor.execute("SELECT id, category, name FROM dropdown_option")
-        for dropdown_id, category, name in cursor.fetchall():
+        for dropdown_id, category, name in _reference_rows(cursor, "SELECT id, category, name FROM dropdown_option"):
             if dropdown_id is None:
                 continue
             cache[int(dropdown_id)] = {
@@ -998,7 +1574,8 @@ def _load_sku_tag_metadata(cursor) -> List[Dict[str, Any]]:
     cache: List[Dict[str, Any]] = []
     dropdown_cache = _build_dropdown_option_cache(cursor)
     try:
-        cursor.execute(
+        rows = _reference_rows(
+            cursor,
             """
             SELECT
                 atm.attribute_id,
@@ -1010,9 +1587,9 @@ def _load_sku_tag_metadata(cursor) -> List[Dict[str, Any]]:
             FROM attribute_term_metadata atm
             LEFT JOIN attribute_dropdown_map adm
                 ON atm.attribute_id = adm.attribute_id
-            """
+            """,
         )
-        for row in cursor.fetchall():
+        for row in rows:
             attribute_id, term_id, sku_tag, astro_name, dropdown_option_id, dropdown_category = row
             sku_tag_str = _normalize_string(sku_tag)
             if not sku_tag_str:
@@ -1044,30 +1621,28 @@ def _category_to_spec_field(category: Optional[str]) -> Optional[str]:
     return _CATEGORY_TO_SPEC_FIELD.get(category.lower())
 
 
-def _extract_details_from_dropdown(cursor, sku) -> Optional[Dict[str, str]]:
+def _get_sku_tag_matcher(cursor) -> Optional[SkuTagMatcher]:
+    """Compile the SKU tag metadata once; rebuilt whenever the metadata cache is reloaded."""
+    global _SKU_TAG_MATCHER
+    if cursor is None and _SKU_TAG_METADATA is None and not _reference_replica_ready():
+        # Offline with nothing loaded yet: use the keyword parsing rather than caching empty metadata.
+        return None
     metadata = _load_sku_tag_metadata(cursor)
     if not metadata:
         return None
+    if _SKU_TAG_MATCHER is None or _SKU_TAG_MATCHER[0] is not metadata:
+        _SKU_TAG_MATCHER = (metadata, SkuTagMatcher.from_metadata(metadata, _category_to_spec_field))
+    return _SKU_TAG_MATCHER[1]
+
+
+def _extract_details_from_dropdown(cursor, sku) -> Optional[Dict[str, str]]:
+    matcher = _get_sku_tag_matcher(cursor)
+    if matcher is None:
+        return None
     normalized_sku = _normalize_token(sku)
     if not normalized_sku:
         return None
-    matched: Dict[str, str] = {}
-    matched_tags: set[str] = set()
-    for entry in sorted(metadata, key=lambda item: len(item["normalized_tag"]), reverse=True):
-        tag = entry["normalized_tag"]
-        if not tag or tag in matched_tags:
-            continue
-        if tag not in normalized_sku:
-            continue
-        field = _category_to_spec_field(entry["dropdown_category"])
-        if not field:
-            continue
-        value = entry["dropdown_option_name"] or entry["astro_name"] or entry["sku_tag"]
-        if not value:
-            continue
-        if field not in matched:
-            matched[field] = value
-        matched_tags.add(tag)
+    matched = matcher.match(normalized_sku)
     if not matched:
         return None
     if "Battery" in matched and "Battery 2" not in matched:
@@ -1075,10 +1650,26 @@ def _extract_details_from_dropdown(cursor, sku) -> Optional[Dict[str, str]]:
     return matched
 
 
+_GRADE_BATTERY_MAP = {
+    "AGRADE": "70% Battery",
+    "BGRADE": "45% Battery",
+    "CGRADE": "5% Battery",
+}
+
+
+def _get_sku_keyword_matcher() -> SkuKeywordMatcher:
+    """Compile the [search] keywords once per config snapshot."""
+    global _SKU_KEYWORD_MATCHER
+    config = load_config()
+    if _SKU_KEYWORD_MATCHER is None or _SKU_KEYWORD_MATCHER[0] is not config:
+        _SKU_KEYWORD_MATCHER = (config, SkuKeywordMatcher.from_config(config))
+    return _SKU_KEYWORD_MATCHER[1]
+
+
 def _extract_details_from_sku_keywords(sku):
     # Extract hardware details from the SKU string using keywords from the config
     sku = sku or ""
-    config = load_config()
+    matcher = _get_sku_keyword_matcher()
     details = {
         "Model": "Unknown",
         "CPU": "Unknown",
@@ -1089,64 +1680,42 @@ def _extract_details_from_sku_keywords(sku):
         "Battery": "Unknown",
     }
 
-    CPU_KEYWORDS = config.get("search", "cpu_keywords").split(",")
-    RAM_KEYWORDS = config.get("search", "ram_keywords").split(",")
-    SSD_KEYWORDS = config.get("search", "ssd_keywords").split(",")
-    MODEL_KEYWORDS = config.get("search", "model_keywords").split(",")
-    RESOLUTION_KEYWORDS = config.get("search", "resolution_keywords").split(",")
-    WINDOWS_KEYWORDS = config.get("search", "windows_keywords").split(",")
-    GRADE_KEYWORDS = config.get("search", "grade_keywords").split(",")
-
-    grade_map = {
-        "AGRADE": "70% Battery",
-        "BGRADE": "45% Battery",
-        "CGRADE": "5% Battery",
-    }
-
-    def match_with_fallback(keywords, target):
-        for keyword in keywords:
-            if re.search(rf"(?<!\w){re.escape(keyword)}(?!\w)", target, re.IGNORECASE):
-                return keyword
-        for keyword in keywords:
-            if keyword.lower() in target.lower():
-                return keyword
-        return None
-
-    model_match = match_with_fallback(MODEL_KEYWORDS, sku)
+    model_match = matcher.first_match("model", sku)
     if model_match:
         details["Model"] = model_match
 
-    cpu_match = match_with_fallback(CPU_KEYWORDS, sku)
+    cpu_match = matcher.first_match("cpu", sku)
     if cpu_match:
         details["CPU"] = cpu_match
 
-    ssd_match = match_with_fallback(SSD_KEYWORDS, sku)
+    ssd_match = matcher.first_match("ssd", sku)
     if ssd_match:
         if "TB" in ssd_match.upper():
             details["SSD"] = ssd_match.replace("SSD", "").strip()
         else:
             details["SSD"] = ssd_match.replace("SSD", "").strip() + "GB"
 
-    ram_match = match_with_fallback(RAM_KEYWORDS, sku)
+    ram_match = matcher.first_match("ram", sku)
     if ram_match:
         details["RAM"] = ram_match.replace("RAM", "").replace("GB", "").strip() + "GB"
 
-    res_match = match_with_fallback(RESOLUTION_KEYWORDS, sku)
+    res_match = matcher.first_match("resolution", sku)
     if res_match:
         details["Resolution"] = res_match
 
-    win_match = match_with_fallback(WINDOWS_KEYWORDS, sku)
+    win_match = matcher.first_match("windows", sku)
     if win_match:
         details["Windows"] = "Windows 11" if "11" in win_match else "Windows 10"
 
-    for keyword in GRADE_KEYWORDS:
-        if keyword.upper() in sku.upper():
-            details["Battery"] = grade_map.get(keyword.upper(), "Unknown")
+    grade_match = matcher.last_substring_match("grade", sku)
+    if grade_match is not None:
+        details["Battery"] = _GRADE_BATTERY_MAP.get(grade_match.upper(), "Unknown")
 
     details["Battery 2"] = details["Battery"]
     return details
 
 
+@traced()
 def extract_details_from_sku(cursor, sku):
     """
     Derive hardware details from the SKU using dropdown metadata when available,
@@ -1167,78 +1736,42 @@ def extract_details_from_sku(cursor, sku):
     combined["Battery 2"] = dropdown_details.get("Battery 2") or fallback.get("Battery 2")
     return combined
 
-_wmi_instance = None  # Cache WMI instance
-_last_wmi_error = None
-
-
-def _ensure_wmi_instance():
-    """Return a cached WMI instance, initialising when required."""
-
-    global _wmi_instance
-
-    if sys.platform != "win32":
-        return None
+_BATTERY_SAMPLER: Optional[BatterySampler] = None
+_BATTERY_SAMPLER_LOCK = threading.Lock()
 
-    if _wmi_instance is not None:
-        return _wmi_instance
 
-    try:
-        try:
-            import pythoncom  # type: ignore[import]
-
-            pythoncom.CoInitialize()
-        except ImportError:
-            # pywin32 may not be installed when running unit tests on non-Windows platforms.
-            pass
-        _wmi_instance = wmi.WMI()
-    except Exception as exc:  # noqa: BLE001 - log details for supportability
-        _handle_wmi_error(exc)
-        return None
+def get_battery_sampler() -> BatterySampler:
+    """Return the shared battery sampler, starting it on first use."""
 
-    return _wmi_instance
+    global _BATTERY_SAMPLER
+    with _BATTERY_SAMPLER_LOCK:
+        if _BATTERY_SAMPLER is None:
+            _BATTERY_SAMPLER = BatterySampler(log=log_event).start()
+        return _BATTERY_SAMPLER
 
 
-def _handle_wmi_error(error):
-    """Log WMI errors once and reset the cached client for a future retry."""
+def set_battery_sampler(sampler: Optional[BatterySampler]) -> None:
+    """Replace the shared sampler (e.g. one backed by FakeBatterySource); None stops it."""
 
-    global _wmi_instance, _last_wmi_error
+    global _BATTERY_SAMPLER
+    with _BATTERY_SAMPLER_LOCK:
+        previous, _BATTERY_SAMPLER = _BATTERY_SAMPLER, sampler
+    if previous is not None and previous is not sampler:
+        previous.stop(timeout=0)
 
-    message = str(error)
-    if message != _last_wmi_error:
-        log_event(f"get_live_battery_percent error: {error}")
-        _last_wmi_error = message
 
-    _wmi_instance = None
+def get_battery_snapshot() -> BatterySnapshot:
+    return get_battery_sampler().snapshot()
 
 
 def get_live_battery_percent(index=0):
-    instance = _ensure_wmi_instance()
-    if instance is None:
-        return None
-
-    try:
-        batteries = instance.Win32_Battery()
-        if index < len(batteries):
-            return int(batteries[index].EstimatedChargeRemaining)
-    except Exception as exc:  # noqa: BLE001 - surface diagnostic info
-        _handle_wmi_error(exc)
-    return None
+    return get_battery_snapshot().percent(index)
 
 
 def is_battery_charging(index=0) -> bool:
     """Return True if the indexed battery is actively charging."""
 
-    instance = _ensure_wmi_instance()
-    if instance is None:
-        return False
-
-    try:
-        batteries = instance.Win32_Battery()
-        if index < len(batteries):
-            return batteries[index].BatteryStatus in {2, 6}  # Charging states
-    except Exception as exc:  # noqa: BLE001 - surface diagnostic info
-        _handle_wmi_error(exc)
-    return False
+    return get_battery_snapshot().charging(index)
 
 def preload_previous_results():
     # Load previous test results from the database for the current serial number
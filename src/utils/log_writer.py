@@ -0,0 +1,141 @@
+import atexit
+import os
+import sys
+import threading
+from collections import deque
+from typing import Callable, Deque, List, Optional, Union
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_TIMEOUT = 5.0
+
+
+def _report_write_failure(exc: Exception) -> None:
+    print(f"Failed to log event: {exc}")
+
+
+class BackgroundLogWriter:
+    """
+    Append pre-formatted lines to a log file from a daemon thread.
+
+    ``write()`` only queues the line; the writer thread drains the queue in
+    batches, opening the file once per batch and rotating it to ``<path>.1``
+    when it grows past ``max_bytes``. If the thread cannot run (or the writer
+    has been closed) lines are written synchronously instead, so nothing is lost.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Callable[[], str]],
+        *,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        on_error: Optional[Callable[[Exception], None]] = None,
+    ):
+        self._path = path if callable(path) else (lambda: path)
+        self.max_bytes = max_bytes
+        self.batch_size = max(1, batch_size)
+        self._on_error = on_error or _report_write_failure
+        self._pending: Deque[str] = deque()
+        self._unwritten = 0
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._condition = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._hooks_installed = False
+
+    def write(self, line: str) -> None:
+        with self._condition:
+            if not self._closed and self._ensure_thread_locked():
+                self._pending.append(line)
+                self._unwritten += 1
+                self._condition.notify()
+                return
+        self._write_batch([line])
+
+    def flush(self, timeout: float = DEFAULT_FLUSH_TIMEOUT) -> bool:
+        """Block until queued lines are on disk; returns False on timeout."""
+
+        if threading.current_thread() is self._thread:
+            return False
+        with self._condition:
+            self._condition.notify_all()
+            return self._condition.wait_for(lambda: self._unwritten == 0, timeout)
+
+    def close(self, timeout: float = DEFAULT_FLUSH_TIMEOUT) -> None:
+        """Flush, stop the writer thread and switch to synchronous writes."""
+
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            thread = self._thread
+            self._condition.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def install_exit_hooks(self) -> None:
+        """Flush on interpreter exit and before uncaught exceptions are reported."""
+
+        if self._hooks_installed:
+            return
+        self._hooks_installed = True
+        atexit.register(self.close)
+
+        previous_excepthook = sys.excepthook
+
+        def excepthook(exc_type, exc, tb):
+            self.flush()
+            previous_excepthook(exc_type, exc, tb)
+
+        sys.excepthook = excepthook
+
+        previous_thread_excepthook = threading.excepthook
+
+        def thread_excepthook(args):
+            self.flush()
+            previous_thread_excepthook(args)
+
+        threading.excepthook = thread_excepthook
+
+    def _ensure_thread_locked(self) -> bool:
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        try:
+            thread.start()
+        except RuntimeError:
+            # Interpreter shutdown or thread exhaustion: write on the caller instead.
+            return False
+        self._thread = thread
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            try:
+                self._write_batch(batch)
+            finally:
+                with self._condition:
+                    self._unwritten -= len(batch)
+                    self._condition.notify_all()
+
+    def _write_batch(self, lines: List[str]) -> None:
+        with self._io_lock:
+            try:
+                path = self._path()
+                self._rotate_if_needed(path)
+                with open(path, "a", encoding="utf-8") as log_file:
+                    log_file.write("".join(lines))
+            except Exception as exc:
+                self._on_error(exc)
+
+    def _rotate_if_needed(self, path: str) -> None:
+        if os.path.exists(path) and os.path.getsize(path) > self.max_bytes:
+            if os.path.exists(path + ".1"):
+                os.remove(path + ".1")
+            os.rename(path, path + ".1")
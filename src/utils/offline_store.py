@@ -0,0 +1,208 @@
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.order_prefetch import reference_key
+
+JOURNAL_PENDING = "pending"
+JOURNAL_APPLIED = "applied"
+JOURNAL_CONFLICT = "conflict"
+JOURNAL_REJECTED = "rejected"
+JOURNAL_SUPERSEDED = "superseded"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS order_snapshot (
+    reference_key TEXT PRIMARY KEY,
+    snapshot TEXT NOT NULL,
+    saved_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assignment_journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL,
+    order_number TEXT NOT NULL,
+    serial_number TEXT NOT NULL,
+    row TEXT NOT NULL,
+    hash_csv_path TEXT,
+    checked_at TEXT,
+    report TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    detail TEXT,
+    serial_row_id INTEGER,
+    created_at REAL NOT NULL,
+    applied_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_assignment_journal_status ON assignment_journal (status, id);
+"""
+
+
+@contextmanager
+def _connect(path: str) -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+class OfflineOrderStore:
+    """
+    Order search snapshots kept on disk so a bench can keep working while MySQL is down.
+
+    ``save()`` stores the snapshot under the searched reference and its
+    canonical order number; ``load()`` returns it with ``saved_at`` added.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with _connect(path) as conn:
+            conn.executescript(_SCHEMA)
+
+    def save(self, reference: str, snapshot: Dict[str, Any]) -> None:
+        text = json.dumps(snapshot)
+        now = time.time()
+        keys = {reference_key(reference), reference_key(snapshot.get("order_number") or "")} - {""}
+        with _connect(self.path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO order_snapshot (reference_key, snapshot, saved_at) VALUES (?, ?, ?)",
+                [(key, text, now) for key in keys],
+            )
+
+    def load(self, reference: str) -> Optional[Dict[str, Any]]:
+        with _connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT snapshot, saved_at FROM order_snapshot WHERE reference_key = ?", (reference_key(reference),)
+            ).fetchone()
+        if row is None:
+            return None
+        snapshot = json.loads(row[0])
+        snapshot["saved_at"] = row[1]
+        return snapshot
+
+    def stats(self) -> Dict[str, int]:
+        with _connect(self.path) as conn:
+            return {"snapshots": conn.execute("SELECT COUNT(*) FROM order_snapshot").fetchone()[0]}
+
+
+@dataclass
+class JournalEntry:
+    id: int
+    order_id: int
+    order_number: str
+    serial_number: str
+    row: Dict[str, Any]
+    hash_csv_path: Optional[str]
+    checked_at: Optional[str]
+    attempts: int
+    # Stock-unit check report fields (battery report included); None for entries journalled without one.
+    report: Optional[Dict[str, Any]] = None
+
+
+class AssignmentJournal:
+    """
+    Durable, ordered log of serial assignments made while MySQL was unreachable.
+
+    Each entry carries the full ``order_serials`` row keyed by column name
+    and the Web-Tools stock report that the online assignment would have sent.
+    Journalling a serial again supersedes its earlier pending entry, so only
+    the last offline decision for a device is replayed. The reconciler
+    (``logic/reconcile_logic.py``) reads ``pending()`` in order and records
+    the outcome of each entry with ``mark()``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with _connect(path) as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(assignment_journal)")}
+            if "report" not in columns:
+                # Journals written before the stock report was stored.
+                conn.execute("ALTER TABLE assignment_journal ADD COLUMN report TEXT")
+
+    def append(
+        self,
+        order_id: int,
+        order_number: str,
+        serial_number: str,
+        row: Dict[str, Any],
+        *,
+        hash_csv_path: Optional[str] = None,
+        checked_at: Optional[str] = None,
+        report: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        with _connect(self.path) as conn:
+            conn.execute(
+                "UPDATE assignment_journal SET status = ?, detail = ? WHERE serial_number = ? AND status = ?",
+                (JOURNAL_SUPERSEDED, f"replaced by a later assignment to {order_number}", serial_number, JOURNAL_PENDING),
+            )
+            cursor = conn.execute(
+                "INSERT INTO assignment_journal "
+                "(order_id, order_number, serial_number, row, hash_csv_path, checked_at, report, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    order_id,
+                    order_number,
+                    serial_number,
+                    json.dumps(row),
+                    hash_csv_path,
+                    checked_at,
+                    json.dumps(report) if report is not None else None,
+                    time.time(),
+                ),
+            )
+            return cursor.lastrowid
+
+    def pending(self) -> List[JournalEntry]:
+        with _connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT id, order_id, order_number, serial_number, row, hash_csv_path, checked_at, attempts, report "
+                "FROM assignment_journal WHERE status = ? ORDER BY id",
+                (JOURNAL_PENDING,),
+            ).fetchall()
+        return [
+            JournalEntry(
+                row[0], row[1], row[2], row[3], json.loads(row[4]), row[5], row[6], row[7],
+                json.loads(row[8]) if row[8] else None,
+            )
+            for row in rows
+        ]
+
+    def mark(self, entry_id: int, status: str, detail: str = "", serial_row_id: Optional[int] = None) -> None:
+        with _connect(self.path) as conn:
+            conn.execute(
+                "UPDATE assignment_journal SET status = ?, detail = ?, serial_row_id = ?, attempts = attempts + 1, "
+                "applied_at = ? WHERE id = ?",
+                (status, detail, serial_row_id, time.time() if status == JOURNAL_APPLIED else None, entry_id),
+            )
+
+    def record_attempt(self, entry_id: int, detail: str) -> None:
+        """Note a failed replay that left the entry pending (e.g. the connection dropped)."""
+
+        with _connect(self.path) as conn:
+            conn.execute(
+                "UPDATE assignment_journal SET attempts = attempts + 1, detail = ? WHERE id = ?", (detail, entry_id)
+            )
+
+    def conflicts(self) -> List[Dict[str, Any]]:
+        with _connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT id, serial_number, order_number, detail, created_at FROM assignment_journal "
+                "WHERE status IN (?, ?) ORDER BY id",
+                (JOURNAL_CONFLICT, JOURNAL_REJECTED),
+            ).fetchall()
+        return [
+            {"id": row[0], "serial_number": row[1], "order_number": row[2], "detail": row[3], "created_at": row[4]}
+            for row in rows
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        with _connect(self.path) as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM assignment_journal GROUP BY status").fetchall())
+        return {
+            status: int(counts.get(status, 0))
+            for status in (JOURNAL_PENDING, JOURNAL_APPLIED, JOURNAL_CONFLICT, JOURNAL_REJECTED, JOURNAL_SUPERSEDED)
+        }
@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.telemetry import span
+
+DEFAULT_CAPACITY = 32
+DEFAULT_WAIT_SECONDS = 5.0
+DEFAULT_TTL_SECONDS = 300.0
+
+Loader = Callable[[str], Optional[Dict[str, Any]]]
+
+
+def reference_key(reference: str) -> str:
+    """Cache key for an order reference (order numbers compare case-insensitively)."""
+
+    return (reference or "").strip().casefold()
+
+
+class OrderSnapshotPrefetcher:
+    """
+    Resolve order references in the background while they are being typed.
+
+    ``request()`` only records the latest reference; one worker thread loads
+    it with ``loader`` and keeps the snapshot in a small LRU cache for
+    ``ttl`` seconds. A newer request replaces one that has not started yet,
+    and a load that finishes after ``clear()`` is discarded, so a stale
+    lookup never reaches the search. ``get()`` returns a cached snapshot, waits briefly for the
+    matching lookup already in flight, or returns None so the caller resolves
+    the reference itself.
+    """
+
+    def __init__(
+        self,
+        loader: Loader,
+        *,
+        capacity: int = DEFAULT_CAPACITY,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        log: Optional[Callable[[str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._loader = loader
+        self.capacity = max(1, capacity)
+        self.ttl = ttl
+        self._clock = clock
+        self._log = log or (lambda message: None)
+        self._cond = threading.Condition()
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._pending: Optional[Tuple[str, str]] = None
+        self._in_flight: Optional[str] = None
+        self._generation = 0
+        self._worker: Optional[threading.Thread] = None
+        self.requested = 0
+        self.loaded = 0
+        self.superseded = 0
+        self.discarded = 0
+        self.hits = 0
+        self.waits = 0
+        self.misses = 0
+        self.expirations = 0
+
+    def request(self, reference: str) -> None:
+        """Prefetch ``reference`` unless it is cached or already being loaded."""
+
+        key = reference_key(reference)
+        if not key:
+            return
+        with self._cond:
+            if self._fresh(key) is not None or key in self._busy_keys():
+                return
+            if self._pending is not None:
+                self.superseded += 1
+            self._pending = (key, reference.strip())
+            self.requested += 1
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="order-prefetch", daemon=True)
+                self._worker.start()
+            self._cond.notify_all()
+
+    def get(self, reference: str, wait: float = DEFAULT_WAIT_SECONDS) -> Optional[Dict[str, Any]]:
+        key = reference_key(reference)
+        with span("order_prefetch.lookup") as attrs:
+            with self._cond:
+                outcome = "miss"
+                snapshot = self._fresh(key)
+                if snapshot is not None:
+                    outcome = "hit"
+                elif key and key in self._busy_keys():
+                    outcome = "wait"
+                    self._cond.wait_for(lambda: key not in self._busy_keys(), timeout=wait)
+                    snapshot = self._fresh(key)
+                if snapshot is not None:
+                    self._cache.move_to_end(key)
+                elif outcome == "wait":
+                    outcome = "miss"
+                if outcome == "hit":
+                    self.hits += 1
+                elif outcome == "wait":
+                    self.waits += 1
+                else:
+                    self.misses += 1
+            attrs["outcome"] = outcome
+        return snapshot
+
+    def clear(self) -> None:
+        """Drop every cached snapshot; loads still running are discarded when they finish."""
+
+        with self._cond:
+            self._cache.clear()
+            self._pending = None
+            self._generation += 1
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "cached": len(self._cache),
+                "requested": self.requested,
+                "loaded": self.loaded,
+                "superseded": self.superseded,
+                "discarded": self.discarded,
+                "hits": self.hits,
+                "waits": self.waits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+            }
+
+    def _fresh(self, key: str) -> Optional[Dict[str, Any]]:
+        # Called with the condition held; an expired snapshot is dropped, not served.
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        if self._clock() >= expires_at:
+            del self._cache[key]
+            self.expirations += 1
+            return None
+        return snapshot
+
+    def _busy_keys(self) -> Tuple[Optional[str], Optional[str]]:
+        return self._in_flight, self._pending[0] if self._pending else None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._cond.wait_for(lambda: self._pending is not None, timeout=30.0):
+                    # Idle: let the thread end; request() starts a new one.
+                    self._worker = None
+                    return
+                (key, reference), self._pending = self._pending, None
+                self._in_flight = key
+                generation = self._generation
+            snapshot = None
+            try:
+                snapshot = self._loader(reference)
+            except Exception as exc:
+                self._log(f"Order prefetch for '{reference}' failed: {exc}")
+            with self._cond:
+                self._in_flight = None
+                if generation != self._generation:
+                    self.discarded += 1
+                elif snapshot is not None:
+                    self._cache[key] = (self._clock() + self.ttl, snapshot)
+                    self._cache.move_to_end(key)
+                    while len(self._cache) > self.capacity:
+                        self._cache.popitem(last=False)
+                    self.loaded += 1
+                self._cond.notify_all()
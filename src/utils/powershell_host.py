@@ -0,0 +1,380 @@
+import atexit
+import base64
+import itertools
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+RESPONSE_MARKER = "@@SCPSHOST@@"
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_TIMEOUT = 60.0
+SHUTDOWN_GRACE = 2.0
+
+# Request loop run inside each powershell.exe worker. Requests arrive as one JSON
+# object per stdin line; each script runs as a fresh script block with the
+# request args splatted in, and the reply is written as a single marked line so
+# stray Write-Host/native output on stdout is ignored by the reader.
+WORKER_LOOP = r"""
+$ErrorActionPreference = "Continue"
+$ProgressPreference = "SilentlyContinue"
+[Console]::OutputEncoding = New-Object System.Text.UTF8Encoding $false
+$marker = "@@SCPSHOST@@"
+while ($true) {
+    $line = [Console]::In.ReadLine()
+    if ($null -eq $line) { break }
+    if ([string]::IsNullOrWhiteSpace($line)) { continue }
+    $response = @{ id = $null; ok = $true; output = ""; error = ""; exit_code = 0 }
+    try {
+        $request = $line | ConvertFrom-Json
+        $response.id = $request.id
+        $params = @{}
+        if ($null -ne $request.args) {
+            foreach ($property in $request.args.PSObject.Properties) { $params[$property.Name] = $property.Value }
+        }
+        $global:LASTEXITCODE = 0
+        $block = [ScriptBlock]::Create([string]$request.script)
+        $response.output = (& $block @params 2>&1 | Out-String)
+        $response.exit_code = [int]$global:LASTEXITCODE
+    } catch {
+        $response.ok = $false
+        $response.error = $_.Exception.Message
+    }
+    [Console]::Out.WriteLine($marker + ($response | ConvertTo-Json -Compress))
+    [Console]::Out.Flush()
+}
+"""
+
+# Line-for-line stand-in for WORKER_LOOP used by tests and non-Windows runs.
+# argv[1] maps request names to canned replies; "*" is the default reply.
+_STUB_WORKER_SOURCE = r"""
+import json, sys, time
+responses = json.loads(sys.argv[1])
+print("stub worker ready", flush=True)
+for line in sys.stdin:
+    if not line.strip():
+        continue
+    request = json.loads(line)
+    spec = dict(responses.get(request.get("name"), responses.get("*", {})))
+    if spec.get("sleep"):
+        time.sleep(spec["sleep"])
+    if spec.get("crash"):
+        sys.exit(3)
+    if spec.get("noise"):
+        print(spec["noise"], flush=True)
+    output = spec.get("output", "")
+    if spec.get("echo_args"):
+        output = json.dumps(request.get("args") or {}, sort_keys=True)
+    reply = {
+        "id": request["id"],
+        "ok": spec.get("ok", True),
+        "output": output,
+        "error": spec.get("error", ""),
+        "exit_code": spec.get("exit_code", 0),
+    }
+    print("@@SCPSHOST@@" + json.dumps(reply), flush=True)
+"""
+
+
+class PowerShellHostError(RuntimeError):
+    """The worker could not be started, crashed, or returned garbage."""
+
+
+class PowerShellTimeout(PowerShellHostError):
+    """The request did not finish in time; its worker has been killed."""
+
+
+@dataclass
+class PowerShellResult:
+    ok: bool
+    output: str
+    error: str
+    exit_code: int
+    duration_ms: float
+    timed_out: bool = False
+
+    @property
+    def succeeded(self) -> bool:
+        return self.ok and self.exit_code == 0
+
+    @property
+    def last_line(self) -> str:
+        lines = [line.strip() for line in self.output.splitlines() if line.strip()]
+        return lines[-1] if lines else ""
+
+
+def _windows_no_window_creationflags() -> int:
+    if sys.platform == "win32":
+        return subprocess.CREATE_NO_WINDOW
+    return 0
+
+
+def default_worker_command() -> List[str]:
+    """64-bit ``powershell.exe`` running :data:`WORKER_LOOP`."""
+
+    system_root = os.environ.get("SystemRoot", r"C:\Windows")
+    executable = "powershell.exe"
+    for folder in ("Sysnative", "System32"):
+        candidate = os.path.join(system_root, folder, "WindowsPowerShell", "v1.0", "powershell.exe")
+        if os.path.exists(candidate):
+            executable = candidate
+            break
+    encoded = base64.b64encode(WORKER_LOOP.encode("utf-16-le")).decode("ascii")
+    return [executable, "-NoLogo", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass", "-EncodedCommand", encoded]
+
+
+def stub_worker_command(responses: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    Command for a Python worker that speaks the same protocol with canned replies.
+
+    Each reply spec may set ``output``, ``ok``, ``error``, ``exit_code``,
+    ``sleep`` (seconds), ``crash`` (exit without replying), ``noise`` (an
+    unmarked stdout line) or ``echo_args`` (reply with the request args as JSON).
+    """
+
+    return [sys.executable, "-c", _STUB_WORKER_SOURCE, json.dumps(responses)]
+
+
+class _Worker:
+    def __init__(self, command: List[str]):
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            creationflags=_windows_no_window_creationflags(),
+        )
+        self.replies: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self.recent_output: Deque[str] = deque(maxlen=5)
+        self._reader = threading.Thread(target=self._read_replies, name="pshost-reader", daemon=True)
+        self._reader.start()
+
+    def _read_replies(self) -> None:
+        try:
+            for line in self.process.stdout:
+                position = line.find(RESPONSE_MARKER)
+                if position < 0:
+                    if line.strip():
+                        self.recent_output.append(line.strip())
+                    continue
+                try:
+                    self.replies.put(json.loads(line[position + len(RESPONSE_MARKER):]))
+                except ValueError:
+                    self.recent_output.append(line.strip())
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.replies.put(None)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def send(self, request: Dict[str, Any]) -> None:
+        self.process.stdin.write(json.dumps(request) + "\n")
+        self.process.stdin.flush()
+
+    def wait_for(self, request_id: int, deadline: float) -> Dict[str, Any]:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PowerShellTimeout(f"no reply within the timeout (request {request_id})")
+            try:
+                reply = self.replies.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if reply is None:
+                detail = " | ".join(self.recent_output) or f"exit code {self.process.poll()}"
+                raise PowerShellHostError(f"worker exited mid-request: {detail}")
+            if reply.get("id") == request_id:
+                return reply
+
+    def close(self, grace: float = SHUTDOWN_GRACE) -> None:
+        try:
+            self.process.stdin.close()
+            self.process.wait(grace)
+        except Exception:
+            self.kill()
+
+    def kill(self) -> None:
+        try:
+            self.process.kill()
+            self.process.wait(SHUTDOWN_GRACE)
+        except Exception:
+            pass
+
+
+class PowerShellHost:
+    """
+    Pool of long-lived PowerShell processes that run scripts on request.
+
+    Starting ``powershell.exe`` costs seconds per call, so scripts are sent to
+    warm workers over stdin instead. At most ``max_workers`` requests run at
+    once; further callers wait for a free slot. A worker that times out is
+    killed, and one that crashes is discarded; the next request starts a
+    replacement.
+    """
+
+    def __init__(
+        self,
+        command: Optional[List[str]] = None,
+        *,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        default_timeout: float = DEFAULT_TIMEOUT,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        self._command = list(command) if command else default_worker_command()
+        self.max_workers = max(1, max_workers)
+        self.default_timeout = default_timeout
+        self._log = log or (lambda message: None)
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._lock = threading.Lock()
+        self._idle: List[_Worker] = []
+        self._busy: List[_Worker] = []
+        self._ids = itertools.count(1)
+        self._closed = False
+        self.spawned = 0
+        self.restarts = 0
+        self.requests = 0
+        self.timeouts = 0
+
+    def run(
+        self,
+        script: str,
+        args: Optional[Dict[str, Any]] = None,
+        *,
+        timeout: Optional[float] = None,
+        name: str = "script",
+    ) -> PowerShellResult:
+        """Run ``script`` with ``args`` bound to its parameters; raises PowerShellHostError."""
+
+        timeout = self.default_timeout if timeout is None else timeout
+        request = {"id": next(self._ids), "name": name, "script": script, "args": args or {}}
+        started = time.monotonic()
+        with self._slots:
+            if self._closed:
+                raise PowerShellHostError("PowerShell host has been shut down")
+            with self._lock:
+                self.requests += 1
+            reply = self._dispatch(request, started + timeout)
+        duration_ms = (time.monotonic() - started) * 1000.0
+        return PowerShellResult(
+            ok=bool(reply.get("ok")),
+            output=str(reply.get("output") or ""),
+            error=str(reply.get("error") or ""),
+            exit_code=int(reply.get("exit_code") or 0),
+            duration_ms=duration_ms,
+        )
+
+    def _dispatch(self, request: Dict[str, Any], deadline: float) -> Dict[str, Any]:
+        # A dead idle worker is only noticed on write; the request never ran,
+        # so it is safe to resend once on a fresh worker.
+        for attempt in (1, 2):
+            worker = self._checkout()
+            healthy = False
+            try:
+                try:
+                    worker.send(request)
+                except (OSError, ValueError) as exc:
+                    if attempt == 1:
+                        self._log(f"PowerShell worker unavailable ({exc}); starting a new one.")
+                        continue
+                    raise PowerShellHostError(f"could not send request to worker: {exc}") from exc
+                reply = worker.wait_for(request["id"], deadline)
+                healthy = True
+                return reply
+            except PowerShellTimeout:
+                with self._lock:
+                    self.timeouts += 1
+                self._log(f"PowerShell request '{request['name']}' timed out; restarting worker.")
+                raise
+            except PowerShellHostError as exc:
+                self._log(f"PowerShell request '{request['name']}' failed: {exc}")
+                raise
+            finally:
+                self._checkin(worker, healthy)
+        raise PowerShellHostError("no PowerShell worker available")
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive:
+                    self._busy.append(worker)
+                    return worker
+                self.restarts += 1
+        try:
+            worker = _Worker(self._command)
+        except OSError as exc:
+            raise PowerShellHostError(f"could not start PowerShell worker: {exc}") from exc
+        with self._lock:
+            self.spawned += 1
+            self._busy.append(worker)
+        return worker
+
+    def _checkin(self, worker: _Worker, healthy: bool) -> None:
+        with self._lock:
+            if worker in self._busy:
+                self._busy.remove(worker)
+            keep = healthy and worker.alive and not self._closed
+            if keep:
+                self._idle.append(worker)
+            else:
+                self.restarts += 1
+        if not keep:
+            worker.kill()
+
+    def warm(self) -> None:
+        """Start one idle worker in the background so the first request skips startup."""
+
+        def start():
+            with self._lock:
+                if self._idle or self._busy or self._closed:
+                    return
+            try:
+                worker = _Worker(self._command)
+            except OSError as exc:
+                self._log(f"PowerShell worker warm-up failed: {exc}")
+                return
+            with self._lock:
+                self.spawned += 1
+                if self._closed:
+                    worker.kill()
+                else:
+                    self._idle.append(worker)
+
+        threading.Thread(target=start, name="pshost-warm", daemon=True).start()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "idle": len(self._idle),
+                "busy": len(self._busy),
+                "spawned": self.spawned,
+                "restarts": self.restarts,
+                "requests": self.requests,
+                "timeouts": self.timeouts,
+            }
+
+    def shutdown(self) -> None:
+        """Close every worker; busy ones are killed when their request returns."""
+
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
+
+    def install_exit_hook(self) -> "PowerShellHost":
+        atexit.register(self.shutdown)
+        return self
@@ -0,0 +1,291 @@
+import datetime
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+DEFAULT_SYNC_INTERVAL = 300.0
+# Changed rows are re-read this far behind the high-water mark, so a write that
+# committed late with an older updated_at is still picked up.
+SYNC_OVERLAP_SECONDS = 60
+MYSQL_ERROR_BAD_FIELD = 1054
+
+_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS replica_state (
+    table_name TEXT PRIMARY KEY,
+    high_water TEXT,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class ReplicaTable:
+    name: str
+    keys: Tuple[str, ...]
+    values: Tuple[str, ...]
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return self.keys + self.values
+
+
+REFERENCE_TABLES = (
+    ReplicaTable("dropdown_option", ("id",), ("category", "name")),
+    ReplicaTable("attribute_term_metadata", ("attribute_id", "term_id"), ("sku_tag", "astro_name", "dropdown_option_id")),
+    ReplicaTable("attribute_dropdown_map", ("attribute_id",), ("dropdown_category",)),
+)
+
+# Returns a DB-API connection (closed after each sync) or None when MySQL is unavailable.
+Connect = Callable[[], Any]
+
+
+def _local_value(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode("utf-8", errors="replace")
+    return value
+
+
+def _mysql_error_code(exc: BaseException) -> Optional[int]:
+    args = getattr(exc, "args", ())
+    return args[0] if args and isinstance(args[0], int) else None
+
+
+class ReferenceReplica:
+    """
+    Local SQLite copy of the MySQL reference tables behind SKU parsing.
+
+    ``sync()`` pulls rows whose ``updated_at`` is at or after each table's
+    high-water mark (see ``sql/005_reference_table_updated_at.sql``) and
+    upserts them. Deleted rows are found by comparing row counts and, only when
+    they differ, the remote key set. Without ``updated_at`` (MySQL error 1054)
+    every sync re-reads the whole table instead. ``on_change`` runs after a
+    sync that changed anything. ``query()`` reads the copy once every table
+    has been synced, so later processes start from disk instead of MySQL.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        connect: Connect,
+        *,
+        tables: Sequence[ReplicaTable] = REFERENCE_TABLES,
+        interval: float = DEFAULT_SYNC_INTERVAL,
+        on_change: Optional[Callable[[], None]] = None,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        self.path = path
+        self._connect_mysql = connect
+        self.tables = tuple(tables)
+        self.interval = interval
+        self._on_change = on_change or (lambda: None)
+        self._log = log or (lambda message: None)
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.delta = True
+        self.syncs = 0
+        self.failures = 0
+        self.upserted = 0
+        self.deleted = 0
+        self.last_error: Optional[str] = None
+        self.last_sync_ms: Optional[float] = None
+        self._repeated_key_tables: Set[str] = set()
+        with self._connect() as conn:
+            conn.executescript(_STATE_SCHEMA)
+            for table in self.tables:
+                columns = ", ".join(table.columns)
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table.name} ({columns}, PRIMARY KEY ({', '.join(table.keys)}))")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def ready(self) -> bool:
+        """True once every table has completed a sync (possibly in an earlier session)."""
+
+        with self._connect() as conn:
+            synced = conn.execute("SELECT COUNT(*) FROM replica_state").fetchone()[0]
+        return synced >= len(self.tables)
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        with self._connect() as conn:
+            return conn.execute(sql, tuple(params)).fetchall()
+
+    def start(self) -> "ReferenceReplica":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="reference-replica", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            with self._connect() as conn:
+                state = dict(conn.execute("SELECT table_name, high_water FROM replica_state").fetchall())
+        except sqlite3.Error:
+            state = {}
+        stats: Dict[str, Any] = {
+            "mode": "delta" if self.delta else "full",
+            "syncs": self.syncs,
+            "failures": self.failures,
+            "upserted": self.upserted,
+            "deleted": self.deleted,
+            "last_sync_ms": self.last_sync_ms,
+            "last_error": self.last_error,
+        }
+        for table in self.tables:
+            stats[f"{table.name}.high_water"] = state.get(table.name)
+        return stats
+
+    def sync(self) -> bool:
+        """Pull changes for every table; True when the local copy changed."""
+
+        with self._sync_lock:
+            started = time.perf_counter()
+            mysql_conn = self._connect_mysql()
+            if mysql_conn is None:
+                raise ConnectionError("MySQL unavailable")
+            try:
+                cursor = mysql_conn.cursor()
+                changed = False
+                for table in self.tables:
+                    changed = self._sync_table(cursor, table) or changed
+            finally:
+                mysql_conn.close()
+            self.syncs += 1
+            self.last_sync_ms = round((time.perf_counter() - started) * 1000.0, 1)
+        if changed:
+            self._on_change()
+        return changed
+
+    def _sync_table(self, cursor, table: ReplicaTable) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("SELECT high_water FROM replica_state WHERE table_name = ?", (table.name,)).fetchone()
+        high_water = row[0] if row else None
+        rows, new_high_water = self._fetch_changes(cursor, table, high_water)
+        fetched_keys = {tuple(row[: len(table.keys)]) for row in rows}
+        self._warn_if_keys_repeat(table, len(rows), len(fetched_keys))
+        upserted = self._upsert(table, rows)
+        if self.delta and high_water is not None:
+            remote_keys = self._remote_keys_if_deleted(cursor, table)
+        else:
+            # A full read is the complete key set already.
+            remote_keys = fetched_keys
+        deleted = self._delete_missing(table, remote_keys) if remote_keys is not None else 0
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO replica_state (table_name, high_water, synced_at) VALUES (?, ?, ?)",
+                (table.name, new_high_water or high_water, time.time()),
+            )
+        self.upserted += upserted
+        self.deleted += deleted
+        if upserted or deleted:
+            self._log(f"Reference replica: {table.name} upserted={upserted} deleted={deleted}")
+        return bool(upserted or deleted)
+
+    def _fetch_changes(
+        self, cursor, table: ReplicaTable, high_water: Optional[str]
+    ) -> Tuple[List[Tuple[Any, ...]], Optional[str]]:
+        columns = ", ".join(table.columns)
+        if self.delta:
+            sql = f"SELECT {columns}, updated_at FROM {table.name}"
+            params: Tuple[Any, ...] = ()
+            if high_water is not None:
+                since = datetime.datetime.fromisoformat(high_water) - datetime.timedelta(seconds=SYNC_OVERLAP_SECONDS)
+                sql += " WHERE updated_at >= %s"
+                params = (since,)
+            try:
+                cursor.execute(sql, params)
+                fetched = cursor.fetchall()
+            except Exception as exc:
+                if _mysql_error_code(exc) != MYSQL_ERROR_BAD_FIELD:
+                    raise
+                self.delta = False
+                self._log(
+                    "Reference tables have no updated_at column; apply sql/005_reference_table_updated_at.sql. "
+                    "Re-reading them in full on every sync."
+                )
+                return self._fetch_changes(cursor, table, None)
+            stamps = [row[-1] for row in fetched if row[-1] is not None]
+            new_high_water = max(stamps).isoformat(sep=" ") if stamps else None
+            return [tuple(_local_value(value) for value in row[:-1]) for row in fetched], new_high_water
+        cursor.execute(f"SELECT {columns} FROM {table.name}")
+        return [tuple(_local_value(value) for value in row) for row in cursor.fetchall()], None
+
+    def _upsert(self, table: ReplicaTable, rows: List[Tuple[Any, ...]]) -> int:
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" for _ in table.columns)
+        if table.values:
+            assignments = ", ".join(f"{column} = excluded.{column}" for column in table.values)
+            differs = " OR ".join(f"{table.name}.{column} IS NOT excluded.{column}" for column in table.values)
+            conflict = f"DO UPDATE SET {assignments} WHERE {differs}"
+        else:
+            conflict = "DO NOTHING"
+        sql = (
+            f"INSERT INTO {table.name} ({', '.join(table.columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({', '.join(table.keys)}) {conflict}"
+        )
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(sql, rows)
+            # Re-read rows that did not change are skipped by the WHERE and not counted.
+            return conn.total_changes - before
+
+    def _remote_keys_if_deleted(self, cursor, table: ReplicaTable) -> Optional[Set[Tuple[Any, ...]]]:
+        # Every remote row has been pulled at some point, so equal counts mean nothing was deleted.
+        cursor.execute(f"SELECT COUNT(*) FROM {table.name}")
+        remote_count = int(cursor.fetchone()[0])
+        with self._connect() as conn:
+            local_count = conn.execute(f"SELECT COUNT(*) FROM {table.name}").fetchone()[0]
+        if remote_count == local_count:
+            return None
+        cursor.execute(f"SELECT {', '.join(table.keys)} FROM {table.name}")
+        fetched = cursor.fetchall()
+        remote_keys = {tuple(_local_value(value) for value in row) for row in fetched}
+        self._warn_if_keys_repeat(table, len(fetched), len(remote_keys))
+        return remote_keys
+
+    def _warn_if_keys_repeat(self, table: ReplicaTable, rows: int, keys: int) -> None:
+        # The local copy keeps one row per key; sql/005 adds the unique key that prevents this.
+        if keys < rows and table.name not in self._repeated_key_tables:
+            self._repeated_key_tables.add(table.name)
+            self._log(
+                f"Reference replica: {rows - keys} {table.name} rows repeat a ({', '.join(table.keys)}) key and "
+                "only one of each is kept; remove the duplicates and apply sql/005_reference_table_updated_at.sql."
+            )
+
+    def _delete_missing(self, table: ReplicaTable, remote_keys: Set[Tuple[Any, ...]]) -> int:
+        keys = ", ".join(table.keys)
+        match = " AND ".join(f"{column} IS ?" for column in table.keys)
+        with self._connect() as conn:
+            local_keys = {tuple(row) for row in conn.execute(f"SELECT {keys} FROM {table.name}")}
+            missing = [key for key in local_keys if key not in remote_keys]
+            if missing:
+                conn.executemany(f"DELETE FROM {table.name} WHERE {match}", missing)
+        return len(missing)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync()
+                self.last_error = None
+            except Exception as exc:
+                self.failures += 1
+                self.last_error = str(exc)
+                self._log(f"Reference replica sync failed: {exc}")
+            self._stop.wait(self.interval)
@@ -0,0 +1,157 @@
+import re
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class SkuTagMatcher:
+    """
+    Aho–Corasick automaton over normalized SKU tags.
+
+    Tags are supplied in priority order as ``(tag, field, value)`` tuples; the
+    first tuple for a tag owns it. ``match()`` walks the normalized SKU once and,
+    for every spec field, returns the value of the highest-priority tag found.
+    """
+
+    def __init__(self, tagged_values: Iterable[Tuple[str, str, str]]):
+        self._fields: List[Tuple[str, str]] = []
+        tag_ids: Dict[str, int] = {}
+        for tag, field, value in tagged_values:
+            if not tag or tag in tag_ids:
+                continue
+            tag_ids[tag] = len(self._fields)
+            self._fields.append((field, value))
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._outputs: List[List[int]] = [[]]
+        for tag, tag_id in tag_ids.items():
+            state = 0
+            for char in tag:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._outputs.append([])
+                state = next_state
+            self._outputs[state].append(tag_id)
+        self._fail = [0] * len(self._goto)
+        self._build_failure_links()
+
+    @classmethod
+    def from_metadata(
+        cls,
+        metadata: Iterable[Dict[str, Any]],
+        category_to_field: Callable[[Optional[str]], Optional[str]],
+    ) -> "SkuTagMatcher":
+        """Compile ``attribute_term_metadata`` entries, longest tags first."""
+
+        tagged_values = []
+        for entry in sorted(metadata, key=lambda item: len(item["normalized_tag"]), reverse=True):
+            field = category_to_field(entry["dropdown_category"])
+            value = entry["dropdown_option_name"] or entry["astro_name"] or entry["sku_tag"]
+            if field and value:
+                tagged_values.append((entry["normalized_tag"], field, value))
+        return cls(tagged_values)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._outputs[next_state].extend(self._outputs[self._fail[next_state]])
+
+    def find_tags(self, normalized_sku: str) -> List[int]:
+        """Return the ids of every tag occurring in ``normalized_sku``, in priority order."""
+
+        found = set()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for char in normalized_sku:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return sorted(found)
+
+    def match(self, normalized_sku: str) -> Dict[str, str]:
+        matched: Dict[str, str] = {}
+        for tag_id in self.find_tags(normalized_sku):
+            field, value = self._fields[tag_id]
+            if field not in matched:
+                matched[field] = value
+        return matched
+
+
+SKU_KEYWORD_CATEGORIES = ("cpu", "ram", "ssd", "model", "resolution", "windows", "grade")
+
+
+class SkuKeywordMatcher:
+    """
+    Pre-compiled ``[search]`` keyword lists.
+
+    Each category compiles to one alternation with a capture group per keyword,
+    so ``first_match`` returns the earliest-listed keyword that appears as a
+    whole word anywhere in the SKU, then falls back to a case-insensitive
+    substring test, exactly like the per-keyword ``re.search`` loop it replaces.
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]]):
+        self._keywords = {category: list(values) for category, values in keywords.items()}
+        self._lowered = {category: [value.lower() for value in values] for category, values in self._keywords.items()}
+        self._uppered = {category: [value.upper() for value in values] for category, values in self._keywords.items()}
+        self._patterns = {
+            category: re.compile(
+                r"(?<!\w)(?=(?:" + "|".join(f"({re.escape(value)})" for value in values) + r")(?!\w))",
+                re.IGNORECASE,
+            )
+            for category, values in self._keywords.items()
+            if values
+        }
+
+    @classmethod
+    def from_config(cls, config) -> "SkuKeywordMatcher":
+        return cls(
+            {
+                category: config.get("search", f"{category}_keywords").split(",")
+                for category in SKU_KEYWORD_CATEGORIES
+            }
+        )
+
+    def first_match(self, category: str, target: str) -> Optional[str]:
+        keywords = self._keywords.get(category) or []
+        pattern = self._patterns.get(category)
+        if pattern is not None:
+            best = None
+            for match in pattern.finditer(target):
+                index = match.lastindex - 1
+                if best is None or index < best:
+                    best = index
+                    if best == 0:
+                        break
+            if best is not None:
+                return keywords[best]
+        lowered_target = target.lower()
+        for keyword, lowered in zip(keywords, self._lowered.get(category) or []):
+            if lowered in lowered_target:
+                return keyword
+        return None
+
+    def last_substring_match(self, category: str, target: str) -> Optional[str]:
+        """Return the last-listed keyword contained in ``target`` (case-insensitive)."""
+
+        uppered_target = target.upper()
+        found = None
+        for keyword, uppered in zip(self._keywords.get(category) or [], self._uppered.get(category) or []):
+            if uppered in uppered_target:
+                found = keyword
+        return found
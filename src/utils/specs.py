@@ -1,15 +1,23 @@
 # utils/specs.py
 import json
 import re
+import hashlib
+import platform
+import tempfile
 import time
 import psutil
-import wmi
 import subprocess
 import os
 from pathlib import Path
 from typing import Optional
-from utils.helpers import log_event, ensure_batteryinfoview, get_app_dir
-import pythoncom
+from utils.helpers import log_event, ensure_batteryinfoview, get_app_dir, get_battery_snapshot
+from utils.telemetry import traced
+from utils.wmi_probes import (
+    WMI_PROBES,
+    ComWmiProvider,
+    Probe,
+    collect_probes,
+)
 import configparser
 import getpass
 import sys
@@ -17,50 +25,107 @@ import sys
 config = configparser.ConfigParser()
 config.read(os.path.join(os.path.dirname(__file__), '..', 'config.ini'))
 
-SPECS_CACHE_TTL = 300  # seconds
+SPECS_CACHE_TTL = 300  # seconds; volatile fields
+STATIC_SPECS_CACHE_TTL = 7 * 24 * 3600  # seconds; guarded by the hardware fingerprint
+SPECS_CACHE_VERSION = 2
+# Probes whose fields can change without a hardware change. The BIOS serial is
+# included so a motherboard swap, which leaves the fingerprint intact, is noticed
+# within one volatile TTL; a changed serial then discards the static entries too.
+VOLATILE_SPEC_PROBES = frozenset({"bios", "display", "os", "battery"})
+
+_hardware_fingerprint = None
 
 
 def _specs_cache_path() -> Path:
     return Path(get_app_dir()) / "specs_cache.json"
 
 
-def _load_cached_specs() -> Optional[dict]:
+def _read_machine_guid() -> str:
+    if sys.platform != "win32":
+        return ""
+    try:
+        import winreg  # type: ignore[import]
+
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Cryptography") as key:
+            return str(winreg.QueryValueEx(key, "MachineGuid")[0])
+    except Exception as exc:
+        log_event(f"MachineGuid lookup failed: {exc}")
+        return ""
+
+
+def get_hardware_fingerprint() -> str:
+    """Cheap identity for this machine; cached specs are discarded when it changes."""
+    global _hardware_fingerprint
+    if _hardware_fingerprint is None:
+        parts = [
+            platform.node(),
+            str(os.cpu_count() or 0),
+            str(psutil.virtual_memory().total),
+            _read_machine_guid(),
+        ]
+        _hardware_fingerprint = hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32]
+    return _hardware_fingerprint
+
+
+def _probe_cache_ttl(probe_name: str) -> float:
+    return SPECS_CACHE_TTL if probe_name in VOLATILE_SPEC_PROBES else STATIC_SPECS_CACHE_TTL
+
+
+def _entry_is_fresh(entry: Optional[dict], probe_name: str, now: float) -> bool:
+    if not isinstance(entry, dict) or not isinstance(entry.get("fields"), dict):
+        return False
+    try:
+        collected_at = float(entry.get("collected_at", 0))
+    except (TypeError, ValueError):
+        return False
+    return 0 <= now - collected_at <= _probe_cache_ttl(probe_name)
+
+
+def _load_specs_entries() -> dict:
+    """Return cached probe entries from disk, or {} if missing, outdated or from other hardware."""
     path = _specs_cache_path()
     if not path.exists():
-        return None
+        return {}
     try:
         data = json.loads(path.read_text(encoding="utf-8"))
-        ts = float(data.get("timestamp", 0))
-        if time.time() - ts > SPECS_CACHE_TTL:
-            return None
-        specs = data.get("specs")
-        if isinstance(specs, dict):
-            log_event("Loaded cached laptop specs.")
-            return specs
     except Exception as exc:
         log_event(f"Failed to load specs cache: {exc}")
-    return None
-
-
-def _save_specs_cache(specs: dict) -> None:
+        return {}
+    if not isinstance(data, dict) or data.get("version") != SPECS_CACHE_VERSION:
+        log_event("Ignoring specs cache written by another app version.")
+        return {}
+    if data.get("fingerprint") != get_hardware_fingerprint():
+        log_event("Ignoring specs cache from different hardware.")
+        return {}
+    entries = data.get("entries")
+    return dict(entries) if isinstance(entries, dict) else {}
+
+
+def _save_specs_entries(entries: dict) -> None:
     path = _specs_cache_path()
+    payload = {
+        "version": SPECS_CACHE_VERSION,
+        "fingerprint": get_hardware_fingerprint(),
+        "entries": entries,
+    }
+    temp_path = None
     try:
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps({"timestamp": time.time(), "specs": specs}), encoding="utf-8")
+        fd, temp_path = tempfile.mkstemp(prefix=".specs_cache.", dir=str(path.parent))
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle)
+        os.replace(temp_path, path)
+        temp_path = None
     except Exception as exc:
         log_event(f"Failed to save specs cache: {exc}")
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
 
 
-def _strip_thinkpad_prefix(value: Optional[str]) -> str:
-    """Remove a leading ThinkPad/Thinkpad token if it appears at the start."""
-    if not value:
-        return ""
-    sanitized = value.strip()
-    match = re.match(r"(?i)^thinkpad(?:[\s\-]+)?", sanitized)
-    if match:
-        sanitized = sanitized[match.end():].strip()
-    return sanitized
-
 def get_ssd_thresholds():
     # Retrieve SSD thresholds from the configuration file or use hardcoded defaults
     try:
@@ -84,70 +149,69 @@ def get_ssd_thresholds():
 
 SSD_THRESHOLDS = get_ssd_thresholds()
 
-def parse_cpu_family_and_model(cpu_name):
-    """
-    Extracts the CPU family and model from a CPU name string.
-    Examples:
-        Intel(R) Core(TM) i5-8350U CPU @ 1.70GHz -> i5-8350U
-        Intel(R) Core(TM) i7-1165G7 -> i7-1165G7
-        AMD Ryzen 5 3500U -> Ryzen 5 3500U
-        AMD Ryzen 7 5800H -> Ryzen 7 5800H
-    """
-    cpu_name = cpu_name.strip()
-    cpu_name = re.sub(r"with\s+[\w\-]+\s+Graphics", "", cpu_name, flags=re.IGNORECASE).strip()
-    # Intel Core iX-YYYY
-    intel = re.search(r'(i[3579]-[A-Za-z0-9]+)', cpu_name, re.IGNORECASE)
-    if intel:
-        return intel.group(1)
-    # AMD Ryzen <series> (capture up to CPU/@ or end)
-    amd = re.search(r'(Ryzen\s[\w\-\s]+?)(?:\s+CPU|\s*@|$)', cpu_name, re.IGNORECASE)
-    if amd:
-        return amd.group(1).strip()
-    # Fallback: just return the first 2 words
-    return cpu_name
-
-
-def format_windows_caption(os_info) -> str:
-    caption = str(getattr(os_info, "Caption", "") or "").strip()
-    caption = re.sub(r"^Microsoft\s+", "", caption, flags=re.IGNORECASE)
-    caption = re.sub(r"\s+", " ", caption).strip()
-    if caption:
-        return caption
+_specs_cache_entries = None
+_latest_batteryinfoview_report = None
+_wmi_provider = ComWmiProvider()
+BATTERY_PROBE_TIMEOUT = 45.0
 
-    try:
-        build_number = int(os_info.BuildNumber)
-    except (TypeError, ValueError):
-        return "Unknown"
-    return "Windows 11" if build_number >= 22000 else "Windows 10"
 
-_laptop_specs_cache = None
-_latest_batteryinfoview_report = None
+def set_wmi_provider(provider) -> None:
+    """Swap the WMI backend (e.g. for ``wmi_probes.FakeWmiProvider``) and drop cached specs."""
+    global _wmi_provider, _specs_cache_entries
+    _wmi_provider = provider
+    _specs_cache_entries = None
 
-def reset_specs_cache() -> None:
-    """Clear the in-memory cache and remove the persisted specs cache file."""
-    global _laptop_specs_cache
-    _laptop_specs_cache = None
-    cache_path = _specs_cache_path()
-    if cache_path.exists():
-        try:
-            cache_path.unlink()
-        except Exception as exc:
-            log_event(f"Failed to delete specs cache file: {exc}")
 
-def get_laptop_specs(force_refresh=False):
-    global _laptop_specs_cache
-    if _laptop_specs_cache is not None and not force_refresh:
-        log_event("Returning cached laptop specs.")
-        return _laptop_specs_cache.copy()
+def _probe_battery(session, log) -> dict:
+    healths = get_battery_health()
+    if not healths:
+        log("Detected Battery Health: Unknown")
+        return {"Battery": "Unknown"}
+    fields = {"Battery": healths[0] if isinstance(healths[0], str) else "Unknown"}
+    log(f"Detected Battery Health: {fields['Battery']}")
+    for index, entry in enumerate(healths[1:], start=2):
+        stats = entry if isinstance(entry, str) else "Unknown"
+        fields[f"Battery {index}"] = stats
+        log(f"Detected Battery {index} Health: {stats}")
+    return fields
+
+
+SPEC_PROBES = WMI_PROBES + (
+    Probe("battery", _probe_battery, timeout=BATTERY_PROBE_TIMEOUT, uses_wmi=False),
+)
+
+
+def reset_specs_cache(include_static: bool = False) -> None:
+    """
+    Mark cached volatile specs (serial, display, Windows, battery) stale so they are probed again.
+
+    Static hardware entries survive unless ``include_static`` is set, in which
+    case the persisted cache file is removed entirely.
+    """
+    global _specs_cache_entries
+    if include_static:
+        _specs_cache_entries = None
+        cache_path = _specs_cache_path()
+        if cache_path.exists():
+            try:
+                cache_path.unlink()
+            except Exception as exc:
+                log_event(f"Failed to delete specs cache file: {exc}")
+        return
+
+    entries = _specs_cache_entries if _specs_cache_entries is not None else _load_specs_entries()
+    # Volatile entries are marked stale rather than dropped, so the next probe can
+    # compare the BIOS serial with the one the static entries were cached with.
+    kept = {
+        name: dict(entry, collected_at=0) if name in VOLATILE_SPEC_PROBES and isinstance(entry, dict) else entry
+        for name, entry in entries.items()
+    }
+    _specs_cache_entries = kept
+    if kept != entries:
+        _save_specs_entries(kept)
 
-    if not force_refresh:
-        cached_specs = _load_cached_specs()
-        if cached_specs:
-            _laptop_specs_cache = cached_specs.copy()
-            return _laptop_specs_cache.copy()
 
-    log_event("Fetching laptop specs...")
-    pythoncom.CoInitialize()
+def _merge_cached_specs(entries: dict) -> dict:
     specs = {
         "Serial Number": "Unknown",
         "CPU": "Unknown",
@@ -160,110 +224,80 @@ def get_laptop_specs(force_refresh=False):
         "Battery": "Unknown",
         "Battery 2": None
     }
+    for probe in SPEC_PROBES:
+        entry = entries.get(probe.name)
+        if isinstance(entry, dict) and isinstance(entry.get("fields"), dict):
+            specs.update(entry["fields"])
+    return specs
 
-    try:
-        c = wmi.WMI()
-        log_event("Initialized WMI interface.")
-
-        for cpu in c.Win32_Processor():
-            specs["CPU"] = parse_cpu_family_and_model(cpu.Name)
-            log_event(f"Detected CPU: {specs['CPU']}")
-            break
-
-        bios = c.Win32_BIOS()[0]
-        specs["Serial Number"] = bios.SerialNumber.strip()
-        log_event(f"Detected Serial Number: {specs['Serial Number']}")
-
-        for display in c.Win32_VideoController():
-            if display.CurrentHorizontalResolution and display.CurrentVerticalResolution:
-                specs["Resolution"] = f"{display.CurrentHorizontalResolution}x{display.CurrentVerticalResolution}"
-                log_event(f"Detected Resolution: {specs['Resolution']}")
-                break
-
-        os_info = c.Win32_OperatingSystem()[0]
-        specs["Windows"] = format_windows_caption(os_info)
-        log_event(f"Detected Windows Version: {specs['Windows']}")
-
-        system_info = c.Win32_ComputerSystem()[0]
-        manufacturer = (system_info.Manufacturer or "").lower()
-        family_model = _strip_thinkpad_prefix(getattr(system_info, "SystemFamily", ""))
-        detected_model = _strip_thinkpad_prefix(getattr(system_info, "Model", ""))
-        fallback_model = (system_info.Model or "").strip()
-        if "lenovo" in manufacturer:
-            specs["Model"] = family_model or detected_model or fallback_model
-        else:
-            specs["Model"] = detected_model or fallback_model
-        log_event(f"Detected Model: {specs['Model']}")
-
-        specs["RAM"] = f"{round(psutil.virtual_memory().total / (1024**3))}GB"
-        log_event(f"Detected RAM: {specs['RAM']}")
-
-        # --- Improved SSD/Drive Size Calculation ---
-        drive_sizes = []
-        drive_type = "HDD"
-        physical_drives = {}
-        for disk in c.Win32_DiskDrive():
-            # Skip USB/removable drives
-            if hasattr(disk, "InterfaceType") and disk.InterfaceType and disk.InterfaceType.upper() == "USB":
-                continue
-            if hasattr(disk, "MediaType") and disk.MediaType and "removable" in disk.MediaType.lower():
-                continue
-            # Get size in GB
-            if disk.Size:
-                size_gb = int(int(disk.Size) / (1000 ** 3))
-                physical_drives[disk.DeviceID] = size_gb
-                caption = disk.Caption.lower()
-                media_type = disk.MediaType.lower() if disk.MediaType else ""
-                if any(x in caption for x in ["ssd", "nvme", "m.2"]) or "ssd" in media_type:
-                    drive_type = "SSD"
-
-        # Map logical disks to physical disks and only count those on non-removable drives
-        for partition in c.Win32_DiskPartition():
-            for logical in partition.associators("Win32_LogicalDiskToPartition"):
-                # Find the physical drive for this partition
-                for disk in c.Win32_DiskDrive():
-                    for part in disk.associators("Win32_DiskDriveToDiskPartition"):
-                        if part.DeviceID == partition.DeviceID and disk.DeviceID in physical_drives:
-                            # Only add size if not already counted
-                            if physical_drives[disk.DeviceID] not in drive_sizes:
-                                drive_sizes.append(physical_drives[disk.DeviceID])
-
-        if drive_sizes:
-            specs["SSD"] = "+".join(f"{size}GB" for size in drive_sizes)
-            specs["Drive Type"] = drive_type
-            log_event(f"Detected SSD: {specs['SSD']} ({specs['Drive Type']})")
-
-        healths = get_battery_health()
-        if not healths:
-            specs["Battery"] = "Unknown"
-            log_event("Detected Battery Health: Unknown")
-        else:
-            specs["Battery"] = healths[0] if isinstance(healths[0], str) else "Unknown"
-            log_event(f"Detected Battery Health: {specs['Battery']}")
-            for index, entry in enumerate(healths[1:], start=2):
-                stats = entry if isinstance(entry, str) else "Unknown"
-                specs[f"Battery {index}"] = stats
-                log_event(f"Detected Battery {index} Health: {stats}")
 
-    except Exception as e:
-        log_event(f"Exception in get_laptop_specs: {e}")
-        raise
-    finally:
-        pythoncom.CoUninitialize()
+def _bios_serial_changed(entries: dict, run) -> bool:
+    """True when the freshly probed BIOS serial differs from the cached one."""
+    cached = entries.get("bios")
+    if not isinstance(cached, dict) or not isinstance(cached.get("fields"), dict):
+        return False
+    cached_serial = cached["fields"].get("Serial Number")
+    probed_serial = run.results.get("bios", {}).get("Serial Number")
+    return bool(cached_serial and probed_serial and cached_serial != probed_serial)
+
+
+@traced()
+def get_laptop_specs(force_refresh=False):
+    """
+    Return laptop specs, re-probing only the cache entries that are stale.
+
+    Each probe's fields are cached separately with a static or volatile TTL;
+    ``force_refresh`` re-probes everything.
+    """
+    global _specs_cache_entries
+    if _specs_cache_entries is None:
+        _specs_cache_entries = _load_specs_entries()
+    entries = dict(_specs_cache_entries)
+
+    now = time.time()
+    stale = [
+        probe for probe in SPEC_PROBES
+        if force_refresh or not _entry_is_fresh(entries.get(probe.name), probe.name, now)
+    ]
+    if not stale:
+        log_event("Returning cached laptop specs.")
+        return _merge_cached_specs(entries)
+
+    log_event(f"Fetching laptop specs ({', '.join(probe.name for probe in stale)})...")
+    run = collect_probes(_wmi_provider, stale, log=log_event)
+    if _bios_serial_changed(entries, run):
+        # Same fingerprint, different board: every cached hardware entry may be wrong.
+        log_event("BIOS serial changed since specs were cached; re-probing all hardware.")
+        entries = {}
+        rest = [probe for probe in SPEC_PROBES if probe.name not in run.status]
+        if rest:
+            extra = collect_probes(_wmi_provider, rest, log=log_event)
+            for attribute in ("fields", "results", "status", "durations_ms"):
+                getattr(run, attribute).update(getattr(extra, attribute))
+    log_event(f"Spec probe timings (ms): {run.durations_ms}")
+
+    wmi_names = [probe.name for probe in stale if probe.uses_wmi]
+    if wmi_names and not run.succeeded(wmi_names) and not any(name in entries for name in wmi_names):
+        message = f"Exception in get_laptop_specs: no WMI probe succeeded ({run.status})"
+        log_event(message)
+        raise RuntimeError(message)
+
+    for name, fields in run.results.items():
+        entries[name] = {"collected_at": now, "fields": fields}
+    _specs_cache_entries = entries
+    if run.results:
+        _save_specs_entries(entries)
+
+    if not run.complete:
+        # Failed probes keep their previous (stale) entry, if any, and are retried next call.
+        log_event(f"Laptop specs fetched with incomplete probes: {run.status}")
+    else:
+        log_event("Laptop specs fetched successfully.")
+    return _merge_cached_specs(entries)
 
-    _laptop_specs_cache = specs.copy()
-    _save_specs_cache(specs)
-    log_event("Laptop specs fetched successfully.")
-    return specs
 
 def get_live_battery_percent():
-    try:
-        w = wmi.WMI()
-        for battery in w.Win32_Battery():
-            return int(battery.EstimatedChargeRemaining)
-    except Exception as e:
-        log_event(f"Error reading live battery percent: {e}")
-    return None
+    return get_battery_snapshot().percent(0)
 
 def get_latest_batteryinfoview_report():
     """Return the most recent raw BatteryInfoView export captured during spec scan."""
@@ -0,0 +1,121 @@
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from utils.log_writer import BackgroundLogWriter
+
+EVENTS_FILENAME = "events.jsonl"
+
+_LOCAL = threading.local()
+_SINK: Optional[Callable[[Dict[str, Any]], None]] = None
+_EVENT_WRITER: Optional[BackgroundLogWriter] = None
+_WRITER_LOCK = threading.Lock()
+
+
+def get_events_path() -> str:
+    from utils.helpers import get_app_dir
+
+    return os.path.join(get_app_dir(), EVENTS_FILENAME)
+
+
+def _default_sink(event: Dict[str, Any]) -> None:
+    global _EVENT_WRITER
+    if _EVENT_WRITER is None:
+        with _WRITER_LOCK:
+            if _EVENT_WRITER is None:
+                writer = BackgroundLogWriter(get_events_path)
+                writer.install_exit_hooks()
+                _EVENT_WRITER = writer
+    _EVENT_WRITER.write(json.dumps(event, default=str, separators=(",", ":")) + "\n")
+
+
+def set_event_sink(sink: Optional[Callable[[Dict[str, Any]], None]]) -> None:
+    """Redirect span events (e.g. to a list in tests); None restores events.jsonl."""
+
+    global _SINK
+    _SINK = sink
+
+
+def emit_event(event: Dict[str, Any]) -> None:
+    try:
+        (_SINK or _default_sink)(event)
+    except Exception as exc:
+        print(f"Failed to record telemetry event: {exc}")
+
+
+def _span_stack() -> List[Dict[str, Any]]:
+    stack = getattr(_LOCAL, "stack", None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    return stack
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block and emit one JSON event for it when it ends.
+
+    Spans nest per thread: the event carries the enclosing span's id as
+    ``parent_id`` and the outermost span's id as ``trace_id``. The yielded dict
+    can be updated with extra attributes while the span is open.
+    """
+
+    stack = _span_stack()
+    parent = stack[-1] if stack else None
+    span_id = uuid.uuid4().hex[:16]
+    current = {
+        "span_id": span_id,
+        "trace_id": parent["trace_id"] if parent else span_id,
+        "attrs": dict(attrs),
+    }
+    stack.append(current)
+    started_at = datetime.datetime.now().isoformat(timespec="milliseconds")
+    started = time.perf_counter()
+    status = "ok"
+    error = None
+    try:
+        yield current["attrs"]
+    except BaseException as exc:
+        status = "error"
+        error = type(exc).__name__
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000.0
+        stack.pop()
+        event = {
+            "ts": started_at,
+            "span": name,
+            "duration_ms": round(duration_ms, 3),
+            "status": status,
+            "span_id": span_id,
+            "parent_id": parent["span_id"] if parent else None,
+            "trace_id": current["trace_id"],
+            "thread": threading.current_thread().name,
+        }
+        if error:
+            event["error"] = error
+        if current["attrs"]:
+            event["attrs"] = current["attrs"]
+        emit_event(event)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator form of :func:`span`, named after the function by default."""
+
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,248 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+DELIVERED = "delivered"
+RETRY = "retry"
+REJECTED = "rejected"
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_DEAD = "dead"
+
+DEFAULT_MAX_CONCURRENT = 2
+DEFAULT_BASE_DELAY = 5.0
+DEFAULT_MAX_DELAY = 300.0
+IDLE_POLL_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+@dataclass
+class OutboxItem:
+    id: int
+    idempotency_key: str
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+# A handler sends one item and returns (DELIVERED | RETRY | REJECTED, detail).
+Handler = Callable[[OutboxItem], "tuple[str, str]"]
+
+
+class UploadOutbox:
+    """
+    Durable queue of Web-Tools uploads backed by a local SQLite file.
+
+    ``enqueue()`` commits the upload to disk and returns at once; sender
+    threads (``max_concurrent`` of them) deliver due items through the handler
+    registered for their kind. RETRY results are rescheduled with exponential
+    backoff and jitter, REJECTED ones are parked as ``dead`` with the last
+    error. Every item carries an idempotency key that handlers send as the
+    ``Idempotency-Key`` header, so the replay after a crash mid-send is safe.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        handlers: Dict[str, Handler],
+        *,
+        max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        log: Optional[Callable[[str], None]] = None,
+    ):
+        self.path = path
+        self._handlers = dict(handlers)
+        self.max_concurrent = max(1, max_concurrent)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._log = log or (lambda message: None)
+        self._claim_lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._in_flight = 0
+        self.delivered = 0
+        self.retried = 0
+        self.rejected = 0
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            # Anything still marked as sending was interrupted by a crash.
+            recovered = conn.execute(
+                "UPDATE outbox SET status = ? WHERE status = ?", (STATUS_PENDING, STATUS_SENDING)
+            ).rowcount
+        if recovered:
+            self._log(f"Upload outbox: re-queued {recovered} upload(s) interrupted mid-send.")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], idempotency_key: Optional[str] = None) -> str:
+        """Persist an upload for delivery; returns its idempotency key."""
+
+        if kind not in self._handlers:
+            raise ValueError(f"No outbox handler registered for '{kind}'")
+        key = idempotency_key or uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, kind, payload, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(payload), now, now),
+            )
+        self._log(f"Upload outbox: queued {kind} key={key}")
+        with self._wake:
+            self._wake.notify_all()
+        return key
+
+    def start(self) -> "UploadOutbox":
+        with self._wake:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            self._stop.clear()
+            while len(self._threads) < self.max_concurrent:
+                thread = threading.Thread(target=self._run_sender, name="upload-outbox", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+        for thread in list(self._threads):
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def drain(self, timeout: float) -> bool:
+        """Block until every queued upload is delivered or dead; False on timeout."""
+
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.stats()["pending"] == 0 and self._in_flight == 0:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            with self._wake:
+                self._wake.wait(min(0.05, remaining))
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        return {
+            "pending": int(rows.get(STATUS_PENDING, 0)) + int(rows.get(STATUS_SENDING, 0)),
+            "dead": int(rows.get(STATUS_DEAD, 0)),
+            "in_flight": self._in_flight,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "rejected": self.rejected,
+        }
+
+    def _next_due_in(self) -> Optional[float]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (STATUS_PENDING,)
+            ).fetchone()
+        if not row or row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def _claim(self) -> Optional[OutboxItem]:
+        with self._claim_lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, idempotency_key, kind, payload, attempts FROM outbox "
+                "WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT 1",
+                (STATUS_PENDING, time.time()),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE outbox SET status = ? WHERE id = ?", (STATUS_SENDING, row[0]))
+        with self._wake:
+            self._in_flight += 1
+        return OutboxItem(row[0], row[1], row[2], json.loads(row[3]), row[4])
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _finish(self, item: OutboxItem, outcome: str, detail: str) -> None:
+        attempts = item.attempts + 1
+        with self._connect() as conn:
+            if outcome == DELIVERED:
+                conn.execute("DELETE FROM outbox WHERE id = ?", (item.id,))
+            elif outcome == REJECTED:
+                conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, last_error = ? WHERE id = ?",
+                    (STATUS_DEAD, attempts, detail, item.id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                    (STATUS_PENDING, attempts, detail, time.time() + self._backoff(attempts), item.id),
+                )
+        with self._wake:
+            self._in_flight -= 1
+            if outcome == DELIVERED:
+                self.delivered += 1
+            elif outcome == REJECTED:
+                self.rejected += 1
+            else:
+                self.retried += 1
+            self._wake.notify_all()
+        self._log(f"Upload outbox: {item.kind} key={item.idempotency_key} attempt={attempts} {outcome} {detail}".rstrip())
+
+    def _run_sender(self) -> None:
+        while not self._stop.is_set():
+            try:
+                item = self._claim()
+            except sqlite3.Error as exc:
+                self._log(f"Upload outbox read failed: {exc}")
+                item = None
+            if item is None:
+                try:
+                    due_in = self._next_due_in()
+                except sqlite3.Error:
+                    due_in = None
+                wait = IDLE_POLL_SECONDS if due_in is None else min(IDLE_POLL_SECONDS, due_in)
+                with self._wake:
+                    if not self._stop.is_set():
+                        self._wake.wait(max(0.01, wait))
+                continue
+            handler = self._handlers.get(item.kind)
+            try:
+                outcome, detail = handler(item) if handler else (REJECTED, "no handler")
+            except Exception as exc:
+                outcome, detail = RETRY, f"handler error: {exc}"
+            try:
+                self._finish(item, outcome, detail)
+            except sqlite3.Error as exc:
+                self._log(f"Upload outbox write failed: {exc}")
+                with self._wake:
+                    self._in_flight -= 1
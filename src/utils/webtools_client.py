@@ -0,0 +1,266 @@
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import uuid
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_BASE_URL = "http://192.168.1.188:5001"
+RETRY_STATUSES = (500, 502, 503, 504)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 1.0
+DEFAULT_POOL_SIZE = 4
+REPORT_UPLOAD_JSON = "json"
+REPORT_UPLOAD_MULTIPART = "multipart"
+STREAM_CHUNK_SIZE = 64 * 1024
+# Compressed bodies stay in memory up to this size, then spill to a temp file.
+GZIP_SPOOL_BYTES = 1024 * 1024
+HTTP_UNSUPPORTED_MEDIA_TYPE = 415
+
+
+@dataclass(frozen=True)
+class WebToolsConfig:
+    base_url: str
+    api_key: str
+    report_upload: str = REPORT_UPLOAD_JSON
+    compress: bool = False
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key) and self.api_key != "<SECRET>"
+
+
+class MultipartStream:
+    """
+    ``multipart/form-data`` body that is generated while it is sent.
+
+    Field values are small byte strings; file parts are read from disk in
+    ``STREAM_CHUNK_SIZE`` pieces, so a large attachment is never held in
+    memory. ``__len__`` lets requests send a Content-Length instead of
+    chunking, and ``seek(0)`` lets urllib3 rewind the body for a retry.
+    """
+
+    def __init__(
+        self,
+        fields: List[Tuple[str, bytes, str]],
+        files: List[Tuple[str, str, str, str]],
+        boundary: Optional[str] = None,
+    ):
+        self.boundary = boundary or uuid.uuid4().hex
+        self._segments: List[Union[bytes, str]] = []
+        for name, value, content_type in fields:
+            self._segments.append(self._part_header(name, None, content_type) + value + b"\r\n")
+        for name, filename, path, content_type in files:
+            self._segments.append(self._part_header(name, filename, content_type))
+            self._segments.append(path)
+            self._segments.append(b"\r\n")
+        self._segments.append(f"--{self.boundary}--\r\n".encode("ascii"))
+        self._length = sum(len(part) if isinstance(part, bytes) else os.path.getsize(part) for part in self._segments)
+        self._reset()
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _part_header(self, name: str, filename: Optional[str], content_type: str) -> bytes:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        return (
+            f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\nContent-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+
+    def _reset(self) -> None:
+        self._index = 0
+        self._offset = 0
+        self._position = 0
+        self._handle: Optional[BinaryIO] = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("MultipartStream only seeks from the start")
+        self.close()
+        self._reset()
+        while self._position < offset and self.read(min(STREAM_CHUNK_SIZE, offset - self._position)):
+            pass
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        size = self._length if size is None or size < 0 else size
+        chunks = []
+        while size > 0 and self._index < len(self._segments):
+            segment = self._segments[self._index]
+            if isinstance(segment, bytes):
+                chunk = segment[self._offset:self._offset + size]
+                self._offset += len(chunk)
+                done = self._offset >= len(segment)
+            else:
+                if self._handle is None:
+                    self._handle = open(segment, "rb")
+                chunk = self._handle.read(min(size, STREAM_CHUNK_SIZE))
+                done = not chunk
+                if done:
+                    self._handle.close()
+                    self._handle = None
+            if done:
+                self._index += 1
+                self._offset = 0
+            if chunk:
+                chunks.append(chunk)
+                size -= len(chunk)
+                self._position += len(chunk)
+        return b"".join(chunks)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class _SizedBody:
+    """Read-only view of a spooled file with a known length (avoids requests calling fileno())."""
+
+    def __init__(self, handle: BinaryIO, length: int):
+        self._handle = handle
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        return self._handle.read(size)
+
+    def tell(self) -> int:
+        return self._handle.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._handle.seek(offset, whence)
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+def gzip_body(body: Union[bytes, BinaryIO]) -> Union[bytes, _SizedBody]:
+    """Gzip a request body; streams are compressed through a spooled temp file."""
+
+    if isinstance(body, bytes):
+        return gzip.compress(body)
+    spool = tempfile.SpooledTemporaryFile(max_size=GZIP_SPOOL_BYTES)
+    with gzip.GzipFile(fileobj=spool, mode="wb") as compressor:
+        shutil.copyfileobj(body, compressor, STREAM_CHUNK_SIZE)
+    length = spool.tell()
+    spool.seek(0)
+    return _SizedBody(spool, length)
+
+
+class WebToolsClient:
+    """
+    Shared HTTP client for the Web-Tools API.
+
+    One ``requests.Session`` keeps connections alive and pooled, so the hash
+    upload and the check report of an assignment reuse the same socket. Retries
+    on connection errors and 5xx responses (with exponential backoff and
+    ``Retry-After`` support) are handled by the mounted ``HTTPAdapter`` instead
+    of sleep loops in every caller. The final 5xx response is returned rather
+    than raised, so callers can still classify it. ``send(retry=False)`` uses
+    a second session that makes a single attempt, for callers that queue the
+    upload in the outbox on failure and let its sender do the retrying.
+    """
+
+    def __init__(
+        self,
+        config: WebToolsConfig,
+        *,
+        retries: int = DEFAULT_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        pool_size: int = DEFAULT_POOL_SIZE,
+    ):
+        self.config = config
+        self.base_url = config.base_url.rstrip("/")
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            # Uploads carry an Idempotency-Key, so resending a POST is safe.
+            allowed_methods=None,
+            raise_on_status=False,
+            respect_retry_after_header=True,
+        )
+        self.session = self._session(HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry))
+        self.single_attempt_session = self._session(
+            HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=Retry(total=0, raise_on_status=False))
+        )
+        # Downgraded for the rest of the process when the server answers 415.
+        self.report_upload = config.report_upload
+        self.compress = config.compress
+
+    def _session(self, adapter: HTTPAdapter) -> requests.Session:
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"X-Second-Check-Key": self.config.api_key})
+        return session
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def post(self, path: str, *, headers: Optional[Dict[str, str]] = None, **kwargs: Any) -> requests.Response:
+        return self.session.post(self.url(path), headers=headers, **kwargs)
+
+    def send(
+        self,
+        path: str,
+        body: Union[bytes, MultipartStream],
+        content_type: str,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 30,
+        retry: bool = True,
+    ) -> requests.Response:
+        """
+        POST a prepared body, gzip-encoded when compression is enabled.
+
+        A 415 reply to a compressed body turns compression off for this client
+        and the request is sent again uncompressed. With ``retry=False`` the
+        request is made once, without the adapter's retries and backoff.
+        """
+
+        session = self.session if retry else self.single_attempt_session
+        request_headers = {**(headers or {}), "Content-Type": content_type}
+        if self.compress:
+            compressed = gzip_body(body)
+            try:
+                response = session.post(
+                    self.url(path),
+                    data=compressed,
+                    headers={**request_headers, "Content-Encoding": "gzip"},
+                    timeout=timeout,
+                )
+            finally:
+                if not isinstance(compressed, bytes):
+                    compressed.close()
+            if response.status_code != HTTP_UNSUPPORTED_MEDIA_TYPE:
+                return response
+            self.compress = False
+            if not isinstance(body, bytes):
+                body.seek(0)
+        return session.post(self.url(path), data=body, headers=request_headers, timeout=timeout)
+
+    def close(self) -> None:
+        self.session.close()
+        self.single_attempt_session.close()
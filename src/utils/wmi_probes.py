@@ -0,0 +1,429 @@
+"""
+Hardware probes used by ``utils.specs.get_laptop_specs``.
+
+Each probe reads one independent slice of the machine (CPU, BIOS, display, OS,
+model, RAM, disks, battery) and returns the spec fields it owns. ``collect_probes``
+runs them on separate daemon threads, each inside its own COM apartment, and
+returns whatever finished before the per-probe timeouts expire.
+
+WMI access goes through a provider so the same code can run against
+``FakeWmiProvider`` on machines without WMI (tests and benchmarks).
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_PROBE_TIMEOUT = 15.0
+
+LogFn = Callable[[str], None]
+
+
+def _no_log(message: str) -> None:
+    pass
+
+
+class ComWmiProvider:
+    """Real WMI backend; ``wmi``/``pythoncom`` are imported on first use."""
+
+    @contextmanager
+    def session(self) -> Iterator["ComWmiSession"]:
+        import pythoncom
+        import wmi
+
+        pythoncom.CoInitialize()
+        try:
+            yield ComWmiSession(wmi.WMI())
+        finally:
+            pythoncom.CoUninitialize()
+
+
+class ComWmiSession:
+    def __init__(self, client):
+        self._client = client
+
+    def query(self, class_name: str) -> List[Any]:
+        return list(getattr(self._client, class_name)())
+
+    def references(self, assoc_class: str) -> List[Tuple[str, str]]:
+        """Return raw ``(Antecedent, Dependent)`` object paths for an association class."""
+
+        pairs = []
+        for link in getattr(self._client, assoc_class)():
+            # wmi_property() returns the raw path; plain attribute access would
+            # resolve each reference with another COM round trip.
+            pairs.append((link.wmi_property("Antecedent").value, link.wmi_property("Dependent").value))
+        return pairs
+
+
+_PATH_KEY_PATTERN = re.compile(r'DeviceID="((?:[^"\\]|\\.)*)"')
+_PATH_ESCAPE_PATTERN = re.compile(r"\\(.)")
+
+
+def parse_device_id_from_path(path: Optional[str]) -> Optional[str]:
+    """Extract the ``DeviceID`` key from a WMI object path, undoing WMI escaping."""
+
+    match = _PATH_KEY_PATTERN.search(str(path or ""))
+    if not match:
+        return None
+    return _PATH_ESCAPE_PATTERN.sub(r"\1", match.group(1))
+
+
+def wmi_reference_path(class_name: str, device_id: str) -> str:
+    escaped = str(device_id).replace("\\", "\\\\").replace('"', '\\"')
+    return f'\\\\LOCALHOST\\root\\cimv2:{class_name}.DeviceID="{escaped}"'
+
+
+class FakeWmiObject:
+    """Attribute bag standing in for a ``wmi._wmi_object``."""
+
+    def __init__(self, provider: "FakeWmiProvider", class_name: str, properties: Dict[str, Any]):
+        self._provider = provider
+        self._class_name = class_name
+        self.__dict__.update(properties)
+
+    def associators(self, assoc_class: str) -> List["FakeWmiObject"]:
+        return self._provider.associators(self._class_name, getattr(self, "DeviceID", None), assoc_class)
+
+
+class FakeWmiProvider:
+    """
+    In-memory WMI backend.
+
+    ``tables`` maps a WMI class name to a list of property dicts. ``delays``
+    adds a per-class sleep to every query and ``row_latency`` a further sleep
+    per returned row. ``associations`` maps an association class to
+    ``((class, DeviceID), (class, DeviceID))`` antecedent/dependent pairs.
+    ``calls`` counts sessions, queries and associator lookups.
+    """
+
+    def __init__(
+        self,
+        tables: Dict[str, List[Dict[str, Any]]],
+        *,
+        delays: Optional[Dict[str, float]] = None,
+        row_latency: float = 0.0,
+        associations: Optional[Dict[str, List[Tuple[Tuple[str, Any], Tuple[str, Any]]]]] = None,
+        failures: Optional[Dict[str, Exception]] = None,
+    ):
+        self.tables = tables
+        self.delays = delays or {}
+        self.row_latency = row_latency
+        self.associations = associations or {}
+        self.failures = failures or {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+    def _simulate(self, class_name: str, rows: int) -> None:
+        delay = self.delays.get(class_name, 0.0) + self.row_latency * rows
+        if delay:
+            time.sleep(delay)
+        if class_name in self.failures:
+            raise self.failures[class_name]
+
+    @contextmanager
+    def session(self) -> Iterator["FakeWmiProvider"]:
+        self._count("session")
+        yield self
+
+    def query(self, class_name: str) -> List[FakeWmiObject]:
+        self._count(class_name)
+        rows = self.tables.get(class_name, [])
+        self._simulate(class_name, len(rows))
+        return [FakeWmiObject(self, class_name, row) for row in rows]
+
+    def references(self, assoc_class: str) -> List[Tuple[str, str]]:
+        self._count(assoc_class)
+        links = self.associations.get(assoc_class, [])
+        self._simulate(assoc_class, len(links))
+        return [(wmi_reference_path(*antecedent), wmi_reference_path(*dependent)) for antecedent, dependent in links]
+
+    def _find(self, class_name: str, device_id: Any) -> Optional[FakeWmiObject]:
+        for row in self.tables.get(class_name, []):
+            if row.get("DeviceID") == device_id:
+                return FakeWmiObject(self, class_name, row)
+        return None
+
+    def associators(self, class_name: str, device_id: Any, assoc_class: str) -> List[FakeWmiObject]:
+        self._count(f"associators:{assoc_class}")
+        key = (class_name, device_id)
+        related = []
+        for antecedent, dependent in self.associations.get(assoc_class, []):
+            other = dependent if antecedent == key else antecedent if dependent == key else None
+            if other is not None:
+                related.append(other)
+        self._simulate(assoc_class, len(related))
+        return [obj for obj in (self._find(*other) for other in related) if obj is not None]
+
+
+# --- Parsers -----------------------------------------------------------------
+
+
+def strip_thinkpad_prefix(value: Optional[str]) -> str:
+    """Remove a leading ThinkPad/Thinkpad token if it appears at the start."""
+    if not value:
+        return ""
+    sanitized = value.strip()
+    match = re.match(r"(?i)^thinkpad(?:[\s\-]+)?", sanitized)
+    if match:
+        sanitized = sanitized[match.end():].strip()
+    return sanitized
+
+
+def parse_cpu_family_and_model(cpu_name):
+    """
+    Extracts the CPU family and model from a CPU name string.
+    Examples:
+        Intel(R) Core(TM) i5-8350U CPU @ 1.70GHz -> i5-8350U
+        Intel(R) Core(TM) i7-1165G7 -> i7-1165G7
+        AMD Ryzen 5 3500U -> Ryzen 5 3500U
+        AMD Ryzen 7 5800H -> Ryzen 7 5800H
+    """
+    cpu_name = cpu_name.strip()
+    cpu_name = re.sub(r"with\s+[\w\-]+\s+Graphics", "", cpu_name, flags=re.IGNORECASE).strip()
+    # Intel Core iX-YYYY
+    intel = re.search(r'(i[3579]-[A-Za-z0-9]+)', cpu_name, re.IGNORECASE)
+    if intel:
+        return intel.group(1)
+    # AMD Ryzen <series> (capture up to CPU/@ or end)
+    amd = re.search(r'(Ryzen\s[\w\-\s]+?)(?:\s+CPU|\s*@|$)', cpu_name, re.IGNORECASE)
+    if amd:
+        return amd.group(1).strip()
+    # Fallback: just return the first 2 words
+    return cpu_name
+
+
+def format_windows_caption(os_info) -> str:
+    caption = str(getattr(os_info, "Caption", "") or "").strip()
+    caption = re.sub(r"^Microsoft\s+", "", caption, flags=re.IGNORECASE)
+    caption = re.sub(r"\s+", " ", caption).strip()
+    if caption:
+        return caption
+
+    try:
+        build_number = int(os_info.BuildNumber)
+    except (TypeError, ValueError):
+        return "Unknown"
+    return "Windows 11" if build_number >= 22000 else "Windows 10"
+
+
+# --- Probes --------------------------------------------------------------------
+
+
+def probe_cpu(session, log: LogFn) -> Dict[str, Any]:
+    for cpu in session.query("Win32_Processor"):
+        value = parse_cpu_family_and_model(cpu.Name)
+        log(f"Detected CPU: {value}")
+        return {"CPU": value}
+    return {}
+
+
+def probe_bios(session, log: LogFn) -> Dict[str, Any]:
+    bios = session.query("Win32_BIOS")[0]
+    serial = bios.SerialNumber.strip()
+    log(f"Detected Serial Number: {serial}")
+    return {"Serial Number": serial}
+
+
+def probe_display(session, log: LogFn) -> Dict[str, Any]:
+    for display in session.query("Win32_VideoController"):
+        if display.CurrentHorizontalResolution and display.CurrentVerticalResolution:
+            value = f"{display.CurrentHorizontalResolution}x{display.CurrentVerticalResolution}"
+            log(f"Detected Resolution: {value}")
+            return {"Resolution": value}
+    return {}
+
+
+def probe_os(session, log: LogFn) -> Dict[str, Any]:
+    os_info = session.query("Win32_OperatingSystem")[0]
+    value = format_windows_caption(os_info)
+    log(f"Detected Windows Version: {value}")
+    return {"Windows": value}
+
+
+def probe_system(session, log: LogFn) -> Dict[str, Any]:
+    system_info = session.query("Win32_ComputerSystem")[0]
+    manufacturer = (system_info.Manufacturer or "").lower()
+    family_model = strip_thinkpad_prefix(getattr(system_info, "SystemFamily", ""))
+    detected_model = strip_thinkpad_prefix(getattr(system_info, "Model", ""))
+    fallback_model = (system_info.Model or "").strip()
+    if "lenovo" in manufacturer:
+        value = family_model or detected_model or fallback_model
+    else:
+        value = detected_model or fallback_model
+    log(f"Detected Model: {value}")
+    return {"Model": value}
+
+
+def probe_ram(session, log: LogFn) -> Dict[str, Any]:
+    import psutil
+
+    value = f"{round(psutil.virtual_memory().total / (1024**3))}GB"
+    log(f"Detected RAM: {value}")
+    return {"RAM": value}
+
+
+def probe_disks(session, log: LogFn) -> Dict[str, Any]:
+    drive_sizes = []
+    drive_type = "HDD"
+    physical_drives = {}
+    drive_order = []
+    for disk in session.query("Win32_DiskDrive"):
+        drive_order.append(disk.DeviceID)
+        # Skip USB/removable drives
+        if hasattr(disk, "InterfaceType") and disk.InterfaceType and disk.InterfaceType.upper() == "USB":
+            continue
+        if hasattr(disk, "MediaType") and disk.MediaType and "removable" in disk.MediaType.lower():
+            continue
+        # Get size in GB
+        if disk.Size:
+            size_gb = int(int(disk.Size) / (1000 ** 3))
+            physical_drives[disk.DeviceID] = size_gb
+            caption = disk.Caption.lower()
+            media_type = disk.MediaType.lower() if disk.MediaType else ""
+            if any(x in caption for x in ["ssd", "nvme", "m.2"]) or "ssd" in media_type:
+                drive_type = "SSD"
+
+    # Map logical disks to physical disks with one query per association class
+    # and join in memory, instead of calling associators() per partition/drive.
+    mounted_partitions = set()
+    for partition_path, _logical_path in session.references("Win32_LogicalDiskToPartition"):
+        partition_id = parse_device_id_from_path(partition_path)
+        if partition_id is not None:
+            mounted_partitions.add(partition_id)
+
+    drives_by_partition: Dict[str, set] = {}
+    for drive_path, partition_path in session.references("Win32_DiskDriveToDiskPartition"):
+        drive_id = parse_device_id_from_path(drive_path)
+        partition_id = parse_device_id_from_path(partition_path)
+        if drive_id is not None and partition_id is not None:
+            drives_by_partition.setdefault(partition_id, set()).add(drive_id)
+
+    # Keep the previous ordering (partition order, then drive order) and the
+    # "count each size once" rule so the SSD text is unchanged.
+    for partition in session.query("Win32_DiskPartition"):
+        if partition.DeviceID not in mounted_partitions:
+            continue
+        owners = drives_by_partition.get(partition.DeviceID, set())
+        for drive_id in drive_order:
+            if drive_id in owners and drive_id in physical_drives:
+                if physical_drives[drive_id] not in drive_sizes:
+                    drive_sizes.append(physical_drives[drive_id])
+
+    if not drive_sizes:
+        return {}
+    value = "+".join(f"{size}GB" for size in drive_sizes)
+    log(f"Detected SSD: {value} ({drive_type})")
+    return {"SSD": value, "Drive Type": drive_type}
+
+
+@dataclass(frozen=True)
+class Probe:
+    name: str
+    func: Callable[[Any, LogFn], Dict[str, Any]]
+    timeout: float = DEFAULT_PROBE_TIMEOUT
+    uses_wmi: bool = True
+
+
+WMI_PROBES: Tuple[Probe, ...] = (
+    Probe("cpu", probe_cpu),
+    Probe("bios", probe_bios),
+    Probe("display", probe_display),
+    Probe("os", probe_os),
+    Probe("system", probe_system),
+    Probe("ram", probe_ram, uses_wmi=False),
+    Probe("disks", probe_disks),
+)
+
+
+@dataclass
+class ProbeRun:
+    fields: Dict[str, Any] = field(default_factory=dict)
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    status: Dict[str, str] = field(default_factory=dict)
+    durations_ms: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def complete(self) -> bool:
+        return all(state == "ok" for state in self.status.values())
+
+    def succeeded(self, names: Iterable[str]) -> bool:
+        return any(self.status.get(name) == "ok" for name in names)
+
+
+@contextmanager
+def _no_session() -> Iterator[None]:
+    yield None
+
+
+def collect_probes(
+    provider,
+    probes: Iterable[Probe],
+    *,
+    log: Optional[LogFn] = None,
+) -> ProbeRun:
+    """
+    Run ``probes`` concurrently and merge their fields.
+
+    Every probe gets its own daemon thread and, when it needs WMI, its own
+    provider session (and therefore COM apartment). Probes still running when
+    their timeout expires are abandoned and reported with status ``timeout``;
+    probes that raise are reported as ``error``. Fields are merged in probe
+    order so the result does not depend on completion order.
+    """
+
+    log = log or _no_log
+    probes = list(probes)
+    results: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, str] = {}
+    durations: Dict[str, float] = {}
+    lock = threading.Lock()
+
+    def run(probe: Probe) -> None:
+        started = time.perf_counter()
+        try:
+            scope = provider.session() if probe.uses_wmi else _no_session()
+            with scope as session:
+                values = probe.func(session, log)
+            with lock:
+                results[probe.name] = values or {}
+        except Exception as exc:
+            with lock:
+                errors[probe.name] = str(exc)
+        finally:
+            with lock:
+                durations[probe.name] = (time.perf_counter() - started) * 1000.0
+
+    started = time.monotonic()
+    threads = []
+    for probe in probes:
+        thread = threading.Thread(target=run, args=(probe,), name=f"spec-probe-{probe.name}", daemon=True)
+        thread.start()
+        threads.append((probe, thread))
+
+    run_result = ProbeRun()
+    for probe, thread in threads:
+        thread.join(max(0.0, started + probe.timeout - time.monotonic()))
+
+    with lock:
+        for probe, thread in threads:
+            if probe.name in results:
+                run_result.status[probe.name] = "ok"
+                run_result.results[probe.name] = results[probe.name]
+                run_result.fields.update(results[probe.name])
+            elif probe.name in errors:
+                run_result.status[probe.name] = "error"
+                log(f"Spec probe '{probe.name}' failed: {errors[probe.name]}")
+            else:
+                run_result.status[probe.name] = "timeout"
+                log(f"Spec probe '{probe.name}' timed out after {probe.timeout:.1f}s; returning partial specs.")
+            if probe.name in durations:
+                run_result.durations_ms[probe.name] = round(durations[probe.name], 3)
+    return run_result
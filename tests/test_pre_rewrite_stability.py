@@ -11,33 +11,2157 @@ if str(SRC_ROOT) not in sys.path:
     sys.path.insert(0, str(SRC_ROOT))
 
 from db.database import build_retry_sleep_seconds, format_db_unavailable_message
+from db.pool import ConnectionPool, PoolTimeout
+from utils.log_writer import BackgroundLogWriter
 from services.auth_service import normalize_usernames
 
 
+_APP_DIR_PATCHER = None
+_APP_DIR = None
+
+
+def setUpModule():
+    """Send logs.txt, events.jsonl and other files the app keeps next to itself to a temporary directory."""
+
+    import tempfile
+
+    from utils import helpers
+
+    global _APP_DIR_PATCHER, _APP_DIR
+    _APP_DIR = tempfile.TemporaryDirectory()
+    _APP_DIR_PATCHER = patch.object(helpers, "get_app_dir", return_value=_APP_DIR.name)
+    _APP_DIR_PATCHER.start()
+
+
+def tearDownModule():
+    from utils import helpers, telemetry
+
+    helpers.flush_log()
+    if telemetry._EVENT_WRITER is not None:
+        telemetry._EVENT_WRITER.flush()
+    _APP_DIR_PATCHER.stop()
+    _APP_DIR.cleanup()
+
+
 class AuthServiceTests(unittest.TestCase):
     def test_normalize_usernames_filters_missing_values(self):
         rows = [("alice",), None, ("",), (None,), ("bob",)]
 
-        usernames = normalize_usernames(rows)
+        usernames = normalize_usernames(rows)
+
+        self.assertEqual(usernames, ["alice", "bob"])
+
+
+class DatabaseHelperTests(unittest.TestCase):
+    def test_build_retry_sleep_seconds_scales_by_attempt(self):
+        self.assertEqual(build_retry_sleep_seconds(2, 3), 6)
+
+    def test_format_db_unavailable_message_is_clear(self):
+        message = format_db_unavailable_message("timeout", 2)
+
+        self.assertIn("The app started, but the database is unavailable.", message)
+        self.assertIn("Error connecting to MySQL after 2 attempts", message)
+        self.assertIn("timeout", message)
+
+    def test_format_db_unavailable_message_supports_unexpected_errors(self):
+        message = format_db_unavailable_message("boom", 1, unexpected=True)
+
+        self.assertIn("Unexpected error connecting to MySQL after 1 attempts", message)
+
+
+class SchemaVerificationCacheTests(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        from db import database
+
+        self.database = database
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        database._VERIFIED_SCHEMAS.clear()
+        database._SCHEMA_VERIFICATION_STATS.update(verified=0, skipped=0)
+        self.addCleanup(database._VERIFIED_SCHEMAS.clear)
+        fingerprint_path = str(Path(self.temp_dir.name) / "schema_fingerprint.json")
+        patcher = patch.object(database, "_schema_fingerprint_path", return_value=fingerprint_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_verification_runs_once_per_database_and_version(self):
+        settings = {"host": "db-host", "database": "astro"}
+        log = Mock()
+
+        with patch.object(self.database, "ensure_schema", return_value=True) as ensure_schema:
+            self.database.ensure_schema_once(Mock(), settings, log)
+            self.database.ensure_schema_once(Mock(), settings, log)
+            self.database._VERIFIED_SCHEMAS.clear()
+            self.database.ensure_schema_once(Mock(), settings, log)
+            self.assertEqual(ensure_schema.call_count, 1)
+
+            self.database._VERIFIED_SCHEMAS.clear()
+            with patch("version.__version__", "999.0.0"):
+                self.database.ensure_schema_once(Mock(), settings, log)
+            self.assertEqual(ensure_schema.call_count, 2)
+
+        self.assertEqual(self.database.get_schema_verification_stats(), {"verified": 2, "skipped": 2})
+
+    def test_failed_verification_is_retried(self):
+        settings = {"host": "db-host", "database": "astro"}
+
+        with patch.object(self.database, "ensure_schema", return_value=False) as ensure_schema:
+            self.database.ensure_schema_once(Mock(), settings, Mock())
+            self.database.ensure_schema_once(Mock(), settings, Mock())
+
+        self.assertEqual(ensure_schema.call_count, 2)
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def _sqlite_pool(self, **kwargs):
+        import sqlite3
+
+        created = []
+
+        def connect():
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+            created.append(conn)
+            return conn
+
+        return ConnectionPool(connect, **kwargs), created
+
+    def test_released_connections_are_reused(self):
+        pool, created = self._sqlite_pool(max_size=2)
+
+        first = pool.acquire()
+        first.cursor().execute("SELECT 1")
+        first.close()
+        second = pool.acquire()
+
+        self.assertIs(second.raw_connection, created[0])
+        self.assertEqual(len(created), 1)
+        self.assertEqual(pool.stats()["reused"], 1)
+
+    def test_checkout_times_out_when_pool_is_exhausted(self):
+        pool, _created = self._sqlite_pool(max_size=1, checkout_timeout=0.05)
+
+        held = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        held.close()
+        pool.acquire().close()
+
+    def test_idle_and_unhealthy_connections_are_replaced(self):
+        now = [0.0]
+        checks = []
+
+        def failing_check(conn):
+            checks.append(conn)
+            raise RuntimeError("server has gone away")
+
+        pool, created = self._sqlite_pool(
+            idle_timeout=60,
+            health_check=failing_check,
+            health_check_after=5,
+            clock=lambda: now[0],
+        )
+
+        pool.acquire().close()
+        now[0] = 1.0
+        pool.acquire().close()
+        self.assertEqual(len(created), 1)
+
+        now[0] = 10.0
+        pool.acquire().close()
+        self.assertEqual(len(created), 2)
+        self.assertEqual(checks, [created[0]])
+
+        now[0] = 100.0
+        pool.acquire().close()
+        self.assertEqual(len(created), 3)
+        self.assertEqual(pool.stats()["evicted_idle"], 1)
+
+
+class OrderSearchSnapshotTests(unittest.TestCase):
+    def setUp(self):
+        import main_logic
+
+        self.main_logic = main_logic
+        patcher = patch.object(main_logic, "_ORDER_SNAPSHOT_QUERY_ENABLED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        main_logic.invalidate_order_cache()
+        self.addCleanup(main_logic.invalidate_order_cache)
+
+    def test_snapshot_resolves_candidates_and_note_in_one_query(self):
+        cursor = Mock()
+        cursor.fetchone.return_value = (
+            12,
+            b"PC-1001",
+            self.main_logic.ORDER_MATCH_PC_NUMBER,
+            "SKU-B",
+            json.dumps(
+                [
+                    [9, 2, 2, "SKU-B", "Second", None, None, None, None, None, None],
+                    [8, 1, 1, "SKU-A", "First", None, None, None, None, None, None],
+                ]
+            ),
+            b" Check hinge ",
+        )
+
+        snapshot = self.main_logic.load_order_search_snapshot(cursor, " 1001 ")
+
+        self.assertEqual(cursor.execute.call_count, 1)
+        self.assertEqual(cursor.execute.call_args[0][1], ["1001", "PC-1001", "1001"])
+        self.assertEqual(snapshot["order_id"], 12)
+        self.assertEqual(snapshot["order_number"], "PC-1001")
+        self.assertEqual([candidate["sku"] for candidate in snapshot["candidates"]], ["SKU-A", "SKU-B"])
+        self.assertEqual(snapshot["note"], "Check hinge")
+
+    def test_snapshot_falls_back_to_sequential_lookups(self):
+        cursor = Mock()
+        cursor.execute.side_effect = [Exception(1054, "Unknown column"), None, None, None, None, None]
+        cursor.fetchone.side_effect = [None, (5, "EXT-5"), ("note",)]
+        cursor.fetchall.side_effect = [[], [("SKU-1, SKU-2",)]]
+
+        snapshot = self.main_logic.load_order_search_snapshot(cursor, "ABC")
+
+        self.assertFalse(self.main_logic._ORDER_SNAPSHOT_QUERY_ENABLED)
+        self.assertEqual(snapshot["match_rank"], self.main_logic.ORDER_MATCH_EXTERNAL_ID)
+        self.assertEqual([candidate["sku"] for candidate in snapshot["candidates"]], ["SKU-1", "SKU-2"])
+        self.assertEqual(snapshot["note"], "note")
+
+    def test_missing_optional_table_falls_back_to_sequential_lookups(self):
+        cursor = Mock()
+        cursor.execute.side_effect = [
+            Exception(1146, "Table 'astro.custom_order_item' doesn't exist"),
+            None,
+            Exception(1146, "Table 'astro.custom_order_item' doesn't exist"),
+            None,
+            Exception(1146, "Table 'astro.order_note' doesn't exist"),
+        ]
+        cursor.fetchone.return_value = (5, "ORD-5")
+        cursor.fetchall.return_value = [("SKU-1",)]
+
+        snapshot = self.main_logic.load_order_search_snapshot(cursor, "ORD-5")
+
+        self.assertFalse(self.main_logic._ORDER_SNAPSHOT_QUERY_ENABLED)
+        self.assertEqual((snapshot["order_id"], snapshot["order_number"]), (5, "ORD-5"))
+        self.assertEqual([candidate["sku"] for candidate in snapshot["candidates"]], ["SKU-1"])
+        self.assertEqual(snapshot["note"], "")
+
+    def test_transient_errors_keep_the_combined_query(self):
+        cursor = Mock()
+        cursor.execute.side_effect = Exception(2013, "Lost connection to MySQL server during query")
+
+        with self.assertRaises(Exception):
+            self.main_logic.load_order_search_snapshot(cursor, "ABC")
+
+        self.assertEqual(cursor.execute.call_count, 1)
+        self.assertTrue(self.main_logic._ORDER_SNAPSHOT_QUERY_ENABLED)
+
+
+class OrderPrefetchTests(unittest.TestCase):
+    def _prefetcher(self, capacity=8):
+        import threading
+
+        from utils.order_prefetch import OrderSnapshotPrefetcher
+
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.loaded = []
+
+        def loader(reference):
+            self.loaded.append(reference)
+            self.started.set()
+            self.release.wait(5)
+            return {"order_number": reference.upper()}
+
+        return OrderSnapshotPrefetcher(loader, capacity=capacity)
+
+    def test_newer_reference_replaces_one_still_waiting(self):
+        import threading
+
+        prefetcher = self._prefetcher()
+        prefetcher.request("ORD-1")
+        self.assertTrue(self.started.wait(5))
+        prefetcher.request("ORD-12")
+        prefetcher.request("ORD-123")
+        # Release after get() has started waiting, so the lookup is still in flight.
+        releaser = threading.Timer(0.2, self.release.set)
+        releaser.start()
+        self.addCleanup(releaser.cancel)
+
+        snapshot = prefetcher.get("ord-123 ")
+
+        self.assertEqual(snapshot, {"order_number": "ORD-123"})
+        self.assertEqual(self.loaded, ["ORD-1", "ORD-123"])
+        stats = prefetcher.stats()
+        self.assertEqual((stats["superseded"], stats["waits"]), (1, 1))
+        self.assertEqual(prefetcher.get("ORD-123"), snapshot)
+        self.assertEqual(prefetcher.stats()["hits"], 1)
+
+    def test_clear_discards_a_lookup_still_running(self):
+        prefetcher = self._prefetcher()
+        prefetcher.request("ORD-1")
+        self.assertTrue(self.started.wait(5))
+        prefetcher.clear()
+        self.release.set()
+
+        self.assertIsNone(prefetcher.get("ORD-1"))
+        stats = prefetcher.stats()
+        self.assertEqual((stats["discarded"], stats["cached"], stats["misses"]), (1, 0, 1))
+
+    def test_cache_evicts_least_recently_used(self):
+        prefetcher = self._prefetcher(capacity=2)
+        self.release.set()
+        for reference in ("A-1", "B-1"):
+            prefetcher.request(reference)
+            prefetcher.get(reference)
+        prefetcher.get("A-1")
+        prefetcher.request("C-1")
+        prefetcher.get("C-1")
+
+        self.assertEqual(prefetcher.stats()["cached"], 2)
+        self.assertIsNotNone(prefetcher.get("A-1", wait=0))
+        self.assertIsNone(prefetcher.get("B-1", wait=0))
+
+    def test_snapshots_expire_after_the_ttl(self):
+        from utils.order_prefetch import OrderSnapshotPrefetcher
+
+        now = [0.0]
+        loaded = []
+
+        def loader(reference):
+            loaded.append(reference)
+            return {"order_number": reference, "version": len(loaded)}
+
+        prefetcher = OrderSnapshotPrefetcher(loader, ttl=300.0, clock=lambda: now[0])
+        prefetcher.request("ORD-1")
+        self.assertEqual(prefetcher.get("ORD-1")["version"], 1)
+        prefetcher.request("ORD-1")
+        self.assertEqual(loaded, ["ORD-1"])
+
+        now[0] = 300.0
+        self.assertIsNone(prefetcher.get("ORD-1", wait=0))
+        prefetcher.request("ORD-1")
+
+        self.assertEqual(prefetcher.get("ORD-1")["version"], 2)
+        self.assertEqual(prefetcher.stats()["expirations"], 1)
+
+    def test_search_uses_prefetched_snapshot(self):
+        import main_logic
+
+        prefetcher = Mock()
+        prefetcher.get.return_value = {
+            "order_id": 4,
+            "order_number": "ORD-4",
+            "match_rank": main_logic.ORDER_MATCH_ORDER_NUMBER,
+            "candidates": [],
+            "note": "",
+        }
+        root = Mock()
+        with patch.object(main_logic, "get_order_prefetcher", return_value=prefetcher), patch.object(
+            main_logic, "get_db_connection"
+        ) as connect, patch.object(main_logic, "load_order_search_snapshot") as load, patch.object(
+            main_logic, "get_offline_order_store"
+        ) as offline_store, patch.object(
+            main_logic.threading, "Thread"
+        ) as thread:
+            main_logic.search_order_logic("ORD-4", Mock(), Mock(), {}, {}, root)
+            thread.call_args.kwargs["target"]()
+
+        prefetcher.get.assert_called_once_with("ORD-4")
+        load.assert_not_called()
+        offline_store.return_value.save.assert_called_once_with("ORD-4", prefetcher.get.return_value)
+        connect.return_value.close.assert_called_once()
+
+
+class TTLCacheTests(unittest.TestCase):
+    def test_entries_expire_and_least_recently_used_is_evicted(self):
+        from utils.cache import TTLCache
+
+        now = [0.0]
+        cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        now[0] = 11
+        self.assertIsNone(cache.get("a"))
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        self.assertEqual((stats["evictions"], stats["expirations"], stats["size"]), (1, 1, 1))
+
+    def test_order_snapshot_is_served_from_cache_until_invalidated(self):
+        import main_logic
+
+        main_logic.invalidate_order_cache()
+        self.addCleanup(main_logic.invalidate_order_cache)
+        before = main_logic.get_order_cache_stats()
+        cursor = Mock()
+        cursor.fetchone.return_value = (7, "ORD-7", main_logic.ORDER_MATCH_ORDER_NUMBER, "SKU-A", None, "first")
+        with patch.object(main_logic, "_ORDER_SNAPSHOT_QUERY_ENABLED", True):
+            first = main_logic.load_order_search_snapshot(cursor, "ORD-7")
+            second = main_logic.load_order_search_snapshot(cursor, "ord-7")
+            self.assertEqual(cursor.execute.call_count, 1)
+            self.assertEqual(second, first)
+
+            cursor.fetchone.return_value = ("second",)
+            self.assertEqual(main_logic.load_order_note_for_order_id(cursor, 7), "first")
+            with patch.object(main_logic, "get_db_connection"):
+                main_logic.save_order_note_for_order_id(7, "second")
+            self.assertEqual(main_logic.load_order_note_for_order_id(cursor, 7), "second")
+
+        stats = main_logic.get_order_cache_stats()
+        self.assertEqual(stats["identity"]["hits"] - before["identity"]["hits"], 1)
+        self.assertEqual(stats["notes"]["invalidations"] - before["notes"]["invalidations"], 1)
+
+    def test_diagnostics_report_cache_and_service_counters(self):
+        from ui.diagnostics import collect_diagnostics, format_diagnostics
+
+        with patch("ui.diagnostics.get_pool_stats", return_value={"idle": 1, "in_use": 0}):
+            sections = collect_diagnostics()
+        text = format_diagnostics(sections)
+
+        for title in ("Database pool", "Order candidates cache", "Order notes cache", "Upload outbox", "PowerShell host"):
+            self.assertIn(title, sections)
+        self.assertIn("hit_rate", text)
+
+
+class SerialPaginationTests(unittest.TestCase):
+    def setUp(self):
+        import datetime
+
+        base = datetime.datetime(2025, 1, 1)
+        # Three rows per timestamp so page boundaries fall between equal assigned_at values.
+        self.rows = [(row_id, f"S{row_id:03d}", "SKU", base + datetime.timedelta(minutes=row_id // 3)) for row_id in range(1, 46)]
+        self.calls = []
+
+    def _fetch(self, after, limit):
+        self.calls.append(after)
+        remaining = [row for row in self.rows if after is None or (row[3], row[0]) > after]
+        return remaining[:limit]
+
+    def test_pages_follow_the_keyset_without_gaps_or_repeats(self):
+        from logic.view_serials_logic import SerialPager
+
+        pager = SerialPager(self._fetch, page_size=20)
+        seen = pager.get_page(0) + pager.get_page(1) + pager.get_page(2)
+
+        self.assertEqual(seen, self.rows)
+        self.assertEqual(self.calls[1], (self.rows[19][3], 20))
+        self.assertEqual(len(pager.get_page(2)), 5)
+
+    def test_prefetched_page_is_served_without_another_query(self):
+        from logic.view_serials_logic import SerialPager
+
+        pager = SerialPager(self._fetch, page_size=20)
+        pager.get_page(0)
+        pager.prefetch(1)
+        pager.prefetch(5)
+        second = pager.get_page(1)
+
+        self.assertEqual(second, self.rows[20:40])
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual((pager.fetches, pager.prefetch_hits), (2, 1))
+
+    def test_reset_refetches_from_the_current_page_start(self):
+        from logic.view_serials_logic import SerialPager
+
+        pager = SerialPager(self._fetch, page_size=20)
+        pager.get_page(0)
+        pager.get_page(1)
+        del self.rows[25]
+        pager.reset_from(1)
+
+        self.assertEqual(pager.get_page(1), self.rows[20:40])
+        self.assertEqual(self.calls[-1], (self.rows[19][3], 20))
+
+    def test_page_query_seeks_past_the_previous_page(self):
+        import datetime
+
+        from logic.view_serials_logic import fetch_serial_page
+
+        cursor = Mock()
+        cursor.fetchall.return_value = []
+        moment = datetime.datetime(2025, 1, 1)
+        fetch_serial_page(cursor, "ORD-1", (moment, 99), 20)
+
+        sql, params = cursor.execute.call_args.args
+        self.assertIn("ORDER BY assigned_at, id", sql)
+        self.assertIn("LIMIT %s", sql)
+        self.assertEqual(params, ("ORD-1", moment, moment, 99, 20))
+
+
+class ReferenceLookupTests(unittest.TestCase):
+    def setUp(self):
+        import main_logic
+
+        self.main_logic = main_logic
+        patcher = patch.object(main_logic, "_JOB_REFERENCE_NORM_ENABLED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_trade_lookup_uses_the_normalised_column(self):
+        cursor = Mock()
+        cursor.fetchone.return_value = (3, b"TJ-0003")
+
+        identity = self.main_logic.resolve_trade_job_by_reference(cursor, " tj-0003 ")
+
+        self.assertEqual(identity, (3, "TJ-0003"))
+        sql, params = cursor.execute.call_args.args
+        self.assertIn("reference_number_norm = UPPER(TRIM(%s))", sql)
+        self.assertEqual(params, ("tj-0003",))
+
+    def test_missing_column_falls_back_to_the_scan_once(self):
+        cursor = Mock()
+        cursor.execute.side_effect = [Exception(1054, "Unknown column 'reference_number_norm'"), None, None]
+        cursor.fetchone.return_value = (3, "TJ-0003")
+
+        self.assertEqual(self.main_logic.resolve_trade_job_by_reference(cursor, "TJ-0003"), (3, "TJ-0003"))
+        self.assertEqual(self.main_logic.resolve_trade_job_by_reference(cursor, "TJ-0003"), (3, "TJ-0003"))
+
+        self.assertFalse(self.main_logic._JOB_REFERENCE_NORM_ENABLED)
+        self.assertEqual(cursor.execute.call_count, 3)
+        self.assertIn("UPPER(TRIM(reference_number))", cursor.execute.call_args.args[0])
+
+    def test_other_errors_are_not_swallowed(self):
+        cursor = Mock()
+        cursor.execute.side_effect = Exception(2013, "Lost connection")
+
+        with self.assertRaises(Exception):
+            self.main_logic.resolve_trade_job_by_reference(cursor, "TJ-0003")
+        self.assertTrue(self.main_logic._JOB_REFERENCE_NORM_ENABLED)
+
+
+class TradeJobSearchTests(unittest.TestCase):
+    def setUp(self):
+        import main_logic
+
+        self.main_logic = main_logic
+        patcher = patch.object(main_logic, "_TRADE_JOB_FULLTEXT_ENABLED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_search_uses_fulltext_phrase_and_reference_prefix(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = [(7, b"TJ-0070", "Kestrel Trust", None)]
+
+        matches = self.main_logic.search_trade_jobs(cursor, '  tj_00"7  ')
+
+        self.assertEqual(matches, [{"id": 7, "reference": "TJ-0070", "label": "TJ-0070 - Kestrel Trust"}])
+        sql, params = cursor.execute.call_args.args
+        self.assertIn("MATCH(reference_number, customer, summary) AGAINST (%s IN BOOLEAN MODE)", sql)
+        self.assertIn("MATCH(product_name)", sql)
+        self.assertEqual(params[:4], ('"tj_00 7"',) * 4)
+        self.assertEqual(params[4:], ("tj\\_00\"7%", 20))
+
+    def test_terms_with_stopword_letters_use_fulltext(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = []
+
+        for text in ("Academ", "Latitude", "in a"):
+            self.main_logic.search_trade_jobs(cursor, text)
+            sql, params = cursor.execute.call_args.args
+            self.assertIn("MATCH(", sql)
+            self.assertEqual(params[0], f'"{text}"')
+
+    def test_migration_disables_stopwords_before_building_indexes(self):
+        script = (REPO_ROOT / "sql" / "004_trade_job_fulltext.sql").read_text(encoding="utf-8")
+
+        disabled = script.index("SET SESSION innodb_ft_enable_stopword = OFF;")
+        self.assertLess(disabled, script.index("ADD FULLTEXT INDEX ft_job_search"))
+        self.assertLess(disabled, script.index("ADD FULLTEXT INDEX ft_product_name"))
+
+    def test_short_search_uses_like_scan(self):
+        cursor = Mock()
+        cursor.fetchall.return_value = []
+
+        self.main_logic.search_trade_jobs(cursor, "7")
+
+        sql, params = cursor.execute.call_args.args
+        self.assertNotIn("MATCH(", sql)
+        self.assertEqual(params, ("%7%",) * 4 + (20,))
+        self.assertTrue(self.main_logic._TRADE_JOB_FULLTEXT_ENABLED)
+
+    def test_missing_fulltext_index_falls_back_once(self):
+        cursor = Mock()
+        cursor.execute.side_effect = [Exception(1191, "Can't find FULLTEXT index"), None, None]
+        cursor.fetchall.return_value = [(3, "TJ-0003", "", "")]
+
+        self.assertEqual(self.main_logic.search_trade_jobs(cursor, "TJ-0003")[0]["label"], "TJ-0003")
+        self.main_logic.search_trade_jobs(cursor, "TJ-0003")
+
+        self.assertFalse(self.main_logic._TRADE_JOB_FULLTEXT_ENABLED)
+        self.assertEqual(cursor.execute.call_count, 3)
+        self.assertNotIn("MATCH(", cursor.execute.call_args.args[0])
+
+    def test_other_errors_are_not_swallowed(self):
+        cursor = Mock()
+        cursor.execute.side_effect = Exception(2013, "Lost connection")
+
+        with self.assertRaises(Exception):
+            self.main_logic.search_trade_jobs(cursor, "TJ-0003")
+        self.assertTrue(self.main_logic._TRADE_JOB_FULLTEXT_ENABLED)
+
+
+class SkuTagMatcherTests(unittest.TestCase):
+    @staticmethod
+    def _entry(tag, category, name):
+        return {
+            "sku_tag": tag,
+            "normalized_tag": tag.replace("-", "").upper(),
+            "astro_name": name,
+            "dropdown_category": category,
+            "dropdown_option_name": name,
+        }
+
+    def test_longest_tag_wins_and_first_valid_entry_owns_tag(self):
+        from utils import helpers
+
+        metadata = [
+            self._entry("I5", "cpu", "Core i5"),
+            self._entry("I5-8350U", "cpu", "Core i5-8350U"),
+            self._entry("16GB", "colour", "Ignored"),
+            self._entry("16GB", "memory", "16GB"),
+            self._entry("16GB", "storage", "Not used"),
+            self._entry("AG", "battery", "70% Battery"),
+        ]
+
+        with (
+            patch.object(helpers, "_load_sku_tag_metadata", return_value=metadata),
+            patch.object(helpers, "_SKU_TAG_MATCHER", None),
+        ):
+            details = helpers._extract_details_from_dropdown(Mock(), "t480-i5-8350u-16gb-ag")
+            self.assertIsNone(helpers._extract_details_from_dropdown(Mock(), "X1-CARBON"))
+
+        self.assertEqual(
+            details,
+            {
+                "CPU": "Core i5-8350U",
+                "RAM": "16GB",
+                "Battery": "70% Battery",
+                "Battery 2": "70% Battery",
+            },
+        )
+
+
+class _SqliteSource:
+    """SQLite database behind a MySQLdb-style connection (``%s`` placeholders, no-op close)."""
+
+    def __init__(self, with_updated_at=True):
+        import sqlite3
+
+        self.conn = sqlite3.connect(":memory:", detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE dropdown_option (id INTEGER PRIMARY KEY, category TEXT, name TEXT, updated_at TIMESTAMP);
+            CREATE TABLE attribute_term_metadata (
+                attribute_id INTEGER, term_id INTEGER, sku_tag TEXT, astro_name TEXT, dropdown_option_id INTEGER,
+                updated_at TIMESTAMP
+            );
+            CREATE TABLE attribute_dropdown_map (attribute_id INTEGER PRIMARY KEY, dropdown_category TEXT, updated_at TIMESTAMP);
+            """
+        )
+        # Without it, queries naming updated_at fail like a database before sql/005.
+        self.with_updated_at = with_updated_at
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.conn.execute(sql, params)
+        self.conn.commit()
+
+    def cursor(self):
+        source = self
+
+        class _Cursor:
+            def execute(self, sql, params=()):
+                source.statements.append(sql)
+                if "updated_at" in sql and not source.with_updated_at:
+                    raise Exception(1054, "Unknown column 'updated_at' in 'field list'")
+                self._rows = source.conn.execute(sql.replace("%s", "?"), params).fetchall()
+
+            def fetchall(self):
+                return self._rows
+
+            def fetchone(self):
+                return self._rows[0] if self._rows else None
+
+        return _Cursor()
+
+    def close(self):
+        pass
+
+
+class ReferenceReplicaTests(unittest.TestCase):
+    def setUp(self):
+        import datetime
+        import tempfile
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = str(Path(temp_dir.name) / "replica.sqlite3")
+        self.now = datetime.datetime(2025, 6, 1, 9, 0, 0)
+
+    def _seed(self, source, stamp):
+        source.execute("INSERT INTO dropdown_option VALUES (?, ?, ?, ?)", (1, "CPU", b"Core i5", stamp))
+        source.execute("INSERT INTO dropdown_option VALUES (?, ?, ?, ?)", (2, "memory", "16GB", stamp))
+        source.execute("INSERT INTO attribute_term_metadata VALUES (?, ?, ?, ?, ?, ?)", (10, 1, "I5", "Core i5", 1, stamp))
+        source.execute("INSERT INTO attribute_term_metadata VALUES (?, ?, ?, ?, ?, ?)", (11, 2, "16GB", "16GB", 2, stamp))
+        source.execute("INSERT INTO attribute_dropdown_map VALUES (?, ?, ?)", (10, "cpu", stamp))
+
+    def _replica(self, source, **kwargs):
+        from utils.reference_replica import ReferenceReplica
+
+        return ReferenceReplica(self.path, lambda: source, **kwargs)
+
+    def test_first_sync_mirrors_tables_and_marks_replica_ready(self):
+        source = _SqliteSource()
+        self._seed(source, self.now)
+        changes = []
+        replica = self._replica(source, on_change=lambda: changes.append(True))
+
+        self.assertFalse(replica.ready())
+        self.assertTrue(replica.sync())
+
+        self.assertTrue(replica.ready())
+        self.assertEqual(changes, [True])
+        self.assertEqual(replica.query("SELECT id, category, name FROM dropdown_option ORDER BY id"), [(1, "CPU", "Core i5"), (2, "memory", "16GB")])
+        self.assertEqual(replica.stats()["dropdown_option.high_water"], "2025-06-01 09:00:00")
+
+    def test_rows_sharing_a_key_are_reported(self):
+        source = _SqliteSource()
+        self._seed(source, self.now)
+        source.execute("INSERT INTO attribute_term_metadata VALUES (?, ?, ?, ?, ?, ?)", (10, 1, "I5-8", "Core i5", 1, self.now))
+        messages = []
+        replica = self._replica(source, log=messages.append)
+
+        replica.sync()
+        replica.sync()
+
+        warnings = [message for message in messages if "repeat" in message]
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("1 attribute_term_metadata rows repeat a (attribute_id, term_id) key", warnings[0])
+
+    def test_migration_enforces_the_replica_keys(self):
+        script = (REPO_ROOT / "sql" / "005_reference_table_updated_at.sql").read_text(encoding="utf-8")
+
+        self.assertIn("ADD UNIQUE KEY uniq_attribute_term_metadata_term (attribute_id, term_id)", script)
+        self.assertIn("ADD UNIQUE KEY uniq_attribute_dropdown_map_attribute (attribute_id)", script)
+
+    def test_delta_sync_pulls_changed_rows_and_detects_deletes(self):
+        import datetime
+
+        source = _SqliteSource()
+        self._seed(source, self.now)
+        replica = self._replica(source)
+        replica.sync()
+        source.statements.clear()
+
+        self.assertFalse(replica.sync())
+        self.assertIn("WHERE updated_at >= %s", source.statements[0])
+        # Counts match, so the key set is never read.
+        self.assertFalse(any(sql.startswith("SELECT id FROM") for sql in source.statements))
+
+        later = self.now + datetime.timedelta(hours=1)
+        source.execute("UPDATE dropdown_option SET name = ?, updated_at = ? WHERE id = 2", ("32GB", later))
+        source.execute("DELETE FROM attribute_term_metadata WHERE attribute_id = 10")
+        upserted, deleted = replica.upserted, replica.deleted
+
+        self.assertTrue(replica.sync())
+
+        self.assertEqual(replica.upserted - upserted, 1)
+        self.assertEqual(replica.deleted - deleted, 1)
+        self.assertEqual(replica.query("SELECT name FROM dropdown_option WHERE id = 2"), [("32GB",)])
+        self.assertEqual(replica.query("SELECT attribute_id, term_id FROM attribute_term_metadata"), [(11, 2)])
+        self.assertEqual(replica.stats()["dropdown_option.high_water"], "2025-06-01 10:00:00")
+
+    def test_missing_updated_at_column_falls_back_to_full_reads(self):
+        source = _SqliteSource(with_updated_at=False)
+        self._seed(source, None)
+        replica = self._replica(source)
+
+        replica.sync()
+        source.execute("DELETE FROM dropdown_option WHERE id = 1")
+        source.statements.clear()
+        replica.sync()
+
+        self.assertFalse(replica.delta)
+        self.assertTrue(replica.ready())
+        self.assertNotIn("updated_at", " ".join(source.statements))
+        self.assertEqual(replica.query("SELECT id FROM dropdown_option"), [(2,)])
+
+    def test_sku_metadata_loads_from_replica_and_reloads_after_change(self):
+        import datetime
+
+        from utils import helpers
+
+        source = _SqliteSource()
+        self._seed(source, self.now)
+        replica = self._replica(source, on_change=helpers.reset_sku_reference_cache)
+        replica.sync()
+        patcher = patch.object(helpers, "_REFERENCE_REPLICA", replica)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(helpers.reset_sku_reference_cache)
+        helpers.reset_sku_reference_cache()
+        cursor = Mock()
+
+        metadata = helpers._load_sku_tag_metadata(cursor)
+
+        cursor.execute.assert_not_called()
+        self.assertEqual(
+            {entry["sku_tag"]: (entry["dropdown_category"], entry["dropdown_option_name"]) for entry in metadata},
+            {"I5": ("cpu", "Core i5"), "16GB": ("memory", "16GB")},
+        )
+        self.assertIs(helpers._load_sku_tag_metadata(cursor), metadata)
+
+        source.execute(
+            "UPDATE dropdown_option SET name = ?, updated_at = ? WHERE id = 1",
+            ("Core i5-8350U", self.now + datetime.timedelta(minutes=5)),
+        )
+        replica.sync()
+
+        reloaded = helpers._load_sku_tag_metadata(cursor)
+        self.assertIsNot(reloaded, metadata)
+        self.assertIn("Core i5-8350U", [entry["dropdown_option_name"] for entry in reloaded])
+        cursor.execute.assert_not_called()
+
+
+class SkuKeywordMatcherTests(unittest.TestCase):
+    CONFIG_TEMPLATE = """[search]
+cpu_keywords = i5,i7
+ram_keywords = 8RAM,16RAM
+ssd_keywords = 256SSD,1TB
+model_keywords = T480,T480S
+resolution_keywords = 1920x1080
+windows_keywords = WIN10,WIN11
+grade_keywords = {grades}
+"""
+
+    def test_keywords_are_compiled_once_and_reloaded_when_config_changes(self):
+        import os
+        import tempfile
+
+        from utils import helpers
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config_path = os.path.join(temp_dir, "config.ini")
+            with open(config_path, "w", encoding="utf-8") as handle:
+                handle.write(self.CONFIG_TEMPLATE.format(grades="AGRADE,BGRADE"))
+
+            with (
+                patch.object(helpers, "get_config_path", return_value=config_path),
+                patch.object(helpers, "_CONFIG_CACHE", helpers._ConfigCache()),
+                patch.object(helpers, "_SKU_KEYWORD_MATCHER", None),
+                patch.object(helpers.SkuKeywordMatcher, "from_config", wraps=helpers.SkuKeywordMatcher.from_config) as compile_keywords,
+            ):
+                details = helpers._extract_details_from_sku_keywords("t480s-i7-16RAM-1TB-WIN11-BGRADE")
+                helpers._extract_details_from_sku_keywords("T480-i5")
+                self.assertEqual(compile_keywords.call_count, 1)
+
+                with open(config_path, "w", encoding="utf-8") as handle:
+                    handle.write(self.CONFIG_TEMPLATE.format(grades="AGRADE,BGRADE,CGRADE"))
+                os.utime(config_path, ns=(0, 0))
+                reloaded = helpers._extract_details_from_sku_keywords("T480-CGRADE")
+
+                self.assertEqual(compile_keywords.call_count, 2)
+        self.assertEqual(details["Model"], "T480S")
+        self.assertEqual(details["CPU"], "i7")
+        self.assertEqual(details["RAM"], "16GB")
+        self.assertEqual(details["SSD"], "1TB")
+        self.assertEqual(details["Windows"], "Windows 11")
+        self.assertEqual(details["Battery"], "45% Battery")
+        self.assertEqual(reloaded["Battery 2"], "5% Battery")
+
+
+class ConfigCacheTests(unittest.TestCase):
+    def test_config_is_parsed_once_until_the_file_changes(self):
+        import os
+        import tempfile
+
+        from utils import helpers
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config_path = os.path.join(temp_dir, "config.ini")
+            with open(config_path, "w", encoding="utf-8") as handle:
+                handle.write("[app]\nmode = order\n")
+
+            cache = helpers._ConfigCache()
+            with (
+                patch.object(helpers, "get_config_path", return_value=config_path),
+                patch.object(helpers, "_CONFIG_CACHE", cache),
+                patch.object(helpers, "log_event") as log_event,
+            ):
+                first = helpers.load_config()
+                self.assertIs(helpers.load_config(), first)
+                self.assertEqual(log_event.call_count, 2)
+                with self.assertRaises(TypeError):
+                    first.set("app", "mode", "trade")
+
+                helpers.save_app_mode("trade")
+                self.assertEqual(helpers.load_app_mode(), "trade")
+                second = helpers.load_config()
+                self.assertIsNot(second, first)
+                self.assertIsNot(helpers.reload_config(), second)
+
+        self.assertEqual(cache.loads, 3)
+
+
+class BackgroundLogWriterTests(unittest.TestCase):
+    def test_lines_are_written_in_order_and_flushed(self):
+        import os
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_path = os.path.join(temp_dir, "logs.txt")
+            writer = BackgroundLogWriter(log_path)
+            for index in range(500):
+                writer.write(f"[2024-01-01 00:00:00] line {index}\n")
+            self.assertTrue(writer.flush())
+
+            with open(log_path, encoding="utf-8") as handle:
+                lines = handle.read().splitlines()
+            writer.close()
+
+        self.assertEqual(len(lines), 500)
+        self.assertEqual(lines[0], "[2024-01-01 00:00:00] line 0")
+        self.assertEqual(lines[-1], "[2024-01-01 00:00:00] line 499")
+
+    def test_rotates_by_size_and_writes_synchronously_after_close(self):
+        import os
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_path = os.path.join(temp_dir, "logs.txt")
+            writer = BackgroundLogWriter(log_path, max_bytes=16, batch_size=1)
+            writer.write("a line over the limit\n")
+            writer.flush()
+            writer.write("second line\n")
+            writer.close()
+            writer.write("after close\n")
+
+            with open(log_path + ".1", encoding="utf-8") as handle:
+                rotated = handle.read()
+            with open(log_path, encoding="utf-8") as handle:
+                current = handle.read()
+
+        self.assertEqual(rotated, "a line over the limit\n")
+        self.assertEqual(current, "second line\nafter close\n")
+
+
+class TelemetrySpanTests(unittest.TestCase):
+    def setUp(self):
+        from utils import telemetry
+
+        self.telemetry = telemetry
+        self.events = []
+        telemetry.set_event_sink(self.events.append)
+        self.addCleanup(telemetry.set_event_sink, None)
+
+    def test_nested_spans_share_trace_and_record_parent(self):
+        @self.telemetry.traced()
+        def inner():
+            return "done"
+
+        with self.telemetry.span("outer", order="ORD-1") as attrs:
+            attrs["candidates"] = 2
+            self.assertEqual(inner(), "done")
+
+        inner_event, outer_event = self.events
+        self.assertEqual(inner_event["span"], "inner")
+        self.assertEqual(inner_event["parent_id"], outer_event["span_id"])
+        self.assertEqual(inner_event["trace_id"], outer_event["trace_id"])
+        self.assertIsNone(outer_event["parent_id"])
+        self.assertEqual(outer_event["attrs"], {"order": "ORD-1", "candidates": 2})
+        self.assertGreaterEqual(outer_event["duration_ms"], inner_event["duration_ms"])
+        json.dumps(outer_event)
+
+    def test_failed_span_is_recorded_and_reraised(self):
+        with self.assertRaises(ValueError):
+            with self.telemetry.span("upload"):
+                raise ValueError("boom")
+
+        self.assertEqual(self.events[0]["status"], "error")
+        self.assertEqual(self.events[0]["error"], "ValueError")
+
+
+def _fake_wmi_tables():
+    return {
+        "Win32_Processor": [{"Name": "Intel(R) Core(TM) i5-8350U CPU @ 1.70GHz"}],
+        "Win32_BIOS": [{"SerialNumber": " PF24NEM2 "}],
+        "Win32_VideoController": [{"CurrentHorizontalResolution": 1920, "CurrentVerticalResolution": 1080}],
+        "Win32_OperatingSystem": [{"Caption": "Microsoft Windows 11 Pro", "BuildNumber": "22631"}],
+        "Win32_ComputerSystem": [{"Manufacturer": "LENOVO", "SystemFamily": "ThinkPad T480", "Model": "20L5"}],
+        "Win32_DiskDrive": [
+            {
+                "DeviceID": "\\\\.\\PHYSICALDRIVE0",
+                "Size": "256060514304",
+                "Caption": "SAMSUNG NVMe SSD",
+                "MediaType": "Fixed hard disk media",
+                "InterfaceType": "SCSI",
+            }
+        ],
+        "Win32_DiskPartition": [{"DeviceID": "Disk #0, Partition #2"}],
+        "Win32_LogicalDisk": [{"DeviceID": "C:"}],
+    }
+
+
+def _fake_wmi_associations():
+    return {
+        "Win32_LogicalDiskToPartition": [
+            (("Win32_DiskPartition", "Disk #0, Partition #2"), ("Win32_LogicalDisk", "C:")),
+        ],
+        "Win32_DiskDriveToDiskPartition": [
+            (("Win32_DiskDrive", "\\\\.\\PHYSICALDRIVE0"), ("Win32_DiskPartition", "Disk #0, Partition #2")),
+        ],
+    }
+
+
+class SpecProbeTests(unittest.TestCase):
+    def test_get_laptop_specs_collects_all_probes_through_provider(self):
+        from utils import specs
+        from utils.wmi_probes import FakeWmiProvider
+
+        provider = FakeWmiProvider(_fake_wmi_tables(), associations=_fake_wmi_associations())
+        previous_provider = specs._wmi_provider
+        self.addCleanup(specs.set_wmi_provider, previous_provider)
+        specs.set_wmi_provider(provider)
+
+        with (
+            patch.object(specs, "get_battery_health", return_value=["87% (batteryinfoview)"]),
+            patch.object(specs, "_load_specs_entries", return_value={}),
+            patch.object(specs, "_save_specs_entries") as save_cache,
+        ):
+            result = specs.get_laptop_specs(force_refresh=True)
+
+        self.assertEqual(result["CPU"], "i5-8350U")
+        self.assertEqual(result["Serial Number"], "PF24NEM2")
+        self.assertEqual(result["Resolution"], "1920x1080")
+        self.assertEqual(result["Windows"], "Windows 11 Pro")
+        self.assertEqual(result["Model"], "T480")
+        self.assertEqual(result["SSD"], "256GB")
+        self.assertEqual(result["Drive Type"], "SSD")
+        self.assertEqual(result["Battery"], "87% (batteryinfoview)")
+        save_cache.assert_called_once()
+        self.assertEqual(provider.calls["session"], 6)
+
+    def test_hung_probe_times_out_with_partial_results(self):
+        import time
+
+        from utils.wmi_probes import WMI_PROBES, FakeWmiProvider, Probe, collect_probes
+
+        provider = FakeWmiProvider(
+            _fake_wmi_tables(),
+            delays={"Win32_VideoController": 2.0},
+            failures={"Win32_BIOS": RuntimeError("RPC server unavailable")},
+        )
+        probes = [
+            Probe(probe.name, probe.func, timeout=0.2, uses_wmi=probe.uses_wmi)
+            for probe in WMI_PROBES
+            if probe.name != "disks"
+        ]
+
+        started = time.monotonic()
+        run = collect_probes(provider, probes)
+
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(run.status["display"], "timeout")
+        self.assertEqual(run.status["bios"], "error")
+        self.assertEqual(run.status["cpu"], "ok")
+        self.assertFalse(run.complete)
+        self.assertEqual(run.fields["CPU"], "i5-8350U")
+        self.assertNotIn("Resolution", run.fields)
+
+
+class SpecsCacheTests(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+
+        from utils import specs
+        from utils.wmi_probes import FakeWmiProvider
+
+        self.specs = specs
+        self.provider = FakeWmiProvider(_fake_wmi_tables(), associations=_fake_wmi_associations())
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.cache_path = Path(temp_dir.name) / "specs_cache.json"
+        self.battery = Mock(return_value=["91% (batteryinfoview)"])
+        previous_provider = specs._wmi_provider
+        self.addCleanup(specs.set_wmi_provider, previous_provider)
+        specs.set_wmi_provider(self.provider)
+        for patcher in (
+            patch.object(specs, "_specs_cache_path", return_value=self.cache_path),
+            patch.object(specs, "get_hardware_fingerprint", return_value="machine-a"),
+            patch.object(specs, "get_battery_health", self.battery),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reset_only_reprobes_volatile_fields(self):
+        first = self.specs.get_laptop_specs()
+        cpu_queries = self.provider.calls["Win32_Processor"]
+
+        self.specs.set_wmi_provider(self.provider)  # drop the in-memory copy; read back from disk
+        self.specs.reset_specs_cache()
+        second = self.specs.get_laptop_specs()
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.provider.calls["Win32_Processor"], cpu_queries)
+        self.assertEqual(self.provider.calls["Win32_VideoController"], 2)
+        self.assertEqual(self.provider.calls["Win32_BIOS"], 2)
+        self.assertEqual(self.battery.call_count, 2)
+        cached = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        self.assertEqual(cached["version"], self.specs.SPECS_CACHE_VERSION)
+        self.assertEqual(set(cached["entries"]), {probe.name for probe in self.specs.SPEC_PROBES})
+
+    def test_changed_bios_serial_discards_cached_hardware(self):
+        first = self.specs.get_laptop_specs()
+        cpu_queries = self.provider.calls["Win32_Processor"]
+
+        self.provider.tables["Win32_BIOS"] = [{"SerialNumber": "PF9SWAPD"}]
+        self.provider.tables["Win32_Processor"] = [{"Name": "Intel(R) Core(TM) i7-8650U CPU @ 1.90GHz"}]
+        self.specs.reset_specs_cache()
+        second = self.specs.get_laptop_specs()
+
+        self.assertEqual(first["Serial Number"], "PF24NEM2")
+        self.assertEqual(second["Serial Number"], "PF9SWAPD")
+        self.assertEqual(self.provider.calls["Win32_Processor"], cpu_queries + 1)
+        self.assertNotEqual(second["CPU"], first["CPU"])
+
+    def test_stale_volatile_entries_and_other_hardware_are_reprobed(self):
+        import time
+
+        self.specs.get_laptop_specs()
+        with patch.object(time, "time", return_value=time.time() + self.specs.SPECS_CACHE_TTL + 1):
+            self.specs.get_laptop_specs()
+        self.assertEqual(self.provider.calls["Win32_OperatingSystem"], 2)
+        self.assertEqual(self.provider.calls["Win32_BIOS"], 2)
+        cpu_queries = self.provider.calls["Win32_Processor"]
+
+        self.specs.set_wmi_provider(self.provider)
+        with patch.object(self.specs, "get_hardware_fingerprint", return_value="machine-b"):
+            self.specs.get_laptop_specs()
+        self.assertGreater(self.provider.calls["Win32_Processor"], cpu_queries)
+
+
+class DiskMappingTests(unittest.TestCase):
+    def test_device_ids_are_parsed_from_escaped_reference_paths(self):
+        from utils.wmi_probes import parse_device_id_from_path
 
-        self.assertEqual(usernames, ["alice", "bob"])
+        path = '\\\\PC01\\root\\cimv2:Win32_DiskDrive.DeviceID="\\\\\\\\.\\\\PHYSICALDRIVE1"'
+        self.assertEqual(parse_device_id_from_path(path), "\\\\.\\PHYSICALDRIVE1")
+        self.assertIsNone(parse_device_id_from_path("Win32_LogicalDisk.Name='C:'"))
 
+    def test_disk_sizes_come_from_batched_association_queries(self):
+        from utils.wmi_probes import FakeWmiProvider, probe_disks
 
-class DatabaseHelperTests(unittest.TestCase):
-    def test_build_retry_sleep_seconds_scales_by_attempt(self):
-        self.assertEqual(build_retry_sleep_seconds(2, 3), 6)
+        def drive(index, size, caption="NVMe SSD", interface="SCSI"):
+            return {
+                "DeviceID": f"\\\\.\\PHYSICALDRIVE{index}",
+                "Size": str(size),
+                "Caption": caption,
+                "MediaType": "Fixed hard disk media",
+                "InterfaceType": interface,
+            }
 
-    def test_format_db_unavailable_message_is_clear(self):
-        message = format_db_unavailable_message("timeout", 2)
+        tables = {
+            "Win32_DiskDrive": [drive(0, 512110190592), drive(1, 1000204886016), drive(2, 64023257088, "USB Stick", "USB")],
+            "Win32_DiskPartition": [
+                {"DeviceID": "Disk #1, Partition #0"},
+                {"DeviceID": "Disk #0, Partition #0"},
+                {"DeviceID": "Disk #0, Partition #1"},
+                {"DeviceID": "Disk #2, Partition #0"},
+            ],
+        }
+        associations = {
+            "Win32_LogicalDiskToPartition": [
+                (("Win32_DiskPartition", "Disk #1, Partition #0"), ("Win32_LogicalDisk", "D:")),
+                (("Win32_DiskPartition", "Disk #0, Partition #1"), ("Win32_LogicalDisk", "C:")),
+                (("Win32_DiskPartition", "Disk #2, Partition #0"), ("Win32_LogicalDisk", "E:")),
+            ],
+            "Win32_DiskDriveToDiskPartition": [
+                (("Win32_DiskDrive", f"\\\\.\\PHYSICALDRIVE{index}"), ("Win32_DiskPartition", f"Disk #{index}, Partition #{part}"))
+                for index, part in ((0, 0), (0, 1), (1, 0), (2, 0))
+            ],
+        }
+        provider = FakeWmiProvider(tables, associations=associations)
 
-        self.assertIn("The app started, but the database is unavailable.", message)
-        self.assertIn("Error connecting to MySQL after 2 attempts", message)
-        self.assertIn("timeout", message)
+        with provider.session() as session:
+            fields = probe_disks(session, lambda message: None)
 
-    def test_format_db_unavailable_message_supports_unexpected_errors(self):
-        message = format_db_unavailable_message("boom", 1, unexpected=True)
+        self.assertEqual(fields, {"SSD": "1000GB+512GB", "Drive Type": "SSD"})
+        self.assertNotIn("associators:Win32_DiskDriveToDiskPartition", provider.calls)
+        self.assertEqual(provider.calls["Win32_DiskDrive"], 1)
 
-        self.assertIn("Unexpected error connecting to MySQL after 1 attempts", message)
+
+class BatterySamplerTests(unittest.TestCase):
+    def test_snapshot_is_swapped_and_errors_keep_previous_readings(self):
+        from utils.battery_sampler import BatterySampler, FakeBatterySource
+
+        messages = []
+        source = FakeBatterySource([[(80, 2), (55, 1)], RuntimeError("RPC unavailable"), RuntimeError("RPC unavailable")])
+        sampler = BatterySampler(source, log=messages.append)
+
+        first = sampler.sample_now()
+        failed = sampler.sample_now()
+        sampler.sample_now()
+
+        self.assertEqual((first.percent(0), first.charging(0)), (80, True))
+        self.assertEqual((first.percent(1), first.charging(1)), (55, False))
+        self.assertIsNone(first.percent(2))
+        self.assertEqual(failed.readings, first.readings)
+        self.assertEqual(failed.error, "RPC unavailable")
+        self.assertIsNot(sampler.snapshot(), first)
+        self.assertEqual(len(messages), 1)
+
+    def test_missing_first_sample_is_waited_for_once_and_never_on_the_ui_thread(self):
+        import threading
+        import time
+
+        from utils.battery_sampler import BatterySampler
+
+        class HungSource:
+            def read(self):
+                threading.Event().wait(5)
+                return []
+
+            def close(self):
+                pass
+
+        sampler = BatterySampler(HungSource(), first_sample_wait=0.3)
+        self.addCleanup(sampler.stop, 0)
+
+        started = time.monotonic()
+        self.assertIsNone(sampler.snapshot().sampled_at)
+        self.assertLess(time.monotonic() - started, 0.2)
+
+        timings = []
+
+        def worker_reads():
+            for _ in range(2):
+                started = time.monotonic()
+                sampler.snapshot()
+                timings.append(time.monotonic() - started)
+
+        worker = threading.Thread(target=worker_reads)
+        worker.start()
+        worker.join(5)
+
+        self.assertGreaterEqual(timings[0], 0.25)
+        self.assertLess(timings[1], 0.2)
+
+    def test_helpers_and_footer_read_the_shared_snapshot(self):
+        import main_logic
+        from utils import helpers
+        from utils.battery_sampler import BatterySampler, FakeBatterySource
+
+        source = FakeBatterySource([[(64, 6), (12, 1)]])
+        sampler = BatterySampler(source, interval=60)
+        sampler.sample_now()
+        self.addCleanup(helpers.set_battery_sampler, None)
+        helpers.set_battery_sampler(sampler)
+
+        self.assertEqual(helpers.get_live_battery_percent(1), 12)
+        self.assertTrue(helpers.is_battery_charging(0))
+        self.assertIsNone(helpers.get_live_battery_percent(2))
+        snapshot = helpers.get_battery_snapshot()
+        self.assertEqual(main_logic.battery_labels_for(snapshot), ["Battery 1", "Battery 2"])
+        self.assertEqual(source.reads, 1)
+
+
+class PowerShellHostTests(unittest.TestCase):
+    def _host(self, responses, **kwargs):
+        from utils.powershell_host import PowerShellHost, stub_worker_command
+
+        host = PowerShellHost(stub_worker_command(responses), **kwargs)
+        self.addCleanup(host.shutdown)
+        return host
+
+    def test_requests_reuse_one_worker_and_skip_unmarked_output(self):
+        host = self._host({"*": {"echo_args": True, "noise": "WARNING: stray host output"}})
+
+        results = [host.run("param($Value) $Value", {"Value": index}, timeout=10) for index in range(3)]
+
+        self.assertEqual([json.loads(result.output) for result in results], [{"Value": 0}, {"Value": 1}, {"Value": 2}])
+        self.assertTrue(all(result.succeeded for result in results))
+        self.assertEqual(host.stats()["spawned"], 1)
+
+    def test_timeout_and_crash_restart_the_worker(self):
+        from utils.powershell_host import PowerShellHostError, PowerShellTimeout
+
+        host = self._host({"slow": {"sleep": 5}, "boom": {"crash": True}, "*": {"output": "ok"}})
+
+        with self.assertRaises(PowerShellTimeout):
+            host.run("Start-Sleep 5", timeout=0.5, name="slow")
+        self.assertEqual(host.run("'ok'", timeout=10).last_line, "ok")
+        with self.assertRaises(PowerShellHostError):
+            host.run("exit 3", timeout=10, name="boom")
+        self.assertEqual(host.run("'ok'", timeout=10).last_line, "ok")
+
+        stats = host.stats()
+        self.assertEqual(stats["spawned"], 3)
+        self.assertEqual(stats["timeouts"], 1)
+
+    def test_concurrency_is_capped_at_max_workers(self):
+        import threading
+
+        host = self._host({"*": {"sleep": 0.2, "output": "done"}}, max_workers=2)
+        outputs = []
+        threads = [threading.Thread(target=lambda: outputs.append(host.run("'done'", timeout=10).last_line)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outputs, ["done"] * 5)
+        self.assertLessEqual(host.stats()["spawned"], 2)
+
+    def test_hash_capture_runs_in_the_shared_host(self):
+        import tempfile
+
+        from utils import helpers
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        csv_path = Path(temp_dir.name) / "PF1ABCDE.csv"
+        csv_path.write_text("Device Serial Number\nPF1ABCDE\n", encoding="utf-8")
+        host = self._host({"Autopilot hash capture": {"output": f"{csv_path}\n"}})
+        self.addCleanup(helpers.set_powershell_host, None)
+        helpers.set_powershell_host(host)
+        host.run("'warm-up'", timeout=10)  # start the worker before faking the platform
+
+        with patch.object(helpers.sys, "platform", "win32"), patch.object(helpers.subprocess, "run") as one_off:
+            captured = helpers.capture_autopilot_hash_csv(output_directory=temp_dir.name)
+
+        self.assertEqual(captured, str(csv_path))
+        one_off.assert_not_called()
+        self.assertEqual(host.stats()["requests"], 2)
+        self.assertEqual(host.stats()["spawned"], 1)
+
+    def test_timed_out_host_request_is_not_rerun_as_a_one_off(self):
+        import tempfile
+
+        from utils import helpers
+        from utils.powershell_host import PowerShellTimeout
+
+        host = Mock()
+        host.run.side_effect = PowerShellTimeout("no reply within the timeout (request 1)")
+        self.addCleanup(helpers.set_powershell_host, None)
+        helpers.set_powershell_host(host)
+
+        with patch.object(helpers.sys, "platform", "win32"), patch.object(helpers.subprocess, "run") as one_off:
+            activated = helpers.check_activation_status()
+            with tempfile.TemporaryDirectory() as out_dir:
+                captured = helpers.capture_autopilot_hash_csv(output_directory=out_dir)
+
+        self.assertFalse(activated)
+        self.assertIsNone(captured)
+        one_off.assert_not_called()
+        self.assertEqual(host.run.call_count, 2)
+
+
+class HashPrefetchTests(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.cache_dir = temp_dir.name
+        self.calls = []
+
+    def _capture(self, preferred_serial=None, output_directory=None):
+        self.calls.append(preferred_serial)
+        path = Path(output_directory) / f"{preferred_serial}.csv"
+        path.write_text("Device Serial Number,Hardware Hash\n", encoding="utf-8")
+        return str(path)
+
+    def test_prefetch_is_reused_by_later_lookups(self):
+        from utils.hash_prefetch import HashPrefetcher
+
+        states = []
+        prefetcher = HashPrefetcher(self._capture, self.cache_dir, serial_source=lambda: "PF1ABCDE")
+        prefetcher.add_listener(lambda state, path: states.append(state))
+
+        self.assertTrue(prefetcher.start())
+        first = prefetcher.get("PF1ABCDE", wait=5)
+        second = prefetcher.get("PF1ABCDE", wait=5)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, ["PF1ABCDE"])
+        self.assertEqual(states, ["pending", "ready"])
+        stats = prefetcher.stats()
+        self.assertEqual(stats["captures"], 1)
+        self.assertEqual(stats["misses"], 0)
+        self.assertEqual(stats["hits"] + stats["waits"], 2)
+
+    def test_csv_from_an_earlier_session_is_a_hit_and_failures_retry(self):
+        from utils.hash_prefetch import HashPrefetcher, hash_csv_filename
+
+        existing = Path(self.cache_dir) / hash_csv_filename("PF/OLD")
+        existing.write_text("cached", encoding="utf-8")
+        failing = Mock(return_value=None)
+        prefetcher = HashPrefetcher(failing, self.cache_dir)
+
+        self.assertEqual(prefetcher.get("PF/OLD"), str(existing))
+        self.assertIsNone(prefetcher.get("PF2NEW", wait=5))
+        self.assertIsNone(prefetcher.get("PF2NEW", wait=5))
+
+        self.assertEqual(failing.call_count, 2)
+        stats = prefetcher.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["failures"]), (1, 2, 2))
+        self.assertEqual(stats["state"], "failed")
+
+
+class _StandInWebTools:
+    """Local HTTP server that answers uploads with scripted status codes."""
+
+    def __init__(self, statuses=(), delay=0.0, unsupported=None):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.statuses = list(statuses)
+        self.requests = []
+        self.request_headers = []
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+        lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so reused connections are visible
+
+            def setup(self):
+                super().setup()
+                with lock:
+                    stand_in.connections += 1
+
+            def do_POST(self):
+                import time
+
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with lock:
+                    stand_in.active += 1
+                    stand_in.max_active = max(stand_in.max_active, stand_in.active)
+                    if unsupported is not None and unsupported(self.headers):
+                        status = 415
+                    else:
+                        status = stand_in.statuses.pop(0) if stand_in.statuses else 200
+                    stand_in.requests.append((self.path, self.headers.get("Idempotency-Key"), body))
+                    stand_in.request_headers.append(dict(self.headers))
+                time.sleep(delay)
+                payload = json.dumps({"success": status == 200}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                with lock:
+                    stand_in.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class UploadOutboxTests(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = Path(temp_dir.name)
+        self.outbox_path = str(self.temp_dir / "outbox.sqlite3")
+
+    def _stand_in(self, **kwargs):
+        stand_in = _StandInWebTools(**kwargs)
+        self.addCleanup(stand_in.close)
+        return stand_in
+
+    def _post_handler(self, stand_in):
+        import requests
+
+        from utils.upload_outbox import DELIVERED, REJECTED, RETRY
+
+        def handler(item):
+            response = requests.post(
+                f"{stand_in.url}/upload", json=item.payload, headers={"Idempotency-Key": item.idempotency_key}, timeout=5
+            )
+            if response.status_code == 200:
+                return DELIVERED, ""
+            return (RETRY if response.status_code >= 500 else REJECTED), f"status={response.status_code}"
+
+        return handler
+
+    def test_queued_hash_upload_retries_with_one_idempotency_key(self):
+        from utils import helpers
+        from utils.upload_outbox import UploadOutbox
+        from utils.webtools_client import WebToolsClient, WebToolsConfig
+
+        stand_in = self._stand_in(statuses=[503, 200])
+        csv_path = self.temp_dir / "PF1ABCDE.csv"
+        csv_path.write_bytes(b"\xef\xbb\xbfDevice Serial Number,Hardware Hash\r\nPF1ABCDE,T0FB\r\n")
+        outbox = UploadOutbox(
+            self.outbox_path,
+            {helpers.OUTBOX_HASH_UPLOAD: helpers._deliver_queued_hash_upload},
+            base_delay=0.01,
+        )
+        self.addCleanup(helpers.set_upload_outbox, None)
+        helpers.set_upload_outbox(outbox)
+        self.addCleanup(helpers.set_webtools_client, None)
+        helpers.set_webtools_client(WebToolsClient(WebToolsConfig(stand_in.url, "test-key"), backoff_factor=0))
+
+        self.assertTrue(helpers.queue_hash_csv_upload(str(csv_path), serial_id=42, sku="X280"))
+        outbox.start()
+        self.assertTrue(outbox.drain(5))
+
+        self.assertEqual([path for path, _key, _body in stand_in.requests], ["/orders/serials/hash"] * 2)
+        keys = {key for _path, key, _body in stand_in.requests}
+        self.assertEqual(len(keys), 1)
+        self.assertIn(b"PF1ABCDE,T0FB", stand_in.requests[-1][2])
+        self.assertIn(b'name="serial_id"', stand_in.requests[-1][2])
+        stats = outbox.stats()
+        # The 503 is retried by the client adapter, inside one outbox attempt.
+        self.assertEqual((stats["pending"], stats["delivered"], stats["retried"]), (0, 1, 0))
+
+    def test_queued_stock_report_is_sent_with_the_hash_csv_inline(self):
+        from utils import helpers
+        from utils.upload_outbox import UploadOutbox
+        from utils.webtools_client import WebToolsClient, WebToolsConfig
+
+        stand_in = self._stand_in()
+        csv_path = self.temp_dir / "PF1ABCDE.csv"
+        csv_path.write_text("Device Serial Number,Hardware Hash\nPF1ABCDE,T0FB\n", encoding="utf-8")
+        outbox = UploadOutbox(self.outbox_path, {helpers.OUTBOX_STOCK_REPORT: helpers._deliver_queued_stock_report})
+        self.addCleanup(helpers.set_upload_outbox, None)
+        helpers.set_upload_outbox(outbox)
+        self.addCleanup(helpers.set_webtools_client, None)
+        helpers.set_webtools_client(WebToolsClient(WebToolsConfig(stand_in.url, "test-key"), backoff_factor=0))
+
+        self.assertTrue(
+            helpers.queue_stock_unit_check_report(
+                order_id=4,
+                order_number="ORD-4",
+                serial_number="PF1ABCDE",
+                sku="X280",
+                specs={},
+                test_results={},
+                hash_csv_path=str(csv_path),
+                battery_report={"wear_level": "12%"},
+                checked_at="2026-01-05T10:00:00Z",
+                idempotency_key="journal-PF1ABCDE",
+            )
+        )
+        outbox.start()
+        self.assertTrue(outbox.drain(5))
+
+        ((path, key, body),) = stand_in.requests
+        report = json.loads(body)
+        self.assertEqual((path, key), (helpers.STOCK_REPORT_PATH, "journal-PF1ABCDE"))
+        self.assertEqual(report["hash_filename"], "PF1ABCDE.csv")
+        self.assertIn("PF1ABCDE,T0FB", report["hash_file_data"])
+        self.assertEqual(report["battery_report"], {"wear_level": "12%"})
+
+    def test_uploads_interrupted_by_a_crash_are_replayed_under_the_cap(self):
+        import sqlite3
+
+        from utils.upload_outbox import UploadOutbox
+
+        stand_in = self._stand_in(delay=0.1)
+        first = UploadOutbox(self.outbox_path, {"report": self._post_handler(stand_in)})
+        keys = [first.enqueue("report", {"serial": f"PF{index}"}) for index in range(5)]
+        with sqlite3.connect(self.outbox_path) as conn:  # the previous session died mid-send
+            conn.execute("UPDATE outbox SET status = 'sending'")
+
+        replay = UploadOutbox(self.outbox_path, {"report": self._post_handler(stand_in)}, max_concurrent=2)
+        self.addCleanup(replay.stop, 0)
+        replay.start()
+
+        self.assertTrue(replay.drain(10))
+        self.assertEqual(sorted(key for _path, key, _body in stand_in.requests), sorted(keys))
+        self.assertLessEqual(stand_in.max_active, 2)
+
+    def test_rejected_uploads_are_parked(self):
+        from utils.upload_outbox import UploadOutbox
+
+        stand_in = self._stand_in(statuses=[400])
+        outbox = UploadOutbox(self.outbox_path, {"report": self._post_handler(stand_in)}, base_delay=0.01)
+        self.addCleanup(outbox.stop, 0)
+        outbox.enqueue("report", {"serial": "PF1"})
+        outbox.start()
+
+        self.assertTrue(outbox.drain(5))
+        self.assertEqual(outbox.stats()["dead"], 1)
+        self.assertEqual(len(stand_in.requests), 1)
+
+
+class WebToolsClientTests(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+
+        from utils import helpers
+        from utils.webtools_client import WebToolsClient, WebToolsConfig
+
+        self.helpers = helpers
+        self.stand_in = _StandInWebTools()
+        self.addCleanup(self.stand_in.close)
+        self.addCleanup(helpers.set_webtools_client, None)
+        helpers.set_webtools_client(WebToolsClient(WebToolsConfig(self.stand_in.url, "test-key"), backoff_factor=0))
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.csv_path = Path(temp_dir.name) / "PF1ABCDE.csv"
+        self.csv_path.write_text("Device Serial Number,Hardware Hash\nPF1ABCDE,T0FB\n", encoding="utf-8")
+
+    def test_uploads_of_one_assignment_share_a_connection(self):
+        self.assertTrue(self.helpers.upload_hash_csv(str(self.csv_path), serial_id=7))
+        ok, _body = self.helpers.upload_trade_job_check_report(
+            job_reference="TJ-1", serial_number="PF1ABCDE", product_label="X280", specs={}, test_results={}
+        )
+        self.assertTrue(ok)
+        ok, _body = self.helpers.upload_stock_unit_check_report(
+            order_id=1, order_number="ORD-1", serial_number="PF1ABCDE", sku="X280", specs={}, test_results={}
+        )
+        self.assertTrue(ok)
+
+        paths = [path for path, _key, _body in self.stand_in.requests]
+        self.assertEqual(
+            paths, ["/orders/serials/hash", "/jobs/api/second-check/trade-report", "/api/stock_units/check-report"]
+        )
+        self.assertEqual(self.stand_in.connections, 1)
+
+    def test_5xx_is_retried_by_the_adapter_and_config_is_read_once(self):
+        from utils.webtools_client import WebToolsClient
+
+        self.stand_in.statuses = [502, 503]
+        ok, _body = self.helpers.upload_stock_unit_check_report(
+            order_id=1, order_number="ORD-1", serial_number="PF1ABCDE", sku="X280", specs={}, test_results={}
+        )
+        self.assertTrue(ok)
+        self.assertEqual(len(self.stand_in.requests), 3)
+        self.assertEqual(len({key for _path, key, _body in self.stand_in.requests}), 1)
+
+        self.helpers.set_webtools_client(None)
+        with patch.object(self.helpers, "_load_webtools_api_config", return_value=("http://127.0.0.1:9", "k")) as load:
+            first = self.helpers.get_webtools_client()
+            self.assertIs(self.helpers.get_webtools_client(), first)
+        self.assertIsInstance(first, WebToolsClient)
+        load.assert_called_once()
+
+    def test_report_that_queues_on_failure_is_posted_once(self):
+        from utils.upload_outbox import UploadOutbox
+
+        outbox = UploadOutbox(
+            str(self.csv_path.parent / "outbox.sqlite3"),
+            {self.helpers.OUTBOX_TRADE_REPORT: self.helpers._deliver_queued_trade_report},
+        )
+        self.addCleanup(self.helpers.set_upload_outbox, None)
+        self.helpers.set_upload_outbox(outbox)
+        self.stand_in.statuses = [503, 503, 503, 503]
+
+        ok, body = self.helpers.upload_trade_job_check_report(
+            job_reference="TJ-1",
+            serial_number="PF1ABCDE",
+            product_label="X280",
+            specs={},
+            test_results={},
+            queue_on_failure=True,
+        )
+
+        self.assertFalse(ok)
+        self.assertTrue(body["queued"])
+        # No adapter retries in the foreground: the outbox sender owns them.
+        self.assertEqual(len(self.stand_in.requests), 1)
+        self.assertEqual(outbox.stats()["pending"], 1)
+
+
+class StreamingReportUploadTests(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.csv_path = Path(temp_dir.name) / "PF1ABCDE.csv"
+        self.csv_bytes = b"Device Serial Number,Hardware Hash\r\n" + b"PF1ABCDE," + b"T0FB" * 50_000 + b"\r\n"
+        self.csv_path.write_bytes(self.csv_bytes)
+
+    def _use_client(self, stand_in, **options):
+        from utils import helpers
+        from utils.webtools_client import WebToolsClient, WebToolsConfig
+
+        client = WebToolsClient(WebToolsConfig(stand_in.url, "test-key", **options), backoff_factor=0)
+        self.addCleanup(helpers.set_webtools_client, None)
+        helpers.set_webtools_client(client)
+        return helpers, client
+
+    def test_multipart_stream_reports_its_length_and_rewinds(self):
+        from utils.webtools_client import MultipartStream
+
+        stream = MultipartStream([("report", b'{"a": 1}', "application/json")], [("hash_file", "x.csv", str(self.csv_path), "text/csv")])
+        first = b"".join(iter(lambda: stream.read(7_001), b""))
+        stream.seek(0)
+        second = stream.read()
+        stream.close()
+
+        self.assertEqual(len(first), len(stream))
+        self.assertEqual(first, second)
+        self.assertIn(b'name="report"', first)
+        self.assertIn(self.csv_bytes, first)
+        self.assertTrue(first.endswith(f"--{stream.boundary}--\r\n".encode("ascii")))
+
+    def test_gzip_rejected_with_415_is_resent_plain_and_disabled(self):
+        import gzip
+
+        stand_in = _StandInWebTools(unsupported=lambda headers: headers.get("Content-Encoding") == "gzip")
+        self.addCleanup(stand_in.close)
+        helpers, client = self._use_client(stand_in, report_upload="multipart", compress=True)
+
+        for _ in range(2):
+            ok, _body = helpers.upload_trade_job_check_report(
+                job_reference="TJ-1",
+                serial_number="PF1ABCDE",
+                product_label="X280",
+                specs={},
+                test_results={},
+                hash_csv_path=str(self.csv_path),
+            )
+            self.assertTrue(ok)
+
+        encodings = [headers.get("Content-Encoding") for headers in stand_in.request_headers]
+        self.assertEqual(encodings, ["gzip", None, None])
+        self.assertFalse(client.compress)
+        self.assertIn(self.csv_bytes, gzip.decompress(stand_in.requests[0][2]))
+        self.assertTrue(stand_in.request_headers[1]["Content-Type"].startswith("multipart/form-data"))
+        self.assertIn(self.csv_bytes, stand_in.requests[1][2])
+        self.assertIn(b'"hash_file_data": ""', stand_in.requests[1][2])
+
+    def test_multipart_rejected_with_415_falls_back_to_embedded_json(self):
+        stand_in = _StandInWebTools(unsupported=lambda headers: headers.get("Content-Type", "").startswith("multipart/"))
+        self.addCleanup(stand_in.close)
+        helpers, client = self._use_client(stand_in, report_upload="multipart")
+
+        ok, _body = helpers.upload_stock_unit_check_report(
+            order_id=1,
+            order_number="ORD-1",
+            serial_number="PF1ABCDE",
+            sku="X280",
+            specs={},
+            test_results={},
+            hash_csv_path=str(self.csv_path),
+        )
+
+        self.assertTrue(ok)
+        self.assertEqual(client.report_upload, "json")
+        report = json.loads(stand_in.requests[-1][2])
+        self.assertEqual(report["hash_filename"], "PF1ABCDE.csv")
+        self.assertEqual(report["hash_file_data"], self.csv_bytes.decode("utf-8").replace("\r\n", "\n"))
+
+
+class BatchAssignTests(unittest.TestCase):
+    def _rows(self):
+        from logic.batch_assign_logic import BatchRow
+
+        return [
+            BatchRow(2, "S1", specs={"CPU": "i5"}, test_results={"keyboard": "Pass"}),
+            BatchRow(3, "S2", sku="SKU-B"),
+            BatchRow(4, "S3"),
+            BatchRow(5, ""),
+            BatchRow(6, "S1"),
+        ]
+
+    def _conn(self, existing):
+        conn = Mock()
+        cursor = conn.cursor.return_value
+        cursor.fetchall.side_effect = [[("SKU-A",)], existing]
+        return conn, cursor
+
+    def test_csv_columns_map_onto_specs_and_tests(self):
+        import tempfile
+
+        from logic.batch_assign_logic import read_batch_csv
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "pallet.csv"
+            path.write_text("Serial_Number,SKU,CPU,Battery2,Keyboard,extra\nPF1,SKU-A,i7,88%,pass,x\n", encoding="utf-8-sig")
+            rows = read_batch_csv(str(path))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0].serial_number, rows[0].sku), ("PF1", "SKU-A"))
+        self.assertEqual(rows[0].specs["CPU"], "i7")
+        self.assertEqual(rows[0].specs["Battery 2"], "88%")
+        self.assertEqual(rows[0].test_results["keyboard"], "pass")
+
+    def test_batch_resolves_once_checks_conflicts_once_and_commits_once(self):
+        from logic import batch_assign_logic
+
+        conn, cursor = self._conn([("S2", "ORD-7"), ("S3", "ORD-9")])
+        with patch.object(batch_assign_logic, "resolve_order_identity", return_value=(7, "ORD-7")) as resolve:
+            result = batch_assign_logic.assign_serials_batch(conn, "ord-7", self._rows(), assigned_by="tech")
+
+        resolve.assert_called_once()
+        self.assertEqual(cursor.execute.call_count, 2)
+        conflict_sql, conflict_params = cursor.execute.call_args_list[1].args
+        self.assertIn("IN (%s, %s, %s)", conflict_sql)
+        self.assertEqual(conflict_params, ("S1", "S2", "S3"))
+        cursor.executemany.assert_called_once()
+        inserted = cursor.executemany.call_args.args[1]
+        self.assertEqual([(row[2], row[3], row[4], row[13], row[-1]) for row in inserted], [("S1", "SKU-A", "i5", "pass", "tech")])
+        conn.commit.assert_called_once()
+        self.assertTrue(result.ok)
+        self.assertEqual(
+            [row.status for row in result.rows],
+            ["assigned", "already_assigned", "conflict", "invalid", "duplicate"],
+        )
+        self.assertEqual(result.rows[2].detail, "assigned to ORD-9")
+
+    def test_reassign_moves_conflicts_in_the_same_transaction(self):
+        from logic import batch_assign_logic
+
+        conn, cursor = self._conn([("S3", "ORD-9")])
+        with patch.object(batch_assign_logic, "resolve_order_identity", return_value=(7, "ORD-7")):
+            result = batch_assign_logic.assign_serials_batch(conn, "ORD-7", self._rows()[:3], reassign=True)
+
+        delete_call, insert_call = cursor.executemany.call_args_list
+        self.assertEqual(delete_call.args[1], [("S3",)])
+        self.assertEqual([row[2] for row in insert_call.args[1]], ["S1", "S2", "S3"])
+        conn.commit.assert_called_once()
+        self.assertEqual([row.status for row in result.rows], ["assigned", "assigned", "reassigned"])
+
+    def test_serials_match_case_and_trailing_space_insensitively(self):
+        from logic import batch_assign_logic
+        from logic.batch_assign_logic import BatchRow
+
+        rows = [BatchRow(2, "pf1abc", sku="SKU-A"), BatchRow(3, "PF1ABC ", sku="SKU-A"), BatchRow(4, "s3", sku="SKU-A")]
+        conn = Mock()
+        conn.cursor.return_value.fetchall.return_value = [("S3 ", "ORD-9")]
+        with patch.object(batch_assign_logic, "resolve_order_identity", return_value=(7, "ORD-7")):
+            result = batch_assign_logic.assign_serials_batch(conn, "ORD-7", rows, reassign=True)
+
+        self.assertEqual([row.status for row in result.rows], ["assigned", "duplicate", "reassigned"])
+        self.assertEqual(result.rows[2].detail, "moved from ORD-9")
+
+    def test_write_failure_rolls_back_every_row(self):
+        from logic import batch_assign_logic
+
+        conn, cursor = self._conn([])
+        cursor.executemany.side_effect = RuntimeError("deadlock")
+        with patch.object(batch_assign_logic, "resolve_order_identity", return_value=(7, "ORD-7")):
+            result = batch_assign_logic.assign_serials_batch(conn, "ORD-7", self._rows()[:2])
+
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+        self.assertFalse(result.ok)
+        self.assertIn("deadlock", result.error)
+        self.assertEqual([row.status for row in result.rows], ["failed", "failed"])
+
+
+class _OrderSerialsStandIn:
+    """SQLite ``order_serials`` behind a MySQLdb-style connection that raises MySQL error codes."""
+
+    def __init__(self):
+        import sqlite3
+
+        from main_logic import ORDER_SERIALS_COLUMNS
+
+        self.conn = sqlite3.connect(":memory:")
+        columns = ", ".join(f"{column} {'TEXT UNIQUE' if column == 'serial_number' else ''}" for column in ORDER_SERIALS_COLUMNS)
+        self.conn.execute(f"CREATE TABLE order_serials (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})")
+        # Errors raised by the next INSERTs, in order (None lets one through).
+        self.insert_failures = []
+        self.commits = 0
+
+    def add(self, serial_number, order_number):
+        self.conn.execute(
+            "INSERT INTO order_serials (order_id, order_number, serial_number) VALUES (?, ?, ?)", (9, order_number, serial_number)
+        )
+        self.conn.commit()
+
+    def owners(self):
+        return self.conn.execute("SELECT serial_number, order_number FROM order_serials ORDER BY id").fetchall()
+
+    def cursor(self):
+        import sqlite3
+
+        stand_in = self
+
+        class _Cursor:
+            lastrowid = None
+
+            def execute(self, sql, params=()):
+                if sql.strip().startswith("INSERT") and stand_in.insert_failures:
+                    failure = stand_in.insert_failures.pop(0)
+                    if failure is not None:
+                        raise failure
+                try:
+                    result = stand_in.conn.execute(sql.replace("%s", "?"), params)
+                except sqlite3.IntegrityError as exc:
+                    raise Exception(1062, f"Duplicate entry for key 'uniq_serial_number' ({exc})")
+                self.lastrowid = result.lastrowid
+                self._rows = result.fetchall()
+
+            def fetchall(self):
+                return self._rows
+
+        return _Cursor()
+
+    def commit(self):
+        self.commits += 1
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+
+class OfflineJournalTests(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+
+        from utils.offline_store import AssignmentJournal, OfflineOrderStore
+
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = Path(temp_dir.name)
+        path = str(self.temp_dir / "offline.sqlite3")
+        self.store = OfflineOrderStore(path)
+        self.journal = AssignmentJournal(path)
+
+    def _journal(self, serial, order_number="ORD-1", hash_csv_path=None, report=None):
+        import main_logic
+
+        tests = main_logic.normalised_test_results({"keyboard": "pass"})
+        row = main_logic.order_serial_row(1, order_number, serial, "SKU-1", {"CPU": "i5"}, tests, None, None, "tester")
+        return self.journal.append(
+            1,
+            order_number,
+            serial,
+            dict(zip(main_logic.ORDER_SERIALS_COLUMNS, row)),
+            hash_csv_path=hash_csv_path,
+            checked_at="2026-01-05T10:00:00Z",
+            report=report,
+        )
+
+    def test_snapshot_is_found_by_searched_reference_and_order_number(self):
+        snapshot = {"order_id": 4, "order_number": "ORD-4", "match_rank": 3, "candidates": [], "note": "fragile"}
+
+        self.store.save("ext-9911", snapshot)
+
+        self.assertEqual(self.store.load(" EXT-9911 ")["note"], "fragile")
+        self.assertEqual(self.store.load("ord-4")["order_id"], 4)
+        self.assertIsNone(self.store.load("ORD-5"))
+        self.assertEqual(self.store.stats(), {"snapshots": 2})
+
+    def test_offline_results_footer_shows_the_snapshot_age(self):
+        import main_logic
+
+        self.assertIn("less than a minute ago", main_logic.offline_snapshot_notice(1000.0, now=1030.0))
+        self.assertIn("1 day ago", main_logic.offline_snapshot_notice(1000.0, now=1000.0 + 86400 * 1.5))
+
+        specs = {field: "Unknown" for field in ("Model", "CPU", "SSD", "RAM", "Resolution", "Windows", "Battery")}
+        notice = main_logic.offline_snapshot_notice(1000.0, now=1000.0 + 2 * 3600)
+        with patch.object(main_logic, "get_battery_snapshot", return_value=Mock(count=0)), patch.object(
+            main_logic, "battery_labels_for", return_value=[]
+        ):
+            summary, _color, *_rest = main_logic.build_results_footer(
+                specs, specs, {"state": "unsupported"}, offline_notice=notice
+            )
+
+        self.assertTrue(summary.startswith("OFFLINE: order details from a copy saved 2 h ago."))
+
+    def test_journalling_a_serial_again_supersedes_its_pending_entry(self):
+        self._journal("S1", "ORD-1")
+        self._journal("S2", "ORD-1")
+        self._journal("S1", "ORD-2")
+
+        pending = self.journal.pending()
+
+        self.assertEqual([(entry.serial_number, entry.order_number) for entry in pending], [("S2", "ORD-1"), ("S1", "ORD-2")])
+        self.assertEqual(pending[1].row["test_keyboard"], "pass")
+        self.assertEqual(self.journal.stats()["superseded"], 1)
+
+    def test_replay_applies_in_order_and_reports_serial_conflicts(self):
+        from logic.reconcile_logic import replay_assignment_journal
+
+        hash_csv = self.temp_dir / "S1.csv"
+        hash_csv.write_text("hash", encoding="utf-8")
+        db = _OrderSerialsStandIn()
+        db.add("S2", "ORD-9")
+        self._journal("S1", hash_csv_path=str(hash_csv))
+        self._journal("S2")
+        self._journal("S3")
+        queue_hash_upload = Mock(return_value=True)
+
+        result = replay_assignment_journal(db, self.journal, queue_hash_upload=queue_hash_upload)
+
+        self.assertIsNone(result.stopped)
+        self.assertEqual([entry.status for entry in result.entries], ["applied", "conflict", "applied"])
+        self.assertEqual(result.conflicts[0].detail, "already assigned to ORD-9")
+        self.assertEqual(db.owners(), [("S2", "ORD-9"), ("S1", "ORD-1"), ("S3", "ORD-1")])
+        queue_hash_upload.assert_called_once()
+        self.assertEqual(queue_hash_upload.call_args.kwargs["serial_id"], result.entries[0].serial_row_id)
+        self.assertEqual(self.journal.stats()["pending"], 0)
+        self.assertEqual(self.journal.conflicts()[0]["serial_number"], "S2")
+        # Journalled without a stock report: written to MySQL but never seen by Web-Tools.
+        self.assertEqual([entry.serial_number for entry in result.db_only], ["S1", "S3"])
+        self.assertEqual(result.db_only[0].detail, "DB only: no stock report journalled")
+
+    def test_replay_queues_the_journalled_stock_report_with_the_hash_csv(self):
+        from logic.reconcile_logic import replay_assignment_journal
+
+        hash_csv = self.temp_dir / "S1.csv"
+        hash_csv.write_text("hash", encoding="utf-8")
+        report = {
+            "order_id": 1,
+            "order_number": "ORD-1",
+            "serial_number": "S1",
+            "sku": "SKU-1",
+            "specs": {"CPU": "i5"},
+            "test_results": {"keyboard": "pass"},
+            "mdm_status": None,
+            "assigned_by": "tester",
+            "battery_report": {"wear_level": "12%"},
+            "checked_at": "2026-01-05T10:00:00Z",
+        }
+        self._journal("S1", hash_csv_path=str(hash_csv), report=report)
+        queue_hash_upload = Mock(return_value=True)
+        queue_stock_report = Mock(side_effect=[True, False])
+
+        result = replay_assignment_journal(
+            _OrderSerialsStandIn(), self.journal, queue_hash_upload=queue_hash_upload, queue_stock_report=queue_stock_report
+        )
+
+        self.assertTrue(result.entries[0].report_queued)
+        self.assertEqual(result.db_only, [])
+        kwargs = queue_stock_report.call_args.kwargs
+        self.assertEqual(kwargs["hash_csv_path"], str(hash_csv))
+        self.assertEqual(kwargs["battery_report"], {"wear_level": "12%"})
+        self.assertEqual(kwargs["idempotency_key"], "journal-S1-2026-01-05T10:00:00Z")
+        # The report carries the hash CSV, so no separate hash upload is queued.
+        queue_hash_upload.assert_not_called()
+
+        self._journal("S2", report=dict(report, serial_number="S2"))
+        second = replay_assignment_journal(
+            _OrderSerialsStandIn(), self.journal, queue_hash_upload=queue_hash_upload, queue_stock_report=queue_stock_report
+        )
+
+        self.assertEqual(second.db_only[0].detail, "DB only: stock report could not be queued")
+
+    def test_journal_written_before_reports_were_stored_is_upgraded(self):
+        import sqlite3
+
+        from utils.offline_store import AssignmentJournal
+
+        path = str(self.temp_dir / "old.sqlite3")
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TABLE assignment_journal (id INTEGER PRIMARY KEY AUTOINCREMENT, order_id INTEGER NOT NULL, "
+                "order_number TEXT NOT NULL, serial_number TEXT NOT NULL, row TEXT NOT NULL, hash_csv_path TEXT, "
+                "checked_at TEXT, status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+                "detail TEXT, serial_row_id INTEGER, created_at REAL NOT NULL, applied_at REAL)"
+            )
+            conn.execute(
+                "INSERT INTO assignment_journal (order_id, order_number, serial_number, row, created_at) "
+                "VALUES (1, 'ORD-1', 'S0', '{}', 0)"
+            )
+        conn.close()
+
+        journal = AssignmentJournal(path)
+        journal.append(1, "ORD-1", "S1", {}, report={"serial_number": "S1"})
+
+        self.assertEqual([entry.report for entry in journal.pending()], [None, {"serial_number": "S1"}])
+
+    def test_replay_stops_when_the_connection_drops_and_resumes_later(self):
+        from logic.reconcile_logic import replay_assignment_journal
+
+        db = _OrderSerialsStandIn()
+        db.insert_failures = [None, Exception(2006, "MySQL server has gone away")]
+        for serial in ("S1", "S2", "S3"):
+            self._journal(serial, report={"serial_number": serial})
+        queue_stock_report = Mock(return_value=True)
+
+        first = replay_assignment_journal(db, self.journal, queue_hash_upload=Mock(), queue_stock_report=queue_stock_report)
+
+        self.assertIn("gone away", first.stopped)
+        self.assertEqual([entry.serial_number for entry in self.journal.pending()], ["S2", "S3"])
+
+        # S2 reached the table but the journal was not updated before the crash.
+        db.add("S2", "ORD-1")
+        second = replay_assignment_journal(db, self.journal, queue_hash_upload=Mock(), queue_stock_report=queue_stock_report)
+
+        self.assertIsNone(second.stopped)
+        self.assertEqual([entry.status for entry in second.entries], ["applied", "applied"])
+        self.assertEqual(second.entries[0].detail, "already in order_serials")
+        # Its report may not have been queued before the crash, so it is queued again under the same key.
+        self.assertEqual(queue_stock_report.call_count, 3)
+        self.assertEqual(self.journal.stats()["applied"], 3)
+
+    def _assign_offline(self, **overrides):
+        import main_logic
+
+        kwargs = dict(
+            order_number="ORD-4",
+            serial_number="PF24NEM2",
+            specs={"CPU": "i5"},
+            test_results={key: "pass" for key in main_logic.TEST_RESULT_KEYS},
+            sku="",
+            mdm_status=None,
+            assigned_by="tester",
+            root=Mock(),
+        )
+        kwargs.update(overrides)
+        with (
+            patch.object(main_logic, "get_db_connection", return_value=None),
+            patch.object(main_logic, "get_offline_order_store", return_value=self.store),
+            patch.object(main_logic, "get_assignment_journal", return_value=self.journal),
+            patch.object(main_logic, "extract_details_from_sku", return_value={}),
+            patch.object(main_logic, "build_results_footer", return_value=("All listed specs match.", None, None, None, None)),
+            patch.object(main_logic, "get_hash_prefetcher", return_value=Mock(get=Mock(return_value=None))),
+            patch.object(main_logic, "get_latest_batteryinfoview_report", return_value={"wear_level": "12%"}),
+            patch.object(main_logic, "upload_stock_unit_check_report") as upload_stock_report,
+            patch.object(main_logic, "show_assign_success_dialog") as show_success,
+            patch.object(main_logic.messagebox, "showerror") as showerror,
+        ):
+            main_logic.assign_serial_logic(**kwargs)
+        upload_stock_report.assert_not_called()
+        return show_success, showerror
+
+    def test_assign_while_offline_journals_the_full_row(self):
+        self.store.save(
+            "ORD-4",
+            {
+                "order_id": 4,
+                "order_number": "ORD-4",
+                "match_rank": 1,
+                "candidates": [{"label": "SKU-4", "sku": "SKU-4", "details": None}],
+                "note": "",
+            },
+        )
+
+        show_success, showerror = self._assign_offline()
+
+        showerror.assert_not_called()
+        self.assertIn("saved offline", show_success.call_args.args[1])
+        (entry,) = self.journal.pending()
+        self.assertEqual((entry.order_id, entry.serial_number), (4, "PF24NEM2"))
+        self.assertEqual(entry.row["sku"], "SKU-4")
+        self.assertEqual(entry.row["cpu"], "i5")
+        self.assertEqual(entry.row["activation"], "pass")
+        self.assertEqual(entry.row["assigned_by"], "tester")
+        self.assertEqual(entry.report["sku"], "SKU-4")
+        self.assertEqual(entry.report["battery_report"], {"wear_level": "12%"})
+        self.assertEqual(entry.report["checked_at"], entry.checked_at)
+
+    def test_assign_while_offline_needs_a_saved_order(self):
+        show_success, showerror = self._assign_offline(order_number="ORD-404")
+
+        showerror.assert_called_once()
+        show_success.assert_not_called()
+        self.assertEqual(self.journal.pending(), [])
 
 
 class RuntimeManifestTests(unittest.TestCase):
@@ -68,13 +2192,17 @@ class AssignSerialLogicTests(unittest.TestCase):
             patch.object(main_logic, "extract_details_from_sku", return_value={}),
             patch.object(main_logic, "build_results_footer", return_value=("All listed specs match.", None, None, None, None)),
             patch.object(main_logic, "resolve_order_identity", return_value=(12, "ORD-1")),
-            patch.object(main_logic, "capture_autopilot_hash_csv", return_value=r"C:\temp\PF24NEM2.csv"),
+            patch.object(
+                main_logic,
+                "get_hash_prefetcher",
+                return_value=Mock(get=Mock(return_value=r"C:\temp\PF24NEM2.csv")),
+            ),
             patch.object(
                 main_logic,
                 "upload_stock_unit_check_report",
                 return_value=(False, {"error": "Stock unit not found"}),
             ) as upload_stock_report,
-            patch.object(main_logic, "upload_hash_csv") as upload_hash_csv,
+            patch.object(main_logic, "queue_hash_csv_upload") as queue_hash_upload,
             patch.object(main_logic, "show_assign_success_dialog") as show_success,
             patch.object(main_logic.messagebox, "askyesno", return_value=False),
             patch.object(main_logic.messagebox, "showinfo") as showinfo,
@@ -100,13 +2228,61 @@ class AssignSerialLogicTests(unittest.TestCase):
             )
 
         self.assertEqual(upload_stock_report.call_count, 1)
-        upload_hash_csv.assert_not_called()
+        queue_hash_upload.assert_not_called()
         show_success.assert_not_called()
         showinfo.assert_called_once()
         conn.commit.assert_not_called()
         executed_sql = "\n".join(str(call.args[0]) for call in cursor.execute.call_args_list)
         self.assertNotIn("INSERT INTO order_serials", executed_sql)
 
+    def test_spans_exclude_time_spent_in_dialogs(self):
+        import time
+
+        import main_logic
+        from utils import telemetry
+
+        events = []
+        telemetry.set_event_sink(events.append)
+        self.addCleanup(telemetry.set_event_sink, None)
+        cursor = Mock()
+        cursor.fetchall.return_value = [("ORD-9",)]
+        conn = Mock()
+        conn.cursor.return_value = cursor
+
+        def slow_dialog(*args, **kwargs):
+            time.sleep(0.3)
+            return True
+
+        with (
+            patch.object(main_logic, "get_db_connection", return_value=conn),
+            patch.object(main_logic, "extract_details_from_sku", return_value={}),
+            patch.object(main_logic, "build_results_footer", return_value=("All listed specs match.", None, None, None, None)),
+            patch.object(main_logic, "resolve_order_identity", return_value=(12, "ORD-1")),
+            patch.object(main_logic, "get_hash_prefetcher", return_value=Mock(get=Mock(return_value=None))),
+            patch.object(main_logic, "get_latest_batteryinfoview_report", return_value={"filename": "b.csv"}),
+            patch.object(main_logic, "upload_stock_unit_check_report", return_value=(False, {"error": "HTTP 500"})),
+            patch.object(main_logic, "show_assign_success_dialog", side_effect=slow_dialog),
+            patch.object(main_logic.messagebox, "askyesno", side_effect=slow_dialog),
+            patch.object(main_logic.messagebox, "askokcancel", side_effect=slow_dialog),
+        ):
+            main_logic.assign_serial_logic(
+                order_number="ORD-1",
+                serial_number="PF24NEM2",
+                specs={},
+                test_results={},
+                sku="SKU-1",
+                mdm_status=None,
+                assigned_by="tester",
+                root=Mock(),
+            )
+
+        conn.commit.assert_called_once()
+        spans = {event["span"]: event for event in events if event["span"].startswith("assign_serial")}
+        self.assertEqual(
+            set(spans), {"assign_serial.prepare", "assign_serial.lookup", "assign_serial.stock_report", "assign_serial.write"}
+        )
+        self.assertTrue(all(event["duration_ms"] < 250 for event in spans.values()))
+
 
 if __name__ == "__main__":
     unittest.main()